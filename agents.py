@@ -3,23 +3,62 @@ Multi-agent supervisor system for easydo.ai
 """
 
 import logging
-from typing import Dict, Any, List, Sequence, TypedDict, Optional, Annotated
+from typing import (
+    Dict,
+    Any,
+    List,
+    Literal,
+    Sequence,
+    TypedDict,
+    Optional,
+    Annotated,
+    Awaitable,
+    Callable,
+)
 from langchain_anthropic import ChatAnthropic
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from langchain_core.messages import ToolMessage
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import RemoveMessage, ToolMessage
 from langgraph.graph import StateGraph, END, MessagesState, START
 from langgraph.prebuilt import create_react_agent
-from langgraph.types import Command
+from langgraph.types import Command, Send
 from langchain_core.tools import tool, InjectedToolCallId, Tool
+from langgraph.errors import GraphRecursionError
 from langgraph.prebuilt import InjectedState
+from pydantic import BaseModel, Field
 from tools import get_tools
+from utils.intent_router import (
+    DAY_WINDOW_WORDS,
+    IntentRouter,
+    format_tool_reply,
+    time_window,
+)
+from services.llm_scheduler import (
+    llm_scheduler,
+    llm_turn,
+    current_turn,
+    estimate_tokens,
+    record_usage,
+    turn_usage,
+)
+from mongodb_config import CHAT_SESSION_TAIL_SIZE
+from services.mongo_checkpointer import GRAPH_CHECKPOINTS_ENABLED, mongo_checkpointer
+from services.turn_budget import (
+    BudgetReason,
+    TurnBudget,
+    TurnBudgetCallback,
+    TurnBudgetExceeded,
+)
+import asyncio
 import json
 import os
+import uuid
 
 # Add these imports for timezone correction
 from dateutil import parser
 import pytz
-from datetime import datetime
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
 
 # Improved logging configuration
@@ -83,6 +122,74 @@ def setup_logging():
 # Setup logging at module level
 logger = setup_logging()
 
+# Route obvious single-tool requests around the supervisor LLM
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Let the supervisor run independent sub-tasks as concurrent graph branches
+PARALLEL_AGENTS_ENABLED = os.getenv("PARALLEL_AGENTS_ENABLED", "true").lower() == "true"
+MAX_PARALLEL_BRANCHES = int(os.getenv("MAX_PARALLEL_BRANCHES", "3"))
+
+
+class ScheduledChatAnthropic(ChatAnthropic):
+    """ChatAnthropic that waits for the global LLM scheduler before each call"""
+
+    @staticmethod
+    def _actual_tokens(result) -> Optional[int]:
+        """Record the response usage and return its total token count"""
+        try:
+            usage = result.generations[0].message.usage_metadata
+        except (IndexError, AttributeError):
+            return None
+        if not usage:
+            return None
+        record_usage(usage)
+        return usage["input_tokens"] + usage["output_tokens"]
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        turn = current_turn()
+        estimated = estimate_tokens(messages)
+        await llm_scheduler.acquire(turn["user_id"], estimated, turn["priority"])
+        actual = None
+        try:
+            result = await super()._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            actual = self._actual_tokens(result)
+            return result
+        finally:
+            llm_scheduler.release(estimated, actual)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        estimated = estimate_tokens(messages)
+        llm_scheduler.acquire_blocking(estimated)
+        result = super()._generate(
+            messages, stop=stop, run_manager=run_manager, **kwargs
+        )
+        actual = self._actual_tokens(result)
+        if actual is not None:
+            llm_scheduler.token_bucket.adjust(estimated - actual)
+        return result
+
+
+class SupervisorState(MessagesState):
+    """Supervisor graph state: messages plus the fast-path entry agent, if any"""
+
+    # Parallel branches may all clear this at once, so the last write wins
+    fast_path: Annotated[Optional[str], lambda _, new: new]
+
+
+class ParallelTask(BaseModel):
+    agent: Literal["retriever_agent", "executor_agent"] = Field(
+        description="Agent that should run this sub-task"
+    )
+    task: str = Field(
+        description="Self-contained instructions, including any details the agent needs"
+    )
+
+
+# Awaited with the messages each graph step added, e.g. to stream them
+StepCallback = Callable[[List[BaseMessage]], Awaitable[None]]
+
 
 class AgentState(TypedDict):
     messages: Sequence[BaseMessage]
@@ -91,6 +198,21 @@ class AgentState(TypedDict):
     user_context: Dict[str, Any]
 
 
+def build_conversation_history(
+    session_messages: List[Dict[str, Any]],
+) -> List[BaseMessage]:
+    """Convert stored chat messages into LangChain messages for the agent"""
+    conversation_history = []
+    for msg in session_messages:
+        role = msg.get("role")
+        content = msg.get("message")
+        if role == "user":
+            conversation_history.append(HumanMessage(content=content))
+        elif role == "assistant":
+            conversation_history.append(AIMessage(content=content))
+    return conversation_history
+
+
 def create_json_gmail_tool():
     """Create a Gmail tool that accepts a single JSON string"""
 
@@ -202,18 +324,167 @@ def create_json_calendar_tool():
     )
 
 
+# Static agent instructions. They never change between requests, so they are
+# sent as a cached system prefix; only the date context after them varies.
+RETRIEVER_STATIC_PROMPT = (
+    "You are a retriever agent specialized in information gathering and research.\n\n"
+    "INSTRUCTIONS:\n"
+    "1. Decide which tool to use based on the user's request\n"
+    "2. Look at the description of the tool and see if you have all details required\n"
+    "3. If you have all required details, proceed to calling those tools\n"
+    "4. If you don't have all required details, or if the task is outside your capabilities "
+    "(such as sending emails, creating calendar events, or performing actions), "
+    "use report_to_supervisor to ask for more details or hand off the task\n\n"
+    "Available tools and their purposes:\n"
+    "- Use your available tools for information gathering and research tasks\n"
+    "- Use report_to_supervisor when you need more information or when the task "
+    "requires actions beyond research (like sending emails or creating events)\n\n"
+    "IMPORTANT: Always use the current year from the date context when constructing "
+    "search queries. When searching for recent events, news, or information, use the "
+    "current year as the reference year. For example, if someone asks about "
+    "'latest news' or 'recent events', include the current year in your search.\n\n"
+    "Be thorough but concise in your findings when you can complete the task."
+)
+
+EXECUTOR_STATIC_PROMPT = (
+    "You are an executor agent specialized in performing actions and executing tasks.\n\n"
+    "INSTRUCTIONS:\n"
+    "1. Decide which tool to use based on the user's request\n"
+    "2. Look at the description of the tool and see if you have all details required\n"
+    "3. If you have all required details, proceed to calling those tools\n"
+    "4. If you don't have all required details, or if the task is outside your capabilities "
+    "(such as research, information gathering, or web searches), "
+    "use report_to_supervisor to ask for more details or hand off the task\n\n"
+    "Available tools and their purposes:\n"
+    "- Use your available tools for action-oriented tasks like sending emails and managing calendars\n"
+    "- Use report_to_supervisor when you need more information or when the task "
+    "requires research or information gathering beyond your action capabilities\n\n"
+    "Provide clear, actionable results of your operations when you can complete the task."
+)
+
+SUPERVISOR_STATIC_PROMPT = (
+    "You are a supervisor managing two specialized agents:\n"
+    "- RETRIEVER AGENT: Can only perform web searches and information gathering\n"
+    "- EXECUTOR AGENT: Can only perform actions like sending emails and creating calendar events\n\n"
+    "When delegating tasks involving recent events or latest information, "
+    "ensure agents use the current year from the date context\n\n"
+    "WORKFLOW COORDINATION RULES:\n\n"
+    "1. FOR PURE RESEARCH TASKS:\n"
+    "   - Send directly to retriever agent\n"
+    "   - Example: 'find information about...' → retriever_agent\n\n"
+    "2. FOR PURE ACTION TASKS (with all details provided):\n"
+    "   - Send directly to executor agent\n"
+    "   - Example: 'send email to john@example.com saying hello' → executor_agent\n\n"
+    "3. FOR COMBINED TASKS (research + actions):\n"
+    "   - FIRST: Send research part to retriever agent\n"
+    "   - THEN: Once you have research results, combine them with "
+    "action requirements and send to executor\n"
+    "   - Example: 'find best restaurant and send invite' → "
+    "retriever first, then executor with restaurant info\n\n"
+    "4. WHEN AGENTS REPORT BACK:\n"
+    "   - If retriever reports back saying it can't do actions BUT "
+    "hasn't provided research yet:\n"
+    "     → Tell retriever: 'First complete the research part using "
+    "web search, then report back with findings'\n"
+    "   - If retriever provides research results and mentions "
+    "actions needed:\n"
+    "     → Take the research results and delegate action tasks to "
+    "executor with full context\n"
+    "   - If executor reports back needing more information:\n"
+    "     → Send missing information request to retriever, then back "
+    "to executor\n\n"
+    "5. COORDINATION EXAMPLES:\n"
+    "   - Task: 'Find best pizza place and send email invitation'\n"
+    "     Step 1: 'Retriever: Find the best pizza place in [location]'\n"
+    "     Step 2: Wait for research results\n"
+    "     Step 3: 'Executor: Send email about [pizza place] invitation with details...'\n\n"
+    "IMPORTANT INSTRUCTIONS:\n"
+    "- NEVER let retriever skip the research step when research is needed\n"
+    "- ALWAYS ensure retriever completes web search before moving to actions\n"
+    "- ALWAYS provide full context (including research results) to executor\n"
+    "- Break down complex tasks into research phase → action phase\n"
+    "- If an agent reports inability without completing their core task, guide them to complete it first\n"
+    "- Provide comprehensive summaries to users based on all agent results\n"
+    "- When delegating tasks about recent events, "
+    "remind agents to use the current year in their searches"
+)
+
+PARALLEL_DISPATCH_PROMPT = (
+    "\n\nPARALLEL SUB-TASKS:\n"
+    "- When a request contains sub-tasks that do not depend on each other "
+    "(e.g. several separate searches, or a calendar lookup alongside research), "
+    "use dispatch_parallel to run them at the same time instead of one by one\n"
+    "- Each task must be self-contained; agents do not see each other's work\n"
+    "- Never put a task in the same batch as the task whose results it needs\n"
+    "- All results come back together before your next step"
+)
+
+
+# Anthropic silently ignores a cache breakpoint whose prefix (tool definitions
+# plus system text) is shorter than the model's minimum cacheable length
+PROMPT_CACHE_MIN_TOKENS = {"claude-3-5-haiku": 2048, "claude-3-haiku": 2048}
+PROMPT_CACHE_DEFAULT_MIN_TOKENS = 1024
+# Rough English/JSON ratio; errs towards dropping breakpoints near the limit
+CHARS_PER_TOKEN = 3.5
+
+
+def prompt_cache_min_tokens(model: Optional[str]) -> int:
+    """Minimum cacheable prefix for a model id"""
+    for prefix, min_tokens in PROMPT_CACHE_MIN_TOKENS.items():
+        if (model or "").startswith(prefix):
+            return min_tokens
+    return PROMPT_CACHE_DEFAULT_MIN_TOKENS
+
+
+def estimate_prefix_tokens(static_prompt: str, tools: Sequence[Any] = ()) -> int:
+    """Approximate tokens of the static system text plus the tool schemas"""
+    schemas = json.dumps([convert_to_anthropic_tool(t) for t in tools], default=str)
+    return int((len(static_prompt) + len(schemas)) / CHARS_PER_TOKEN)
+
+
+def build_cached_system_prompt(
+    static_prompt: str, dynamic_prompt: str, cache: bool = True
+) -> SystemMessage:
+    """System prompt whose static prefix carries an Anthropic cache breakpoint.
+
+    Anthropic caches everything up to the breakpoint (tool definitions and the
+    static instructions), so only the short dynamic suffix is re-processed.
+    With cache=False (prefix below the model's minimum) no breakpoint is set.
+    """
+    static_block = {"type": "text", "text": static_prompt}
+    if cache:
+        static_block["cache_control"] = {"type": "ephemeral"}
+    return SystemMessage(
+        content=[static_block, {"type": "text", "text": dynamic_prompt}]
+    )
+
+
 class MultiAgentSupervisor:
     """Multi-agent supervisor system with retriever and executor agents"""
 
-    def __init__(self, selected_tools: Optional[List[str]] = None):
+    def __init__(
+        self,
+        selected_tools: Optional[List[str]] = None,
+        llm=None,
+        parallel: bool = PARALLEL_AGENTS_ENABLED,
+        max_parallel_branches: int = MAX_PARALLEL_BRANCHES,
+        checkpointer=None,
+    ):
         logger.info("🚀 Initializing Multi-Agent Supervisor")
-        self.llm = ChatAnthropic(
+        self.llm = llm or ScheduledChatAnthropic(
             model="claude-3-5-haiku-20241022",
             temperature=0.7,
             anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
         )
         logger.info("✅ Claude model loaded")
 
+        self.intent_router = IntentRouter() if FAST_PATH_ENABLED else None
+        self.parallel = parallel and max_parallel_branches > 1
+        self.max_parallel_branches = max_parallel_branches
+        if checkpointer is None and GRAPH_CHECKPOINTS_ENABLED:
+            checkpointer = mongo_checkpointer
+        self.checkpointer = checkpointer
+
         # Get current date for agent context
         self.current_date = datetime.now().strftime("%Y-%m-%d")
         self.current_year = datetime.now().year
@@ -224,10 +495,29 @@ class MultiAgentSupervisor:
         self.executor_agent = self._create_executor_agent()
         self.supervisor_agent = self._create_supervisor_agent()
 
-        # Build the multi-agent graph
+        # Build the multi-agent graph, plus a checkpointed copy for chat sessions
         self.graph = self._build_supervisor_graph()
+        self.resumable_graph = (
+            self._build_supervisor_graph(self.checkpointer)
+            if self.checkpointer is not None
+            else None
+        )
         logger.info("✅ Multi-agent system ready")
 
+    def _build_system_prompt(
+        self, static_prompt: str, tools: Sequence[Any] = ()
+    ) -> SystemMessage:
+        """Static instructions marked for prompt caching, then the date context"""
+        prefix_tokens = estimate_prefix_tokens(static_prompt, tools)
+        min_tokens = prompt_cache_min_tokens(getattr(self.llm, "model", None))
+        return build_cached_system_prompt(
+            static_prompt,
+            f"CURRENT DATE CONTEXT:\n"
+            f"- Today's date: {self.current_date}\n"
+            f"- Current year: {self.current_year}",
+            cache=prefix_tokens >= min_tokens,
+        )
+
     def _create_retriever_agent(self):
         """Create retriever agent with web search capabilities"""
         # Get web search tool - use correct tool name
@@ -240,30 +530,7 @@ class MultiAgentSupervisor:
         retriever_agent = create_react_agent(
             model=self.llm,
             tools=all_tools,
-            prompt=(
-                f"You are a retriever agent specialized in information gathering and research.\n\n"
-                f"CURRENT DATE CONTEXT:\n"
-                f"- Today's date: {self.current_date}\n"
-                f"- Current year: {self.current_year}\n"
-                f"- When searching for recent events, news, or information, "
-                f"use {self.current_year} as the reference year\n"
-                f"- For queries about 'latest' or 'recent' events, search for {self.current_year} information\n\n"
-                "INSTRUCTIONS:\n"
-                "1. Decide which tool to use based on the user's request\n"
-                "2. Look at the description of the tool and see if you have all details required\n"
-                "3. If you have all required details, proceed to calling those tools\n"
-                "4. If you don't have all required details, or if the task is outside your capabilities "
-                "(such as sending emails, creating calendar events, or performing actions), "
-                "use report_to_supervisor to ask for more details or hand off the task\n\n"
-                "Available tools and their purposes:\n"
-                "- Use your available tools for information gathering and research tasks\n"
-                "- Use report_to_supervisor when you need more information or when the task "
-                "requires actions beyond research (like sending emails or creating events)\n\n"
-                "IMPORTANT: Always use the current year context when constructing search queries. "
-                f"For example, if someone asks about 'latest news' or 'recent events', "
-                f"include '{self.current_year}' in your search.\n\n"
-                "Be thorough but concise in your findings when you can complete the task."
-            ),
+            prompt=self._build_system_prompt(RETRIEVER_STATIC_PROMPT, all_tools),
             name="retriever_agent",
         )
         logger.info("🔍 Retriever agent created")
@@ -281,30 +548,10 @@ class MultiAgentSupervisor:
         # Combine tools
         executor_tools = [gmail_tool, calendar_tool, report_to_supervisor]
 
-        # Create a generic prompt for the executor agent
-        executor_prompt = (
-            f"You are an executor agent specialized in performing actions and executing tasks.\n\n"
-            f"CURRENT DATE CONTEXT:\n"
-            f"- Today's date: {self.current_date}\n"
-            f"- Current year: {self.current_year}\n\n"
-            "INSTRUCTIONS:\n"
-            "1. Decide which tool to use based on the user's request\n"
-            "2. Look at the description of the tool and see if you have all details required\n"
-            "3. If you have all required details, proceed to calling those tools\n"
-            "4. If you don't have all required details, or if the task is outside your capabilities "
-            "(such as research, information gathering, or web searches), "
-            "use report_to_supervisor to ask for more details or hand off the task\n\n"
-            "Available tools and their purposes:\n"
-            "- Use your available tools for action-oriented tasks like sending emails and managing calendars\n"
-            "- Use report_to_supervisor when you need more information or when the task "
-            "requires research or information gathering beyond your action capabilities\n\n"
-            "Provide clear, actionable results of your operations when you can complete the task."
-        )
-
         executor_agent = create_react_agent(
             model=self.llm,
             tools=executor_tools,
-            prompt=executor_prompt,
+            prompt=self._build_system_prompt(EXECUTOR_STATIC_PROMPT, executor_tools),
             name="executor_agent",
         )
         logger.info("⚡ Executor agent created")
@@ -323,58 +570,16 @@ class MultiAgentSupervisor:
             description="Assign email and calendar management tasks to the executor agent.",
         )
 
+        supervisor_tools = [assign_to_retriever, assign_to_executor]
+        supervisor_prompt = SUPERVISOR_STATIC_PROMPT
+        if self.parallel:
+            supervisor_tools.append(self._create_parallel_dispatch_tool())
+            supervisor_prompt += PARALLEL_DISPATCH_PROMPT
+
         supervisor_agent = create_react_agent(
             model=self.llm,
-            tools=[assign_to_retriever, assign_to_executor],
-            prompt=(
-                f"You are a supervisor managing two specialized agents:\n"
-                f"- RETRIEVER AGENT: Can only perform web searches and information gathering\n"
-                f"- EXECUTOR AGENT: Can only perform actions like sending emails and creating calendar events\n\n"
-                f"CURRENT DATE CONTEXT:\n"
-                f"- Today's date: {self.current_date}\n"
-                f"- Current year: {self.current_year}\n"
-                f"- When delegating tasks involving recent events or latest information, "
-                f"ensure agents use {self.current_year} context\n\n"
-                "WORKFLOW COORDINATION RULES:\n\n"
-                "1. FOR PURE RESEARCH TASKS:\n"
-                "   - Send directly to retriever agent\n"
-                "   - Example: 'find information about...' → retriever_agent\n\n"
-                "2. FOR PURE ACTION TASKS (with all details provided):\n"
-                "   - Send directly to executor agent\n"
-                "   - Example: 'send email to john@example.com saying hello' → executor_agent\n\n"
-                "3. FOR COMBINED TASKS (research + actions):\n"
-                "   - FIRST: Send research part to retriever agent\n"
-                "   - THEN: Once you have research results, combine them with "
-                "action requirements and send to executor\n"
-                "   - Example: 'find best restaurant and send invite' → "
-                "retriever first, then executor with restaurant info\n\n"
-                "4. WHEN AGENTS REPORT BACK:\n"
-                "   - If retriever reports back saying it can't do actions BUT "
-                "hasn't provided research yet:\n"
-                "     → Tell retriever: 'First complete the research part using "
-                "web search, then report back with findings'\n"
-                "   - If retriever provides research results and mentions "
-                "actions needed:\n"
-                "     → Take the research results and delegate action tasks to "
-                "executor with full context\n"
-                "   - If executor reports back needing more information:\n"
-                "     → Send missing information request to retriever, then back "
-                "to executor\n\n"
-                "5. COORDINATION EXAMPLES:\n"
-                "   - Task: 'Find best pizza place and send email invitation'\n"
-                "     Step 1: 'Retriever: Find the best pizza place in [location]'\n"
-                "     Step 2: Wait for research results\n"
-                "     Step 3: 'Executor: Send email about [pizza place] invitation with details...'\n\n"
-                "IMPORTANT INSTRUCTIONS:\n"
-                "- NEVER let retriever skip the research step when research is needed\n"
-                "- ALWAYS ensure retriever completes web search before moving to actions\n"
-                "- ALWAYS provide full context (including research results) to executor\n"
-                "- Break down complex tasks into research phase → action phase\n"
-                "- If an agent reports inability without completing their core task, guide them to complete it first\n"
-                "- Provide comprehensive summaries to users based on all agent results\n"
-                f"- When delegating tasks about recent events, "
-                f"remind agents to use {self.current_year} in their searches"
-            ),
+            tools=supervisor_tools,
+            prompt=self._build_system_prompt(supervisor_prompt, supervisor_tools),
             name="supervisor",
         )
         logger.info("🎯 Supervisor agent created")
@@ -416,6 +621,68 @@ class MultiAgentSupervisor:
 
         return handoff_tool
 
+    def _create_parallel_dispatch_tool(self):
+        """Create a tool that fans independent sub-tasks out to concurrent agents"""
+        max_branches = self.max_parallel_branches
+
+        @tool(
+            "dispatch_parallel",
+            description=(
+                "Run independent sub-tasks on the retriever and/or executor agents "
+                f"at the same time (at most {max_branches} per call). "
+                "Results from every branch are returned together."
+            ),
+        )
+        def dispatch_parallel_tool(
+            tasks: List[ParallelTask],
+            state: Annotated[MessagesState, InjectedState],
+            tool_call_id: Annotated[str, InjectedToolCallId],
+        ) -> Command:
+            dispatched, deferred = tasks[:max_branches], tasks[max_branches:]
+            logger.info(
+                f"🔀 SUPERVISOR → {len(dispatched)} PARALLEL BRANCHES"
+                + (f" ({len(deferred)} deferred)" if deferred else "")
+            )
+
+            summary = f"Dispatched {len(dispatched)} sub-tasks in parallel"
+            if deferred:
+                summary += (
+                    f". Branch limit is {max_branches}; not started: "
+                    + "; ".join(f"{t.agent}: {t.task}" for t in deferred)
+                )
+            # A fixed id lets every branch carry this message without duplicating it
+            tool_message = ToolMessage(
+                content=summary,
+                name="dispatch_parallel",
+                tool_call_id=tool_call_id,
+                id=str(uuid.uuid4()),
+            )
+            messages = state["messages"] + [tool_message]
+
+            branches = []
+            for index, sub_task in enumerate(dispatched, 1):
+                logger.info(f"   {index}. {sub_task.agent}: {sub_task.task[:150]}")
+                task_message = HumanMessage(
+                    content=f"Parallel sub-task {index}/{len(dispatched)}: "
+                    f"{sub_task.task}",
+                    name="supervisor",
+                )
+                branches.append(
+                    Send(
+                        sub_task.agent,
+                        {"messages": messages + [task_message], "fast_path": None},
+                    )
+                )
+
+            # Each branch ends at the supervisor, which runs once all have merged
+            return Command(
+                goto=branches,
+                update={**state, "messages": messages},
+                graph=Command.PARENT,
+            )
+
+        return dispatch_parallel_tool
+
     def _create_report_to_supervisor_tool(self):
         """Create a tool for agents to report back to supervisor when they need help or clarification"""
 
@@ -448,34 +715,107 @@ class MultiAgentSupervisor:
             }
             return Command(
                 goto="supervisor",
-                update={**state, "messages": state["messages"] + [tool_message]},
+                update={
+                    **state,
+                    "messages": state["messages"] + [tool_message],
+                    # A fast-path agent that needs help hands over to the supervisor
+                    "fast_path": None,
+                },
                 graph=Command.PARENT,
             )
 
         return report_to_supervisor_tool
 
-    def _build_supervisor_graph(self):
+    def _build_supervisor_graph(self, checkpointer=None):
         """Build the multi-agent supervisor graph"""
         logger.info("🔧 Building multi-agent graph...")
 
         # Create the supervisor graph
         supervisor_graph = (
-            StateGraph(MessagesState)
+            StateGraph(SupervisorState)
             .add_node(
                 self.supervisor_agent,
                 destinations=("retriever_agent", "executor_agent", END),
             )
             .add_node(self.retriever_agent)
             .add_node(self.executor_agent)
-            .add_edge(START, "supervisor")  # Add the START edge
-            .add_edge("retriever_agent", "supervisor")
-            .add_edge("executor_agent", "supervisor")
-            .compile()
+            .add_conditional_edges(
+                START,
+                self._route_entry,
+                ["supervisor", "retriever_agent", "executor_agent"],
+            )
+            .add_conditional_edges(
+                "retriever_agent", self._route_after_agent, ["supervisor", END]
+            )
+            .add_conditional_edges(
+                "executor_agent", self._route_after_agent, ["supervisor", END]
+            )
+            .compile(checkpointer=checkpointer)
         )
 
         logger.info("✅ Multi-agent graph compiled")
         return supervisor_graph
 
+    @staticmethod
+    def _route_entry(state: SupervisorState) -> str:
+        """Start at the fast-path agent if the router picked one"""
+        return state.get("fast_path") or "supervisor"
+
+    @staticmethod
+    def _route_after_agent(state: SupervisorState) -> str:
+        """A fast-path agent that finished on its own answers the user directly"""
+        return END if state.get("fast_path") else "supervisor"
+
+    async def _run_fast_path_tool(
+        self, route: Dict[str, Any], user_id: str
+    ) -> Optional[str]:
+        """Call a read-only tool directly; None means fall back to the supervisor"""
+        tools = get_tools([route["target"]])
+        if not tools:
+            return None
+        tool_func = tools[0].func
+
+        args = route["args"]
+        if "time_words" in route:
+            words = set(route["time_words"])
+            tz = timezone.utc
+            if words & DAY_WINDOW_WORDS:
+                # "today"/"tomorrow" end at the user's midnight, not the server's
+                try:
+                    # Imported here: the calendar services need OAuth settings
+                    from services.calendar_sync import calendar_sync
+
+                    tz_name = await asyncio.to_thread(
+                        calendar_sync.get_time_zone, user_id
+                    )
+                    tz = ZoneInfo(tz_name) if tz_name else None
+                except Exception as e:
+                    logger.warning(f"⚡ FAST PATH: no calendar time zone - {e}")
+                    tz = None
+                if tz is None:
+                    return None
+            args = {**args, **time_window(words, tz=tz)}
+
+        if route["target"] == "google_calendar_mcp":
+            kwargs = {
+                "tool": route["action"],
+                "args": {**args, "user_id": user_id},
+            }
+        else:
+            kwargs = {"action": route["action"], "user_id": user_id, **args}
+
+        try:
+            # Tool functions drive their own event loop, so keep them off ours
+            result = await asyncio.to_thread(tool_func, **kwargs)
+        except Exception as e:
+            logger.warning(f"⚡ FAST PATH: {route['action']} failed - {e}")
+            return None
+
+        reply = format_tool_reply(route, result)
+        if reply is None:
+            logger.info(f"⚡ FAST PATH: {route['action']} unusable, falling back")
+        return reply
+
     def _ensure_iso_with_tz(self, dt_str, tz_str):
         """Ensure datetime string has timezone info, else append from tz_str."""
         try:
@@ -503,11 +843,26 @@ class MultiAgentSupervisor:
             return " ".join(text_parts) if text_parts else ""
         return ""
 
+    async def has_checkpoint(self, session_id: str) -> bool:
+        """True if the session's messages are in a graph checkpoint"""
+        if self.resumable_graph is None:
+            return False
+        try:
+            snapshot = await self.resumable_graph.aget_state(
+                {"configurable": {"thread_id": session_id}}
+            )
+        except Exception:
+            return False
+        return bool(snapshot.values.get("messages"))
+
     async def process_message(
         self,
         user_input: str,
         conversation_history: List[BaseMessage] = None,
         user_id: str = None,
+        budget: Optional[TurnBudget] = None,
+        session_id: Optional[str] = None,
+        on_step: Optional[StepCallback] = None,
     ) -> str:
         """Process user message through the multi-agent supervisor system"""
         logger.info(
@@ -523,23 +878,97 @@ class MultiAgentSupervisor:
         else:
             user_input_with_context = user_input
 
-        messages = conversation_history + [
-            HumanMessage(content=user_input_with_context)
-        ]
-        logger.info(f"🔄 Starting multi-agent workflow with {len(messages)} messages")
+        graph, config = self.graph, {}
+        saved_messages, pending_nodes = None, ()
+        if session_id and self.resumable_graph is not None:
+            graph = self.resumable_graph
+            config = {"configurable": {"thread_id": session_id}}
+            try:
+                snapshot = await graph.aget_state(config)
+                saved_messages = snapshot.values.get("messages")
+                pending_nodes = snapshot.next
+            except Exception as e:
+                logger.warning(f"⚠️ Checkpoints unavailable, running without: {e}")
+                graph, config = self.graph, {}
+
+        route = None
+        if self.intent_router is not None:
+            # Callers with a checkpoint may pass no history; it is in the checkpoint
+            route = self.intent_router.classify(
+                user_input, conversation_history or saved_messages
+            )
 
-        # Create initial state
-        initial_state = {
-            "messages": messages,
-        }
+        if route and route["kind"] == "tool" and user_id:
+            logger.info(
+                f"⚡ FAST PATH: {route['reason']} → {route['target']}.{route['action']}"
+            )
+            reply = await self._run_fast_path_tool(route, user_id)
+            if reply is not None:
+                if saved_messages:
+                    await self._checkpoint_exchange(
+                        graph, config, user_input_with_context, reply
+                    )
+                return reply
+            route = None
+
+        user_message = HumanMessage(content=user_input_with_context)
+        if (
+            saved_messages
+            and pending_nodes
+            and self._is_current_turn(saved_messages, user_message)
+        ):
+            # The same turn was interrupted (crash, timeout or restart):
+            # continue from the last completed node instead of starting over
+            logger.info(f"♻️ Resuming session {session_id} at {list(pending_nodes)}")
+            initial_state = None
+        elif saved_messages:
+            # The checkpoint already holds every earlier message, tool results
+            # included, so only the new user message is added, and turns older
+            # than the same window the session tail keeps are removed from it
+            removed = self._trim_checkpointed(saved_messages)
+            logger.info(
+                f"🔄 Continuing checkpointed session with "
+                f"{len(saved_messages) - len(removed)} messages"
+            )
+            initial_state = {"messages": removed + [user_message], "fast_path": None}
+        else:
+            messages = conversation_history + [user_message]
+            logger.info(
+                f"🔄 Starting multi-agent workflow with {len(messages)} messages"
+            )
+            initial_state = {"messages": messages, "fast_path": None}
+
+        if initial_state is not None and route and route["kind"] == "agent":
+            logger.info(f"⚡ FAST PATH: {route['reason']} → {route['target']}")
+            initial_state["fast_path"] = route["target"]
 
         try:
             # Process through the multi-agent supervisor system
             logger.info("🚀 Starting multi-agent execution...")
-            final_state = await self.graph.ainvoke(initial_state)
+            budget = budget or TurnBudget()
+            with llm_turn(user_id):
+                final_state = await self._run_with_budget(
+                    graph, initial_state, config, budget, on_step
+                )
+                usage = turn_usage()
+            turn_messages = self._current_turn_messages(final_state["messages"])
+
+            logger.info(
+                f"📊 Token usage: {usage['calls']} calls, "
+                f"{usage['input_tokens']} input "
+                f"({usage['cache_read_tokens']} cache read, "
+                f"{usage['cache_creation_tokens']} cache write), "
+                f"{usage['output_tokens']} output"
+            )
 
             # Log detailed workflow analysis
-            self._log_workflow_analysis(final_state["messages"])
+            self._log_workflow_analysis(turn_messages)
+
+            if budget.exhausted:
+                logger.warning(
+                    f"⏱️ Turn budget exhausted ({budget.exhausted}): {budget.summary()}"
+                )
+                return self._partial_answer(turn_messages, budget.exhausted)
 
             logger.info(
                 f"✅ Workflow completed with {len(final_state['messages'])} total messages"
@@ -548,7 +977,7 @@ class MultiAgentSupervisor:
             # Look for the best response from the conversation
             all_responses = []
 
-            for message in final_state["messages"]:
+            for message in turn_messages:
                 if isinstance(message, AIMessage):
                     text = self._extract_text_from_message(message)
                     if text and text.strip() and text != "[]":
@@ -615,6 +1044,137 @@ class MultiAgentSupervisor:
         logger.warning("⚠️  No AI response found")
         return "I'm sorry, I couldn't generate a response."
 
+    async def _run_with_budget(
+        self,
+        graph,
+        initial_state: Optional[Dict[str, Any]],
+        config: Dict[str, Any],
+        budget: TurnBudget,
+        on_step: Optional[StepCallback] = None,
+    ) -> Dict[str, Any]:
+        """Run the graph step by step, keeping the latest state if the budget runs out"""
+        latest = initial_state or {"messages": []}
+        config = {
+            **config,
+            "recursion_limit": budget.recursion_limit,
+            "callbacks": [TurnBudgetCallback(budget)],
+        }
+
+        async def run_steps():
+            nonlocal latest
+            seen = None
+            async for state in graph.astream(
+                initial_state, config=config, stream_mode="values"
+            ):
+                latest = state
+                if seen is None:  # the starting state, before any step ran
+                    seen = len(state["messages"])
+                    continue
+                budget.record_step(state["messages"][seen:])
+                if on_step is not None:
+                    await on_step(state["messages"][seen:])
+                seen = len(state["messages"])
+
+        try:
+            await asyncio.wait_for(run_steps(), budget.remaining_seconds())
+        except TurnBudgetExceeded as e:
+            budget.exhausted = e.reason
+            logger.warning(f"⏱️ Stopping turn early: {e}")
+        except asyncio.TimeoutError:
+            budget.exhausted = BudgetReason.DEADLINE
+        except GraphRecursionError:
+            budget.exhausted = BudgetReason.STEPS
+        return latest
+
+    @staticmethod
+    def _is_user_message(message: BaseMessage) -> bool:
+        # Parallel sub-task instructions are HumanMessages written by the supervisor
+        return isinstance(message, HumanMessage) and message.name != "supervisor"
+
+    def _trim_checkpointed(
+        self, saved_messages: List[BaseMessage], keep: int = CHAT_SESSION_TAIL_SIZE
+    ) -> List[RemoveMessage]:
+        """Removals that cut checkpointed history to about keep messages
+
+        The cut is made at a user message, so a tool call is never separated
+        from its result; the latest turn is always kept.
+        """
+        excess = len(saved_messages) + 1 - keep  # room for the new user message
+        if excess <= 0:
+            return []
+        turn_starts = [
+            index
+            for index, message in enumerate(saved_messages)
+            if self._is_user_message(message)
+        ]
+        if not turn_starts:
+            return []
+        start = next((i for i in turn_starts if i >= excess), turn_starts[-1])
+        return [
+            RemoveMessage(id=message.id)
+            for message in saved_messages[:start]
+            if message.id
+        ]
+
+    def _current_turn_messages(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Messages produced after the latest user message"""
+        for index in range(len(messages) - 1, -1, -1):
+            if self._is_user_message(messages[index]):
+                return messages[index + 1 :]
+        return messages
+
+    def _is_current_turn(
+        self, saved_messages: List[BaseMessage], user_message: HumanMessage
+    ) -> bool:
+        """True if the checkpoint's latest user message is this one"""
+        for message in reversed(saved_messages):
+            if self._is_user_message(message):
+                return message.content == user_message.content
+        return False
+
+    async def _checkpoint_exchange(
+        self, graph, config: Dict[str, Any], user_input: str, reply: str
+    ):
+        """Record a fast-path exchange so the checkpointed history stays complete"""
+        try:
+            await graph.aupdate_state(
+                config,
+                {
+                    "messages": [
+                        HumanMessage(content=user_input),
+                        AIMessage(content=reply, name="supervisor"),
+                    ]
+                },
+                as_node="supervisor",
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not checkpoint fast-path reply: {e}")
+
+    def _partial_answer(self, messages: List[BaseMessage], reason: str) -> str:
+        """Best answer available when a turn stops early"""
+        findings = []
+        for message in messages:
+            if not isinstance(message, AIMessage):
+                continue
+            # Supervisor text next to a handoff is an instruction, not a finding
+            if message.tool_calls and message.name == "supervisor":
+                continue
+            text = self._extract_text_from_message(message)
+            if text and text.strip() and text != "[]":
+                findings.append(text)
+
+        if findings:
+            logger.info(f"📤 Using partial response ({len(findings[-1])} chars)")
+            return (
+                f"I had to stop before fully finishing this request ({reason}). "
+                f"Here's what I have so far:\n\n{findings[-1]}"
+            )
+        return (
+            f"I had to stop before finishing this request ({reason}) and don't "
+            "have a result yet. Please try again, or break the request into "
+            "smaller steps."
+        )
+
     def _log_workflow_analysis(self, messages):
         """Log detailed analysis of the workflow steps"""
         logger.info("🔍 WORKFLOW ANALYSIS:")
@@ -798,9 +1358,9 @@ class MultiAgentSupervisor:
 class EasydoAgent:
     """Legacy single agent - now delegates to MultiAgentSupervisor"""
 
-    def __init__(self, selected_tools: Optional[List[str]] = None):
+    def __init__(self, selected_tools: Optional[List[str]] = None, llm=None):
         logger.info("Initializing EasydoAgent (legacy mode)")
-        self.multi_agent = MultiAgentSupervisor(selected_tools)
+        self.multi_agent = MultiAgentSupervisor(selected_tools, llm=llm)
         logger.info("EasydoAgent now uses MultiAgentSupervisor")
 
     async def process_message(
@@ -808,8 +1368,18 @@ class EasydoAgent:
         user_input: str,
         conversation_history: List[BaseMessage] = None,
         user_id: str = None,
+        session_id: Optional[str] = None,
+        on_step: Optional[StepCallback] = None,
     ) -> str:
         """Delegate to the multi-agent supervisor system"""
         return await self.multi_agent.process_message(
-            user_input, conversation_history, user_id
+            user_input,
+            conversation_history,
+            user_id,
+            session_id=session_id,
+            on_step=on_step,
         )
+
+    async def has_checkpoint(self, session_id: str) -> bool:
+        """True if the session's messages are in a graph checkpoint"""
+        return await self.multi_agent.has_checkpoint(session_id)
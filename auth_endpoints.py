@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from services.google_oauth import oauth_service
 from aws_services.dynamodb_config import token_storage
+from services.auth_status import auth_status
 from user_service import user_service
 import logging
 
@@ -18,6 +19,8 @@ class AuthStatusResponse(BaseModel):
     user_id: str
     expires_at: str = None
     scope: str = None
+    has_refresh_token: bool = None
+    reason: str = None
 
 
 class AuthInitiateResponse(BaseModel):
@@ -98,6 +101,7 @@ async def google_oauth_callback(
             raise HTTPException(
                 status_code=500, detail="Failed to store authentication tokens"
             )
+        auth_status.forget(result["user_id"], result["service"])
 
         logger.info(
             f"Successfully stored tokens for user {result['user_id']}, service {result['service']}"
@@ -137,19 +141,17 @@ async def check_authorization(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check for valid tokens
-    tokens = token_storage.get_tokens(user_id, service)
-
-    if tokens:
-        return AuthStatusResponse(
-            authorized=True,
-            service=service,
-            user_id=user_id,
-            expires_at=tokens.get("expires_at"),
-            scope=tokens.get("scope"),
-        )
-    else:
-        return AuthStatusResponse(authorized=False, service=service, user_id=user_id)
+    # Token metadata only, no Lambda or Google call
+    status = auth_status.get_status(user_id, service)
+    return AuthStatusResponse(
+        authorized=status["authorized"],
+        service=service,
+        user_id=user_id,
+        expires_at=status.get("expires_at"),
+        scope=status.get("scope"),
+        has_refresh_token=status.get("has_refresh_token"),
+        reason=status.get("reason"),
+    )
 
 
 @router.get("/user/{user_id}/services")
@@ -196,6 +198,7 @@ async def revoke_authorization(
 
         # Delete from our storage
         success = token_storage.delete_tokens(user_id, service)
+        auth_status.forget(user_id, service)
 
         if success:
             return {
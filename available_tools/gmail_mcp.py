@@ -3,6 +3,11 @@ from pydantic import BaseModel, Field
 from typing import Any
 import asyncio
 from services.gmail_lambda_service import gmail_lambda_service
+from services.gmail_sync import gmail_sync
+from utils.tool_memo import tool_memo
+
+# REST endpoints write through the Lambda service without this tool
+tool_memo.watch(gmail_lambda_service, "gmail_mcp")
 
 
 class GmailMCPInput(BaseModel):
@@ -26,7 +31,8 @@ def gmail_mcp_func(action: str, user_id: str, **kwargs) -> Any:
     async def run():
         try:
             if action == "get_messages":
-                result = await gmail_lambda_service.get_gmail_messages(
+                # Answered from the synced metadata index when it can be
+                result = await gmail_sync.get_messages(
                     user_id=user_id,
                     query=kwargs.get("query", ""),
                     max_results=kwargs.get("max_results", 10),
@@ -58,7 +64,10 @@ def gmail_mcp_func(action: str, user_id: str, **kwargs) -> Any:
         except Exception as e:
             return {"status": "error", "message": f"Gmail tool error: {str(e)}"}
 
-    return asyncio.run(run())
+    # Reads are memoized per user; send_message clears this user's cached reads
+    return tool_memo.call(
+        "gmail_mcp", action, user_id, kwargs, lambda: asyncio.run(run())
+    )
 
 
 def get_tool() -> Tool:
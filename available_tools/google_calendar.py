@@ -2,10 +2,12 @@ from langchain.tools import Tool
 from pydantic import BaseModel, Field
 from typing import Any, Dict
 import asyncio
-from services.calendar_lambda_service import CalendarLambdaService
+from services.calendar_lambda_service import calendar_lambda_service
+from services.calendar_sync import calendar_sync
+from utils.tool_memo import tool_memo
 
-# Initialize calendar Lambda service
-calendar_lambda_service = CalendarLambdaService()
+# REST endpoints write through the Lambda service without this tool
+tool_memo.watch(calendar_lambda_service, "google_calendar_mcp")
 
 
 class GoogleCalendarMCPInput(BaseModel):
@@ -38,6 +40,7 @@ def google_calendar_mcp_func(tool: str, args: Dict[str, Any]) -> Any:
                 "create-event": "create_event",
                 "update-event": "update_event",
                 "delete-event": "delete_event",
+                "get-agenda": "get_agenda",
             }
 
             lambda_tool_name = tool_mapping.get(tool, tool)
@@ -57,6 +60,16 @@ def google_calendar_mcp_func(tool: str, args: Dict[str, Any]) -> Any:
                     time_max=args.get("timeMax"),
                 )
 
+            elif tool == "get-agenda":
+                # Served from the synced event cache when it covers the window
+                result = await calendar_sync.get_agenda(
+                    user_id,
+                    time_min=args.get("timeMin"),
+                    time_max=args.get("timeMax"),
+                    calendar_ids=args.get("calendarIds"),
+                    max_results=args.get("maxResults", 50),
+                )
+
             elif tool == "create-event":
                 # Map old argument names to new ones
                 result = await calendar_lambda_service.call_calendar_tool(
@@ -101,8 +114,8 @@ def google_calendar_mcp_func(tool: str, args: Dict[str, Any]) -> Any:
                     "status": "error",
                     "message": (
                         f"Unknown calendar tool: {tool}. "
-                        "Available: list-calendars, list-events, create-event, "
-                        "update-event, delete-event"
+                        "Available: list-calendars, list-events, get-agenda, "
+                        "create-event, update-event, delete-event"
                     ),
                 }
 
@@ -111,7 +124,14 @@ def google_calendar_mcp_func(tool: str, args: Dict[str, Any]) -> Any:
         except Exception as e:
             return {"status": "error", "message": f"Calendar tool error: {str(e)}"}
 
-    return asyncio.run(run())
+    # Reads are memoized per user; create/update/delete clear cached reads
+    return tool_memo.call(
+        "google_calendar_mcp",
+        tool,
+        args.get("user_id"),
+        args,
+        lambda: asyncio.run(run()),
+    )
 
 
 # Updated tool descriptions for the new Lambda-based system
@@ -131,6 +151,16 @@ GOOGLE_CALENDAR_TOOLS = [
             "timeMax": "ISO datetime string (optional, end time filter)",
         },
     },
+    {
+        "name": "get-agenda",
+        "description": "List events across all of the user's calendars in a time window, sorted by start time.",
+        "args": {
+            "timeMin": "ISO datetime string (optional, window start, default: now)",
+            "timeMax": "ISO datetime string (optional, window end, default: 7 days after timeMin)",
+            "calendarIds": "array of calendar IDs (optional, default: all visible calendars)",
+            "maxResults": "integer (max events in total, default: 50)",
+        },
+    },
     {
         "name": "create-event",
         "description": "Create a new calendar event.",
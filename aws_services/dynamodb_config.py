@@ -108,6 +108,62 @@ class TokenStorage:
             logger.error(f"Unexpected error retrieving tokens: {e}")
             return None
 
+    def get_token_metadata(
+        self, user_id: str, service: str
+    ) -> Optional[Dict[str, Any]]:
+        """Expiry, scope and refresh token presence, expired or not (no secrets)"""
+        if not self.table:
+            logger.error("DynamoDB table not available")
+            return None
+
+        try:
+            response = self.table.get_item(
+                Key={"user_id": user_id, "service": service},
+                ProjectionExpression="#e, #s, #r, #u",
+                ExpressionAttributeNames={
+                    "#e": "expires_at",
+                    "#s": "scope",
+                    "#r": "refresh_token",
+                    "#u": "updated_at",
+                },
+            )
+            if "Item" not in response:
+                return None
+
+            item = response["Item"]
+            return {
+                "expires_at": item.get("expires_at"),
+                "scope": item.get("scope", ""),
+                "has_refresh_token": bool(item.get("refresh_token")),
+                "updated_at": item.get("updated_at"),
+            }
+
+        except ClientError as e:
+            logger.error(
+                f"Error reading token metadata for user {user_id}, service {service}: {e}"
+            )
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error reading token metadata: {e}")
+            return None
+
+    def get_refresh_token(self, user_id: str, service: str) -> Optional[str]:
+        """Stored refresh token for a user and service, if any"""
+        if not self.table:
+            logger.error("DynamoDB table not available")
+            return None
+
+        try:
+            response = self.table.get_item(
+                Key={"user_id": user_id, "service": service},
+                ProjectionExpression="refresh_token",
+            )
+            return response.get("Item", {}).get("refresh_token")
+
+        except Exception as e:
+            logger.error(f"Error reading refresh token for user {user_id}: {e}")
+            return None
+
     def delete_tokens(self, user_id: str, service: str) -> bool:
         """Delete tokens for a user and service"""
         if not self.table:
@@ -0,0 +1,92 @@
+"""
+Chat history compaction benchmark: one zstd bundle per session.
+
+Builds BENCH_MESSAGES chat_messages documents for one session, shaped like
+ChatMessage.create_message with agent-style replies. For each zstd level it
+reports the bundle size against the raw BSON and the time ChatService needs
+to build the bundle (compact_session) and to read it back
+(get_session_messages on a compacted session). No database is needed.
+
+Usage: python benchmarks/bench_chat_retention.py
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import zstandard
+from bson import ObjectId, encode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_service import ChatService  # noqa: E402
+from mongodb_config import Projections  # noqa: E402
+
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "500"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "50"))
+LEVELS = [int(level) for level in os.getenv("BENCH_LEVELS", "3,10,19").split(",")]
+
+
+def message_documents():
+    started = datetime(2025, 3, 1, 9, 0)
+    session_id = str(ObjectId())
+    replies = [
+        "I found 3 unread emails from the design team about the launch review.",
+        "Your calendar is free on Thursday afternoon; I created the event.",
+        "Here is a summary of the search results with sources listed below.",
+    ]
+    return [
+        {
+            "_id": ObjectId(),
+            "session_id": session_id,
+            "user_id": "665f1c2e9b1e8a3d4c5b6a79",
+            "role": ("user", "assistant")[i % 2],
+            "message": f"{replies[i % 3]} (turn {i}) " * (1 + i % 4),
+            "metadata": {"tools": ["gmail_mcp"]} if i % 2 else {},
+            "timestamp": started + timedelta(seconds=30 * i),
+            "created_at": started + timedelta(seconds=30 * i),
+        }
+        for i in range(MESSAGES)
+    ]
+
+
+def timed(fn):
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    data = b"".join(encode(doc) for doc in message_documents())
+    print(f"{MESSAGES} messages, {len(data)} bytes of BSON, median of {ITERATIONS}")
+    print(
+        f"{'level':<7}{'bundle bytes':>13}{'ratio':>8}"
+        f"{'compact ms':>12}{'read ms':>9}"
+    )
+    for level in LEVELS:
+        compressor = zstandard.ZstdCompressor(level=level)
+        bundle = {"data": compressor.compress(data)}
+
+        def read():
+            messages = ChatService._documents(ChatService._decompress(bundle), False)
+            return [
+                ChatService._project(doc, Projections.MESSAGE_TEXT) for doc in messages
+            ]
+
+        assert len(read()) == MESSAGES
+        compact_ms = timed(lambda: compressor.compress(data))
+        read_ms = timed(read)
+        print(
+            f"{level:<7}{len(bundle['data']):>13}"
+            f"{len(data) / len(bundle['data']):>7.1f}x"
+            f"{compact_ms:>12.2f}{read_ms:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
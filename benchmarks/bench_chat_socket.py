@@ -0,0 +1,251 @@
+"""
+Chat WebSocket vs. POST-per-message benchmark for many concurrent sessions.
+
+Runs BENCH_SOCKETS sessions on one event loop (one worker process), each
+sending BENCH_TURNS messages. The socket side drives the real
+services.chat_socket.ChatSocketManager through an in-memory WebSocket. The
+POST side repeats the reads POST /tasks/{task_id}/messages makes per message:
+user lookup, session read, full history before the turn and again for the
+response. MongoDB is modelled as BENCH_DB_MS per call plus BENCH_DOC_US per
+document returned, run in the threadpool; the agent is BENCH_AGENT_MS of
+asyncio sleep with one streamed step, so no API keys or database are needed.
+
+Usage: python benchmarks/bench_chat_socket.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from starlette.websockets import WebSocketDisconnect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage  # noqa: E402
+
+import services.chat_socket as chat_socket  # noqa: E402
+from agents import build_conversation_history  # noqa: E402
+
+SOCKETS = int(os.getenv("BENCH_SOCKETS", "200"))
+TURNS = int(os.getenv("BENCH_TURNS", "5"))
+HISTORY = int(os.getenv("BENCH_HISTORY", "40"))
+DB_MS = float(os.getenv("BENCH_DB_MS", "2"))
+DOC_US = float(os.getenv("BENCH_DOC_US", "20"))
+AGENT_MS = float(os.getenv("BENCH_AGENT_MS", "300"))
+
+
+class ModelledChatService:
+    """ChatService stand-in with per-call and per-document latency"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.messages = {}
+        self.calls = 0
+        self.docs = 0
+
+    def _cost(self, docs=1):
+        self.calls += 1
+        self.docs += docs
+        time.sleep((DB_MS + docs * DOC_US / 1000) / 1000)
+
+    def create(self, session_id):
+        self.sessions[session_id] = {
+            "_id": session_id,
+            "user_id": "u1",
+            "state": 0,
+            "message_count": HISTORY,
+        }
+        self.messages[session_id] = [
+            {"role": ("user", "assistant")[i % 2], "message": f"message {i} " * 20}
+            for i in range(HISTORY)
+        ]
+
+    def get_session_by_id(self, session_id, projection=None):
+        # The recent message tail counts as documents read when projected
+        tail = self.messages[session_id][-50:]
+        with_tail = projection is not None and "recent_messages" in projection
+        self._cost(1 + len(tail) if with_tail else 1)
+        return dict(self.sessions[session_id])
+
+    def get_recent_messages(self, session_id, limit=50, session=None):
+        messages = self.messages[session_id][-limit:]
+        if session is None:
+            self._cost(len(messages))
+        return messages
+
+    def get_session_messages(self, session_id, limit=None, skip=0, projection=None):
+        messages = self.messages[session_id][skip:]
+        messages = messages[:limit] if limit else messages
+        self._cost(len(messages))
+        return messages
+
+    def add_message(self, session_id, user_id, role, message, metadata=None):
+        self._cost()
+        self.messages[session_id].append({"role": role, "message": message})
+        self.sessions[session_id]["message_count"] += 1
+        return f"{session_id}:{len(self.messages[session_id])}"
+
+    def set_session_processing(self, session_id):
+        self._cost()
+
+    def set_session_require_permission(self, session_id):
+        self._cost()
+
+
+class ModelledUsers:
+    def __init__(self, chat_service):
+        self.chat_service = chat_service
+
+    def get_user_by_email(self, email):
+        self.chat_service._cost()
+        return {"id": "u1"}
+
+
+class ModelledAgent:
+    def __init__(self, selected_tools=None):
+        pass
+
+    async def process_message(
+        self,
+        text,
+        conversation_history=None,
+        user_id=None,
+        session_id=None,
+        on_step=None,
+    ):
+        await asyncio.sleep(AGENT_MS / 2000)
+        if on_step is not None:
+            await on_step([AIMessage(content="working", name="executor_agent")])
+        await asyncio.sleep(AGENT_MS / 2000)
+        return f"reply to {text}"
+
+
+class MemorySocket:
+    """Just enough of starlette's WebSocket for ChatSocketManager"""
+
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        await self.outbox.put({"type": "closed", "code": code})
+
+    async def receive_json(self):
+        data = await self.inbox.get()
+        if data is None:
+            raise WebSocketDisconnect(1000)
+        return data
+
+    async def send_json(self, data):
+        await self.outbox.put(data)
+
+
+async def socket_client(manager, chat_service, users, session_id, latencies):
+    socket = MemorySocket()
+    server = asyncio.create_task(
+        manager.serve(
+            socket,
+            session_id,
+            "user@example.com",
+            chat_service=chat_service,
+            users=users,
+            agent_factory=ModelledAgent,
+        )
+    )
+    assert (await socket.outbox.get())["type"] == "ready"
+    for turn in range(TURNS):
+        started = time.perf_counter()
+        await socket.inbox.put({"message": f"turn {turn}"})
+        while (await socket.outbox.get())["type"] != "reply":
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+    await socket.inbox.put(None)
+    await server
+
+
+async def post_client(chat_service, users, session_id, latencies):
+    """The reads and writes POST /tasks/{task_id}/messages makes per message"""
+    agent = ModelledAgent()
+    for turn in range(TURNS):
+        started = time.perf_counter()
+        text = f"turn {turn}"
+        await asyncio.to_thread(users.get_user_by_email, "user@example.com")
+        await asyncio.to_thread(chat_service.get_session_by_id, session_id)
+        await asyncio.to_thread(chat_service.set_session_processing, session_id)
+        messages = await asyncio.to_thread(
+            chat_service.get_session_messages, session_id
+        )
+        history = build_conversation_history(messages)
+        await asyncio.to_thread(
+            chat_service.add_message, session_id, "u1", "user", text
+        )
+        reply = await agent.process_message(text, history, "u1", session_id)
+        await asyncio.to_thread(
+            chat_service.add_message, session_id, "u1", "assistant", reply
+        )
+        await asyncio.to_thread(chat_service.set_session_require_permission, session_id)
+        await asyncio.to_thread(chat_service.get_session_messages, session_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run(mode):
+    chat_service = ModelledChatService()
+    users = ModelledUsers(chat_service)
+    for i in range(SOCKETS):
+        chat_service.create(f"s{i}")
+    manager = chat_socket.ChatSocketManager(max_connections=SOCKETS)
+    latencies = []
+
+    started = time.perf_counter()
+    if mode == "socket":
+        clients = [
+            socket_client(manager, chat_service, users, f"s{i}", latencies)
+            for i in range(SOCKETS)
+        ]
+    else:
+        clients = [
+            post_client(chat_service, users, f"s{i}", latencies) for i in range(SOCKETS)
+        ]
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+
+    turns = SOCKETS * TURNS
+    latencies.sort()
+    return {
+        "elapsed_s": elapsed,
+        "turns_per_s": turns / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "db_calls_per_turn": chat_service.calls / turns,
+        "docs_read_per_turn": chat_service.docs / turns,
+    }
+
+
+def main():
+    # The modelled services stand in for MongoDB
+    chat_socket.is_mongodb_available = lambda: True
+    print(
+        f"{SOCKETS} sessions x {TURNS} turns, {HISTORY} messages of history, "
+        f"db {DB_MS}ms + {DOC_US}us/doc, agent {AGENT_MS}ms"
+    )
+    print(
+        f"{'mode':<8}{'elapsed s':>11}{'turns/s':>10}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'db calls':>10}{'docs read':>11}"
+    )
+    for mode in ("post", "socket"):
+        result = asyncio.run(run(mode))
+        print(
+            f"{mode:<8}{result['elapsed_s']:>11.2f}{result['turns_per_s']:>10.1f}"
+            f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+            f"{result['db_calls_per_turn']:>10.1f}"
+            f"{result['docs_read_per_turn']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Fast-path router benchmark over a replay set of user turns.
+
+Classification time and hit rate are measured for real. Turn latency is
+modelled from per-step costs (LLM_CALL_MS, TOOL_CALL_MS) so the run needs no
+API keys: a supervisor turn costs two supervisor calls plus the agent's calls,
+an agent fast path skips the supervisor calls, a tool fast path is one tool call.
+
+Usage: python benchmarks/bench_fast_path.py [replay.json]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.intent_router import IntentRouter  # noqa: E402
+
+LLM_CALL_MS = float(os.getenv("BENCH_LLM_CALL_MS", "1200"))
+TOOL_CALL_MS = float(os.getenv("BENCH_TOOL_CALL_MS", "400"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+
+# supervisor -> agent (tool call + answer) -> supervisor
+SUPERVISOR_TURN_MS = 2 * LLM_CALL_MS + 2 * LLM_CALL_MS + TOOL_CALL_MS
+AGENT_FAST_PATH_MS = 2 * LLM_CALL_MS + TOOL_CALL_MS
+TOOL_FAST_PATH_MS = TOOL_CALL_MS
+
+
+def label(route):
+    if route is None:
+        return "supervisor"
+    if route["kind"] == "tool":
+        return f"tool:{route['action']}"
+    return f"agent:{route['target']}"
+
+
+def main():
+    path = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "fast_path_replay.json"
+        )
+    )
+    with open(path) as f:
+        replay = json.load(f)
+
+    router = IntentRouter()
+    timings = []
+    for _ in range(ITERATIONS):
+        for turn in replay:
+            started = time.perf_counter()
+            router.classify(turn["message"])
+            timings.append((time.perf_counter() - started) * 1000)
+
+    correct = hits = wrong_hits = 0
+    baseline_ms = routed_ms = 0.0
+    for turn in replay:
+        got = label(router.classify(turn["message"]))
+        correct += got == turn["expected"]
+        if got != "supervisor":
+            hits += 1
+            wrong_hits += got != turn["expected"]
+        baseline_ms += SUPERVISOR_TURN_MS
+        if got.startswith("tool:"):
+            routed_ms += TOOL_FAST_PATH_MS
+        elif got.startswith("agent:"):
+            routed_ms += AGENT_FAST_PATH_MS
+        else:
+            routed_ms += SUPERVISOR_TURN_MS
+        if got != turn["expected"]:
+            print(
+                f"  mismatch: {turn['message']!r} -> {got} (expected {turn['expected']})"
+            )
+
+    total = len(replay)
+    print(f"Replay turns:        {total}")
+    print(f"Fast-path hit rate:  {hits / total:.0%} ({hits}/{total})")
+    print(f"Wrong fast paths:    {wrong_hits}")
+    print(f"Route accuracy:      {correct / total:.0%}")
+    print(
+        f"Classify latency:    p50 {statistics.median(timings):.3f} ms, "
+        f"max {max(timings):.3f} ms"
+    )
+    print(
+        f"Modelled turn time:  {baseline_ms / total:.0f} ms -> {routed_ms / total:.0f} ms "
+        f"per turn (LLM {LLM_CALL_MS:.0f} ms, tool {TOOL_CALL_MS:.0f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
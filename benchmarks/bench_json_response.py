@@ -0,0 +1,118 @@
+"""
+API response serialization benchmark for 500-message sessions.
+
+Compares FastAPI's default path (jsonable_encoder, then JSONResponse's
+json.dumps) with utils.json_response.OrjsonResponse returned directly, for the
+payloads of the hottest routes: GET/POST /tasks/{task_id}/messages (formatted
+messages), the raw MongoDB message documents behind them (ObjectId and
+datetime fields) and a CalendarResponse with nested event data. Bodies are
+checked to be identical before timing.
+
+Usage: python benchmarks/bench_json_response.py
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_response import OrjsonResponse  # noqa: E402
+
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "500"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+
+
+class CalendarResponse(BaseModel):
+    status: str
+    data: Optional[dict] = None
+    message: Optional[str] = None
+    authorization_url: Optional[str] = None
+
+
+def message_documents():
+    started = datetime(2025, 6, 1, 9, 0)
+    session_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "session_id": session_id,
+            "user_id": "665f1c2e9b1e8a3d4c5b6a79",
+            "role": ("user", "assistant")[i % 2],
+            "message": f"Message {i}: " + "lorem ipsum dolor sit amet " * 12,
+            "timestamp": started + timedelta(seconds=30 * i),
+            "metadata": {"tokens": i * 7, "tools": ["gmail_mcp"]},
+        }
+        for i in range(MESSAGES)
+    ]
+
+
+def calendar_payload():
+    start = datetime(2025, 6, 1, 9, 0, tzinfo=timezone.utc)
+    events = [
+        {
+            "id": f"event{i}",
+            "summary": f"Meeting {i}",
+            "start": {"dateTime": (start + timedelta(hours=i)).isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=i, minutes=30)).isoformat()},
+            "attendees": [{"email": f"person{j}@example.com"} for j in range(4)],
+            "calendarId": "primary",
+        }
+        for i in range(MESSAGES)
+    ]
+    return CalendarResponse(status="success", data={"events": events})
+
+
+def timed(fn):
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    documents = message_documents()
+    payloads = {
+        "formatted messages": {
+            "messages": [
+                {"role": doc["role"], "message": doc["message"]} for doc in documents
+            ]
+        },
+        "mongo message docs": {"messages": documents},
+        "calendar response": calendar_payload(),
+    }
+    object_ids = {ObjectId: str}
+
+    print(f"{MESSAGES} items per payload, median of {ITERATIONS} runs")
+    print(
+        f"{'payload':<20}{'bytes':>9}{'default ms':>12}{'orjson ms':>11}{'speedup':>9}"
+    )
+    for name, payload in payloads.items():
+
+        def default_path():
+            return JSONResponse(jsonable_encoder(payload, custom_encoder=object_ids))
+
+        def orjson_path():
+            return OrjsonResponse(payload)
+
+        body = orjson_path().body
+        assert body == default_path().body, name
+        default_ms, orjson_ms = timed(default_path), timed(orjson_path)
+        print(
+            f"{name:<20}{len(body):>9}{default_ms:>12.2f}{orjson_ms:>11.2f}"
+            f"{default_ms / orjson_ms:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
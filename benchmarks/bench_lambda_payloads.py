@@ -0,0 +1,183 @@
+"""
+Lambda MCP payload benchmark: response size and client decode time.
+
+The result encoders (project/tool_result) are taken from the embedded Gmail
+MCP server script, so the payloads are the ones the Lambda returns. Three
+encodings of a get_gmail_messages result are compared:
+
+- legacy: JSON string inside text content plus the "_debug" stderr log
+- structured: native JSON result (structuredContent), no debug log
+- projected: structured, keeping only the fields a caller asks for
+
+Usage: python benchmarks/bench_lambda_payloads.py [message_count ...]
+"""
+
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.mcp_payload import decode_tool_result  # noqa: E402
+
+SERVER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "lambda_mcp_servers",
+    "gmail_lambda",
+    "gmail_server.py",
+)
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "2000"))
+PROJECTED_FIELDS = ["id", "subject", "sender", "date"]
+
+
+def load_encoders():
+    """Exec the encoder functions from the embedded MCP server script"""
+    with open(SERVER_PATH) as f:
+        module = ast.parse(f.read())
+    script = next(
+        node.value.value
+        for node in ast.walk(module)
+        if isinstance(node, ast.Assign)
+        and getattr(node.targets[0], "id", None) == "mcp_server_script"
+    )
+    wanted = {"PROJECTED_LISTS", "project", "tool_result"}
+    nodes = [
+        node
+        for node in ast.parse(script).body
+        if getattr(node, "name", None) in wanted
+        or (
+            isinstance(node, ast.Assign)
+            and getattr(node.targets[0], "id", None) in wanted
+        )
+    ]
+    namespace = {"json": json}
+    exec(
+        compile(ast.Module(body=nodes, type_ignores=[]), SERVER_PATH, "exec"), namespace
+    )
+    return namespace["tool_result"]
+
+
+def sample_messages(count):
+    return [
+        {
+            "id": f"18c{index:013x}",
+            "subject": f"Quarterly planning follow-up #{index}",
+            "sender": "Jordan Lee <jordan.lee@example.com>",
+            "date": "Mon, 6 May 2024 09:1{0} -0700".format(index % 10),
+            "snippet": "Thanks for joining today. Attached are the notes, the "
+            "revised timeline and the open questions we still need to settle "
+            "before the review next week.",
+        }
+        for index in range(count)
+    ]
+
+
+def sample_stderr(messages):
+    """Log lines the server writes for one get_gmail_messages call"""
+    lines = [
+        "INFO:__main__:=== MCP Server Starting ===",
+        "INFO:__main__:DynamoDB initialized - Table: easydoai-user-tokens-dev",
+        'INFO:__main__:Received request: {"jsonrpc": "2.0", "id": "gmail_tool_call", '
+        '"method": "tools/call", "params": {"name": "get_gmail_messages", '
+        '"arguments": {"user_id": "6650f0c2a1b2c3d4e5f60718", "query": "", '
+        '"max_results": 10}}}',
+        "INFO:__main__:Processing method: tools/call",
+        "INFO:__main__:Handling tool call: get_gmail_messages",
+        "INFO:__main__:Gmail messages request for user: 6650f0c2a1b2c3d4e5f60718",
+        "INFO:__main__:Looking for credentials for user: 6650f0c2a1b2c3d4e5f60718",
+        "INFO:__main__:DynamoDB response status: Found",
+        "INFO:__main__:Token data keys: ['user_id', 'service', 'access_token', "
+        "'refresh_token', 'scope', 'expires_at', 'updated_at']",
+        "INFO:__main__:Access token length: 253",
+        "INFO:__main__:Refresh token available: True",
+        "INFO:__main__:Expires at: 2024-05-06T17:12:44.120931",
+        "INFO:__main__:Creating credentials with scopes: "
+        "['https://www.googleapis.com/auth/gmail.readonly', "
+        "'https://www.googleapis.com/auth/gmail.send']",
+        "INFO:__main__:Using client_id: 123456789012-abcdefg...",
+        "INFO:__main__:Using client_secret: True",
+        "INFO:__main__:Credentials created successfully",
+        "INFO:__main__:Credentials valid: True",
+        "INFO:__main__:Credentials expired: False",
+        "INFO:__main__:Credentials ready for Gmail API",
+        "INFO:__main__:Credentials obtained, calling Gmail API...",
+        "INFO:googleapiclient.discovery_cache:file_cache is only supported with "
+        "oauth2client<4.0.0",
+        "INFO:__main__:Gmail service built successfully",
+        f"INFO:__main__:Retrieved {len(messages)} messages",
+        f"INFO:__main__:Successfully processed {len(messages)} messages",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def legacy_payload(tool_result, data, stderr):
+    response = tool_result("gmail_tool_call", data, {})
+    response["_debug"] = {"stderr": stderr}
+    return json.dumps(response)
+
+
+def compact_payload(tool_result, data, fields=None):
+    options = {"encoding": "structured", "fields": fields}
+    return json.dumps(
+        tool_result("gmail_tool_call", data, options), separators=(",", ":")
+    )
+
+
+def decode_legacy(payload):
+    """What the services did before: decode the payload, then the text content"""
+    result = json.loads(payload)
+    return json.loads(result["result"]["content"][0]["text"])
+
+
+def decode_compact(payload):
+    return decode_tool_result(json.loads(payload)["result"])
+
+
+def time_decode(decode, payload):
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        decode(payload)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 50]
+    tool_result = load_encoders()
+
+    print(
+        f"{'messages':>8} {'encoding':<11} {'bytes':>8} {'vs legacy':>10} "
+        f"{'decode us':>10}"
+    )
+    for count in counts:
+        messages = sample_messages(count)
+        data = {"success": True, "messages": messages, "total": len(messages)}
+        payloads = {
+            "legacy": (
+                legacy_payload(tool_result, data, sample_stderr(messages)),
+                decode_legacy,
+            ),
+            "structured": (compact_payload(tool_result, data), decode_compact),
+            "projected": (
+                compact_payload(tool_result, data, PROJECTED_FIELDS),
+                decode_compact,
+            ),
+        }
+        assert decode_legacy(payloads["legacy"][0]) == decode_compact(
+            payloads["structured"][0]
+        )
+        legacy_bytes = len(payloads["legacy"][0].encode())
+        for name, (payload, decode) in payloads.items():
+            size = len(payload.encode())
+            print(
+                f"{count:>8} {name:<11} {size:>8} {size / legacy_bytes:>9.0%} "
+                f"{time_decode(decode, payload):>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Lambda MCP server cold-start and Google API service build benchmark.
+
+Cold start compares the old per-invocation subprocess (fresh interpreter,
+imports, DynamoDB client, discovery document) with the in-process server that
+lambda_handler now loads once per container. Per-call build compares
+googleapiclient.discovery.build() on every tool call with the server's
+get_service(), which parses the bundled discovery document once and reuses the
+built service per user and access token.
+
+No Google or AWS calls are made: tools/list needs no credentials and the
+services are built with a dummy token.
+
+Usage: python benchmarks/bench_service_build.py [gmail|calendar]
+"""
+
+import ast
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    "gmail": ("gmail_lambda/gmail_server.py", ("gmail", "v1")),
+    "calendar": ("calendar_lambda/calendar_server.py", ("calendar", "v3")),
+}
+COLD_RUNS = int(os.getenv("BENCH_COLD_RUNS", "5"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "50"))
+TOOLS_LIST = {"jsonrpc": "2.0", "id": "bench", "method": "tools/list", "params": {}}
+
+
+def load_handler_module(path):
+    spec = importlib.util.spec_from_file_location("bench_mcp_handler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def server_script(path):
+    with open(path) as f:
+        module = ast.parse(f.read())
+    return next(
+        node.value.value
+        for node in ast.walk(module)
+        if isinstance(node, ast.Assign)
+        and getattr(node.targets[0], "id", None) == "mcp_server_script"
+    )
+
+
+def timed_ms(func, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "gmail"
+    relative_path, google_api = SERVERS[name]
+    path = os.path.join(ROOT, "lambda_mcp_servers", relative_path)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+        f.write(server_script(path))
+        script_path = f.name
+
+    def subprocess_call():
+        subprocess.run(
+            [sys.executable, script_path],
+            input=json.dumps(TOOLS_LIST),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    handler = load_handler_module(path)
+    started = time.perf_counter()
+    handler.lambda_handler(TOOLS_LIST, None)
+    first_in_process_ms = (time.perf_counter() - started) * 1000
+    warm_in_process_ms = timed_ms(
+        lambda: handler.lambda_handler(TOOLS_LIST, None), ITERATIONS
+    )
+
+    print(f"{name} MCP server, tools/list per invocation (median ms)")
+    print(f"  subprocess per invocation   {timed_ms(subprocess_call, COLD_RUNS):8.1f}")
+    print(f"  in-process, first call      {first_in_process_ms:8.1f}")
+    print(f"  in-process, warm call       {warm_in_process_ms:8.3f}")
+
+    server = handler.mcp_server
+    credentials = Credentials(token="bench-token")
+
+    def build_per_call():
+        build(*google_api, credentials=credentials)
+
+    def fresh_token_build():
+        server.service_cache.clear()
+        server.get_service("bench-user", credentials)
+
+    server.discovery_docs.clear()
+    server.service_cache.clear()
+    started = time.perf_counter()
+    server.get_service("bench-user", credentials)
+    first_build_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{name} service build per tool call (median ms)")
+    print(f"  build() every call          {timed_ms(build_per_call, ITERATIONS):8.2f}")
+    print(f"  get_service, first call     {first_build_ms:8.2f}")
+    print(
+        f"  get_service, new token      {timed_ms(fresh_token_build, ITERATIONS):8.2f}"
+    )
+    print(
+        f"  get_service, warm           "
+        f"{timed_ms(lambda: server.get_service('bench-user', credentials), ITERATIONS):8.3f}"
+    )
+    os.unlink(script_path)
+
+
+if __name__ == "__main__":
+    main()
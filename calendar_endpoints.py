@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional, List
 import logging
+import os
 from services.calendar_lambda_service import calendar_lambda_service
+from services.calendar_sync import calendar_sync
+from services.auth_status import auth_status
 from user_service import user_service
+from utils.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
+# How long a user's calendar list is served from the response cache
+CALENDAR_LIST_CACHE_SECONDS = float(os.getenv("CALENDAR_LIST_CACHE_SECONDS", "60"))
+
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
 
@@ -52,9 +59,37 @@ async def calendar_status():
     return {"status": "Calendar MCP Lambda service is running"}
 
 
-@router.get("/calendars")
+@router.get("/status/{user_id}", response_model=CalendarResponse)
+async def check_calendar_auth_status(user_id: str):
+    """Check if user is authenticated for Google Calendar"""
+
+    # Verify user exists
+    user = user_service.get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Stored token metadata only, no Lambda or Calendar API call
+    status = auth_status.get_status(
+        user_id, "google_calendar", include_authorization_url=True
+    )
+    if status["authorized"]:
+        return CalendarResponse(
+            status="success",
+            message="Google Calendar authenticated and ready",
+            data=status,
+        )
+    return CalendarResponse(
+        status="authentication_required",
+        message="Google Calendar authentication required",
+        authorization_url=status["authorization_url"],
+        data=status,
+    )
+
+
+@router.get("/calendars", response_model=CalendarResponse)
 async def get_calendars(
-    user_id: str = Query(..., description="User ID to get calendars for")
+    request: Request,
+    user_id: str = Query(..., description="User ID to get calendars for"),
 ):
     """Get all calendars for a user"""
 
@@ -63,6 +98,11 @@ async def get_calendars(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    cache_key = f"calendars:{user_id}"
+    cached = response_cache.lookup(request, cache_key)
+    if cached is not None:
+        return cached
+
     try:
         result = await calendar_lambda_service.list_calendars(user_id)
 
@@ -73,7 +113,12 @@ async def get_calendars(
                 authorization_url=result["authorization_url"],
             )
         elif result["status"] == "success":
-            return CalendarResponse(status="success", data=result["data"])
+            # No local version for Google's list, so it is cached for a TTL
+            return response_cache.store(
+                cache_key,
+                CalendarResponse(status="success", data=result["data"]),
+                ttl=CALENDAR_LIST_CACHE_SECONDS,
+            )
         else:
             raise HTTPException(status_code=500, detail=result["message"])
 
@@ -82,7 +127,7 @@ async def get_calendars(
         raise HTTPException(status_code=500, detail="Failed to get calendars")
 
 
-@router.get("/events")
+@router.get("/events", response_model=CalendarResponse)
 async def get_events(
     user_id: str = Query(..., description="User ID"),
     calendar_id: str = Query("primary", description="Calendar ID"),
@@ -122,7 +167,53 @@ async def get_events(
         raise HTTPException(status_code=500, detail="Failed to get events")
 
 
-@router.post("/events")
+@router.get("/agenda", response_model=CalendarResponse)
+async def get_agenda(
+    user_id: str = Query(..., description="User ID"),
+    time_min: Optional[str] = Query(
+        None, description="Window start (ISO format), default now"
+    ),
+    time_max: Optional[str] = Query(
+        None, description="Window end (ISO format), default time_min + 7 days"
+    ),
+    calendar_id: Optional[List[str]] = Query(
+        None, description="Only these calendars (repeatable), default all visible"
+    ),
+    max_results: int = Query(50, description="Maximum number of events to return"),
+):
+    """Get events from all of a user's calendars, merged by start time"""
+
+    # Verify user exists
+    user = user_service.get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        result = await calendar_sync.get_agenda(
+            user_id=user_id,
+            time_min=time_min,
+            time_max=time_max,
+            calendar_ids=calendar_id,
+            max_results=max_results,
+        )
+
+        if result["status"] == "authentication_required":
+            return CalendarResponse(
+                status="authentication_required",
+                message=result["message"],
+                authorization_url=result["authorization_url"],
+            )
+        elif result["status"] == "success":
+            return CalendarResponse(status="success", data=result["data"])
+        else:
+            raise HTTPException(status_code=500, detail=result["message"])
+
+    except Exception as e:
+        logger.error(f"Error getting agenda: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get agenda")
+
+
+@router.post("/events", response_model=CalendarResponse)
 async def create_event(
     request: CreateEventRequest, user_id: str = Query(..., description="User ID")
 ):
@@ -165,7 +256,7 @@ async def create_event(
         raise HTTPException(status_code=500, detail="Failed to create event")
 
 
-@router.put("/events")
+@router.put("/events", response_model=CalendarResponse)
 async def update_event(
     request: UpdateEventRequest, user_id: str = Query(..., description="User ID")
 ):
@@ -208,7 +299,7 @@ async def update_event(
         raise HTTPException(status_code=500, detail="Failed to update event")
 
 
-@router.delete("/events")
+@router.delete("/events", response_model=CalendarResponse)
 async def delete_event(
     request: DeleteEventRequest, user_id: str = Query(..., description="User ID")
 ):
@@ -244,7 +335,7 @@ async def delete_event(
         raise HTTPException(status_code=500, detail="Failed to delete event")
 
 
-@router.get("/tools")
+@router.get("/tools", response_model=CalendarResponse)
 async def get_available_tools():
     """Get list of available Calendar tools"""
     try:
@@ -1,18 +1,39 @@
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from mongodb_config import (
+    get_chat_archive_collection,
+    get_chat_bundles_collection,
     get_chat_collection,
     get_chat_sessions_collection,
+    get_checkpoints_collection,
+    get_checkpoint_writes_collection,
     is_mongodb_available,
     ChatMessage,
     ChatSession,
+    Projections,
     TaskState,
+    CHAT_ARCHIVE_BATCH_SIZE,
+    CHAT_ARCHIVE_ZSTD_LEVEL,
+    CHAT_COMPACTION_LEASE_SECONDS,
+    CHAT_SESSION_TAIL_SIZE,
+    RAW_BSON_OPTIONS,
 )
-from bson import ObjectId
-from datetime import datetime
+from pymongo.collection import Collection
+from pymongo.cursor import Cursor
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from services.session_events import session_events
+from bson import Binary, ObjectId, decode_all, encode
+from datetime import datetime, timedelta
 import logging
+import zstandard
 
 logger = logging.getLogger(__name__)
 
+# Topologies that support multi-document transactions
+TRANSACTION_TOPOLOGIES = ("ReplicaSetWithPrimary", "Sharded", "LoadBalanced")
+
+# Compressed bundles must fit in one MongoDB document (16MB)
+CHAT_BUNDLE_MAX_BYTES = 15 * 1024 * 1024
+
 
 class ChatService:
     """Service for managing chat history in MongoDB"""
@@ -21,6 +42,11 @@ class ChatService:
         # Don't initialize collections here - do it lazily
         self._chat_collection = None
         self._sessions_collection = None
+        self._raw_chat_collection = None
+        self._raw_sessions_collection = None
+        self._archive_collection = None
+        self._raw_archive_collection = None
+        self._bundles_collection = None
 
     @property
     def chat_collection(self):
@@ -36,6 +62,53 @@ class ChatService:
             self._sessions_collection = get_chat_sessions_collection()
         return self._sessions_collection
 
+    @property
+    def raw_chat_collection(self):
+        """Chat collection returning undecoded RawBSONDocuments (lazy)"""
+        if self._raw_chat_collection is None:
+            self._raw_chat_collection = get_chat_collection(raw=True)
+        return self._raw_chat_collection
+
+    @property
+    def raw_sessions_collection(self):
+        """Sessions collection returning undecoded RawBSONDocuments (lazy)"""
+        if self._raw_sessions_collection is None:
+            self._raw_sessions_collection = get_chat_sessions_collection(raw=True)
+        return self._raw_sessions_collection
+
+    @property
+    def archive_collection(self):
+        """Archived (cold) messages collection (lazy initialization)"""
+        if self._archive_collection is None:
+            self._archive_collection = get_chat_archive_collection()
+        return self._archive_collection
+
+    @property
+    def raw_archive_collection(self):
+        """Archived messages collection returning RawBSONDocuments (lazy)"""
+        if self._raw_archive_collection is None:
+            self._raw_archive_collection = get_chat_archive_collection(raw=True)
+        return self._raw_archive_collection
+
+    @property
+    def bundles_collection(self):
+        """Compressed per-session message bundles (lazy initialization)"""
+        if self._bundles_collection is None:
+            self._bundles_collection = get_chat_bundles_collection()
+        return self._bundles_collection
+
+    @staticmethod
+    def _documents(cursor: Cursor, raw: bool) -> List[Dict[str, Any]]:
+        """Cursor results, with ObjectIds as strings unless the documents are raw"""
+        if raw:
+            return list(cursor)
+        documents = []
+        for doc in cursor:
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
+            documents.append(doc)
+        return documents
+
     def _check_mongodb_available(self):
         """Check if MongoDB is available and raise exception if not"""
         if not is_mongodb_available():
@@ -69,18 +142,29 @@ class ChatService:
                 session_id, user_id, role, message, metadata
             )
             result = self.chat_collection.insert_one(message_doc)
+            message_id = str(result.inserted_id)
 
-            # Update session message count and timestamp
+            # Update session message count, timestamp and recent message tail
             self.sessions_collection.update_one(
                 {"_id": ObjectId(session_id)},
                 {
                     "$inc": {"message_count": 1},
                     "$set": {"updated_at": datetime.utcnow()},
+                    "$push": {
+                        "recent_messages": {
+                            "$each": [
+                                {"_id": message_id, "role": role, "message": message}
+                            ],
+                            "$slice": -CHAT_SESSION_TAIL_SIZE,
+                        }
+                    },
                 },
             )
 
-            message_id = str(result.inserted_id)
             logger.info(f"Added message {message_id} to session {session_id}")
+            session_events.publish(
+                session_id, {"event": "message", "message_id": message_id}
+            )
             return message_id
         except Exception as e:
             logger.error(f"Error adding message: {e}")
@@ -90,13 +174,43 @@ class ChatService:
         """Update the state of a chat session"""
         try:
             self._check_mongodb_available()
-            result = self.sessions_collection.update_one(
+            previous = self.sessions_collection.find_one_and_update(
                 {"_id": ObjectId(session_id)},
-                {"$set": {"state": state, "updated_at": datetime.utcnow()}},
+                {
+                    "$set": {"state": state, "updated_at": datetime.utcnow()},
+                    "$unset": {"archived_at": "", "compressed_at": ""},
+                },
+                projection={"state": 1, "compressed_at": 1, "compaction_lease": 1},
             )
-            success = result.modified_count > 0
+            success = previous is not None
             if success:
+                if previous.get("state") == TaskState.ARCHIVED:
+                    # Any activity on an archived session brings its messages back
+                    moved = self._write_transaction(
+                        lambda db_session: self._restore_messages(
+                            session_id, bool(previous.get("compressed_at")), db_session
+                        )
+                    )
+                    logger.info(f"Restored {moved} messages of session {session_id}")
+                lease = previous.get("compaction_lease")
+                if lease and lease["expires_at"] < datetime.utcnow():
+                    # A compaction died holding the session and may have left
+                    # its messages in a bundle only
+                    moved = self._write_transaction(
+                        lambda db_session: self._recover_bundle(
+                            session_id, db_session=db_session
+                        )
+                    )
+                    self.sessions_collection.update_one(
+                        {
+                            "_id": ObjectId(session_id),
+                            "compaction_lease.token": lease["token"],
+                        },
+                        {"$unset": {"compaction_lease": ""}},
+                    )
+                    logger.info(f"Recovered {moved} messages of session {session_id}")
                 logger.info(f"Updated session {session_id} state to {state}")
+                session_events.publish(session_id, {"event": "state", "state": state})
             return success
         except Exception as e:
             logger.error(f"Error updating session state: {e}")
@@ -115,21 +229,39 @@ class ChatService:
         return self.update_session_state(session_id, TaskState.COMPLETE)
 
     def get_session_messages(
-        self, session_id: str, limit: int = 50, skip: int = 0
+        self,
+        session_id: str,
+        limit: int = 50,
+        skip: int = 0,
+        projection: Optional[Dict[str, Any]] = None,
+        raw: bool = False,
+        archived: bool = False,
+        compressed: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Get messages for a specific session"""
+        """Get messages for a specific session (only projected fields if given)"""
         try:
+            bundle = self._bundle_messages(session_id, raw) if compressed else None
+            if bundle is not None:
+                # Compacted session: slice the decompressed messages instead
+                page = bundle[skip : skip + limit] if limit else bundle[skip:]
+                messages = [self._project(doc, projection) for doc in page]
+                logger.info(
+                    f"Retrieved {len(messages)} archived messages for session {session_id}"
+                )
+                return messages
+            if archived:
+                collection = (
+                    self.raw_archive_collection if raw else self.archive_collection
+                )
+            else:
+                collection = self.raw_chat_collection if raw else self.chat_collection
             cursor = (
-                self.chat_collection.find({"session_id": session_id})
+                collection.find({"session_id": session_id}, projection)
                 .sort("timestamp", 1)
                 .skip(skip)
                 .limit(limit)
             )
-
-            messages = []
-            for doc in cursor:
-                doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
-                messages.append(doc)
+            messages = self._documents(cursor, raw)
 
             logger.info(f"Retrieved {len(messages)} messages for session {session_id}")
             return messages
@@ -137,19 +269,98 @@ class ChatService:
             logger.error(f"Error retrieving messages: {e}")
             raise
 
-    def get_user_sessions(self, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get all chat sessions for a user"""
+    def get_recent_messages(
+        self,
+        session_id: str,
+        limit: int = CHAT_SESSION_TAIL_SIZE,
+        session: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest messages (_id, role, message), oldest first
+        Served from the session's recent_messages tail (pass session if it was
+        already read with it); chat_messages is only queried for deep history
+        or sessions created before the tail existed
+        """
+        if session is None:
+            session = self.sessions_collection.find_one(
+                {"_id": ObjectId(session_id)},
+                {
+                    "state": 1,
+                    "compressed_at": 1,
+                    "message_count": 1,
+                    "recent_messages": {"$slice": -limit},
+                },
+            )
+            if session is None:
+                return []
+
+        tail = session.get("recent_messages")
+        count = session.get("message_count", 0)
+        if tail is not None and len(tail) >= min(limit, count):
+            return tail[-limit:] if limit else []
+
+        return self.get_session_messages(
+            session_id,
+            limit,
+            max(0, count - limit),
+            projection=Projections.MESSAGE_HISTORY,
+            archived=session.get("state") == TaskState.ARCHIVED,
+            compressed=bool(session.get("compressed_at")),
+        )
+
+    def get_session_page(
+        self, session_id: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        First page of role and message (what get_session_messages returns),
+        from the tail when it holds the whole session
+        """
+        session = (
+            self.sessions_collection.find_one(
+                {"_id": ObjectId(session_id)},
+                {
+                    "state": 1,
+                    "compressed_at": 1,
+                    "message_count": 1,
+                    "recent_messages": 1,
+                },
+            )
+            or {}
+        )
+        tail = session.get("recent_messages")
+        if tail is not None and len(tail) >= session.get("message_count", 0):
+            return [
+                {"role": msg["role"], "message": msg["message"]} for msg in tail[:limit]
+            ]
+        return self.get_session_messages(
+            session_id,
+            limit,
+            projection=Projections.MESSAGE_TEXT,
+            archived=session.get("state") == TaskState.ARCHIVED,
+            compressed=bool(session.get("compressed_at")),
+        )
+
+    def get_user_sessions(
+        self,
+        user_id: int,
+        limit: int = 20,
+        projection: Optional[Dict[str, Any]] = None,
+        raw: bool = False,
+        archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Get a user's chat sessions, archived ones only if archived=True"""
         try:
+            collection = (
+                self.raw_sessions_collection if raw else self.sessions_collection
+            )
             cursor = (
-                self.sessions_collection.find({"user_id": user_id})
+                collection.find(
+                    self._user_sessions_filter(user_id, archived), projection
+                )
                 .sort("updated_at", -1)
                 .limit(limit)
             )
-
-            sessions = []
-            for doc in cursor:
-                doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
-                sessions.append(doc)
+            sessions = self._documents(cursor, raw)
 
             logger.info(f"Retrieved {len(sessions)} sessions for user {user_id}")
             return sessions
@@ -157,10 +368,39 @@ class ChatService:
             logger.error(f"Error retrieving sessions: {e}")
             raise
 
-    def get_session_by_id(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific session by ID"""
+    @staticmethod
+    def _user_sessions_filter(user_id: int, archived: bool) -> Dict[str, Any]:
+        """Archived sessions are listed separately from active ones"""
+        if archived:
+            return {"user_id": user_id, "state": TaskState.ARCHIVED}
+        return {"user_id": user_id, "state": {"$ne": TaskState.ARCHIVED}}
+
+    def get_user_sessions_version(
+        self, user_id: int, limit: int = 20, archived: bool = False
+    ) -> str:
+        """Fingerprint of what get_user_sessions returns: ids and updated_at only"""
+        cursor = (
+            self.sessions_collection.find(
+                self._user_sessions_filter(user_id, archived), {"updated_at": 1}
+            )
+            .sort("updated_at", -1)
+            .limit(limit)
+        )
+        return ",".join(f"{doc['_id']}@{doc.get('updated_at')}" for doc in cursor)
+
+    @staticmethod
+    def get_session_version(session: Dict[str, Any]) -> str:
+        """Changes whenever a message is added or the session is updated"""
+        return f"{session.get('updated_at')}#{session.get('message_count', 0)}"
+
+    def get_session_by_id(
+        self, session_id: str, projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get a specific session by ID (only projected fields if given)"""
         try:
-            session = self.sessions_collection.find_one({"_id": ObjectId(session_id)})
+            session = self.sessions_collection.find_one(
+                {"_id": ObjectId(session_id)}, projection
+            )
             if session:
                 session["_id"] = str(session["_id"])
             return session
@@ -182,26 +422,508 @@ class ChatService:
 
     def delete_session(self, session_id: str, user_id: int) -> bool:
         """Delete a session and all its messages"""
+        return bool(self.delete_sessions([session_id], user_id)["sessions"])
+
+    def _write_transaction(self, callback: Callable[[Any], Any]) -> Any:
+        """Run callback(db_session) in a transaction where the deployment has them"""
+        client = self.sessions_collection.database.client
+        topology = getattr(
+            getattr(client, "topology_description", None), "topology_type_name", None
+        )
+        if topology not in TRANSACTION_TOPOLOGIES:
+            # Standalone servers: callers order their writes so that a
+            # concurrent or interrupted run leaves copies, never gaps
+            return callback(None)
+        with client.start_session() as db_session:
+            return db_session.with_transaction(callback)
+
+    def _owned_sessions(
+        self,
+        session_ids: List[str],
+        user_id: int,
+        db_session=None,
+        query: Optional[Dict[str, Any]] = None,
+    ) -> List[ObjectId]:
+        """Ids of the given sessions that exist and belong to user_id"""
+        object_ids = [ObjectId(sid) for sid in session_ids if ObjectId.is_valid(sid)]
+        cursor = self.sessions_collection.find(
+            {"_id": {"$in": object_ids}, "user_id": user_id, **(query or {})},
+            {"_id": 1},
+            session=db_session,
+        )
+        return [doc["_id"] for doc in cursor]
+
+    @staticmethod
+    def _bulk_result(
+        session_ids: List[str], owned: List[ObjectId], **counts: int
+    ) -> Dict[str, Any]:
+        """Which of the requested sessions were changed"""
+        changed = {str(oid) for oid in owned}
+        return {
+            "status": "success",
+            "sessions": [sid for sid in session_ids if sid in changed],
+            "not_found": [sid for sid in session_ids if sid not in changed],
+            **counts,
+        }
+
+    def _move_messages(
+        self,
+        source: Collection,
+        target: Collection,
+        session_ids: List[str],
+        db_session=None,
+    ) -> int:
+        """Copy the sessions' messages to target, then delete them from source"""
+        # Messages added while this runs are newer than the cutoff and stay put
+        query = {
+            "session_id": {"$in": session_ids},
+            "timestamp": {"$lt": datetime.utcnow()},
+        }
+        moved = 0
+        batch = []
+        # Raw documents are copied without being decoded and re-encoded
+        for doc in source.find(query, session=db_session):
+            batch.append(doc)
+            if len(batch) >= CHAT_ARCHIVE_BATCH_SIZE:
+                moved += self._insert_copies(target, batch, db_session)
+                batch = []
+        if batch:
+            moved += self._insert_copies(target, batch, db_session)
+        source.delete_many(query, session=db_session)
+        return moved
+
+    @staticmethod
+    def _insert_copies(target: Collection, batch: List[Any], db_session=None) -> int:
+        """insert_many that skips documents an interrupted move already copied"""
         try:
-            # Delete all messages in the session
-            self.chat_collection.delete_many({"session_id": session_id})
-
-            # Delete the session
-            result = self.sessions_collection.delete_one(
+            return len(
+                target.insert_many(
+                    batch, ordered=False, session=db_session
+                ).inserted_ids
+            )
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            return e.details["nInserted"]
+
+    def _restore_messages(
+        self, session_id: str, compressed: bool, db_session=None
+    ) -> int:
+        """Move an archived session's messages back to chat_messages"""
+        restored = 0
+        bundle = (
+            self.bundles_collection.find_one({"_id": session_id}, session=db_session)
+            if compressed
+            else None
+        )
+        if bundle is not None:
+            restored = self._unpack(bundle, self.raw_chat_collection, db_session)
+            self.bundles_collection.delete_one({"_id": session_id}, session=db_session)
+        return restored + self._move_messages(
+            self.raw_archive_collection,
+            self.raw_chat_collection,
+            [session_id],
+            db_session,
+        )
+
+    def _recover_bundle(
+        self, session_id: str, token: Optional[ObjectId] = None, db_session=None
+    ) -> int:
+        """
+        Put the messages of a bundle left by a failed compaction back where the
+        session keeps them: the given compaction's own bundle, or without a
+        token any bundle older than a compaction lease
+        """
+        query: Dict[str, Any] = {"_id": session_id}
+        if token is not None:
+            query["compaction_token"] = token
+        else:
+            query["created_at"] = {
+                "$lt": datetime.utcnow()
+                - timedelta(seconds=CHAT_COMPACTION_LEASE_SECONDS)
+            }
+        bundle = self.bundles_collection.find_one(query, session=db_session)
+        if bundle is None:
+            return 0
+        session = self.sessions_collection.find_one(
+            {"_id": ObjectId(session_id)},
+            {"state": 1, "compressed_at": 1},
+            session=db_session,
+        )
+        if session is not None and session.get("compressed_at"):
+            return 0  # the bundle the session is read from
+        restored = 0
+        if session is not None:
+            target = (
+                self.raw_archive_collection
+                if session["state"] == TaskState.ARCHIVED
+                else self.raw_chat_collection
+            )
+            restored = self._unpack(bundle, target, db_session)
+        self.bundles_collection.delete_one(
+            {"_id": session_id, "compaction_token": bundle.get("compaction_token")},
+            session=db_session,
+        )
+        return restored
+
+    def _unpack(
+        self, bundle: Dict[str, Any], target: Collection, db_session=None
+    ) -> int:
+        """Insert a bundle's messages into target, skipping ones already there"""
+        restored = 0
+        messages = self._decompress(bundle, raw=True)
+        for start in range(0, len(messages), CHAT_ARCHIVE_BATCH_SIZE):
+            restored += self._insert_copies(
+                target, messages[start : start + CHAT_ARCHIVE_BATCH_SIZE], db_session
+            )
+        return restored
+
+    @staticmethod
+    def _decompress(bundle: Dict[str, Any], raw: bool = False) -> List[Any]:
+        """Messages of a bundle, oldest first"""
+        data = zstandard.ZstdDecompressor().decompress(bundle["data"])
+        if raw:
+            return decode_all(data, RAW_BSON_OPTIONS)
+        return decode_all(data)
+
+    def _bundle_messages(self, session_id: str, raw: bool = False) -> Optional[List]:
+        """A compacted session's messages, or None if it has no bundle"""
+        bundle = self.bundles_collection.find_one({"_id": session_id}, {"data": 1})
+        if bundle is None:
+            return None
+        messages = self._decompress(bundle, raw)
+        return messages if raw else self._documents(messages, raw=False)
+
+    @staticmethod
+    def _project(doc: Any, projection: Optional[Dict[str, Any]]) -> Any:
+        """Apply an inclusion projection such as Projections.MESSAGE_TEXT"""
+        if projection is None or not isinstance(doc, dict):
+            return doc  # raw documents are passed through whole
+        fields = {key for key, value in projection.items() if value and key != "_id"}
+        if projection.get("_id", 1):
+            fields.add("_id")
+        return {key: value for key, value in doc.items() if key in fields}
+
+    def get_retention_candidates(
+        self, cutoff: datetime, limit: int, exclude: Optional[List[ObjectId]] = None
+    ) -> List[str]:
+        """Oldest complete or archived sessions not updated since cutoff"""
+        cursor = (
+            self.sessions_collection.find(
+                {
+                    "state": {"$in": [TaskState.COMPLETE, TaskState.ARCHIVED]},
+                    "updated_at": {"$lt": cutoff},
+                    "compressed_at": {"$exists": False},
+                    "_id": {"$nin": exclude or []},
+                },
+                {"_id": 1},
+            )
+            .sort("updated_at", 1)
+            .limit(limit)
+        )
+        return [str(doc["_id"]) for doc in cursor]
+
+    def compact_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Pack a complete or archived session's messages into one zstd-compressed
+        chat_archive_bundles document and archive the session
+        Returns None when the session is active, changed meanwhile, too big or
+        being compacted by another worker
+        """
+        try:
+            self._check_mongodb_available()
+            session = self.sessions_collection.find_one(
+                {"_id": ObjectId(session_id)},
+                {"state": 1, "user_id": 1, "updated_at": 1, "compressed_at": 1},
+            )
+            if (
+                session is None
+                or session.get("compressed_at")
+                or session.get("state") not in (TaskState.COMPLETE, TaskState.ARCHIVED)
+            ):
+                return None
+
+            # Claim the session first, so two workers never pack it at once
+            token = ObjectId()
+            now = datetime.utcnow()
+            lease_expires = now + timedelta(seconds=CHAT_COMPACTION_LEASE_SECONDS)
+            unchanged = {
+                "_id": session["_id"],
+                "state": session["state"],
+                "updated_at": session["updated_at"],
+                "compressed_at": {"$exists": False},
+            }
+            claimed = self.sessions_collection.update_one(
                 {
-                    "_id": ObjectId(session_id),
-                    "user_id": user_id,  # Ensure user owns the session
-                }
+                    **unchanged,
+                    "$or": [
+                        {"compaction_lease": {"$exists": False}},
+                        {"compaction_lease.expires_at": {"$lt": now}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "compaction_lease": {
+                            "token": token,
+                            "expires_at": lease_expires,
+                        }
+                    }
+                },
+            )
+            if claimed.matched_count == 0:
+                return None
+            # A run that died before this one may have left messages in its bundle
+            self._write_transaction(
+                lambda db_session: self._recover_bundle(
+                    session_id, db_session=db_session
+                )
+            )
+
+            source = (
+                self.raw_archive_collection
+                if session["state"] == TaskState.ARCHIVED
+                else self.raw_chat_collection
+            )
+            # Every stored message is stamped no later than the session's
+            # updated_at; newer ones change updated_at and the update below fails
+            query = {
+                "session_id": session_id,
+                "timestamp": {"$lte": session["updated_at"]},
+            }
+            data, count, compressed = self._pack(source, query)
+            if len(compressed) > CHAT_BUNDLE_MAX_BYTES:
+                logger.warning(
+                    f"Session {session_id} is too big to compact "
+                    f"({len(compressed)} bytes compressed)"
+                )
+                self.sessions_collection.update_one(
+                    {"_id": session["_id"], "compaction_lease.token": token},
+                    {"$unset": {"compaction_lease": ""}},
+                )
+                return None
+
+            def compact(db_session):
+                # insert_one, not an upsert: an existing bundle belongs to
+                # another compaction and is left alone
+                self.bundles_collection.insert_one(
+                    {
+                        "_id": session_id,
+                        "user_id": session["user_id"],
+                        "codec": "zstd",
+                        "message_count": count,
+                        "raw_bytes": len(data),
+                        "compressed_bytes": len(compressed),
+                        "data": Binary(compressed),
+                        "compaction_token": token,
+                        "created_at": now,
+                    },
+                    session=db_session,
+                )
+                if datetime.utcnow() >= lease_expires:
+                    # Past the lease another run may take this bundle for
+                    # an orphan; the messages are still in place
+                    self.bundles_collection.delete_one(
+                        {"_id": session_id, "compaction_token": token},
+                        session=db_session,
+                    )
+                    return False
+                # The messages go while the session is still uncompressed, so
+                # a state change meanwhile never restores from this bundle;
+                # if one happened, the update below fails and the bundle is
+                # unpacked back where the session now keeps its messages
+                source.delete_many(query, session=db_session)
+                # Only if nothing touched the session and the claim is still ours
+                result = self.sessions_collection.update_one(
+                    {**unchanged, "compaction_lease.token": token},
+                    {
+                        "$set": {"state": TaskState.ARCHIVED, "compressed_at": now},
+                        "$min": {"archived_at": now},
+                        "$unset": {"compaction_lease": ""},
+                    },
+                    session=db_session,
+                )
+                if result.matched_count == 0:
+                    self._recover_bundle(session_id, token, db_session)
+                    return False
+                return True
+
+            try:
+                compacted = self._write_transaction(compact)
+            except DuplicateKeyError:
+                logger.info(f"Session {session_id} already has a bundle, skipping")
+                compacted = False
+            if not compacted:
+                self.sessions_collection.update_one(
+                    {"_id": session["_id"], "compaction_lease.token": token},
+                    {"$unset": {"compaction_lease": ""}},
+                )
+                return None
+            if session["state"] != TaskState.ARCHIVED:
+                session_events.publish(
+                    session_id, {"event": "state", "state": TaskState.ARCHIVED}
+                )
+            logger.info(
+                f"Compacted {count} messages of session {session_id} "
+                f"({len(data)} -> {len(compressed)} bytes)"
+            )
+            return {
+                "status": "success",
+                "session_id": session_id,
+                "messages": count,
+                "raw_bytes": len(data),
+                "compressed_bytes": len(compressed),
+            }
+        except Exception as e:
+            logger.error(f"Error compacting session {session_id}: {e}")
+            raise
+
+    @staticmethod
+    def _pack(source: Collection, query: Dict[str, Any]) -> Tuple[bytes, int, bytes]:
+        """Matching messages as concatenated BSON, their count, and zstd of it"""
+        # Raw documents are encoded back to their original bytes for free
+        encoded = [encode(doc) for doc in source.find(query).sort("timestamp", 1)]
+        data = b"".join(encoded)
+        compressed = zstandard.ZstdCompressor(level=CHAT_ARCHIVE_ZSTD_LEVEL).compress(
+            data
+        )
+        return data, len(encoded), compressed
+
+    def complete_sessions(self, session_ids: List[str], user_id: int) -> Dict[str, Any]:
+        """Mark many of a user's sessions complete (archived ones are skipped)"""
+        try:
+            self._check_mongodb_available()
+
+            def complete(db_session):
+                owned = self._owned_sessions(
+                    session_ids,
+                    user_id,
+                    db_session,
+                    query={"state": {"$ne": TaskState.ARCHIVED}},
+                )
+                self.sessions_collection.update_many(
+                    {"_id": {"$in": owned}, "user_id": user_id},
+                    {
+                        "$set": {
+                            "state": TaskState.COMPLETE,
+                            "updated_at": datetime.utcnow(),
+                        }
+                    },
+                    session=db_session,
+                )
+                return owned
+
+            owned = self._write_transaction(complete)
+            for oid in owned:
+                session_events.publish(
+                    str(oid), {"event": "state", "state": TaskState.COMPLETE}
+                )
+            logger.info(f"Completed {len(owned)} sessions for user {user_id}")
+            return self._bulk_result(session_ids, owned)
+        except Exception as e:
+            logger.error(f"Error completing sessions: {e}")
+            raise
+
+    def archive_sessions(self, session_ids: List[str], user_id: int) -> Dict[str, Any]:
+        """Move many of a user's sessions' messages to chat_messages_archive"""
+        try:
+            self._check_mongodb_available()
+
+            def archive(db_session):
+                owned = self._owned_sessions(
+                    session_ids,
+                    user_id,
+                    db_session,
+                    query={"state": {"$ne": TaskState.ARCHIVED}},
+                )
+                moved = self._move_messages(
+                    self.raw_chat_collection,
+                    self.raw_archive_collection,
+                    [str(oid) for oid in owned],
+                    db_session,
+                )
+                now = datetime.utcnow()
+                self.sessions_collection.update_many(
+                    {"_id": {"$in": owned}, "user_id": user_id},
+                    {
+                        "$set": {
+                            "state": TaskState.ARCHIVED,
+                            "archived_at": now,
+                            "updated_at": now,
+                        }
+                    },
+                    session=db_session,
+                )
+                return owned, moved
+
+            owned, moved = self._write_transaction(archive)
+            for oid in owned:
+                session_events.publish(
+                    str(oid), {"event": "state", "state": TaskState.ARCHIVED}
+                )
+            logger.info(
+                f"Archived {len(owned)} sessions ({moved} messages) for user {user_id}"
             )
+            return self._bulk_result(session_ids, owned, messages=moved)
+        except Exception as e:
+            logger.error(f"Error archiving sessions: {e}")
+            raise
+
+    def delete_sessions(self, session_ids: List[str], user_id: int) -> Dict[str, Any]:
+        """Delete many of a user's sessions with their messages and checkpoints"""
+        try:
+            self._check_mongodb_available()
+
+            def delete(db_session):
+                owned = self._owned_sessions(session_ids, user_id, db_session)
+                thread_ids = [str(oid) for oid in owned]
+                deleted = 0
+                for collection in (self.chat_collection, self.archive_collection):
+                    deleted += collection.delete_many(
+                        {"session_id": {"$in": thread_ids}}, session=db_session
+                    ).deleted_count
+                for bundle in self.bundles_collection.find(
+                    {"_id": {"$in": thread_ids}},
+                    {"message_count": 1},
+                    session=db_session,
+                ):
+                    deleted += bundle["message_count"]
+                self.bundles_collection.delete_many(
+                    {"_id": {"$in": thread_ids}}, session=db_session
+                )
 
-            logger.info(f"Deleted session {session_id} and its messages")
-            return result.deleted_count > 0
+                # The agent's checkpointed graph state for the sessions
+                for collection in (
+                    get_checkpoints_collection(),
+                    get_checkpoint_writes_collection(),
+                ):
+                    if collection is not None:
+                        collection.delete_many(
+                            {"thread_id": {"$in": thread_ids}}, session=db_session
+                        )
+
+                # Sessions last, so a retry after a failure still finds them
+                self.sessions_collection.delete_many(
+                    {"_id": {"$in": owned}, "user_id": user_id}, session=db_session
+                )
+                return owned, deleted
+
+            owned, deleted = self._write_transaction(delete)
+            for oid in owned:
+                session_events.publish(str(oid), {"event": "deleted"})
+            logger.info(
+                f"Deleted {len(owned)} sessions ({deleted} messages) for user {user_id}"
+            )
+            return self._bulk_result(session_ids, owned, messages=deleted)
         except Exception as e:
-            logger.error(f"Error deleting session: {e}")
+            logger.error(f"Error deleting sessions: {e}")
             raise
 
     def search_messages(
-        self, user_id: int, query: str, limit: int = 20
+        self,
+        user_id: int,
+        query: str,
+        limit: int = 20,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """Search messages by text content"""
         try:
@@ -213,16 +935,12 @@ class ChatService:
 
             cursor = (
                 self.chat_collection.find(
-                    {"user_id": user_id, "$text": {"$search": query}}
+                    {"user_id": user_id, "$text": {"$search": query}}, projection
                 )
                 .sort("timestamp", -1)
                 .limit(limit)
             )
-
-            messages = []
-            for doc in cursor:
-                doc["_id"] = str(doc["_id"])
-                messages.append(doc)
+            messages = self._documents(cursor, raw=False)
 
             logger.info(
                 f"Found {len(messages)} messages matching '{query}' for user {user_id}"
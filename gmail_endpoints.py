@@ -5,7 +5,10 @@ Gmail-specific API endpoints for frontend integration
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 from services.gmail_lambda_service import gmail_lambda_service
+from services.gmail_sync import gmail_sync
+from services.auth_status import auth_status
 from user_service import user_service
+from utils.json_response import OrjsonResponse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +36,7 @@ class GmailAuthResponse(BaseModel):
     message: str
 
 
-@router.get("/status/{user_id}")
+@router.get("/status/{user_id}", response_model=GmailAuthResponse)
 async def check_gmail_status(user_id: str):
     """Check if user is authenticated for Gmail"""
 
@@ -43,25 +46,20 @@ async def check_gmail_status(user_id: str):
         raise HTTPException(status_code=404, detail="User not found")
 
     try:
-        # Try to get a Gmail message (this will trigger auth check)
-        result = await gmail_lambda_service.get_gmail_messages(
-            user_id=user_id, query="", max_results=1
+        # Stored token metadata only, no Lambda or Gmail API call
+        status = auth_status.get_status(
+            user_id, "gmail", include_authorization_url=True
         )
 
-        if result.get("status") == "authentication_required":
-            return GmailAuthResponse(
-                authenticated=False,
-                authorization_url=result["authorization_url"],
-                message="Gmail authentication required",
-            )
-        elif result.get("status") == "success":
+        if status["authorized"]:
             return GmailAuthResponse(
                 authenticated=True, message="Gmail authenticated and ready"
             )
-        else:
-            return GmailAuthResponse(
-                authenticated=False, message=result.get("message", "Unknown error")
-            )
+        return GmailAuthResponse(
+            authenticated=False,
+            authorization_url=status["authorization_url"],
+            message="Gmail authentication required",
+        )
 
     except Exception as e:
         logger.error(f"Error checking Gmail status: {e}")
@@ -78,7 +76,7 @@ async def get_gmail_messages(request: GmailMessageRequest):
         raise HTTPException(status_code=404, detail="User not found")
 
     try:
-        result = await gmail_lambda_service.get_gmail_messages(
+        result = await gmail_sync.get_messages(
             user_id=request.user_id,
             query=request.query,
             max_results=request.max_results,
@@ -93,7 +91,7 @@ async def get_gmail_messages(request: GmailMessageRequest):
                 },
             )
         elif result.get("status") == "success":
-            return result["data"]
+            return OrjsonResponse(result["data"])
         else:
             raise HTTPException(
                 status_code=500, detail=result.get("message", "Unknown error")
@@ -132,7 +130,7 @@ async def send_gmail_message(request: GmailSendRequest):
                 },
             )
         elif result.get("status") == "success":
-            return result["data"]
+            return OrjsonResponse(result["data"])
         else:
             raise HTTPException(
                 status_code=500, detail=result.get("message", "Unknown error")
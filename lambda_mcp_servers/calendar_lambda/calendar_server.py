@@ -1,81 +1,78 @@
 """
-Google Calendar MCP Server for AWS Lambda using simplified stdio adapter - WITH CREATE_EVENT
+Google Calendar MCP Server for AWS Lambda - the MCP server script is loaded in-process once per
+container, so discovery documents and built services stay warm between calls
 """
 
+import io
 import os
 import sys
 import json
-import subprocess
+import logging
 import tempfile
+import importlib.util
 from typing import Dict, Any
 
+# Attach the MCP server's log to tools/call responses ("_debug")
+MCP_DEBUG_PAYLOAD = os.environ.get("MCP_DEBUG_PAYLOAD", "false").lower() == "true"
 
-def simple_stdio_adapter(
-    command: list, event: Dict[str, Any], context
-) -> Dict[str, Any]:
-    """
-    Simplified stdio adapter for MCP servers in Lambda
-    Based on AWS Labs approach but without external dependency
-    """
+# MCP server module, loaded on the first invocation of a container
+mcp_server = None
 
-    try:
-        # Start the MCP server process
-        process = subprocess.Popen(
-            command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=os.environ.copy(),
-        )
 
-        # Send the MCP request to the server
-        request_json = json.dumps(event) + "\n"
-        stdout, stderr = process.communicate(
-            input=request_json, timeout=25
-        )  # Lambda timeout buffer
+def debug_requested(event: Dict[str, Any]) -> bool:
+    """Whether the caller asked for the server log in the response"""
+    meta = (event.get("params") or {}).get("_meta") or {}
+    return MCP_DEBUG_PAYLOAD or bool(meta.get("debug"))
 
-        # ALWAYS log stderr to CloudWatch for debugging
-        if stderr:
-            print(f"Calendar MCP Server Debug Output: {stderr}", file=sys.stderr)
 
-        # Parse the response
-        if process.returncode == 0:
-            try:
-                response = json.loads(stdout.strip())
-                # Include debug info for troubleshooting
-                if stderr and event.get("method") == "tools/call":
-                    response["_debug"] = {"stderr": stderr}
-                return response
-            except json.JSONDecodeError as e:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": event.get("id", "error"),
-                    "error": {
-                        "code": -32603,
-                        "message": f"Invalid JSON response from MCP server: {e}",
-                        "data": {"stdout": stdout, "stderr": stderr},
-                    },
-                }
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": event.get("id", "error"),
-                "error": {
-                    "code": -32603,
-                    "message": f"MCP server process failed with code {process.returncode}",
-                    "data": {"stderr": stderr},
-                },
-            }
+def load_mcp_server(script: str):
+    """Load the MCP server script as a module, once per container"""
+    global mcp_server
+    if mcp_server is None:
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+            f.write(script)
+            script_path = f.name
+        spec = importlib.util.spec_from_file_location(
+            "calendar_mcp_server", script_path
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        mcp_server = module
+    return mcp_server
 
-    except subprocess.TimeoutExpired:
-        process.kill()
+
+def in_process_adapter(script: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one MCP request against the loaded server module
+    The server log is captured for "_debug" only when the caller asks for it
+    """
+
+    if not isinstance(event, dict):
         return {
             "jsonrpc": "2.0",
-            "id": event.get("id", "error"),
-            "error": {"code": -32603, "message": "MCP server process timed out"},
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request"},
         }
+
+    handler = None
+    try:
+        server = load_mcp_server(script)
+        if event.get("method") == "tools/call" and debug_requested(event):
+            debug_log = io.StringIO()
+            handler = logging.StreamHandler(debug_log)
+            handler.setFormatter(
+                logging.Formatter("%(levelname)s:%(name)s:%(message)s")
+            )
+            server.logger.addHandler(handler)
+
+        response = server.handle_request(event)
+
+        if handler is not None and debug_log.getvalue():
+            response["_debug"] = {"stderr": debug_log.getvalue()}
+        return response
+
     except Exception as e:
+        print(f"Calendar MCP server error: {e}", file=sys.stderr)
         return {
             "jsonrpc": "2.0",
             "id": event.get("id", "error"),
@@ -84,17 +81,20 @@ def simple_stdio_adapter(
                 "message": f"Failed to execute MCP server: {str(e)}",
             },
         }
+    finally:
+        if handler is not None:
+            server.logger.removeHandler(handler)
 
 
 def lambda_handler(event, context):
     """
-    AWS Lambda handler using simplified stdio adapter
+    AWS Lambda handler running the MCP server in-process
     """
 
     # Print event for debugging
     print(f"Calendar Lambda received event: {json.dumps(event)}", file=sys.stderr)
 
-    # Create temporary stdio MCP server script - WITH CREATE_EVENT
+    # MCP server script, loaded once per container
     mcp_server_script = """#!/usr/bin/env python3
 import json
 import os
@@ -102,12 +102,20 @@ import sys
 import logging
 from typing import Optional, List
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.errors import HttpError
+from collections import OrderedDict
+import heapq
+from itertools import islice
+from zoneinfo import ZoneInfo
 import boto3
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta, timezone
 
 logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 logger.info("=== Calendar MCP Server Starting ===")
 
@@ -119,18 +127,86 @@ except Exception as e:
     logger.error(f"Failed to initialize DynamoDB: {e}")
     table = None
 
+# Credentials reused while the container is warm, keyed by (user_id, service);
+# DynamoDB is read again only once the cached access token has expired
+CREDENTIALS_CACHE_SIZE = int(os.environ.get('CREDENTIALS_CACHE_SIZE', '256'))
+credentials_cache = OrderedDict()
+
+def get_cached_credentials(key):
+    credentials = credentials_cache.get(key)
+    if credentials is None:
+        return None
+    if not credentials.valid:
+        # Expired (google-auth refreshes a little early): reload from DynamoDB
+        del credentials_cache[key]
+        return None
+    credentials_cache.move_to_end(key)
+    return credentials
+
+def cache_credentials(key, credentials):
+    # Without a known expiry the token could go stale unnoticed, so skip caching
+    if credentials.expiry is None:
+        return
+    credentials_cache[key] = credentials
+    credentials_cache.move_to_end(key)
+    while len(credentials_cache) > CREDENTIALS_CACHE_SIZE:
+        credentials_cache.popitem(last=False)
+
+def parse_expiry(expires_at):
+    # Stored ISO expiry as the naive UTC datetime google-auth compares against
+    if not expires_at:
+        return None
+    try:
+        expiry = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+    except ValueError as e:
+        logger.warning(f"Could not parse expiry time: {e}")
+        return None
+    if expiry.tzinfo:
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry
+
+def store_refreshed_token(user_id, service_name, previous_token, credentials):
+    # Conditional write: only replace the token this refresh started from, so a
+    # concurrent refresh in another container is not overwritten
+    try:
+        table.update_item(
+            Key={'user_id': user_id, 'service': service_name},
+            UpdateExpression='SET access_token = :token, expires_at = :expires, updated_at = :updated',
+            ConditionExpression='access_token = :previous',
+            ExpressionAttributeValues={
+                ':token': credentials.token,
+                ':expires': credentials.expiry.isoformat() if credentials.expiry else None,
+                ':updated': datetime.utcnow().isoformat(),
+                ':previous': previous_token
+            }
+        )
+        logger.info("Refreshed token stored")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            logger.info("Token already refreshed by another invocation; keeping the stored one")
+        else:
+            logger.error(f"Failed to store refreshed token: {e}")
+
 def get_user_credentials(user_id):
     if not table:
         logger.error("DynamoDB table not initialized")
         return None
 
+    cache_key = (user_id, 'google_calendar')
+    cached = get_cached_credentials(cache_key)
+    if cached is not None:
+        logger.info(f"Using cached Calendar credentials for user: {user_id}")
+        return cached
+
     try:
         logger.info(f"Looking for Calendar credentials for user: {user_id}")
         # Try google_calendar service first, then fallback to gmail
-        response = table.get_item(Key={'user_id': user_id, 'service': 'google_calendar'})
+        service_name = 'google_calendar'
+        response = table.get_item(Key={'user_id': user_id, 'service': service_name})
         if 'Item' not in response:
             logger.info(f"No google_calendar tokens found, trying gmail tokens for user {user_id}")
-            response = table.get_item(Key={'user_id': user_id, 'service': 'gmail'})
+            service_name = 'gmail'
+            response = table.get_item(Key={'user_id': user_id, 'service': service_name})
         logger.info(f"DynamoDB response status: {'Found' if 'Item' in response else 'Not Found'}")
 
         if 'Item' not in response:
@@ -175,18 +251,7 @@ def get_user_credentials(user_id):
             if not has_calendar_scope:
                 logger.warning(f"Token does not have calendar scope: {scopes_list}")
 
-        # Check if token is expired (basic check)
-        if expires_at:
-            try:
-                from datetime import datetime
-                expires_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                now = datetime.now(expires_dt.tzinfo) if expires_dt.tzinfo else datetime.utcnow()
-                is_expired = now >= expires_dt
-                logger.info(f"Token expired check: {is_expired} (expires: {expires_dt}, now: {now})")
-                if is_expired:
-                    logger.warning(f"Token expired at {expires_at}")
-            except Exception as e:
-                logger.warning(f"Could not parse expiry time: {e}")
+        expiry = parse_expiry(expires_at)
 
         logger.info(f"Creating credentials with scopes: {scopes_list}")
 
@@ -196,13 +261,14 @@ def get_user_credentials(user_id):
         logger.info(f"Using client_id: {client_id[:20] if client_id else 'MISSING'}...")
         logger.info(f"Using client_secret: {bool(client_secret)}")
 
-            credentials = Credentials(
+        credentials = Credentials(
             token=access_token,
             refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
+            token_uri="https://oauth2.googleapis.com/token",
             client_id=client_id,
             client_secret=client_secret,
-            scopes=scopes_list
+            scopes=scopes_list,
+            expiry=expiry
         )
 
         logger.info("Credentials created successfully")
@@ -216,28 +282,223 @@ def get_user_credentials(user_id):
                 from google.auth.transport.requests import Request
                 credentials.refresh(Request())
                 logger.info("Token refreshed successfully")
-
-                # Update DynamoDB with new token (use the same service we found the token in)
-                service_name = 'google_calendar' if 'google_calendar' in str(response) else 'gmail'
-                table.update_item(
-                    Key={'user_id': user_id, 'service': service_name},
-                    UpdateExpression='SET access_token = :token, expires_at = :expires, updated_at = :updated',
-                    ExpressionAttributeValues={
-                        ':token': credentials.token,
-                        ':expires': credentials.expiry.isoformat() if credentials.expiry else None,
-                        ':updated': datetime.utcnow().isoformat()
-                    }
-                )
             except Exception as e:
                 logger.error(f"Token refresh failed: {e}")
                 return None
+            # Update the same record the token was found in
+            store_refreshed_token(user_id, service_name, access_token, credentials)
 
+        cache_credentials(cache_key, credentials)
         logger.info("Credentials ready for Calendar API")
-            return credentials
+        return credentials
     except Exception as e:
         logger.error(f"Error getting credentials for user {user_id}: {e}")
         return None
 
+# Discovery documents and built services, reused while the container is warm
+GOOGLE_API = ('calendar', 'v3')
+SERVICE_CACHE_SIZE = int(os.environ.get('SERVICE_CACHE_SIZE', '32'))
+discovery_docs = {}
+service_cache = OrderedDict()
+
+def get_discovery_doc():
+    # Parse the discovery document bundled with googleapiclient once per container
+    if GOOGLE_API not in discovery_docs:
+        doc = discovery_cache.get_static_doc(*GOOGLE_API)
+        discovery_docs[GOOGLE_API] = json.loads(doc) if doc else None
+    return discovery_docs[GOOGLE_API]
+
+def get_service(user_id, credentials):
+    # One built service per user and access token; a refreshed token builds anew
+    key = (user_id, credentials.token)
+    service = service_cache.get(key)
+    if service is not None:
+        service_cache.move_to_end(key)
+        logger.info("Reusing cached calendar service")
+        return service
+
+    doc = get_discovery_doc()
+    if doc is not None:
+        service = build_from_document(doc, credentials=credentials)
+    else:
+        service = build(*GOOGLE_API, credentials=credentials, static_discovery=True, cache_discovery=False)
+    service_cache[key] = service
+    while len(service_cache) > SERVICE_CACHE_SIZE:
+        service_cache.popitem(last=False)
+    return service
+
+# List fields that field projection applies to
+PROJECTED_LISTS = ("calendars", "events")
+
+def project(data, fields):
+    # Keep only the requested fields on each item of the result lists
+    if not fields:
+        return data
+    projected = dict(data)
+    for key in PROJECTED_LISTS:
+        if isinstance(projected.get(key), list):
+            projected[key] = [
+                {field: item[field] for field in fields if field in item}
+                for item in projected[key]
+            ]
+    return projected
+
+def tool_result(request_id, data, options):
+    # Clients that ask for structured encoding get the result object as-is;
+    # older clients still get it as a JSON string inside a text content block
+    data = project(data, options.get("fields"))
+    if options.get("encoding") == "structured":
+        return {"jsonrpc": "2.0", "id": request_id, "result": {"structuredContent": data}}
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {"content": [{"type": "text", "text": json.dumps(data)}]}
+    }
+
+# Agenda settings
+AGENDA_DEFAULT_DAYS = int(os.environ.get('AGENDA_DEFAULT_DAYS', '7'))
+GOOGLE_BATCH_LIMIT = 50  # requests per Google API batch
+
+# Incremental sync settings: the first (full) sync of a calendar covers
+# SYNC_LOOKBACK_DAYS back to SYNC_HORIZON_DAYS ahead; later syncs send the
+# stored syncToken and only receive changes
+SYNC_LOOKBACK_DAYS = int(os.environ.get('SYNC_LOOKBACK_DAYS', '30'))
+SYNC_HORIZON_DAYS = int(os.environ.get('SYNC_HORIZON_DAYS', '365'))
+SYNC_PAGE_SIZE = 2500
+SYNC_FIELDS = 'items(id,status,summary,start,end,location,htmlLink),nextPageToken,nextSyncToken'
+
+def rfc3339(value):
+    # Google needs an offset on timeMin/timeMax; naive times are taken as UTC
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def compact_event(event, calendar_id):
+    start = event.get('start', {})
+    end = event.get('end', {})
+    return {
+        'id': event.get('id'),
+        'calendar_id': calendar_id,
+        'summary': event.get('summary', '(no title)'),
+        'start': start.get('dateTime') or start.get('date'),
+        'end': end.get('dateTime') or end.get('date'),
+        'all_day': 'dateTime' not in start,
+        'location': event.get('location'),
+        'html_link': event.get('htmlLink')
+    }
+
+def utc_time(value, all_day, time_zone):
+    # Comparable UTC time; all-day dates are midnight in the calendar's zone
+    try:
+        if all_day:
+            try:
+                zone = ZoneInfo(time_zone) if time_zone else timezone.utc
+            except Exception:
+                zone = timezone.utc
+            moment = datetime.fromisoformat(value).replace(tzinfo=zone)
+        else:
+            moment = rfc3339(value)
+        return moment.astimezone(timezone.utc)
+    except (AttributeError, TypeError, ValueError):
+        return datetime.max.replace(tzinfo=timezone.utc)
+
+def start_key(event, time_zone):
+    return utc_time(event['start'], event['all_day'], time_zone)
+
+def list_events_batch(service, calendars, time_min, time_max, max_results):
+    # events.list for every calendar, sent as batched HTTP requests (up to
+    # GOOGLE_BATCH_LIMIT per round trip); each calendar's items come back sorted
+    items = {}
+    errors = {}
+
+    def collect(request_id, response, exception):
+        calendar_id = calendars[int(request_id)]['id']
+        if exception is not None:
+            errors[calendar_id] = str(exception)
+        else:
+            items[calendar_id] = response.get('items', [])
+
+    for offset in range(0, len(calendars), GOOGLE_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=collect)
+        for index in range(offset, min(offset + GOOGLE_BATCH_LIMIT, len(calendars))):
+            batch.add(
+                service.events().list(
+                    calendarId=calendars[index]['id'],
+                    timeMin=time_min,
+                    timeMax=time_max,
+                    singleEvents=True,
+                    orderBy='startTime',
+                    maxResults=max_results
+                ),
+                request_id=str(index)
+            )
+        batch.execute()
+    return items, errors
+
+def merge_agenda(calendars, items, max_results):
+    # Streaming k-way merge of the per-calendar sorted streams; stops after
+    # max_results events instead of sorting everything
+    streams = []
+    for calendar in calendars:
+        events = (compact_event(item, calendar['id']) for item in items.get(calendar['id'], []))
+        time_zone = calendar.get('timeZone')
+        streams.append(((start_key(event, time_zone), event) for event in events))
+    merged = heapq.merge(*streams, key=lambda pair: pair[0])
+    return [event for _, event in islice(merged, max_results)]
+
+def sync_calendar(service, calendar_id, time_zone, sync_token):
+    # Pull one calendar's changes since sync_token (or everything in the sync
+    # window when there is no token, or Google says the token expired)
+    full_sync = not sync_token
+    params = {
+        'calendarId': calendar_id,
+        'singleEvents': True,
+        'maxResults': SYNC_PAGE_SIZE,
+        'fields': SYNC_FIELDS,
+        'showDeleted': not full_sync
+    }
+    window = {}
+    if full_sync:
+        now = datetime.now(timezone.utc)
+        params['timeMin'] = (now - timedelta(days=SYNC_LOOKBACK_DAYS)).isoformat()
+        params['timeMax'] = (now + timedelta(days=SYNC_HORIZON_DAYS)).isoformat()
+        window = {'window_start': params['timeMin'], 'window_end': params['timeMax']}
+    else:
+        params['syncToken'] = sync_token
+
+    events = []
+    deleted = []
+    page_token = None
+    while True:
+        try:
+            page = service.events().list(pageToken=page_token, **params).execute()
+        except HttpError as e:
+            if e.resp.status == 410 and not full_sync:
+                logger.info(f"Sync token expired for {calendar_id}, running a full sync")
+                return sync_calendar(service, calendar_id, time_zone, None)
+            raise
+        for item in page.get('items', []):
+            if item.get('status') == 'cancelled':
+                deleted.append(item['id'])
+                continue
+            event = compact_event(item, calendar_id)
+            event['start_utc'] = utc_time(event['start'], event['all_day'], time_zone).isoformat()
+            event['end_utc'] = utc_time(event['end'] or event['start'], event['all_day'], time_zone).isoformat()
+            events.append(event)
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            break
+
+    return {
+        'events': events,
+        'deleted': deleted,
+        'next_sync_token': page.get('nextSyncToken'),
+        'full_sync': full_sync,
+        'time_zone': time_zone,
+        **window
+    }
+
 def handle_tools_list():
     logger.info("Handling tools/list request for Calendar")
     return {
@@ -319,13 +580,42 @@ def handle_tools_list():
                         },
                         "required": ["user_id", "event_id"]
                     }
+                },
+                {
+                    "name": "get_agenda",
+                    "description": "Events from all of the user's calendars in a time window, merged by start time",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "user_id": {"type": "string", "description": "User ID"},
+                            "time_min": {"type": "string", "description": "Window start (ISO format), default now"},
+                            "time_max": {"type": "string", "description": "Window end (ISO format), default time_min + 7 days"},
+                            "calendar_ids": {"type": "array", "items": {"type": "string"}, "description": "Only these calendars (default: all visible)"},
+                            "max_results": {"type": "integer", "description": "Max events in total", "default": 50}
+                        },
+                        "required": ["user_id"]
+                    }
+                },
+                {
+                    "name": "sync_events",
+                    "description": "Incremental sync: event changes per calendar since the given sync tokens",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "user_id": {"type": "string", "description": "User ID"},
+                            "sync_tokens": {"type": "object", "description": "calendar_id -> nextSyncToken from the previous sync"},
+                            "calendar_ids": {"type": "array", "items": {"type": "string"}, "description": "Only these calendars (default: all visible)"}
+                        },
+                        "required": ["user_id"]
+                    }
                 }
             ]
         }
     }
 
-def handle_tool_call(tool_name, arguments, request_id):
+def handle_tool_call(tool_name, arguments, request_id, options=None):
     logger.info(f"Handling Calendar tool call: {tool_name}")
+    options = options or {}
     try:
         user_id = arguments.get("user_id")
         if not user_id:
@@ -345,14 +635,14 @@ def handle_tool_call(tool_name, arguments, request_id):
             }
 
         logger.info("Credentials obtained, calling Calendar API...")
-        service = build('calendar', 'v3', credentials=credentials)
+        service = get_service(user_id, credentials)
         logger.info("Calendar service built successfully")
 
         if tool_name == "list_calendars":
-    calendars_result = service.calendarList().list().execute()
-    calendars = calendars_result.get("items", [])
+            calendars_result = service.calendarList().list().execute()
+            calendars = calendars_result.get("items", [])
             calendar_list = []
-    for calendar in calendars:
+            for calendar in calendars:
                 calendar_list.append({
                     'id': calendar['id'],
                     'name': calendar['summary'],
@@ -361,20 +651,11 @@ def handle_tool_call(tool_name, arguments, request_id):
                 })
 
             logger.info(f"Successfully retrieved {len(calendar_list)} calendars")
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "calendars": calendar_list,
-                            "total": len(calendar_list)
-                        })
-                    }]
-                }
-            }
+            return tool_result(request_id, {
+                "success": True,
+                "calendars": calendar_list,
+                "total": len(calendar_list)
+            }, options)
 
         elif tool_name == "create_event":
             # Get required parameters
@@ -398,19 +679,19 @@ def handle_tool_call(tool_name, arguments, request_id):
             logger.info(f"Creating event: {summary} from {start_time} to {end_time}")
 
             # Build event object
-    event = {
-        "summary": summary,
+            event = {
+                "summary": summary,
                 "start": {"dateTime": start_time, "timeZone": "UTC"},
                 "end": {"dateTime": end_time, "timeZone": "UTC"}
             }
 
             # Add optional fields
-    if description:
-        event["description"] = description
-    if location:
-        event["location"] = location
-    if attendees:
-        event["attendees"] = [{"email": email} for email in attendees]
+            if description:
+                event["description"] = description
+            if location:
+                event["location"] = location
+            if attendees:
+                event["attendees"] = [{"email": email} for email in attendees]
 
             logger.info(f"Event object: {json.dumps(event)}")
 
@@ -418,24 +699,101 @@ def handle_tool_call(tool_name, arguments, request_id):
             created_event = service.events().insert(calendarId=calendar_id, body=event).execute()
 
             logger.info(f"Event created successfully with ID: {created_event['id']}")
-        return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "event_id": created_event['id'],
-                            "html_link": created_event.get('htmlLink', ''),
-                            "summary": summary,
-                            "start_time": start_time,
-                            "end_time": end_time,
-                            "calendar_id": calendar_id
-                        })
-                    }]
+            return tool_result(request_id, {
+                "success": True,
+                "event_id": created_event['id'],
+                "html_link": created_event.get('htmlLink', ''),
+                "summary": summary,
+                "start_time": start_time,
+                "end_time": end_time,
+                "calendar_id": calendar_id
+            }, options)
+
+        elif tool_name == "sync_events":
+            sync_tokens = arguments.get("sync_tokens") or {}
+            calendar_ids = arguments.get("calendar_ids")
+            calendars = service.calendarList().list().execute().get("items", [])
+            if calendar_ids:
+                calendars = [calendar for calendar in calendars if calendar['id'] in calendar_ids]
+            else:
+                calendars = [calendar for calendar in calendars if not calendar.get('hidden')]
+
+            changes = {}
+            for calendar in calendars:
+                try:
+                    changes[calendar['id']] = sync_calendar(
+                        service, calendar['id'], calendar.get('timeZone'), sync_tokens.get(calendar['id'])
+                    )
+                except Exception as e:
+                    logger.error(f"Sync failed for calendar {calendar['id']}: {e}")
+                    changes[calendar['id']] = {"error": str(e)}
+
+            logger.info(f"Synced {len(changes)} calendars")
+            return tool_result(request_id, {
+                "success": True,
+                "changes": changes,
+                "calendar_ids": [calendar['id'] for calendar in calendars]
+            }, options)
+
+        elif tool_name in ("list_events", "get_agenda"):
+            try:
+                time_min = rfc3339(arguments.get("time_min") or datetime.now(timezone.utc).isoformat())
+                time_max = arguments.get("time_max")
+                if time_max:
+                    time_max = rfc3339(time_max)
+                elif tool_name == "get_agenda":
+                    time_max = time_min + timedelta(days=AGENDA_DEFAULT_DAYS)
+            except ValueError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid time window: {e}"}
                 }
-            }
+            time_min = time_min.isoformat()
+            time_max = time_max.isoformat() if time_max else None
+
+            if tool_name == "list_events":
+                calendar_id = arguments.get("calendar_id", "primary")
+                params = {
+                    "calendarId": calendar_id,
+                    "timeMin": time_min,
+                    "singleEvents": True,
+                    "orderBy": "startTime",
+                    "maxResults": arguments.get("max_results", 10)
+                }
+                if time_max:
+                    params["timeMax"] = time_max
+                events_result = service.events().list(**params).execute()
+                events = [compact_event(item, calendar_id) for item in events_result.get("items", [])]
+
+                logger.info(f"Successfully retrieved {len(events)} events from {calendar_id}")
+                return tool_result(request_id, {
+                    "success": True,
+                    "events": events,
+                    "total": len(events)
+                }, options)
+
+            max_results = arguments.get("max_results", 50)
+            calendar_ids = arguments.get("calendar_ids")
+            calendars = service.calendarList().list().execute().get("items", [])
+            if calendar_ids:
+                calendars = [calendar for calendar in calendars if calendar['id'] in calendar_ids]
+            else:
+                calendars = [calendar for calendar in calendars if not calendar.get('hidden')]
+
+            items, errors = list_events_batch(service, calendars, time_min, time_max, max_results)
+            events = merge_agenda(calendars, items, max_results)
+
+            logger.info(f"Agenda: {len(events)} events from {len(calendars)} calendars")
+            return tool_result(request_id, {
+                "success": True,
+                "events": events,
+                "total": len(events),
+                "calendar_ids": [calendar['id'] for calendar in calendars],
+                "time_min": time_min,
+                "time_max": time_max,
+                "errors": errors
+            }, options)
 
         else:
             return {
@@ -452,12 +810,8 @@ def handle_tool_call(tool_name, arguments, request_id):
             "error": {"code": -32603, "message": f"Calendar tool execution failed: {str(e)}"}
         }
 
-def main():
+def handle_request(request):
     try:
-        request_line = sys.stdin.read().strip()
-        logger.info(f"Calendar MCP received request: {request_line}")
-        request = json.loads(request_line)
-
         method = request.get("method")
         request_id = request.get("id", "unknown")
 
@@ -469,7 +823,7 @@ def main():
             params = request.get("params", {})
             tool_name = params.get("name")
             arguments = params.get("arguments", {})
-            response = handle_tool_call(tool_name, arguments, request_id)
+            response = handle_tool_call(tool_name, arguments, request_id, params)
         else:
             response = {
                 "jsonrpc": "2.0",
@@ -478,7 +832,23 @@ def main():
             }
 
         logger.info(f"Calendar sending response: {json.dumps(response)[:200]}...")
-        print(json.dumps(response))
+        return response
+
+    except Exception as e:
+        logger.error(f"Calendar request error: {e}")
+        return {
+            "jsonrpc": "2.0",
+            "id": "error",
+            "error": {"code": -32603, "message": f"Internal Calendar error: {str(e)}"}
+        }
+
+def main():
+    try:
+        request_line = sys.stdin.read().strip()
+        logger.info(f"Calendar MCP received request: {request_line}")
+        request = json.loads(request_line)
+        response = handle_request(request)
+        print(json.dumps(response, separators=(",", ":")))
 
     except Exception as e:
         logger.error(f"Calendar main loop error: {e}")
@@ -493,15 +863,15 @@ if __name__ == "__main__":
     main()
 """
 
-    # Write script to temporary file
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-        f.write(mcp_server_script)
-        script_path = f.name
-
-    # Make it executable
-    os.chmod(script_path, 0o755)
-
-    # Run the MCP server with our simplified adapter
-    command = [sys.executable, script_path]
+    # JSON-RPC batch: the calls run one after another in this invocation and
+    # share the warm credentials and service caches
+    if isinstance(event, list):
+        if not event:
+            return {
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {"code": -32600, "message": "Invalid Request: empty batch"},
+            }
+        return [in_process_adapter(mcp_server_script, request) for request in event]
 
-    return simple_stdio_adapter(command, event, context)
+    return in_process_adapter(mcp_server_script, event)
@@ -1,81 +1,76 @@
 """
-Gmail MCP Server for AWS Lambda using simplified stdio adapter - WITH DEBUG CAPTURE
+Gmail MCP Server for AWS Lambda - the MCP server script is loaded in-process once per
+container, so discovery documents and built services stay warm between calls
 """
 
+import io
 import os
 import sys
 import json
-import subprocess
+import logging
 import tempfile
+import importlib.util
 from typing import Dict, Any
 
+# Attach the MCP server's log to tools/call responses ("_debug")
+MCP_DEBUG_PAYLOAD = os.environ.get("MCP_DEBUG_PAYLOAD", "false").lower() == "true"
 
-def simple_stdio_adapter(
-    command: list, event: Dict[str, Any], context
-) -> Dict[str, Any]:
-    """
-    Simplified stdio adapter for MCP servers in Lambda
-    Based on AWS Labs approach but without external dependency
-    """
+# MCP server module, loaded on the first invocation of a container
+mcp_server = None
 
-    try:
-        # Start the MCP server process
-        process = subprocess.Popen(
-            command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=os.environ.copy(),
-        )
 
-        # Send the MCP request to the server
-        request_json = json.dumps(event) + "\n"
-        stdout, stderr = process.communicate(
-            input=request_json, timeout=25
-        )  # Lambda timeout buffer
+def debug_requested(event: Dict[str, Any]) -> bool:
+    """Whether the caller asked for the server log in the response"""
+    meta = (event.get("params") or {}).get("_meta") or {}
+    return MCP_DEBUG_PAYLOAD or bool(meta.get("debug"))
 
-        # ALWAYS log stderr to CloudWatch for debugging
-        if stderr:
-            print(f"MCP Server Debug Output: {stderr}", file=sys.stderr)
 
-        # Parse the response
-        if process.returncode == 0:
-            try:
-                response = json.loads(stdout.strip())
-                # Include debug info for troubleshooting
-                if stderr and event.get("method") == "tools/call":
-                    response["_debug"] = {"stderr": stderr}
-                return response
-            except json.JSONDecodeError as e:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": event.get("id", "error"),
-                    "error": {
-                        "code": -32603,
-                        "message": f"Invalid JSON response from MCP server: {e}",
-                        "data": {"stdout": stdout, "stderr": stderr},
-                    },
-                }
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": event.get("id", "error"),
-                "error": {
-                    "code": -32603,
-                    "message": f"MCP server process failed with code {process.returncode}",
-                    "data": {"stderr": stderr},
-                },
-            }
+def load_mcp_server(script: str):
+    """Load the MCP server script as a module, once per container"""
+    global mcp_server
+    if mcp_server is None:
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+            f.write(script)
+            script_path = f.name
+        spec = importlib.util.spec_from_file_location("gmail_mcp_server", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        mcp_server = module
+    return mcp_server
+
+
+def in_process_adapter(script: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one MCP request against the loaded server module
+    The server log is captured for "_debug" only when the caller asks for it
+    """
 
-    except subprocess.TimeoutExpired:
-        process.kill()
+    if not isinstance(event, dict):
         return {
             "jsonrpc": "2.0",
-            "id": event.get("id", "error"),
-            "error": {"code": -32603, "message": "MCP server process timed out"},
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request"},
         }
+
+    handler = None
+    try:
+        server = load_mcp_server(script)
+        if event.get("method") == "tools/call" and debug_requested(event):
+            debug_log = io.StringIO()
+            handler = logging.StreamHandler(debug_log)
+            handler.setFormatter(
+                logging.Formatter("%(levelname)s:%(name)s:%(message)s")
+            )
+            server.logger.addHandler(handler)
+
+        response = server.handle_request(event)
+
+        if handler is not None and debug_log.getvalue():
+            response["_debug"] = {"stderr": debug_log.getvalue()}
+        return response
+
     except Exception as e:
+        print(f"MCP server error: {e}", file=sys.stderr)
         return {
             "jsonrpc": "2.0",
             "id": event.get("id", "error"),
@@ -84,17 +79,20 @@ def simple_stdio_adapter(
                 "message": f"Failed to execute MCP server: {str(e)}",
             },
         }
+    finally:
+        if handler is not None:
+            server.logger.removeHandler(handler)
 
 
 def lambda_handler(event, context):
     """
-    AWS Lambda handler using simplified stdio adapter
+    AWS Lambda handler running the MCP server in-process
     """
 
     # Print event for debugging
     print(f"Lambda received event: {json.dumps(event)}", file=sys.stderr)
 
-    # Create temporary stdio MCP server script - ENHANCED DEBUG VERSION
+    # MCP server script, loaded once per container
     mcp_server_script = """#!/usr/bin/env python3
 import json
 import base64
@@ -103,12 +101,17 @@ import sys
 import logging
 from typing import Optional
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.errors import HttpError
+from collections import OrderedDict
 import boto3
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone
 
 logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 logger.info("=== MCP Server Starting ===")
 
@@ -120,19 +123,85 @@ except Exception as e:
     logger.error(f"Failed to initialize DynamoDB: {e}")
     table = None
 
+# Credentials reused while the container is warm, keyed by (user_id, service);
+# DynamoDB is read again only once the cached access token has expired
+CREDENTIALS_CACHE_SIZE = int(os.environ.get('CREDENTIALS_CACHE_SIZE', '256'))
+credentials_cache = OrderedDict()
+
+def get_cached_credentials(key):
+    credentials = credentials_cache.get(key)
+    if credentials is None:
+        return None
+    if not credentials.valid:
+        # Expired (google-auth refreshes a little early): reload from DynamoDB
+        del credentials_cache[key]
+        return None
+    credentials_cache.move_to_end(key)
+    return credentials
+
+def cache_credentials(key, credentials):
+    # Without a known expiry the token could go stale unnoticed, so skip caching
+    if credentials.expiry is None:
+        return
+    credentials_cache[key] = credentials
+    credentials_cache.move_to_end(key)
+    while len(credentials_cache) > CREDENTIALS_CACHE_SIZE:
+        credentials_cache.popitem(last=False)
+
+def parse_expiry(expires_at):
+    # Stored ISO expiry as the naive UTC datetime google-auth compares against
+    if not expires_at:
+        return None
+    try:
+        expiry = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+    except ValueError as e:
+        logger.warning(f"Could not parse expiry time: {e}")
+        return None
+    if expiry.tzinfo:
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry
+
+def store_refreshed_token(user_id, service_name, previous_token, credentials):
+    # Conditional write: only replace the token this refresh started from, so a
+    # concurrent refresh in another container is not overwritten
+    try:
+        table.update_item(
+            Key={'user_id': user_id, 'service': service_name},
+            UpdateExpression='SET access_token = :token, expires_at = :expires, updated_at = :updated',
+            ConditionExpression='access_token = :previous',
+            ExpressionAttributeValues={
+                ':token': credentials.token,
+                ':expires': credentials.expiry.isoformat() if credentials.expiry else None,
+                ':updated': datetime.utcnow().isoformat(),
+                ':previous': previous_token
+            }
+        )
+        logger.info("Refreshed token stored")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            logger.info("Token already refreshed by another invocation; keeping the stored one")
+        else:
+            logger.error(f"Failed to store refreshed token: {e}")
+
 def get_user_credentials(user_id):
     if not table:
         logger.error("DynamoDB table not initialized")
         return None
 
+    cache_key = (user_id, 'gmail')
+    cached = get_cached_credentials(cache_key)
+    if cached is not None:
+        logger.info(f"Using cached Gmail credentials for user: {user_id}")
+        return cached
+
     try:
         logger.info(f"Looking for credentials for user: {user_id}")
         response = table.get_item(Key={'user_id': user_id, 'service': 'gmail'})
         logger.info(f"DynamoDB response status: {'Found' if 'Item' in response else 'Not Found'}")
-            if 'Item' not in response:
+        if 'Item' not in response:
             logger.warning(f"No Gmail credentials found for user {user_id}")
             return None
-            token_data = response['Item']
+        token_data = response['Item']
         logger.info(f"Token data keys: {list(token_data.keys())}")
 
         # Enhanced token retrieval with better error handling
@@ -161,18 +230,7 @@ def get_user_credentials(user_id):
             logger.error(f"No access token found for user {user_id}")
             return None
 
-        # Check if token is expired (basic check)
-        if expires_at:
-            try:
-                from datetime import datetime
-                expires_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                now = datetime.now(expires_dt.tzinfo) if expires_dt.tzinfo else datetime.utcnow()
-                is_expired = now >= expires_dt
-                logger.info(f"Token expired check: {is_expired} (expires: {expires_dt}, now: {now})")
-                if is_expired:
-                    logger.warning(f"Token expired at {expires_at}")
-            except Exception as e:
-                logger.warning(f"Could not parse expiry time: {e}")
+        expiry = parse_expiry(expires_at)
 
         scopes_list = []
         if scope:
@@ -186,13 +244,14 @@ def get_user_credentials(user_id):
         logger.info(f"Using client_id: {client_id[:20] if client_id else 'MISSING'}...")
         logger.info(f"Using client_secret: {bool(client_secret)}")
 
-            credentials = Credentials(
+        credentials = Credentials(
             token=access_token,
             refresh_token=refresh_token,
             token_uri="https://oauth2.googleapis.com/token",
             client_id=client_id,
             client_secret=client_secret,
-            scopes=scopes_list
+            scopes=scopes_list,
+            expiry=expiry
         )
 
         logger.info("Credentials created successfully")
@@ -206,25 +265,211 @@ def get_user_credentials(user_id):
                 from google.auth.transport.requests import Request
                 credentials.refresh(Request())
                 logger.info("Token refreshed successfully")
-                # Update DynamoDB with new token
-                table.update_item(
-                    Key={'user_id': user_id, 'service': 'gmail'},
-                    UpdateExpression='SET access_token = :token, expires_at = :expires, updated_at = :updated',
-                    ExpressionAttributeValues={
-                        ':token': credentials.token,
-                        ':expires': credentials.expiry.isoformat() if credentials.expiry else None,
-                        ':updated': datetime.utcnow().isoformat()
-                    }
-                )
             except Exception as e:
                 logger.error(f"Token refresh failed: {e}")
                 return None
+            store_refreshed_token(user_id, 'gmail', access_token, credentials)
+
+        cache_credentials(cache_key, credentials)
         logger.info("Credentials ready for Gmail API")
-            return credentials
+        return credentials
     except Exception as e:
         logger.error(f"Error getting credentials for user {user_id}: {e}")
         return None
 
+# Discovery documents and built services, reused while the container is warm
+GOOGLE_API = ('gmail', 'v1')
+SERVICE_CACHE_SIZE = int(os.environ.get('SERVICE_CACHE_SIZE', '32'))
+discovery_docs = {}
+service_cache = OrderedDict()
+
+def get_discovery_doc():
+    # Parse the discovery document bundled with googleapiclient once per container
+    if GOOGLE_API not in discovery_docs:
+        doc = discovery_cache.get_static_doc(*GOOGLE_API)
+        discovery_docs[GOOGLE_API] = json.loads(doc) if doc else None
+    return discovery_docs[GOOGLE_API]
+
+def get_service(user_id, credentials):
+    # One built service per user and access token; a refreshed token builds anew
+    key = (user_id, credentials.token)
+    service = service_cache.get(key)
+    if service is not None:
+        service_cache.move_to_end(key)
+        logger.info("Reusing cached gmail service")
+        return service
+
+    doc = get_discovery_doc()
+    if doc is not None:
+        service = build_from_document(doc, credentials=credentials)
+    else:
+        service = build(*GOOGLE_API, credentials=credentials, static_discovery=True, cache_discovery=False)
+    service_cache[key] = service
+    while len(service_cache) > SERVICE_CACHE_SIZE:
+        service_cache.popitem(last=False)
+    return service
+
+# List fields that field projection applies to
+PROJECTED_LISTS = ("messages",)
+
+def project(data, fields):
+    # Keep only the requested fields on each item of the result lists
+    if not fields:
+        return data
+    projected = dict(data)
+    for key in PROJECTED_LISTS:
+        if isinstance(projected.get(key), list):
+            projected[key] = [
+                {field: item[field] for field in fields if field in item}
+                for item in projected[key]
+            ]
+    return projected
+
+def tool_result(request_id, data, options):
+    # Clients that ask for structured encoding get the result object as-is;
+    # older clients still get it as a JSON string inside a text content block
+    data = project(data, options.get("fields"))
+    if options.get("encoding") == "structured":
+        return {"jsonrpc": "2.0", "id": request_id, "result": {"structuredContent": data}}
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {"content": [{"type": "text", "text": json.dumps(data)}]}
+    }
+
+# Gmail batch requests are limited to 50 calls per round trip
+GOOGLE_BATCH_LIMIT = 50
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+MESSAGE_FIELDS = 'id,threadId,labelIds,snippet,internalDate,payload/headers'
+# Messages indexed by a full sync (newest first)
+SYNC_MAX_MESSAGES = int(os.environ.get('SYNC_MAX_MESSAGES', '500'))
+HISTORY_TYPES = ['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+
+def compact_message(msg):
+    headers = {h['name']: h['value'] for h in msg.get('payload', {}).get('headers', [])}
+    return {
+        'id': msg['id'],
+        'thread_id': msg.get('threadId'),
+        'subject': headers.get('Subject', 'No Subject'),
+        'sender': headers.get('From', 'Unknown'),
+        'date': headers.get('Date', 'Unknown'),
+        'snippet': msg.get('snippet', ''),
+        'labels': msg.get('labelIds', []),
+        'internal_date': int(msg.get('internalDate', 0))
+    }
+
+def get_metadata_batch(service, message_ids):
+    # messages.get(format=metadata) for every id, sent as batched HTTP requests;
+    # returns the messages in the given order plus the ids that no longer exist
+    found = {}
+    missing = []
+    errors = []
+
+    def collect(request_id, response, exception):
+        if exception is None:
+            found[request_id] = compact_message(response)
+        elif isinstance(exception, HttpError) and exception.resp.status == 404:
+            missing.append(request_id)
+        else:
+            errors.append(exception)
+
+    for offset in range(0, len(message_ids), GOOGLE_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=collect)
+        for message_id in message_ids[offset:offset + GOOGLE_BATCH_LIMIT]:
+            batch.add(
+                service.users().messages().get(
+                    userId='me',
+                    id=message_id,
+                    format='metadata',
+                    metadataHeaders=METADATA_HEADERS,
+                    fields=MESSAGE_FIELDS
+                ),
+                request_id=message_id
+            )
+        batch.execute()
+    if errors:
+        raise errors[0]
+    return [found[message_id] for message_id in message_ids if message_id in found], missing
+
+def full_sync(service, max_messages):
+    # The profile's historyId is read first so nothing that changes while the
+    # mailbox is listed is missed by the next incremental sync
+    history_id = service.users().getProfile(userId='me').execute()['historyId']
+    message_ids = []
+    page_token = None
+    while len(message_ids) < max_messages:
+        page = service.users().messages().list(
+            userId='me',
+            maxResults=min(500, max_messages - len(message_ids)),
+            pageToken=page_token
+        ).execute()
+        message_ids.extend(message['id'] for message in page.get('messages', []))
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            break
+    messages, _ = get_metadata_batch(service, message_ids)
+    return {
+        'messages': messages,
+        'labels': {},
+        'deleted': [],
+        'history_id': history_id,
+        'full_sync': True,
+        'complete': not page_token
+    }
+
+def sync_mailbox(service, history_id, max_messages):
+    # Changes since history_id from history.list; without one (or once Gmail
+    # no longer has that history, 404) the newest max_messages are indexed
+    if not history_id:
+        return full_sync(service, max_messages)
+
+    added = []
+    labels = {}
+    deleted = set()
+    page_token = None
+    while True:
+        try:
+            page = service.users().history().list(
+                userId='me',
+                startHistoryId=history_id,
+                historyTypes=HISTORY_TYPES,
+                maxResults=500,
+                pageToken=page_token
+            ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                logger.info("History id expired, running a full sync")
+                return full_sync(service, max_messages)
+            raise
+        for record in page.get('history', []):
+            for change in record.get('messagesAdded', []):
+                added.append(change['message']['id'])
+            for change in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                labels[change['message']['id']] = change['message'].get('labelIds', [])
+            for change in record.get('messagesDeleted', []):
+                deleted.add(change['message']['id'])
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            break
+
+    # Newest additions first, each message fetched once
+    added = [m for m in dict.fromkeys(reversed(added)) if m not in deleted]
+    if len(added) > max_messages:
+        # Dropping the rest would leave holes the index cannot know about
+        logger.info(f"{len(added)} new messages since the last sync, running a full sync")
+        return full_sync(service, max_messages)
+    messages, missing = get_metadata_batch(service, added)
+    deleted.update(missing)
+    # Fetched metadata already carries the current labels
+    fetched = {message['id'] for message in messages}
+    return {
+        'messages': messages,
+        'labels': {m: ids for m, ids in labels.items() if m not in deleted and m not in fetched},
+        'deleted': sorted(deleted),
+        'history_id': page.get('historyId', history_id),
+        'full_sync': False
+    }
+
 def handle_tools_list():
     logger.info("Handling tools/list request")
     return {
@@ -258,13 +503,27 @@ def handle_tools_list():
                         },
                         "required": ["user_id", "to", "subject", "body"]
                     }
+                },
+                {
+                    "name": "sync_messages",
+                    "description": "Message metadata changes since a Gmail historyId (full sync without one)",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "user_id": {"type": "string", "description": "User ID"},
+                            "history_id": {"type": "string", "description": "historyId returned by the previous sync"},
+                            "max_messages": {"type": "integer", "description": "Messages indexed by a full sync", "default": SYNC_MAX_MESSAGES}
+                        },
+                        "required": ["user_id"]
+                    }
                 }
             ]
         }
     }
 
-def handle_tool_call(tool_name, arguments, request_id):
+def handle_tool_call(tool_name, arguments, request_id, options=None):
     logger.info(f"Handling tool call: {tool_name}")
+    options = options or {}
     try:
         if tool_name == "get_gmail_messages":
             user_id = arguments.get("user_id")
@@ -291,52 +550,66 @@ def handle_tool_call(tool_name, arguments, request_id):
 
             logger.info("Credentials obtained, calling Gmail API...")
             try:
-                service = build('gmail', 'v1', credentials=credentials)
+                service = get_service(user_id, credentials)
                 logger.info("Gmail service built successfully")
 
                 results = service.users().messages().list(
-        userId='me',
-        q=query,
-        maxResults=max_results
-    ).execute()
+                    userId='me',
+                    q=query,
+                    maxResults=max_results
+                ).execute()
                 messages = results.get('messages', [])
                 logger.info(f"Retrieved {len(messages)} messages")
-                detailed_messages = []
+                # Headers only, fetched in one batched request
+                detailed_messages, _ = get_metadata_batch(
+                    service, [message['id'] for message in messages[:max_results]]
+                )
 
-                for message in messages[:max_results]:
-                    msg = service.users().messages().get(userId='me', id=message['id']).execute()
+                logger.info(f"Successfully processed {len(detailed_messages)} messages")
+                return tool_result(request_id, {
+                    "success": True,
+                    "messages": detailed_messages,
+                    "total": len(detailed_messages)
+                }, options)
 
-                    headers = msg['payload'].get('headers', [])
-                    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-                    sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-                    date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown')
+            except Exception as e:
+                logger.error(f"Gmail API error: {e}")
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32603, "message": f"Gmail API error: {str(e)}"}
+                }
 
-                    detailed_messages.append({
-                        'id': message['id'],
-                        'subject': subject,
-                        'sender': sender,
-                        'date': date,
-                        'snippet': msg.get('snippet', '')
-                    })
+        elif tool_name == "sync_messages":
+            user_id = arguments.get("user_id")
+            if not user_id:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": "user_id is required"}
+                }
 
-                logger.info(f"Successfully processed {len(detailed_messages)} messages")
+            credentials = get_user_credentials(user_id)
+            if not credentials:
+                logger.error("Failed to get credentials - authentication required")
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
-                    "result": {
-                        "content": [{
-                            "type": "text",
-                            "text": json.dumps({
-                                "success": True,
-                                "messages": detailed_messages,
-                                "total": len(detailed_messages)
-                            })
-                        }]
-                    }
+                    "error": {"code": -32603, "message": "User not authenticated for Gmail"}
                 }
 
+            try:
+                service = get_service(user_id, credentials)
+                changes = sync_mailbox(
+                    service,
+                    arguments.get("history_id"),
+                    arguments.get("max_messages", SYNC_MAX_MESSAGES)
+                )
+                logger.info(f"Synced {len(changes['messages'])} messages, {len(changes['deleted'])} deleted")
+                return tool_result(request_id, {"success": True, **changes}, options)
+
             except Exception as e:
-                logger.error(f"Gmail API error: {e}")
+                logger.error(f"Gmail sync error: {e}")
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
@@ -369,7 +642,7 @@ def handle_tool_call(tool_name, arguments, request_id):
                 }
 
             try:
-                service = build('gmail', 'v1', credentials=credentials)
+                service = get_service(user_id, credentials)
 
                 message_content = f"To: {to}\\nSubject: {subject}\\n\\n{body}"
 
@@ -380,21 +653,12 @@ def handle_tool_call(tool_name, arguments, request_id):
                 ).execute()
 
                 logger.info(f"Message sent successfully with ID: {result['id']}")
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [{
-                            "type": "text",
-                            "text": json.dumps({
-                                "success": True,
-                                "message_id": result['id'],
-                                "to": to,
-                                "subject": subject
-                            })
-                        }]
-                    }
-                }
+                return tool_result(request_id, {
+                    "success": True,
+                    "message_id": result['id'],
+                    "to": to,
+                    "subject": subject
+                }, options)
 
             except Exception as e:
                 logger.error(f"Gmail send error: {e}")
@@ -405,7 +669,7 @@ def handle_tool_call(tool_name, arguments, request_id):
                 }
 
         else:
-        return {
+            return {
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "error": {"code": -32601, "message": f"Unknown tool: {tool_name}"}
@@ -419,12 +683,8 @@ def handle_tool_call(tool_name, arguments, request_id):
             "error": {"code": -32603, "message": f"Tool execution failed: {str(e)}"}
         }
 
-def main():
+def handle_request(request):
     try:
-        request_line = sys.stdin.read().strip()
-        logger.info(f"Received request: {request_line}")
-        request = json.loads(request_line)
-
         method = request.get("method")
         request_id = request.get("id", "unknown")
 
@@ -436,7 +696,7 @@ def main():
             params = request.get("params", {})
             tool_name = params.get("name")
             arguments = params.get("arguments", {})
-            response = handle_tool_call(tool_name, arguments, request_id)
+            response = handle_tool_call(tool_name, arguments, request_id, params)
         else:
             response = {
                 "jsonrpc": "2.0",
@@ -445,7 +705,23 @@ def main():
             }
 
         logger.info(f"Sending response: {json.dumps(response)[:200]}...")
-        print(json.dumps(response))
+        return response
+
+    except Exception as e:
+        logger.error(f"Request error: {e}")
+        return {
+            "jsonrpc": "2.0",
+            "id": "error",
+            "error": {"code": -32603, "message": f"Internal error: {str(e)}"}
+        }
+
+def main():
+    try:
+        request_line = sys.stdin.read().strip()
+        logger.info(f"Received request: {request_line}")
+        request = json.loads(request_line)
+        response = handle_request(request)
+        print(json.dumps(response, separators=(",", ":")))
 
     except Exception as e:
         logger.error(f"Main loop error: {e}")
@@ -460,15 +736,15 @@ if __name__ == "__main__":
     main()
 """
 
-    # Write script to temporary file
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-        f.write(mcp_server_script)
-        script_path = f.name
-
-    # Make it executable
-    os.chmod(script_path, 0o755)
-
-    # Run the MCP server with our simplified adapter
-    command = [sys.executable, script_path]
+    # JSON-RPC batch: the calls run one after another in this invocation and
+    # share the warm credentials and service caches
+    if isinstance(event, list):
+        if not event:
+            return {
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {"code": -32600, "message": "Invalid Request: empty batch"},
+            }
+        return [in_process_adapter(mcp_server_script, request) for request in event]
 
-    return simple_stdio_adapter(command, event, context)
+    return in_process_adapter(mcp_server_script, event)
@@ -1,21 +1,45 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi import FastAPI, HTTPException, Request, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from agents import EasydoAgent
-from langchain.schema import HumanMessage, AIMessage
+from typing import List, Literal, Optional
+from agents import EasydoAgent, build_conversation_history
 from chat_service import ChatService
 from user_service import user_service
 from mongodb_config import (
     close_mongodb_connection,
     is_mongodb_available,
+    Projections,
+    CHAT_BULK_MAX_SESSIONS,
     TaskState,
 )
 from auth_endpoints import router as auth_router
 from gmail_endpoints import router as gmail_router
 from calendar_endpoints import router as calendar_router
+from services.turn_worker import turn_worker, TurnRejectedError
+from services.auth_status import auth_status
+from services.calendar_sync import calendar_sync
+from services.dashboard import (
+    gather_branches,
+    DASHBOARD_AUTH_TIMEOUT_SECONDS,
+    DASHBOARD_EVENTS_LIMIT,
+    DASHBOARD_EVENTS_TIMEOUT_SECONDS,
+    DASHBOARD_TASKS_TIMEOUT_SECONDS,
+)
+from services.llm_scheduler import llm_scheduler, usage_stats
+from services.chat_socket import chat_sockets
+from services.chat_retention import chat_retention
+from services.session_events import (
+    session_events,
+    SESSION_WAIT_MAX_SECONDS,
+    SESSION_WAIT_RECHECK_SECONDS,
+)
+from utils.tool_memo import tool_memo
+from utils.response_cache import response_cache
+from utils.json_response import OrjsonResponse
 
 
 # The new lifespan context manager to handle startup and shutdown.
@@ -46,6 +70,16 @@ async def lifespan(app: FastAPI):
                 ">>> [LIFESPAN] ⚠️ MongoDB not available - application will be limited."
             )
 
+        # Start background turn worker
+        await turn_worker.start()
+        print(">>> [LIFESPAN] ✅ Background turn worker started.")
+
+        # Optional OAuth grant validator (AUTH_VALIDATOR_ENABLED)
+        await auth_status.start()
+
+        # Optional chat history compaction (CHAT_RETENTION_ENABLED)
+        await chat_retention.start()
+
     except Exception as e:
         print(
             f">>> [LIFESPAN] ❌ An unexpected error occurred during startup: {str(e)}"
@@ -55,6 +89,13 @@ async def lifespan(app: FastAPI):
     yield
     # --- SHUTDOWN LOGIC ---
     print(">>> [LIFESPAN] Shutting down application...")
+    try:
+        await turn_worker.stop()
+        print(">>> [LIFESPAN] ✅ Background turn worker stopped.")
+    except Exception as e:
+        print(f">>> [LIFESPAN] ❌ Error stopping turn worker: {e}")
+    await auth_status.stop()
+    await chat_retention.stop()
     try:
         close_mongodb_connection()
         print(">>> [LIFESPAN] ✅ MongoDB connection closed.")
@@ -62,7 +103,7 @@ async def lifespan(app: FastAPI):
         print(f">>> [LIFESPAN] ❌ Error closing MongoDB connection: {e}")
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=OrjsonResponse)
 
 # Read CORS origins from environment variable - UPDATE FOR PRODUCTION
 allowed_origins = os.getenv(
@@ -93,10 +134,85 @@ def map_state_to_status(state: int) -> str:
         return "needs_permission"
     elif state == TaskState.COMPLETE:
         return "complete"
+    elif state == TaskState.ARCHIVED:
+        return "archived"
     else:
         return "unknown"
 
 
+def session_to_task(session: dict) -> dict:
+    """MongoDB chat session in the task-like shape the frontend expects"""
+    # Preview from the recent message tail (SESSION_SUMMARY slices it to one)
+    tail = session.get("recent_messages") or []
+    return {
+        "id": session["_id"],
+        "title": session["title"],
+        "status": map_state_to_status(
+            session.get("state", TaskState.REQUIRE_PERMISSION)
+        ),
+        "state": session.get("state", TaskState.REQUIRE_PERMISSION),
+        "messages": [],
+        "last_message": (
+            {"role": tail[-1]["role"], "message": tail[-1]["message"]} if tail else None
+        ),
+        "user_id": session["user_id"],
+        "created_at": (
+            session["created_at"].isoformat() if session.get("created_at") else None
+        ),
+        "session_id": session["_id"],
+    }
+
+
+def check_turn_capacity(user_id: str):
+    """Reject a background turn up front, before anything is written"""
+    try:
+        turn_worker.check_capacity(user_id)
+    except TurnRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+
+
+def queue_turn(
+    session_id: str,
+    user_id: str,
+    message: str,
+    message_id: str,
+    selected_tools: Optional[List[str]],
+) -> JSONResponse:
+    """Hand a turn to the background worker and answer 202 Accepted"""
+    try:
+        job_id = turn_worker.submit(
+            session_id,
+            user_id,
+            message,
+            message_id=message_id,
+            selected_tools=selected_tools,
+        )
+    except TurnRejectedError as e:
+        # Capacity changed since check_turn_capacity; don't leave the session spinning
+        ChatService().set_session_require_permission(session_id)
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "id": session_id,
+            "session_id": session_id,
+            "job_id": job_id,
+            "status": map_state_to_status(TaskState.PROCESSING),
+            "state": TaskState.PROCESSING,
+            "poll_url": f"/turns/{job_id}",
+        },
+    )
+
+
 # Root endpoint for Elastic Beanstalk health checks
 @app.get("/")
 def read_root():
@@ -128,6 +244,12 @@ class TaskMessageRequest(BaseModel):
     selected_tools: Optional[List[str]] = []  # Add selected tools
 
 
+class BulkTaskRequest(BaseModel):
+    email: EmailStr
+    action: Literal["complete", "archive", "delete"]
+    task_ids: List[str]
+
+
 @app.post("/signup")
 def signup(req: SignupRequest):
     if not is_mongodb_available():
@@ -159,7 +281,11 @@ def login(req: LoginRequest):
 
 
 @app.get("/tasks")
-def list_tasks(email: str = Query(None)):
+def list_tasks(
+    request: Request,
+    email: str = Query(None),
+    archived: bool = Query(False, description="List archived sessions instead"),
+):
     """List chat sessions (MongoDB) instead of PostgreSQL tasks"""
     if not is_mongodb_available():
         raise HTTPException(
@@ -172,38 +298,107 @@ def list_tasks(email: str = Query(None)):
             return []
 
         chat_service = ChatService()
-        sessions = chat_service.get_user_sessions(user["id"])
+        # Polls answer 304 / the cached body while no session has changed
+        cache_key = f"tasks:{user['id']}:{'archived' if archived else 'active'}"
+        version = chat_service.get_user_sessions_version(user["id"], archived=archived)
+        cached = response_cache.lookup(request, cache_key, version)
+        if cached is not None:
+            return cached
+
+        sessions = chat_service.get_user_sessions(
+            user["id"], projection=Projections.SESSION_SUMMARY, archived=archived
+        )
 
         # Convert MongoDB sessions to task-like format for frontend compatibility
-        return [
-            {
-                "id": session["_id"],
-                "title": session["title"],
-                "status": map_state_to_status(
-                    session.get("state", TaskState.REQUIRE_PERMISSION)
-                ),
-                "state": session.get("state", TaskState.REQUIRE_PERMISSION),
-                "messages": [],
-                "user_id": session["user_id"],
-                "created_at": (
-                    session["created_at"].isoformat()
-                    if session.get("created_at")
-                    else None
-                ),
-                "session_id": session["_id"],
-            }
-            for session in sessions
-        ]
+        return response_cache.store(
+            cache_key, [session_to_task(session) for session in sessions], version
+        )
     else:
         return []
 
 
+@app.get("/dashboard")
+async def get_dashboard(
+    user_id: Optional[str] = Query(None),
+    email: Optional[str] = Query(None),
+):
+    """
+    Home page data in one call: tasks, Gmail/Calendar authorization and
+    upcoming events, fetched concurrently. A branch that fails or exceeds
+    its timeout comes back as null with an entry in "errors".
+    """
+    if not is_mongodb_available():
+        raise HTTPException(
+            status_code=503, detail="Chat service is currently unavailable"
+        )
+
+    # Resolve the user once for every branch
+    user = None
+    if user_id:
+        user = user_service.get_user_by_id(user_id)
+    elif email:
+        user = user_service.get_user_by_email(email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_id = user["id"]
+
+    def list_sessions():
+        return [
+            session_to_task(s)
+            for s in ChatService().get_user_sessions(
+                user_id, projection=Projections.SESSION_SUMMARY
+            )
+        ]
+
+    def authorization():
+        return {
+            service: auth_status.get_status(
+                user_id, service, include_authorization_url=True
+            )
+            for service in ("gmail", "google_calendar")
+        }
+
+    async def upcoming_events():
+        result = await calendar_sync.get_agenda(
+            user_id, max_results=DASHBOARD_EVENTS_LIMIT
+        )
+        if result["status"] != "success":
+            raise RuntimeError(result.get("message", result["status"]))
+        return result["data"]
+
+    results, errors = await gather_branches(
+        {
+            "tasks": (
+                asyncio.to_thread(list_sessions),
+                DASHBOARD_TASKS_TIMEOUT_SECONDS,
+            ),
+            "authorization": (
+                asyncio.to_thread(authorization),
+                DASHBOARD_AUTH_TIMEOUT_SECONDS,
+            ),
+            "upcoming_events": (upcoming_events(), DASHBOARD_EVENTS_TIMEOUT_SECONDS),
+        }
+    )
+    return OrjsonResponse(
+        {
+            "user_id": user_id,
+            "email": user.get("email"),
+            **results,
+            "errors": errors,
+            "partial": bool(errors),
+        }
+    )
+
+
 @app.post("/tasks")
 async def create_task_with_message(
     req: TaskMessageRequest,
     session_id: str = Query(
         None, description="Existing session ID to continue, or None for new"
     ),
+    background: bool = Query(
+        False, description="Return 202 immediately and run the turn in the background"
+    ),
 ):
     """Homepage chat logic: continue existing session or create new"""
     if not is_mongodb_available():
@@ -215,11 +410,16 @@ async def create_task_with_message(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    if background:
+        check_turn_capacity(user["id"])
+
     chat_service = ChatService()
 
     if session_id:
         # Continue existing session
-        session = chat_service.get_session_by_id(session_id)
+        session = chat_service.get_session_by_id(
+            session_id, projection=Projections.SESSION_WITH_TAIL
+        )
         if not session or session["user_id"] != user["id"]:
             raise HTTPException(status_code=404, detail="Session not found")
 
@@ -228,16 +428,9 @@ async def create_task_with_message(
         # Set session to processing state when user sends a message
         chat_service.set_session_processing(session_id)
 
-        # Get conversation history
-        session_messages = chat_service.get_session_messages(session_id)
-        conversation_history = []
-        for msg in session_messages:
-            role = msg.get("role")
-            content = msg.get("message")
-            if role == "user":
-                conversation_history.append(HumanMessage(content=content))
-            elif role == "assistant":
-                conversation_history.append(AIMessage(content=content))
+        # Get conversation history (from the session's recent message tail)
+        session_messages = chat_service.get_recent_messages(session_id, session=session)
+        conversation_history = build_conversation_history(session_messages)
 
         print(f">>> Loaded {len(conversation_history)} messages from history")
 
@@ -249,7 +442,12 @@ async def create_task_with_message(
         print(f">>> Created NEW session: {session_id}")
 
     # Add the user message
-    chat_service.add_message(session_id, user["id"], "user", req.message)
+    message_id = chat_service.add_message(session_id, user["id"], "user", req.message)
+
+    if background:
+        return queue_turn(
+            session_id, user["id"], req.message, message_id, req.selected_tools
+        )
 
     # Process with agent WITH conversation history AND user_id AND selected tools
     agent = EasydoAgent(selected_tools=req.selected_tools)
@@ -257,6 +455,7 @@ async def create_task_with_message(
         req.message,
         conversation_history=conversation_history,
         user_id=user["id"],
+        session_id=session_id,
     )
 
     # Add agent response
@@ -266,32 +465,37 @@ async def create_task_with_message(
     chat_service.set_session_require_permission(session_id)
 
     # Get all messages to return
-    all_messages = chat_service.get_session_messages(session_id)
-    formatted_messages = [
-        {"role": msg["role"], "message": msg["message"]} for msg in all_messages
-    ]
+    formatted_messages = chat_service.get_session_page(session_id)
 
     # Get session details
-    session = chat_service.get_session_by_id(session_id)
+    session = chat_service.get_session_by_id(
+        session_id, projection=Projections.SESSION_SUMMARY
+    )
 
-    return {
-        "id": session_id,
-        "title": session.get("title", "Chat Session"),
-        "status": map_state_to_status(
-            session.get("state", TaskState.REQUIRE_PERMISSION)
-        ),
-        "state": session.get("state", TaskState.REQUIRE_PERMISSION),
-        "messages": formatted_messages,
-        "user_id": user["id"],
-        "created_at": (
-            session["created_at"].isoformat() if session.get("created_at") else None
-        ),
-        "session_id": session_id,
-    }
+    return OrjsonResponse(
+        {
+            "id": session_id,
+            "title": session.get("title", "Chat Session"),
+            "status": map_state_to_status(
+                session.get("state", TaskState.REQUIRE_PERMISSION)
+            ),
+            "state": session.get("state", TaskState.REQUIRE_PERMISSION),
+            "messages": formatted_messages,
+            "user_id": user["id"],
+            "created_at": session.get("created_at"),
+            "session_id": session_id,
+        }
+    )
 
 
 @app.post("/tasks/{task_id}/messages")
-async def add_message(task_id: str, req: Request):
+async def add_message(
+    task_id: str,
+    req: Request,
+    background: bool = Query(
+        False, description="Return 202 immediately and run the turn in the background"
+    ),
+):
     """Add message to existing MongoDB chat session WITH conversation history"""
     if not is_mongodb_available():
         raise HTTPException(
@@ -313,23 +517,25 @@ async def add_message(task_id: str, req: Request):
     chat_service = ChatService()
 
     # Verify session exists and belongs to user
-    session = chat_service.get_session_by_id(task_id)
+    session = chat_service.get_session_by_id(
+        task_id, projection=Projections.SESSION_WITH_TAIL
+    )
     if not session or session["user_id"] != user["id"]:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    if background:
+        check_turn_capacity(user["id"])
+
     # Set session to processing state when user sends a message
     chat_service.set_session_processing(task_id)
 
+    if background:
+        message_id = chat_service.add_message(task_id, user["id"], "user", user_message)
+        return queue_turn(task_id, user["id"], user_message, message_id, selected_tools)
+
     # Get conversation history before adding new message
-    session_messages = chat_service.get_session_messages(task_id)
-    conversation_history = []
-    for msg in session_messages:
-        role = msg.get("role")
-        content = msg.get("message")
-        if role == "user":
-            conversation_history.append(HumanMessage(content=content))
-        elif role == "assistant":
-            conversation_history.append(AIMessage(content=content))
+    session_messages = chat_service.get_recent_messages(task_id, session=session)
+    conversation_history = build_conversation_history(session_messages)
 
     print(
         f">>> Continuing session {task_id} with {len(conversation_history)} previous messages"
@@ -344,6 +550,7 @@ async def add_message(task_id: str, req: Request):
         user_message,
         conversation_history=conversation_history,
         user_id=user["id"],
+        session_id=task_id,
     )
 
     # Add assistant response
@@ -353,14 +560,9 @@ async def add_message(task_id: str, req: Request):
     chat_service.set_session_require_permission(task_id)
 
     # Get all messages for this session
-    messages = chat_service.get_session_messages(task_id)
-
-    # Convert to expected format
-    formatted_messages = [
-        {"role": msg["role"], "message": msg["message"]} for msg in messages
-    ]
+    formatted_messages = chat_service.get_session_page(task_id)
 
-    return {"messages": formatted_messages}
+    return OrjsonResponse({"messages": formatted_messages})
 
 
 @app.post("/tasks/{task_id}/complete")
@@ -384,7 +586,9 @@ async def complete_task(task_id: str, req: Request):
     chat_service = ChatService()
 
     # Verify session exists and belongs to user
-    session = chat_service.get_session_by_id(task_id)
+    session = chat_service.get_session_by_id(
+        task_id, projection=Projections.SESSION_STATE
+    )
     if not session or session["user_id"] != user["id"]:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -397,8 +601,48 @@ async def complete_task(task_id: str, req: Request):
     return {"message": "Task completed successfully", "task_id": task_id}
 
 
+@app.post("/tasks/bulk")
+def bulk_task_action(req: BulkTaskRequest):
+    """Complete, archive or delete many of a user's tasks in one request"""
+    if not is_mongodb_available():
+        raise HTTPException(
+            status_code=503, detail="Chat service is currently unavailable"
+        )
+
+    task_ids = list(dict.fromkeys(req.task_ids))
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="task_ids required")
+    if len(task_ids) > CHAT_BULK_MAX_SESSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {CHAT_BULK_MAX_SESSIONS} task_ids per request",
+        )
+
+    user = user_service.get_user_by_email(req.email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    chat_service = ChatService()
+    # Ownership is part of each write's filter; other users' ids are not_found
+    if req.action == "complete":
+        result = chat_service.complete_sessions(task_ids, user["id"])
+    elif req.action == "archive":
+        result = chat_service.archive_sessions(task_ids, user["id"])
+    else:
+        result = chat_service.delete_sessions(task_ids, user["id"])
+        for task_id in result["sessions"]:
+            response_cache.invalidate(f"messages:{task_id}")
+
+    return {
+        "action": req.action,
+        "task_ids": result["sessions"],
+        "not_found": result["not_found"],
+        "messages": result.get("messages", 0),
+    }
+
+
 @app.get("/tasks/{task_id}/messages")
-def get_task_messages(task_id: str):
+def get_task_messages(task_id: str, request: Request):
     """Get messages from MongoDB chat session"""
     if not is_mongodb_available():
         raise HTTPException(
@@ -408,29 +652,125 @@ def get_task_messages(task_id: str):
     chat_service = ChatService()
 
     # Verify session exists
-    session = chat_service.get_session_by_id(task_id)
+    session = chat_service.get_session_by_id(
+        task_id, projection=Projections.SESSION_STATE
+    )
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Get messages for this session
-    messages = chat_service.get_session_messages(task_id)
+    cache_key = f"messages:{task_id}"
+    version = chat_service.get_session_version(session)
+    cached = response_cache.lookup(request, cache_key, version)
+    if cached is not None:
+        return cached
 
-    # Convert to expected format
-    formatted_messages = [
-        {"role": msg["role"], "message": msg["message"]} for msg in messages
-    ]
+    # Get messages for this session (one find_one while the tail holds them all)
+    formatted_messages = chat_service.get_session_page(task_id)
 
-    return {"messages": formatted_messages}
+    return response_cache.store(cache_key, {"messages": formatted_messages}, version)
+
+
+@app.get("/turns/{job_id}")
+async def get_turn_status(
+    job_id: str,
+    wait: float = Query(
+        0, ge=0, le=30, description="Seconds to wait for the turn to finish"
+    ),
+):
+    """Poll (or briefly wait on) a background turn"""
+    job = await turn_worker.wait(job_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Turn not found")
+
+    return {
+        "job_id": job["_id"],
+        "session_id": job["session_id"],
+        "status": job["status"],
+        "reply": job.get("reply"),
+        "error": job.get("error"),
+    }
+
+
+@app.websocket("/tasks/{task_id}/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    task_id: str,
+    email: str = Query(..., description="Authenticated once per connection"),
+):
+    """Chat over one WebSocket per session instead of a POST per message"""
+    await chat_sockets.serve(websocket, task_id, email)
+
+
+@app.get("/tasks/{task_id}/wait")
+async def wait_for_task_change(
+    task_id: str,
+    state: Optional[int] = Query(None, description="Last state the client saw"),
+    message_count: Optional[int] = Query(
+        None, description="Last message_count the client saw"
+    ),
+    timeout: float = Query(
+        25, ge=0, le=SESSION_WAIT_MAX_SECONDS, description="Seconds to wait"
+    ),
+):
+    """Long-poll until the session's state or message_count changes"""
+    if not is_mongodb_available():
+        raise HTTPException(
+            status_code=503, detail="Chat service is currently unavailable"
+        )
+
+    chat_service = ChatService()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    expected = None
+
+    while True:
+        # Subscribe before reading so a change made in between still wakes us
+        async with session_events.listen(task_id) as change:
+            session = await asyncio.to_thread(
+                chat_service.get_session_by_id, task_id, Projections.SESSION_STATE
+            )
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
+
+            current = (
+                session.get("state", TaskState.REQUIRE_PERMISSION),
+                session.get("message_count", 0),
+            )
+            if expected is None:
+                # Parameters the client left out match whatever is current
+                expected = (
+                    current[0] if state is None else state,
+                    current[1] if message_count is None else message_count,
+                )
+            remaining = deadline - loop.time()
+            if current != expected or remaining <= 0:
+                break
+            await session_events.wait(
+                change, min(remaining, SESSION_WAIT_RECHECK_SECONDS)
+            )
+
+    return {
+        "changed": current != expected,
+        "task_id": task_id,
+        "state": current[0],
+        "status": map_state_to_status(current[0]),
+        "message_count": current[1],
+    }
 
 
 @app.get("/available-tools")
-def get_available_tools():
+def get_available_tools(request: Request):
     """Get list of all available tools"""
-    from tools import get_available_tool_names
+    from tools import get_available_tool_names, get_tools_version
 
     try:
+        version = get_tools_version()
+        cached = response_cache.lookup(request, "available-tools", version)
+        if cached is not None:
+            return cached
+
         tool_names = get_available_tool_names()
-        return {"tools": tool_names}
+        return response_cache.store("available-tools", {"tools": tool_names}, version)
     except Exception as e:
         print(f"Error getting available tools: {e}")
         return {"tools": []}
@@ -447,4 +787,12 @@ def health_check():
             "auth": "available",
             "chat": "available" if is_mongodb_available() else "limited",
         },
+        "turn_worker": turn_worker.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_usage": usage_stats.summary(),
+        "tool_memo": tool_memo.stats(),
+        "response_cache": response_cache.stats(),
+        "session_events": session_events.stats(),
+        "chat_sockets": chat_sockets.stats(),
+        "chat_retention": chat_retention.stats(),
     }
@@ -4,7 +4,10 @@ from pymongo.database import Database
 from pymongo.collection import Collection
 from dotenv import load_dotenv
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 import logging
 
 load_dotenv()
@@ -13,10 +16,29 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
 MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "easydo_chat")
 
+# Newest messages kept on each chat_sessions document (recent_messages), so
+# agent history and previews need no chat_messages query
+CHAT_SESSION_TAIL_SIZE = int(os.getenv("CHAT_SESSION_TAIL_SIZE", "50"))
+
+# Bulk session operations: most session ids per request, and messages copied
+# per insert_many when archiving moves them to chat_messages_archive
+CHAT_BULK_MAX_SESSIONS = int(os.getenv("CHAT_BULK_MAX_SESSIONS", "500"))
+CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv("CHAT_ARCHIVE_BATCH_SIZE", "1000"))
+
+# Compacted sessions keep all their messages in one zstd-compressed document
+# in chat_archive_bundles (see ChatService.compact_session)
+CHAT_ARCHIVE_ZSTD_LEVEL = int(os.getenv("CHAT_ARCHIVE_ZSTD_LEVEL", "10"))
+# How long a compaction's claim on a session lasts before another worker may
+# take the session over
+CHAT_COMPACTION_LEASE_SECONDS = float(os.getenv("CHAT_COMPACTION_LEASE_SECONDS", "600"))
+
 # Global MongoDB client and database
 _client: Optional[MongoClient] = None
 _database: Optional[Database] = None
 
+# Leaves result documents as undecoded BSON (see get_chat_collection)
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +49,39 @@ class TaskState:
     PROCESSING = -1  # When AI is working in the background
     REQUIRE_PERMISSION = 0  # When AI finishes and outputs a message
     COMPLETE = 1  # When user clicks 'complete task' button
+    ARCHIVED = 2  # Messages moved to chat_messages_archive or a compressed bundle
+
+
+# Field projections, so each route fetches only the fields it serializes
+class Projections:
+    """Projection documents for chat message and session queries"""
+
+    # role/message pairs for the messages routes and conversation history
+    MESSAGE_TEXT = {"_id": 0, "role": 1, "message": 1}
+    # the same with _id, for callers that skip a message they just stored
+    MESSAGE_HISTORY = {"role": 1, "message": 1}
+    # fields session_to_task reads, for task lists, with the last message
+    SESSION_SUMMARY = {
+        "title": 1,
+        "state": 1,
+        "user_id": 1,
+        "created_at": 1,
+        "recent_messages": {"$slice": -1},
+    }
+    # ownership, state and version checks
+    SESSION_STATE = {"user_id": 1, "state": 1, "message_count": 1, "updated_at": 1}
+    # the same plus the recent message tail, for loading agent history
+    SESSION_WITH_TAIL = {**SESSION_STATE, "recent_messages": 1}
+
+
+# Turn job status constants
+class TurnJobStatus:
+    """Status constants for background agent turn jobs"""
+
+    QUEUED = "queued"  # Accepted, waiting for a worker slot
+    RUNNING = "running"  # Claimed by a worker
+    COMPLETE = "complete"  # Agent replied and the reply was stored
+    FAILED = "failed"  # Agent errored or timed out
 
 
 def get_mongodb_client() -> Optional[MongoClient]:
@@ -61,22 +116,110 @@ def get_mongodb_database() -> Optional[Database]:
     return _database
 
 
-def get_chat_collection() -> Optional[Collection]:
-    """Get the chat messages collection"""
+def get_chat_collection(raw: bool = False) -> Optional[Collection]:
+    """Get the chat messages collection; raw=True returns RawBSONDocuments"""
     db = get_mongodb_database()
     if db is None:
         return None
+    if raw:
+        return db.get_collection("chat_messages", codec_options=RAW_BSON_OPTIONS)
     return db.chat_messages
 
 
-def get_chat_sessions_collection() -> Optional[Collection]:
-    """Get the chat sessions collection"""
+def get_chat_archive_collection(raw: bool = False) -> Optional[Collection]:
+    """Get the archived (cold) chat messages collection"""
     db = get_mongodb_database()
     if db is None:
         return None
+    if raw:
+        return db.get_collection(
+            "chat_messages_archive", codec_options=RAW_BSON_OPTIONS
+        )
+    return db.chat_messages_archive
+
+
+def get_chat_bundles_collection() -> Optional[Collection]:
+    """Get the compressed per-session message bundles collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.chat_archive_bundles
+
+
+def get_chat_sessions_collection(raw: bool = False) -> Optional[Collection]:
+    """Get the chat sessions collection; raw=True returns RawBSONDocuments"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    if raw:
+        return db.get_collection("chat_sessions", codec_options=RAW_BSON_OPTIONS)
     return db.chat_sessions
 
 
+def get_background_leases_collection() -> Optional[Collection]:
+    """Get the collection of leases that keep a background job to one process"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.background_leases
+
+
+def get_turn_jobs_collection() -> Optional[Collection]:
+    """Get the background turn jobs collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.turn_jobs
+
+
+def get_checkpoints_collection() -> Optional[Collection]:
+    """Get the LangGraph checkpoints collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.graph_checkpoints
+
+
+def get_checkpoint_writes_collection() -> Optional[Collection]:
+    """Get the LangGraph pending checkpoint writes collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.graph_checkpoint_writes
+
+
+def get_calendar_events_collection() -> Optional[Collection]:
+    """Get the synced calendar events cache collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.calendar_events
+
+
+def get_calendar_sync_state_collection() -> Optional[Collection]:
+    """Get the per user/calendar sync token collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.calendar_sync_state
+
+
+def get_gmail_messages_collection() -> Optional[Collection]:
+    """Get the Gmail message metadata index collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.gmail_messages
+
+
+def get_gmail_sync_state_collection() -> Optional[Collection]:
+    """Get the per user Gmail historyId collection"""
+    db = get_mongodb_database()
+    if db is None:
+        return None
+    return db.gmail_sync_state
+
+
 def is_mongodb_available() -> bool:
     """Check if MongoDB is available"""
     try:
@@ -127,6 +270,35 @@ class ChatSession:
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "message_count": 0,
+            "recent_messages": [],
+        }
+
+
+# Turn job document structure
+class TurnJob:
+    """Background agent turn job document structure for MongoDB"""
+
+    @staticmethod
+    def create_job(
+        session_id: str,
+        user_id: str,
+        message: str,
+        message_id: Optional[str] = None,
+        selected_tools: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Create a turn job document"""
+        return {
+            "_id": ObjectId(),
+            "session_id": session_id,
+            "user_id": user_id,
+            "message": message,
+            "message_id": message_id,
+            "selected_tools": selected_tools or [],
+            "status": TurnJobStatus.QUEUED,
+            "reply": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
         }
 
 
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from aws_services.dynamodb_config import token_storage
+from services.google_oauth import oauth_service
+
+"""
+OAuth authorization status - answered from TokenStorage metadata (token
+presence, expiry, scopes, refresh token) without invoking a Lambda or Google
+"""
+
+logger = logging.getLogger(__name__)
+
+# Optional validator: periodically refreshes recently checked grants so
+# revoked ones are reported as such
+AUTH_VALIDATOR_ENABLED = os.getenv("AUTH_VALIDATOR_ENABLED", "false").lower() == "true"
+AUTH_VALIDATOR_INTERVAL_SECONDS = float(
+    os.getenv("AUTH_VALIDATOR_INTERVAL_SECONDS", "900")
+)
+# Grants not checked for this long are no longer validated
+AUTH_VALIDATOR_WATCH_SECONDS = float(os.getenv("AUTH_VALIDATOR_WATCH_SECONDS", "86400"))
+
+
+class AuthStatusService:
+    """Authorization status for Gmail and Calendar, shared by all status routes"""
+
+    def __init__(self, storage=None, oauth=None):
+        self.storage = storage or token_storage
+        self.oauth = oauth or oauth_service
+        # (user_id, service) -> (grant accepted by Google, validated at)
+        self._validated: Dict[Tuple[str, str], Tuple[bool, datetime]] = {}
+        # (user_id, service) -> last status check, for the validator
+        self._watched: Dict[Tuple[str, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get_status(
+        self, user_id: str, service: str, include_authorization_url: bool = False
+    ) -> Dict[str, Any]:
+        """Whether the user's stored grant for a service is usable"""
+        status: Dict[str, Any] = {
+            "service": service,
+            "user_id": user_id,
+            "authorized": False,
+        }
+        metadata = self.storage.get_token_metadata(user_id, service)
+
+        if metadata is None:
+            status["reason"] = "not_connected"
+        else:
+            expires_at = metadata.get("expires_at")
+            expired = (
+                not expires_at
+                or datetime.fromisoformat(expires_at) <= datetime.utcnow()
+            )
+            granted = set(metadata.get("scope", "").split())
+            required = set(self.oauth.service_scopes[service])
+            validated = self._validated.get((user_id, service))
+            status.update(
+                expires_at=expires_at,
+                scope=metadata.get("scope") or None,
+                has_refresh_token=metadata["has_refresh_token"],
+                access_token_expired=expired,
+            )
+
+            # The Lambdas refresh expired access tokens themselves, so only a
+            # missing refresh token makes expiry fatal
+            if not required <= granted:
+                status["reason"] = "insufficient_scope"
+            elif expired and not metadata["has_refresh_token"]:
+                status["reason"] = "expired"
+            elif validated and not validated[0]:
+                status["reason"] = "revoked"
+            else:
+                status["authorized"] = True
+            if validated:
+                status["validated_at"] = validated[1].isoformat()
+            if AUTH_VALIDATOR_ENABLED and metadata["has_refresh_token"]:
+                self._watched[(user_id, service)] = time.monotonic()
+
+        if not status["authorized"] and include_authorization_url:
+            auth_data = self.oauth.get_authorization_url(service, user_id)
+            status["authorization_url"] = auth_data["authorization_url"]
+        return status
+
+    def forget(self, user_id: str, service: str):
+        """Drop validator results after the grant was replaced or revoked"""
+        self._validated.pop((user_id, service), None)
+        self._watched.pop((user_id, service), None)
+
+    def validate(self, user_id: str, service: str) -> Optional[bool]:
+        """Refresh the grant once; None when Google could not be reached"""
+        refresh_token = self.storage.get_refresh_token(user_id, service)
+        if not refresh_token:
+            return None
+        try:
+            tokens = self.oauth.check_refresh_token(refresh_token)
+        except ValueError as e:
+            logger.info(f"{service} grant for user {user_id} is no longer valid: {e}")
+            valid = False
+        except Exception as e:
+            logger.warning(f"Could not validate {service} grant for {user_id}: {e}")
+            return None
+        else:
+            # Keep the fresh access token so the next tool call need not refresh
+            self.storage.store_tokens(
+                user_id, service, {**tokens, "refresh_token": refresh_token}
+            )
+            valid = True
+        self._validated[(user_id, service)] = (valid, datetime.utcnow())
+        return valid
+
+    async def _validator_loop(self):
+        while True:
+            await asyncio.sleep(AUTH_VALIDATOR_INTERVAL_SECONDS)
+            cutoff = time.monotonic() - AUTH_VALIDATOR_WATCH_SECONDS
+            for key, seen in list(self._watched.items()):
+                if seen < cutoff:
+                    self._watched.pop(key, None)
+                    self._validated.pop(key, None)
+                    continue
+                try:
+                    await asyncio.to_thread(self.validate, *key)
+                except Exception as e:
+                    logger.warning(f"Auth validator error for {key}: {e}")
+
+    async def start(self):
+        """Start the background validator if AUTH_VALIDATOR_ENABLED"""
+        if AUTH_VALIDATOR_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._validator_loop())
+            logger.info(
+                f"Auth validator started (every {AUTH_VALIDATOR_INTERVAL_SECONDS}s)"
+            )
+
+    async def stop(self):
+        """Stop the background validator"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Global auth status instance
+auth_status = AuthStatusService()
@@ -1,9 +1,11 @@
+import asyncio
 import boto3
 import json
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 from dotenv import load_dotenv
 from services.google_oauth import oauth_service
+from services.mcp_payload import build_tool_call, decode_tool_result
 
 """
 Calendar Lambda MCP Service - integrates Calendar MCP Lambda with OAuth flow
@@ -14,6 +16,9 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Tools that change the user's calendars
+WRITE_TOOLS = {"create_event", "update_event", "delete_event"}
+
 
 class CalendarLambdaService:
     """Service to interact with Calendar MCP Lambda function"""
@@ -22,9 +27,15 @@ class CalendarLambdaService:
         self.lambda_client = boto3.client("lambda", region_name="us-east-1")
         # ✅ Use hardcoded function name like Gmail (no dynamic discovery)
         self.function_name = "LambdaMCPStack-CalendarMCPLambdaC5011EA6-jnbDF1nmxPbQ"
+        # Called with the user_id after a write tool runs
+        self.write_listeners: List[Callable[[str], None]] = []
 
     async def call_calendar_tool(
-        self, tool_name: str, user_id: str, **kwargs
+        self,
+        tool_name: str,
+        user_id: str,
+        fields: Optional[List[str]] = None,
+        **kwargs,
     ) -> Dict[str, Any]:
         """
         Call Calendar MCP tool via Lambda
@@ -32,61 +43,25 @@ class CalendarLambdaService:
         - Tool result if authenticated
         - Auth URL if not authenticated
         - Error if something went wrong
+        `fields` keeps only those keys on each listed calendar or event
         """
         try:
             # Prepare Lambda payload
-            payload = {
-                "jsonrpc": "2.0",
-                "id": "calendar_tool_call",
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": {"user_id": user_id, **kwargs},
-                },
-            }
+            payload = build_tool_call(
+                "calendar_tool_call", tool_name, {"user_id": user_id, **kwargs}, fields
+            )
 
-            # Call Lambda function
-            response = self.lambda_client.invoke(
-                FunctionName=self.function_name, Payload=json.dumps(payload)
+            # Call Lambda function (boto3 blocks, so in a worker thread)
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
             )
 
             # Parse response
             result = json.loads(response["Payload"].read())
-
-            # Check if user needs authentication
-            if "error" in result:
-                error_message = result["error"].get("message", "")
-                if "not authenticated" in error_message.lower():
-                    # Generate OAuth URL for Calendar
-                    auth_data = oauth_service.get_authorization_url(
-                        "google_calendar", user_id
-                    )
-                    return {
-                        "status": "authentication_required",
-                        "message": "Google Calendar access requires authentication.Please visit the authorization URL.",
-                        "authorization_url": auth_data["authorization_url"],
-                        "state": auth_data["state"],
-                    }
-                else:
-                    return {"status": "error", "message": error_message}
-
-            # Tool executed successfully
-            if "result" in result:
-                content = result["result"].get("content", [])
-                if content and isinstance(content, list) and len(content) > 0:
-                    text_content = content[0].get("text", "")
-                    try:
-                        parsed_content = json.loads(text_content)
-                        return {"status": "success", "data": parsed_content}
-                    except json.JSONDecodeError:
-                        return {"status": "success", "data": text_content}
-
-                return {"status": "success", "data": result["result"]}
-
-            return {
-                "status": "error",
-                "message": "Unexpected response format from Lambda",
-            }
+            self._notify_writes([tool_name], user_id)
+            return self._tool_response(result, user_id)
 
         except Exception as e:
             logger.error(f"Error calling Calendar Lambda: {e}")
@@ -95,9 +70,172 @@ class CalendarLambdaService:
                 "message": f"Failed to call Calendar service: {str(e)}",
             }
 
-    async def list_calendars(self, user_id: str) -> Dict[str, Any]:
-        """List all user's calendars"""
-        return await self.call_calendar_tool("list_calendars", user_id=user_id)
+    def _notify_writes(self, tool_names: List[str], user_id: str):
+        if WRITE_TOOLS.intersection(tool_names):
+            for listener in self.write_listeners:
+                listener(user_id)
+
+    def _authentication_required(self, user_id: str) -> Dict[str, Any]:
+        """Auth-required result with a fresh OAuth URL"""
+        auth_data = oauth_service.get_authorization_url("google_calendar", user_id)
+        return {
+            "status": "authentication_required",
+            "message": "Google Calendar access requires authentication.Please visit the authorization URL.",
+            "authorization_url": auth_data["authorization_url"],
+            "state": auth_data["state"],
+        }
+
+    def _tool_response(
+        self,
+        result: Dict[str, Any],
+        user_id: str,
+        auth_required: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Map one JSON-RPC response onto the service's result shape"""
+        # Check if user needs authentication
+        if "error" in result:
+            error_message = result["error"].get("message", "")
+            if "not authenticated" in error_message.lower():
+                return auth_required or self._authentication_required(user_id)
+            return {"status": "error", "message": error_message}
+
+        # Tool executed successfully
+        if "result" in result:
+            return {"status": "success", "data": decode_tool_result(result["result"])}
+
+        return {
+            "status": "error",
+            "message": "Unexpected response format from Lambda",
+        }
+
+    async def call_tools_batch(
+        self, user_id: str, calls: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several Calendar tools in one Lambda invocation (JSON-RPC batch)
+        Each call is {"name", "arguments", optional "fields"}; results come back
+        in the same order, shaped like call_calendar_tool's
+        """
+        if not calls:
+            return []
+        try:
+            payload = [
+                build_tool_call(
+                    f"calendar_tool_call_{index}",
+                    call["name"],
+                    {"user_id": user_id, **call.get("arguments", {})},
+                    call.get("fields"),
+                )
+                for index, call in enumerate(calls)
+            ]
+
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
+            )
+            results = json.loads(response["Payload"].read())
+
+            if not isinstance(results, list):
+                # Deployment without batch support: fall back to one call each
+                logger.warning(
+                    "Calendar Lambda did not accept a batch, calling tools one by one"
+                )
+                return [
+                    await self.call_calendar_tool(
+                        call["name"],
+                        user_id,
+                        fields=call.get("fields"),
+                        **call.get("arguments", {}),
+                    )
+                    for call in calls
+                ]
+
+            self._notify_writes([call["name"] for call in calls], user_id)
+            by_id = {result.get("id"): result for result in results}
+            responses = []
+            auth_required = None
+            for request in payload:
+                tool_response = self._tool_response(
+                    by_id.get(request["id"], {}), user_id, auth_required
+                )
+                # One OAuth URL for the whole batch
+                if tool_response["status"] == "authentication_required":
+                    auth_required = tool_response
+                responses.append(tool_response)
+            return responses
+
+        except Exception as e:
+            logger.error(f"Error calling Calendar Lambda batch: {e}")
+            return [
+                {
+                    "status": "error",
+                    "message": f"Failed to call Calendar service: {str(e)}",
+                }
+                for _ in calls
+            ]
+
+    async def list_calendars(
+        self, user_id: str, fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """List all user's calendars, optionally only the given fields"""
+        return await self.call_calendar_tool(
+            "list_calendars", user_id=user_id, fields=fields
+        )
+
+    async def list_events(
+        self,
+        user_id: str,
+        calendar_id: str = "primary",
+        max_results: int = 10,
+        time_min: str = None,
+        time_max: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """List events from one calendar"""
+        return await self.call_calendar_tool(
+            "list_events",
+            user_id=user_id,
+            fields=fields,
+            calendar_id=calendar_id,
+            max_results=max_results,
+            time_min=time_min,
+            time_max=time_max,
+        )
+
+    async def get_agenda(
+        self,
+        user_id: str,
+        time_min: str = None,
+        time_max: str = None,
+        calendar_ids: Optional[List[str]] = None,
+        max_results: int = 50,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Events from all of the user's calendars in one call, sorted by start"""
+        return await self.call_calendar_tool(
+            "get_agenda",
+            user_id=user_id,
+            fields=fields,
+            time_min=time_min,
+            time_max=time_max,
+            calendar_ids=calendar_ids,
+            max_results=max_results,
+        )
+
+    async def sync_events(
+        self,
+        user_id: str,
+        sync_tokens: Optional[Dict[str, str]] = None,
+        calendar_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Event changes per calendar since the given nextSyncTokens"""
+        return await self.call_calendar_tool(
+            "sync_events",
+            user_id=user_id,
+            sync_tokens=sync_tokens or {},
+            calendar_ids=calendar_ids,
+        )
 
     async def create_event(
         self,
@@ -133,8 +271,10 @@ class CalendarLambdaService:
                 "params": {},
             }
 
-            response = self.lambda_client.invoke(
-                FunctionName=self.function_name, Payload=json.dumps(payload)
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
             )
 
             result = json.loads(response["Payload"].read())
@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DeleteOne, UpdateOne
+
+from mongodb_config import (
+    get_calendar_events_collection,
+    get_calendar_sync_state_collection,
+)
+from services.calendar_lambda_service import calendar_lambda_service
+
+"""
+Incremental Google Calendar sync - a nextSyncToken is kept per user and
+calendar, only the changes are pulled through the Calendar Lambda, and the
+events are cached in MongoDB so agenda reads are answered locally. A write
+bumps write_version on the user's sync state documents, so the next read in
+any worker process syncs first
+"""
+
+logger = logging.getLogger(__name__)
+
+# Sync settings
+CALENDAR_SYNC_ENABLED = os.getenv("CALENDAR_SYNC_ENABLED", "true").lower() == "true"
+CALENDAR_SYNC_MAX_AGE_SECONDS = float(os.getenv("CALENDAR_SYNC_MAX_AGE_SECONDS", "300"))
+AGENDA_DEFAULT_DAYS = int(os.getenv("AGENDA_DEFAULT_DAYS", "7"))
+
+
+def _utc(value: str) -> datetime:
+    """ISO string -> naive UTC datetime (how pymongo hands datetimes back)"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return parsed
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _iso(value: datetime) -> str:
+    return value.replace(tzinfo=timezone.utc).isoformat()
+
+
+class CalendarSyncService:
+    """MongoDB copy of each user's calendar events, kept current with syncTokens"""
+
+    def __init__(self, events=None, sync_state=None, lambda_service=None):
+        self._events = events
+        self._sync_state = sync_state
+        self._indexes_ready = False
+        self.lambda_service = lambda_service or calendar_lambda_service
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.lambda_service.write_listeners.append(self.mark_dirty)
+
+    @property
+    def events(self):
+        """Get cached events collection (lazy initialization)"""
+        if self._events is None:
+            self._events = get_calendar_events_collection()
+        self._ensure_indexes()
+        return self._events
+
+    @property
+    def sync_state(self):
+        """Get sync state collection (lazy initialization)"""
+        if self._sync_state is None:
+            self._sync_state = get_calendar_sync_state_collection()
+        self._ensure_indexes()
+        return self._sync_state
+
+    def _ensure_indexes(self):
+        if self._indexes_ready or self._events is None or self._sync_state is None:
+            return
+        try:
+            self._events.create_index(
+                [
+                    ("user_id", ASCENDING),
+                    ("calendar_id", ASCENDING),
+                    ("start", ASCENDING),
+                ]
+            )
+            self._events.create_index(
+                [
+                    ("user_id", ASCENDING),
+                    ("calendar_id", ASCENDING),
+                    ("event_id", ASCENDING),
+                ],
+                unique=True,
+            )
+            self._sync_state.create_index(
+                [("user_id", ASCENDING), ("calendar_id", ASCENDING)], unique=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not create calendar cache indexes: {e}")
+        self._indexes_ready = True
+
+    def get_time_zone(self, user_id: str) -> Optional[str]:
+        """The user's primary calendar time zone as of the last sync, if any"""
+        if self.sync_state is None:
+            return None
+        states = self.sync_state.find(
+            {"user_id": user_id, "time_zone": {"$ne": None}},
+            {"calendar_id": 1, "time_zone": 1},
+        )
+        # The primary calendar's id is the account's address; secondary and
+        # subscribed calendars end in calendar.google.com
+        ranked = sorted(
+            states,
+            key=lambda s: ("calendar.google.com" in s["calendar_id"], s["calendar_id"]),
+        )
+        return ranked[0]["time_zone"] if ranked else None
+
+    def mark_dirty(self, user_id: str):
+        """Sync before the next read in any process (called after calendar writes)"""
+        try:
+            if self.sync_state is not None:
+                self.sync_state.update_many(
+                    {"user_id": user_id}, {"$inc": {"write_version": 1}}
+                )
+        except Exception as e:
+            logger.warning(f"Could not mark calendar cache dirty for {user_id}: {e}")
+
+    @staticmethod
+    def _is_dirty(states: List[Dict[str, Any]]) -> bool:
+        return any(
+            state.get("write_version", 0) > state.get("synced_version", 0)
+            for state in states
+        )
+
+    async def sync(self, user_id: str) -> Dict[str, Any]:
+        """Pull changes since the stored sync tokens and apply them to the cache"""
+        states = {
+            state["calendar_id"]: state
+            for state in self.sync_state.find({"user_id": user_id})
+        }
+        # Versions read before the call, so a write during the sync marks it again
+        versions = {
+            calendar_id: state.get("write_version", 0)
+            for calendar_id, state in states.items()
+        }
+        result = await self.lambda_service.sync_events(
+            user_id,
+            {
+                calendar_id: state["sync_token"]
+                for calendar_id, state in states.items()
+                if state.get("sync_token")
+            },
+        )
+        if result["status"] != "success":
+            return result
+
+        data = result["data"]
+        synced_at = datetime.utcnow()
+        changed = 0
+        for calendar_id, change in data.get("changes", {}).items():
+            if "error" in change:
+                logger.warning(f"Calendar {calendar_id} not synced: {change['error']}")
+                continue
+            changed += self._apply(user_id, calendar_id, change, synced_at)
+        if versions:
+            self.sync_state.bulk_write(
+                [
+                    UpdateOne(
+                        {"user_id": user_id, "calendar_id": calendar_id},
+                        {"$max": {"synced_version": version}},
+                    )
+                    for calendar_id, version in versions.items()
+                ],
+                ordered=False,
+            )
+
+        # Calendars that were removed or hidden since the last sync
+        gone = set(states) - set(data.get("calendar_ids", []))
+        if gone:
+            query = {"user_id": user_id, "calendar_id": {"$in": list(gone)}}
+            self.events.delete_many(query)
+            self.sync_state.delete_many(query)
+
+        logger.info(f"📅 Calendar sync for {user_id}: {changed} changes")
+        return {"status": "success", "data": {"changes": changed}}
+
+    def _apply(self, user_id, calendar_id, change, synced_at) -> int:
+        key = {"user_id": user_id, "calendar_id": calendar_id}
+        if change.get("full_sync"):
+            self.events.delete_many(key)
+
+        operations = []
+        for event in change.get("events", []):
+            operations.append(
+                UpdateOne(
+                    {**key, "event_id": event["id"]},
+                    {
+                        "$set": {
+                            "start": _utc(event.pop("start_utc")),
+                            "end": _utc(event.pop("end_utc")),
+                            "event": event,
+                        }
+                    },
+                    upsert=True,
+                )
+            )
+        for event_id in change.get("deleted", []):
+            operations.append(DeleteOne({**key, "event_id": event_id}))
+        if operations:
+            self.events.bulk_write(operations, ordered=False)
+
+        state = {
+            "sync_token": change.get("next_sync_token"),
+            "time_zone": change.get("time_zone"),
+            "synced_at": synced_at,
+        }
+        if change.get("full_sync"):
+            # Range the full sync downloaded; reads outside it go to Google
+            state["window_start"] = _utc(change["window_start"])
+            state["window_end"] = _utc(change["window_end"])
+        self.sync_state.update_one(key, {"$set": state}, upsert=True)
+        return len(operations)
+
+    def _refresh_in_background(self, user_id: str):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+
+        def run():
+            try:
+                asyncio.run(self.sync(user_id))
+            except Exception as e:
+                logger.warning(f"Background calendar sync failed for {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(user_id)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    async def get_agenda(
+        self,
+        user_id: str,
+        time_min: Optional[str] = None,
+        time_max: Optional[str] = None,
+        calendar_ids: Optional[List[str]] = None,
+        max_results: int = 50,
+    ) -> Dict[str, Any]:
+        """Agenda from the local cache, falling back to a live Lambda call"""
+
+        async def live():
+            return await self.lambda_service.get_agenda(
+                user_id=user_id,
+                time_min=time_min,
+                time_max=time_max,
+                calendar_ids=calendar_ids,
+                max_results=max_results,
+            )
+
+        if not CALENDAR_SYNC_ENABLED or self.sync_state is None:
+            return await live()
+
+        try:
+            start = _utc(time_min) if time_min else datetime.utcnow()
+            end = (
+                _utc(time_max)
+                if time_max
+                else start + timedelta(days=AGENDA_DEFAULT_DAYS)
+            )
+        except ValueError as e:
+            return {"status": "error", "message": f"Invalid time window: {e}"}
+
+        try:
+            states = list(self.sync_state.find({"user_id": user_id}))
+            if not states or self._is_dirty(states):
+                result = await self.sync(user_id)
+                if result["status"] != "success":
+                    return result
+                states = list(self.sync_state.find({"user_id": user_id}))
+            elif any(
+                (datetime.utcnow() - state["synced_at"]).total_seconds()
+                > CALENDAR_SYNC_MAX_AGE_SECONDS
+                for state in states
+            ):
+                # Serve what we have and catch up off the request path
+                self._refresh_in_background(user_id)
+
+            if calendar_ids:
+                states = [s for s in states if s["calendar_id"] in calendar_ids]
+            if not states or any(
+                not state.get("window_start")
+                or start < state["window_start"]
+                or end > state["window_end"]
+                for state in states
+            ):
+                return await live()
+
+            synced_ids = [state["calendar_id"] for state in states]
+            cursor = (
+                self.events.find(
+                    {
+                        "user_id": user_id,
+                        "calendar_id": {"$in": synced_ids},
+                        "start": {"$lt": end},
+                        "end": {"$gt": start},
+                    },
+                    {"event": 1, "_id": 0},
+                )
+                .sort("start", ASCENDING)
+                .limit(max_results)
+            )
+            events = [doc["event"] for doc in cursor]
+        except Exception as e:
+            logger.error(f"Calendar cache read failed, using live agenda: {e}")
+            return await live()
+
+        return {
+            "status": "success",
+            "data": {
+                "success": True,
+                "events": events,
+                "total": len(events),
+                "calendar_ids": synced_ids,
+                "time_min": _iso(start),
+                "time_max": _iso(end),
+                "source": "cache",
+                "synced_at": _iso(min(state["synced_at"] for state in states)),
+            },
+        }
+
+
+# Global calendar sync instance
+calendar_sync = CalendarSyncService()
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from chat_service import ChatService
+from mongodb_config import get_background_leases_collection, is_mongodb_available
+
+"""
+Chat history retention - compacts sessions that were complete or archived
+before CHAT_RETENTION_DAYS into one zstd-compressed chat_archive_bundles
+document each (ChatService.compact_session), a small batch at a time. Every
+worker process starts the job, but a lease in background_leases lets only one
+of them run it
+"""
+
+logger = logging.getLogger(__name__)
+
+# Off by default: compaction moves messages out of chat_messages
+CHAT_RETENTION_ENABLED = os.getenv("CHAT_RETENTION_ENABLED", "false").lower() == "true"
+# Sessions not updated for this long are compacted
+CHAT_RETENTION_DAYS = float(os.getenv("CHAT_RETENTION_DAYS", "90"))
+CHAT_RETENTION_INTERVAL_SECONDS = float(
+    os.getenv("CHAT_RETENTION_INTERVAL_SECONDS", "3600")
+)
+# Throttling: sessions per batch, pause between batches, sessions per run
+CHAT_RETENTION_BATCH_SIZE = int(os.getenv("CHAT_RETENTION_BATCH_SIZE", "20"))
+CHAT_RETENTION_PAUSE_SECONDS = float(os.getenv("CHAT_RETENTION_PAUSE_SECONDS", "1"))
+CHAT_RETENTION_MAX_SESSIONS = int(os.getenv("CHAT_RETENTION_MAX_SESSIONS", "1000"))
+
+# background_leases document held by the process that runs retention
+CHAT_RETENTION_LEASE_ID = "chat_retention"
+
+
+class ChatRetentionService:
+    """Background compaction of old chat sessions into compressed bundles"""
+
+    def __init__(self, chat_service=None, leases=None):
+        self.chat_service = chat_service or ChatService()
+        self._leases = leases
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._indexes_ready = False
+        self._totals = {
+            "runs": 0,
+            "sessions": 0,
+            "skipped": 0,
+            "messages": 0,
+            "raw_bytes": 0,
+            "compressed_bytes": 0,
+        }
+        self._last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def leases(self):
+        """Get background leases collection (lazy initialization)"""
+        if self._leases is None:
+            self._leases = get_background_leases_collection()
+        return self._leases
+
+    def _acquire_lease(self) -> bool:
+        """Take or renew the retention lease for one interval; False if held elsewhere"""
+        if self.leases is None:
+            return True  # no shared store, so no other process to defer to
+        now = datetime.utcnow()
+        try:
+            self.leases.update_one(
+                {
+                    "_id": CHAT_RETENTION_LEASE_ID,
+                    "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now}}],
+                },
+                {
+                    "$set": {
+                        "holder": self.holder,
+                        "expires_at": now
+                        + timedelta(seconds=CHAT_RETENTION_INTERVAL_SECONDS),
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False  # the lease exists and another process holds it
+        return True
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            self.chat_service.sessions_collection.create_index(
+                [("state", ASCENDING), ("updated_at", ASCENDING)]
+            )
+        except Exception as e:
+            logger.warning(f"Could not create chat retention index: {e}")
+        self._indexes_ready = True
+
+    async def run_once(
+        self, max_sessions: int = CHAT_RETENTION_MAX_SESSIONS
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Compact up to max_sessions eligible sessions, oldest first
+        Returns None if another process holds the retention lease
+        """
+        if not await asyncio.to_thread(self._acquire_lease):
+            logger.debug("Chat retention lease held by another process")
+            return None
+        started = time.monotonic()
+        await asyncio.to_thread(self._ensure_indexes)
+        cutoff = datetime.utcnow() - timedelta(days=CHAT_RETENTION_DAYS)
+        run = {"sessions": 0, "skipped": 0, "messages": 0}
+        sizes = {"raw_bytes": 0, "compressed_bytes": 0}
+        # Sessions left as they were (changed meanwhile, too big, failed)
+        skipped: List[ObjectId] = []
+
+        while run["sessions"] + run["skipped"] < max_sessions:
+            limit = min(
+                CHAT_RETENTION_BATCH_SIZE,
+                max_sessions - run["sessions"] - run["skipped"],
+            )
+            batch = await asyncio.to_thread(
+                self.chat_service.get_retention_candidates, cutoff, limit, skipped
+            )
+            if not batch:
+                break
+            for session_id in batch:
+                try:
+                    result = await asyncio.to_thread(
+                        self.chat_service.compact_session, session_id
+                    )
+                except Exception as e:
+                    logger.warning(f"Chat retention error for {session_id}: {e}")
+                    result = None
+                if result is None:
+                    skipped.append(ObjectId(session_id))
+                    run["skipped"] += 1
+                    continue
+                run["sessions"] += 1
+                run["messages"] += result["messages"]
+                sizes["raw_bytes"] += result["raw_bytes"]
+                sizes["compressed_bytes"] += result["compressed_bytes"]
+            if len(batch) == limit:
+                await asyncio.sleep(CHAT_RETENTION_PAUSE_SECONDS)
+            # A long run keeps the lease; if it lapsed and was taken, stop
+            if not await asyncio.to_thread(self._acquire_lease):
+                break
+
+        for key, value in {**run, **sizes}.items():
+            self._totals[key] += value
+        self._totals["runs"] += 1
+        self._last_run = {
+            **run,
+            **sizes,
+            "finished_at": datetime.utcnow().isoformat(),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        if run["sessions"] or run["skipped"]:
+            logger.info(f"Chat retention run: {self._last_run}")
+        return self._last_run
+
+    async def _retention_loop(self):
+        while True:
+            if is_mongodb_available():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.warning(f"Chat retention run failed: {e}")
+            await asyncio.sleep(CHAT_RETENTION_INTERVAL_SECONDS)
+
+    async def start(self):
+        """Start the background retention job if CHAT_RETENTION_ENABLED"""
+        if CHAT_RETENTION_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._retention_loop())
+            logger.info(
+                f"Chat retention started (sessions idle {CHAT_RETENTION_DAYS} days, "
+                f"every {CHAT_RETENTION_INTERVAL_SECONDS}s)"
+            )
+
+    async def stop(self):
+        """Stop the background retention job"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": CHAT_RETENTION_ENABLED,
+            "holder": self.holder,
+            **self._totals,
+            "last_run": self._last_run,
+        }
+
+
+# Global chat retention instance
+chat_retention = ChatRetentionService()
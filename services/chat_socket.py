@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from agents import EasydoAgent, build_conversation_history
+from chat_service import ChatService
+from mongodb_config import Projections, TaskState, is_mongodb_available
+from services.turn_worker import UserTurnLimitError, turn_worker
+from user_service import user_service
+
+"""
+Chat WebSocket - one connection per chat session that authenticates once, keeps
+the recent history and agent warm for its lifetime, streams agent steps back
+and persists only the new messages of each turn. Turns share the per-user turn
+limit with background turns
+"""
+
+logger = logging.getLogger(__name__)
+
+# Messages of warm history kept per connection (the newest ones)
+CHAT_SOCKET_HISTORY_LIMIT = int(os.getenv("CHAT_SOCKET_HISTORY_LIMIT", "50"))
+# Open chat sockets per worker process; more are refused with 1013
+CHAT_SOCKET_MAX_CONNECTIONS = int(os.getenv("CHAT_SOCKET_MAX_CONNECTIONS", "500"))
+
+
+def _message_text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return " ".join(
+        item.get("text", "")
+        for item in message.content
+        if isinstance(item, dict) and item.get("type") == "text"
+    )
+
+
+def step_events(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """Client events for the messages one graph step added"""
+    events = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            events.append({"type": "tool_result", "tool": message.name})
+        elif isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                events.append(
+                    {
+                        "type": "tool_call",
+                        "agent": message.name,
+                        "tool": tool_call["name"],
+                    }
+                )
+            text = _message_text(message)
+            if text.strip() and not message.tool_calls:
+                events.append(
+                    {"type": "agent_message", "agent": message.name, "content": text}
+                )
+    return events
+
+
+class ChatSocketSession:
+    """State for one socket: the authenticated user, warm history and agents"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        chat_service=None,
+        users=None,
+        agent_factory: Callable[..., Any] = EasydoAgent,
+        turns=None,
+    ):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.chat_service = chat_service or ChatService()
+        self.users = users or user_service
+        self.agent_factory = agent_factory
+        self.turns = turns or turn_worker
+        self.user: Optional[Dict[str, Any]] = None
+        self.history: List[BaseMessage] = []
+        # Once the session has a graph checkpoint the agent reads history from
+        # it and ignores conversation_history, so none is kept here
+        self.checkpointed = False
+        self._agents: Dict[Tuple[str, ...], Any] = {}
+        self.connected = True
+
+    async def authenticate(self, email: str) -> Optional[Dict[str, Any]]:
+        """Check ownership once and load the newest history; returns the session"""
+        user = await asyncio.to_thread(self.users.get_user_by_email, email)
+        if not user:
+            return None
+        session = await asyncio.to_thread(
+            self.chat_service.get_session_by_id,
+            self.session_id,
+            Projections.SESSION_WITH_TAIL,
+        )
+        if not session or session["user_id"] != user["id"]:
+            return None
+
+        # Served from the session's recent message tail when it is long enough
+        messages = await asyncio.to_thread(
+            self.chat_service.get_recent_messages,
+            self.session_id,
+            CHAT_SOCKET_HISTORY_LIMIT,
+            session,
+        )
+        self.user = user
+        self.history = build_conversation_history(messages)
+        return session
+
+    def agent_for(self, selected_tools: Optional[List[str]]):
+        """Agent for this tool selection, built once per connection"""
+        key = tuple(sorted(selected_tools or []))
+        if key not in self._agents:
+            self._agents[key] = self.agent_factory(selected_tools=list(key))
+        return self._agents[key]
+
+    async def send(self, event: Dict[str, Any]):
+        """Send an event; after a disconnect the turn still runs and is stored"""
+        if not self.connected:
+            return
+        try:
+            await self.websocket.send_json(event)
+        except Exception as e:
+            logger.info(f"Chat socket for {self.session_id} went away: {e}")
+            self.connected = False
+
+    async def _stream_step(self, messages: List[BaseMessage]):
+        for event in step_events(messages):
+            await self.send(event)
+
+    async def run_turn(self, text: str, selected_tools: Optional[List[str]] = None):
+        """
+        One user message: persist it, stream the agent, persist the reply.
+        Raises UserTurnLimitError, before anything is stored, if the user
+        already has the maximum number of turns in flight.
+        """
+        async with self.turns.inline_turn(
+            self.session_id, self.user["id"], text
+        ) as job:
+            job["reply"] = await self._run_admitted_turn(text, selected_tools)
+
+    async def _run_admitted_turn(
+        self, text: str, selected_tools: Optional[List[str]]
+    ) -> str:
+        user_id = self.user["id"]
+        agent = self.agent_for(selected_tools)
+        await asyncio.to_thread(
+            self.chat_service.set_session_processing, self.session_id
+        )
+        message_id = await asyncio.to_thread(
+            self.chat_service.add_message, self.session_id, user_id, "user", text
+        )
+        await self.send(
+            {
+                "type": "accepted",
+                "message_id": message_id,
+                "state": TaskState.PROCESSING,
+            }
+        )
+
+        try:
+            reply = await agent.process_message(
+                text,
+                conversation_history=list(self.history),
+                user_id=user_id,
+                session_id=self.session_id,
+                on_step=self._stream_step,
+            )
+        except Exception as e:
+            # Same error reply as a failed background turn, so the session
+            # does not stay in PROCESSING
+            logger.error(f"Chat socket turn failed for {self.session_id}: {e}")
+            reply = (
+                "I'm sorry, I encountered an error while processing your "
+                f"request: {e}"
+            )
+
+        reply_id = await asyncio.to_thread(
+            self.chat_service.add_message, self.session_id, user_id, "assistant", reply
+        )
+        await asyncio.to_thread(
+            self.chat_service.set_session_require_permission, self.session_id
+        )
+        if not self.checkpointed:
+            self.checkpointed = await agent.has_checkpoint(self.session_id)
+        if self.checkpointed:
+            self.history = []
+        else:
+            self.history.extend([HumanMessage(content=text), AIMessage(content=reply)])
+            del self.history[:-CHAT_SOCKET_HISTORY_LIMIT]
+        await self.send(
+            {
+                "type": "reply",
+                "message_id": reply_id,
+                "message": reply,
+                "state": TaskState.REQUIRE_PERMISSION,
+            }
+        )
+        return reply
+
+
+class ChatSocketManager:
+    """Accepts chat sockets for a worker process and runs their message loops"""
+
+    def __init__(self, max_connections: int = CHAT_SOCKET_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self.active = 0
+        self.accepted = 0
+        self.refused = 0
+        self.turns = 0
+        self.rejected_turns = 0
+
+    async def serve(self, websocket: WebSocket, session_id: str, email: str, **kwargs):
+        """Authenticate, then handle messages until the client disconnects"""
+        if not is_mongodb_available():
+            await websocket.close(
+                code=status.WS_1011_INTERNAL_ERROR,
+                reason="Chat service is currently unavailable",
+            )
+            return
+        if self.active >= self.max_connections:
+            self.refused += 1
+            await websocket.close(
+                code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many connections"
+            )
+            return
+
+        self.active += 1
+        try:
+            chat = ChatSocketSession(websocket, session_id, **kwargs)
+            session = await chat.authenticate(email)
+            if session is None:
+                self.refused += 1
+                await websocket.close(
+                    code=status.WS_1008_POLICY_VIOLATION, reason="Session not found"
+                )
+                return
+
+            await websocket.accept()
+            self.accepted += 1
+            await chat.send(
+                {
+                    "type": "ready",
+                    "task_id": session_id,
+                    "state": session.get("state", TaskState.REQUIRE_PERMISSION),
+                    "message_count": session.get("message_count", 0),
+                }
+            )
+            await self._message_loop(chat)
+        finally:
+            self.active -= 1
+
+    async def _message_loop(self, chat: ChatSocketSession):
+        while True:
+            try:
+                data = await chat.websocket.receive_json()
+            except WebSocketDisconnect:
+                return
+            except ValueError:
+                await chat.send({"type": "error", "detail": "Expected a JSON object"})
+                continue
+
+            text = data.get("message") if isinstance(data, dict) else None
+            if not text:
+                await chat.send({"type": "error", "detail": "Message required"})
+                continue
+            try:
+                await chat.run_turn(text, data.get("selected_tools"))
+                self.turns += 1
+            except UserTurnLimitError as e:
+                # Same limit as POST /tasks (429); the client may resend later
+                self.rejected_turns += 1
+                await chat.send({"type": "error", "detail": str(e), "retry_after": 5})
+            except Exception as e:
+                logger.error(
+                    f"Chat socket could not store turn for {chat.session_id}: {e}"
+                )
+                await chat.send(
+                    {"type": "error", "detail": "Failed to process message"}
+                )
+            if not chat.connected:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection counts for health checks"""
+        return {
+            "active": self.active,
+            "max_connections": self.max_connections,
+            "accepted": self.accepted,
+            "refused": self.refused,
+            "turns": self.turns,
+            "rejected_turns": self.rejected_turns,
+        }
+
+
+# Global chat socket manager
+chat_sockets = ChatSocketManager()
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict, Tuple
+
+"""
+Dashboard fan-out - runs the home page's independent reads concurrently, each
+under its own timeout, so one slow branch only leaves its own section empty
+"""
+
+logger = logging.getLogger(__name__)
+
+# Per-branch timeouts for GET /dashboard
+DASHBOARD_TASKS_TIMEOUT_SECONDS = float(
+    os.getenv("DASHBOARD_TASKS_TIMEOUT_SECONDS", "2")
+)
+DASHBOARD_AUTH_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_AUTH_TIMEOUT_SECONDS", "2"))
+# Covers a Calendar Lambda cold start when the event cache has to sync
+DASHBOARD_EVENTS_TIMEOUT_SECONDS = float(
+    os.getenv("DASHBOARD_EVENTS_TIMEOUT_SECONDS", "5")
+)
+DASHBOARD_EVENTS_LIMIT = int(os.getenv("DASHBOARD_EVENTS_LIMIT", "10"))
+
+
+async def _run_branch(name: str, branch: Awaitable, timeout: float) -> Any:
+    try:
+        return await asyncio.wait_for(branch, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Dashboard branch {name} timed out after {timeout}s")
+        raise TimeoutError(f"timed out after {timeout}s")
+
+
+async def gather_branches(
+    branches: Dict[str, Tuple[Awaitable, float]]
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Await {name: (awaitable, timeout)} concurrently
+    Returns ({name: result}, {name: error}); a branch that fails or times out
+    has result None and an error message instead of failing the others
+    """
+    names = list(branches)
+    outcomes = await asyncio.gather(
+        *(_run_branch(name, *branches[name]) for name in names),
+        return_exceptions=True,
+    )
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, TimeoutError):
+                logger.error(f"Dashboard branch {name} failed: {outcome}")
+            results[name] = None
+            errors[name] = str(outcome) or type(outcome).__name__
+        else:
+            results[name] = outcome
+    return results, errors
@@ -1,9 +1,11 @@
+import asyncio
 import boto3
 import json
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 from dotenv import load_dotenv
 from services.google_oauth import oauth_service
+from services.mcp_payload import build_tool_call, decode_tool_result
 
 """
 Gmail Lambda MCP Service - integrates Gmail MCP Lambda with OAuth flow
@@ -16,6 +18,9 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Tools that change the user's mailbox
+WRITE_TOOLS = {"send_gmail_message"}
+
 
 class GmailLambdaService:
     """Service to interact with Gmail MCP Lambda function"""
@@ -23,9 +28,15 @@ class GmailLambdaService:
     def __init__(self):
         self.lambda_client = boto3.client("lambda", region_name="us-east-1")
         self.function_name = "LambdaMCPStack-GmailMCPLambdaD2EF2F90-M8OUb80rPJ9G"
+        # Called with the user_id after a write tool runs
+        self.write_listeners: List[Callable[[str], None]] = []
 
     async def call_gmail_tool(
-        self, tool_name: str, user_id: str, **kwargs
+        self,
+        tool_name: str,
+        user_id: str,
+        fields: Optional[List[str]] = None,
+        **kwargs,
     ) -> Dict[str, Any]:
         """
         Call Gmail MCP tool via Lambda
@@ -33,59 +44,25 @@ class GmailLambdaService:
         - Tool result if authenticated
         - Auth URL if not authenticated
         - Error if something went wrong
+        `fields` keeps only those keys on each listed message
         """
         try:
             # Prepare Lambda payload
-            payload = {
-                "jsonrpc": "2.0",
-                "id": "gmail_tool_call",
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": {"user_id": user_id, **kwargs},
-                },
-            }
+            payload = build_tool_call(
+                "gmail_tool_call", tool_name, {"user_id": user_id, **kwargs}, fields
+            )
 
-            # Call Lambda function
-            response = self.lambda_client.invoke(
-                FunctionName=self.function_name, Payload=json.dumps(payload)
+            # Call Lambda function (boto3 blocks, so in a worker thread)
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
             )
 
             # Parse response
             result = json.loads(response["Payload"].read())
-
-            # Check if user needs authentication
-            if "error" in result:
-                error_message = result["error"].get("message", "")
-                if "not authenticated" in error_message.lower():
-                    # Generate OAuth URL
-                    auth_data = oauth_service.get_authorization_url("gmail", user_id)
-                    return {
-                        "status": "authentication_required",
-                        "message": "Gmail access requires authentication. Please visit the authorization URL.",
-                        "authorization_url": auth_data["authorization_url"],
-                        "state": auth_data["state"],
-                    }
-                else:
-                    return {"status": "error", "message": error_message}
-
-            # Tool executed successfully
-            if "result" in result:
-                content = result["result"].get("content", [])
-                if content and isinstance(content, list) and len(content) > 0:
-                    text_content = content[0].get("text", "")
-                    try:
-                        parsed_content = json.loads(text_content)
-                        return {"status": "success", "data": parsed_content}
-                    except json.JSONDecodeError:
-                        return {"status": "success", "data": text_content}
-
-                return {"status": "success", "data": result["result"]}
-
-            return {
-                "status": "error",
-                "message": "Unexpected response format from Lambda",
-            }
+            self._notify_writes([tool_name], user_id)
+            return self._tool_response(result, user_id)
 
         except Exception as e:
             logger.error(f"Error calling Gmail Lambda: {e}")
@@ -94,12 +71,133 @@ class GmailLambdaService:
                 "message": f"Failed to call Gmail service: {str(e)}",
             }
 
+    def _notify_writes(self, tool_names: List[str], user_id: str):
+        if WRITE_TOOLS.intersection(tool_names):
+            for listener in self.write_listeners:
+                listener(user_id)
+
+    def _authentication_required(self, user_id: str) -> Dict[str, Any]:
+        """Auth-required result with a fresh OAuth URL"""
+        auth_data = oauth_service.get_authorization_url("gmail", user_id)
+        return {
+            "status": "authentication_required",
+            "message": "Gmail access requires authentication. Please visit the authorization URL.",
+            "authorization_url": auth_data["authorization_url"],
+            "state": auth_data["state"],
+        }
+
+    def _tool_response(
+        self,
+        result: Dict[str, Any],
+        user_id: str,
+        auth_required: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Map one JSON-RPC response onto the service's result shape"""
+        # Check if user needs authentication
+        if "error" in result:
+            error_message = result["error"].get("message", "")
+            if "not authenticated" in error_message.lower():
+                return auth_required or self._authentication_required(user_id)
+            return {"status": "error", "message": error_message}
+
+        # Tool executed successfully
+        if "result" in result:
+            return {"status": "success", "data": decode_tool_result(result["result"])}
+
+        return {
+            "status": "error",
+            "message": "Unexpected response format from Lambda",
+        }
+
+    async def call_tools_batch(
+        self, user_id: str, calls: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several Gmail tools in one Lambda invocation (JSON-RPC batch)
+        Each call is {"name", "arguments", optional "fields"}; results come back
+        in the same order, shaped like call_gmail_tool's
+        """
+        if not calls:
+            return []
+        try:
+            payload = [
+                build_tool_call(
+                    f"gmail_tool_call_{index}",
+                    call["name"],
+                    {"user_id": user_id, **call.get("arguments", {})},
+                    call.get("fields"),
+                )
+                for index, call in enumerate(calls)
+            ]
+
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
+            )
+            results = json.loads(response["Payload"].read())
+
+            if not isinstance(results, list):
+                # Deployment without batch support: fall back to one call each
+                logger.warning(
+                    "Gmail Lambda did not accept a batch, calling tools one by one"
+                )
+                return [
+                    await self.call_gmail_tool(
+                        call["name"],
+                        user_id,
+                        fields=call.get("fields"),
+                        **call.get("arguments", {}),
+                    )
+                    for call in calls
+                ]
+
+            self._notify_writes([call["name"] for call in calls], user_id)
+            by_id = {result.get("id"): result for result in results}
+            responses = []
+            auth_required = None
+            for request in payload:
+                tool_response = self._tool_response(
+                    by_id.get(request["id"], {}), user_id, auth_required
+                )
+                # One OAuth URL for the whole batch
+                if tool_response["status"] == "authentication_required":
+                    auth_required = tool_response
+                responses.append(tool_response)
+            return responses
+
+        except Exception as e:
+            logger.error(f"Error calling Gmail Lambda batch: {e}")
+            return [
+                {
+                    "status": "error",
+                    "message": f"Failed to call Gmail service: {str(e)}",
+                }
+                for _ in calls
+            ]
+
     async def get_gmail_messages(
-        self, user_id: str, query: str = "", max_results: int = 10
+        self,
+        user_id: str,
+        query: str = "",
+        max_results: int = 10,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Get Gmail messages for a user, optionally only the given fields"""
+        return await self.call_gmail_tool(
+            "get_gmail_messages",
+            user_id=user_id,
+            fields=fields,
+            query=query,
+            max_results=max_results,
+        )
+
+    async def sync_messages(
+        self, user_id: str, history_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get Gmail messages for a user"""
+        """Message metadata changes since the given Gmail historyId"""
         return await self.call_gmail_tool(
-            "get_gmail_messages", user_id=user_id, query=query, max_results=max_results
+            "sync_messages", user_id=user_id, history_id=history_id
         )
 
     async def send_gmail_message(
@@ -120,8 +218,10 @@ class GmailLambdaService:
                 "params": {},
             }
 
-            response = self.lambda_client.invoke(
-                FunctionName=self.function_name, Payload=json.dumps(payload)
+            response = await asyncio.to_thread(
+                self.lambda_client.invoke,
+                FunctionName=self.function_name,
+                Payload=json.dumps(payload),
             )
 
             result = json.loads(response["Payload"].read())
@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING, DeleteOne, UpdateOne
+
+from mongodb_config import (
+    get_gmail_messages_collection,
+    get_gmail_sync_state_collection,
+)
+from services.gmail_lambda_service import gmail_lambda_service
+
+"""
+Incremental Gmail sync - a metadata index of each user's recent messages is
+kept in MongoDB through history.list, and common searches are answered from it.
+Sending mail bumps write_version on the user's sync state, so the next read in
+any worker process syncs first
+"""
+
+logger = logging.getLogger(__name__)
+
+# Sync settings
+GMAIL_SYNC_ENABLED = os.getenv("GMAIL_SYNC_ENABLED", "true").lower() == "true"
+GMAIL_SYNC_MAX_AGE_SECONDS = float(os.getenv("GMAIL_SYNC_MAX_AGE_SECONDS", "60"))
+
+# Gmail search names for system labels
+SYSTEM_LABELS = {
+    "inbox": "INBOX",
+    "sent": "SENT",
+    "draft": "DRAFT",
+    "drafts": "DRAFT",
+    "starred": "STARRED",
+    "important": "IMPORTANT",
+    "unread": "UNREAD",
+    "spam": "SPAM",
+    "trash": "TRASH",
+}
+CATEGORIES = {"primary": "CATEGORY_PERSONAL"}
+AGE_UNITS = {"d": 1, "m": 30, "y": 365}
+MESSAGE_FIELDS = ("thread_id", "subject", "sender", "date", "snippet", "labels")
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value.replace("-", "/"), "%Y/%m/%d")
+
+
+def _age(value: str) -> timedelta:
+    match = re.fullmatch(r"(\d+)([dmy])", value)
+    if not match:
+        raise ValueError(value)
+    return timedelta(days=int(match.group(1)) * AGE_UNITS[match.group(2)])
+
+
+def parse_query(query: str) -> Optional[Dict[str, Any]]:
+    """
+    MongoDB filter for a Gmail search the metadata index can answer, or None
+    Supported: in:/label:/is: system labels, category:, from:, subject:,
+    newer_than:, older_than:, after:, before:. Free text, quotes and negation
+    need Gmail's own search, and so do spam and trash, which a full sync does
+    not list.
+    """
+    if '"' in query or "(" in query:
+        return None
+
+    required, excluded = [], []
+    conditions: Dict[str, Any] = {}
+    dates: Dict[str, datetime] = {}
+    try:
+        for term in query.split():
+            operator, _, value = term.partition(":")
+            operator, value = operator.lower(), value.lower()
+            if not value or operator.startswith("-"):
+                return None
+            if operator in ("in", "label", "is") and value in ("spam", "trash"):
+                return None
+            if operator in ("in", "label", "is") and value in SYSTEM_LABELS:
+                required.append(SYSTEM_LABELS[value])
+            elif operator == "is" and value == "read":
+                excluded.append("UNREAD")
+            elif operator == "category":
+                required.append(CATEGORIES.get(value, f"CATEGORY_{value.upper()}"))
+            elif operator in ("from", "subject"):
+                field = "sender" if operator == "from" else "subject"
+                conditions[field] = {"$regex": re.escape(value), "$options": "i"}
+            elif operator == "newer_than":
+                dates["$gte"] = datetime.utcnow() - _age(value)
+            elif operator == "older_than":
+                dates["$lt"] = datetime.utcnow() - _age(value)
+            elif operator == "after":
+                dates["$gte"] = _parse_date(value)
+            elif operator == "before":
+                dates["$lt"] = _parse_date(value)
+            else:
+                return None
+    except ValueError:
+        return None
+
+    # Like Gmail, spam and trash only show up when asked for
+    excluded += ["SPAM", "TRASH"]
+    labels: Dict[str, Any] = {"$nin": excluded}
+    if required:
+        labels["$all"] = required
+    conditions["labels"] = labels
+    if dates:
+        conditions["internal_date"] = dates
+    return conditions
+
+
+class GmailSyncService:
+    """MongoDB index of each user's message metadata, kept current via history.list"""
+
+    def __init__(self, messages=None, sync_state=None, lambda_service=None):
+        self._messages = messages
+        self._sync_state = sync_state
+        self._indexes_ready = False
+        self.lambda_service = lambda_service or gmail_lambda_service
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.lambda_service.write_listeners.append(self.mark_dirty)
+
+    @property
+    def messages(self):
+        """Get message index collection (lazy initialization)"""
+        if self._messages is None:
+            self._messages = get_gmail_messages_collection()
+        self._ensure_indexes()
+        return self._messages
+
+    @property
+    def sync_state(self):
+        """Get sync state collection (lazy initialization)"""
+        if self._sync_state is None:
+            self._sync_state = get_gmail_sync_state_collection()
+        self._ensure_indexes()
+        return self._sync_state
+
+    def _ensure_indexes(self):
+        if self._indexes_ready or self._messages is None or self._sync_state is None:
+            return
+        try:
+            self._messages.create_index(
+                [("user_id", ASCENDING), ("internal_date", DESCENDING)]
+            )
+            self._messages.create_index(
+                [("user_id", ASCENDING), ("message_id", ASCENDING)], unique=True
+            )
+            self._sync_state.create_index("user_id", unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create Gmail index indexes: {e}")
+        self._indexes_ready = True
+
+    def mark_dirty(self, user_id: str):
+        """Sync before the next read in any process (called after sending mail)"""
+        try:
+            if self.sync_state is not None:
+                self.sync_state.update_one(
+                    {"user_id": user_id}, {"$inc": {"write_version": 1}}
+                )
+        except Exception as e:
+            logger.warning(f"Could not mark Gmail index dirty for {user_id}: {e}")
+
+    @staticmethod
+    def _is_dirty(state: Dict[str, Any]) -> bool:
+        return state.get("write_version", 0) > state.get("synced_version", 0)
+
+    async def sync(self, user_id: str) -> Dict[str, Any]:
+        """Pull changes since the stored historyId and apply them to the index"""
+        # The version is read before the call, so a write during the sync marks
+        # it again
+        state = self.sync_state.find_one({"user_id": user_id}) or {}
+        result = await self.lambda_service.sync_messages(
+            user_id, state.get("history_id")
+        )
+        if result["status"] != "success":
+            return result
+
+        changes = result["data"]
+        key = {"user_id": user_id}
+        if changes.get("full_sync"):
+            self.messages.delete_many(key)
+
+        operations = []
+        for message in changes.get("messages", []):
+            document = {field: message.get(field) for field in MESSAGE_FIELDS}
+            document["internal_date"] = datetime.utcfromtimestamp(
+                message.get("internal_date", 0) / 1000
+            )
+            operations.append(
+                UpdateOne(
+                    {**key, "message_id": message["id"]},
+                    {"$set": document},
+                    upsert=True,
+                )
+            )
+        for message_id, labels in changes.get("labels", {}).items():
+            operations.append(
+                UpdateOne(
+                    {**key, "message_id": message_id}, {"$set": {"labels": labels}}
+                )
+            )
+        for message_id in changes.get("deleted", []):
+            operations.append(DeleteOne({**key, "message_id": message_id}))
+        if operations:
+            self.messages.bulk_write(operations, ordered=False)
+
+        update = {
+            "history_id": changes.get("history_id"),
+            "synced_at": datetime.utcnow(),
+        }
+        if changes.get("full_sync"):
+            # False when the mailbox has more messages than the full sync indexed
+            update["complete"] = changes.get("complete", False)
+        self.sync_state.update_one(
+            key,
+            {
+                "$set": update,
+                "$max": {"synced_version": state.get("write_version", 0)},
+            },
+            upsert=True,
+        )
+
+        logger.info(f"📧 Gmail sync for {user_id}: {len(operations)} changes")
+        return {"status": "success", "data": {"changes": len(operations)}}
+
+    def _refresh_in_background(self, user_id: str):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+
+        def run():
+            try:
+                asyncio.run(self.sync(user_id))
+            except Exception as e:
+                logger.warning(f"Background Gmail sync failed for {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(user_id)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    async def get_messages(
+        self, user_id: str, query: str = "", max_results: int = 10
+    ) -> Dict[str, Any]:
+        """Messages from the local index, falling back to a live Gmail search"""
+
+        async def live():
+            return await self.lambda_service.get_gmail_messages(
+                user_id=user_id, query=query, max_results=max_results
+            )
+
+        conditions = parse_query(query or "")
+        if not GMAIL_SYNC_ENABLED or conditions is None or self.sync_state is None:
+            return await live()
+
+        try:
+            state = self.sync_state.find_one({"user_id": user_id})
+            if not state or self._is_dirty(state):
+                result = await self.sync(user_id)
+                if result["status"] != "success":
+                    return result
+                state = self.sync_state.find_one({"user_id": user_id})
+            elif (
+                datetime.utcnow() - state["synced_at"]
+            ).total_seconds() > GMAIL_SYNC_MAX_AGE_SECONDS:
+                # Serve what we have and catch up off the request path
+                self._refresh_in_background(user_id)
+
+            cursor = (
+                self.messages.find({"user_id": user_id, **conditions})
+                .sort("internal_date", DESCENDING)
+                .limit(max_results)
+            )
+            messages = [
+                {"id": doc["message_id"], **{f: doc.get(f) for f in MESSAGE_FIELDS}}
+                for doc in cursor
+            ]
+        except Exception as e:
+            logger.error(f"Gmail index read failed, using live search: {e}")
+            return await live()
+
+        # Fewer hits than asked for may just mean older matches were never indexed
+        if len(messages) < max_results and not state.get("complete"):
+            return await live()
+
+        return {
+            "status": "success",
+            "data": {
+                "success": True,
+                "messages": messages,
+                "total": len(messages),
+                "source": "cache",
+            },
+        }
+
+
+# Global Gmail sync instance
+gmail_sync = GmailSyncService()
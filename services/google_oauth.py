@@ -129,22 +129,25 @@ class GoogleOAuthService:
             logger.error(f"Error exchanging code for tokens: {e}")
             raise
 
+    def _refresh_request(self, refresh_token: str) -> requests.Response:
+        refresh_data = {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token",
+        }
+
+        return requests.post(
+            self.token_url,
+            data=refresh_data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=30,
+        )
+
     def refresh_access_token(self, refresh_token: str) -> Optional[Dict[str, Any]]:
         """Refresh an expired access token"""
         try:
-            refresh_data = {
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "refresh_token": refresh_token,
-                "grant_type": "refresh_token",
-            }
-
-            response = requests.post(
-                self.token_url,
-                data=refresh_data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=30,
-            )
+            response = self._refresh_request(refresh_token)
 
             if response.status_code != 200:
                 logger.error(
@@ -161,6 +164,18 @@ class GoogleOAuthService:
             logger.error(f"Error refreshing token: {e}")
             return None
 
+    def check_refresh_token(self, refresh_token: str) -> Dict[str, Any]:
+        """
+        Refresh once to see whether the grant is still valid
+        Returns the new tokens; raises ValueError if Google rejects the grant
+        (revoked or expired) and requests.RequestException on network errors
+        """
+        response = self._refresh_request(refresh_token)
+        if response.status_code in (400, 401):
+            raise ValueError(f"Refresh token rejected: {response.text}")
+        response.raise_for_status()
+        return response.json()
+
     def revoke_token(self, token: str) -> bool:
         """Revoke an access or refresh token"""
         try:
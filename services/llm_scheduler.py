@@ -0,0 +1,439 @@
+import asyncio
+import contextvars
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Optional
+
+"""
+LLM request scheduler - token-bucket rate limiting with fair per-user queuing
+for every ChatAnthropic call made by the agents
+"""
+
+logger = logging.getLogger(__name__)
+
+# Scheduler settings (Anthropic limits are per organisation, so they are shared
+# by every gunicorn worker on the host when LLM_SCHEDULER_STATE_DIR is set)
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "50"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "50000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_SCHEDULER_STATE_DIR = os.getenv("LLM_SCHEDULER_STATE_DIR", "")
+
+
+class Priority:
+    """Scheduling classes - lower values are served first"""
+
+    IN_PROGRESS = 0  # Follow-up step of a workflow that already holds context
+    NEW = 1  # First LLM call of a new turn
+
+
+# Per-turn scheduling context, set by the agent around each workflow
+_turn_context: contextvars.ContextVar[Optional[Dict[str, Any]]] = (
+    contextvars.ContextVar("llm_turn_context", default=None)
+)
+
+
+@contextmanager
+def llm_turn(user_id: Optional[str]):
+    """Tag LLM calls made inside this block with the user and turn progress"""
+    token = _turn_context.set(
+        {"user_id": user_id or "anonymous", "calls": 0, "usage": UsageStats()}
+    )
+    try:
+        yield
+    finally:
+        _turn_context.reset(token)
+
+
+def current_turn() -> Dict[str, Any]:
+    """Return (user_id, priority) for the next LLM call and count it"""
+    context = _turn_context.get()
+    if context is None:
+        return {"user_id": "anonymous", "priority": Priority.NEW}
+    priority = Priority.IN_PROGRESS if context["calls"] > 0 else Priority.NEW
+    context["calls"] += 1
+    return {"user_id": context["user_id"], "priority": priority}
+
+
+def turn_usage() -> Optional[Dict[str, int]]:
+    """Token usage recorded so far in the current turn, if inside llm_turn"""
+    context = _turn_context.get()
+    if context is None:
+        return None
+    return context["usage"].summary()
+
+
+def record_usage(usage_metadata: Optional[Dict[str, Any]]):
+    """Add one response's usage (including prompt cache tokens) to the totals"""
+    if not usage_metadata:
+        return
+    usage_stats.record(usage_metadata)
+    context = _turn_context.get()
+    if context is not None:
+        context["usage"].record(usage_metadata)
+
+
+def estimate_tokens(messages) -> int:
+    """Rough input token estimate (~4 characters per token)"""
+    chars = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            chars += len(json.dumps(content, default=str))
+    return max(1, chars // 4)
+
+
+class TokenBucket:
+    """In-process token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, name: str, rate_per_minute: float):
+        self.name = name
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.time()
+        # acquire_blocking runs in threadpool threads next to the event loop
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def reserve(self, amount: float) -> float:
+        """Take amount if available and return 0, else return seconds to wait"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.time()
+            self._tokens = self._refill(self._tokens, self._updated, now)
+            self._updated = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def adjust(self, delta: float):
+        """Give back (positive) or charge extra (negative) tokens after the fact"""
+        with self._lock:
+            now = time.time()
+            tokens = self._refill(self._tokens, self._updated, now) + delta
+            self._tokens = min(self.capacity, tokens)
+            self._updated = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a flock-protected file on local disk
+
+    Every gunicorn worker on the host opens the same file, so the bucket acts
+    as a local coordinator without an extra service. flock blocks, so the
+    scheduler calls it from a thread rather than the event loop.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, state_dir: str):
+        super().__init__(name, rate_per_minute)
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"llm_bucket_{name}.json")
+
+    @contextmanager
+    def _locked_state(self):
+        with self._lock, open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except json.JSONDecodeError:
+                    state = {}
+                state.setdefault("tokens", self.capacity)
+                state.setdefault("updated", time.time())
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reserve(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._locked_state() as state:
+            now = time.time()
+            tokens = self._refill(state["tokens"], state["updated"], now)
+            state["updated"] = now
+            if tokens >= amount:
+                state["tokens"] = tokens - amount
+                return 0.0
+            state["tokens"] = tokens
+            return (amount - tokens) / self.rate
+
+    def adjust(self, delta: float):
+        with self._locked_state() as state:
+            now = time.time()
+            tokens = self._refill(state["tokens"], state["updated"], now) + delta
+            state["tokens"] = min(self.capacity, tokens)
+            state["updated"] = now
+
+
+class WaitStats:
+    """Rolling wait-time metrics for scheduled LLM calls"""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, wait: float):
+        self.count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent.append(wait)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "count": self.count,
+            "avg_wait_s": round(self.total_wait / self.count, 4) if self.count else 0,
+            "p50_wait_s": round(percentile(0.5), 4),
+            "p95_wait_s": round(percentile(0.95), 4),
+            "max_wait_s": round(self.max_wait, 4),
+        }
+
+
+class UsageStats:
+    """Token usage totals, split out so prompt cache hits can be verified"""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def record(self, usage_metadata: Dict[str, Any]):
+        details = usage_metadata.get("input_token_details") or {}
+        self.calls += 1
+        self.input_tokens += usage_metadata.get("input_tokens", 0) or 0
+        self.output_tokens += usage_metadata.get("output_tokens", 0) or 0
+        self.cache_read_tokens += details.get("cache_read", 0) or 0
+        self.cache_creation_tokens += details.get("cache_creation", 0) or 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "cache_hit_ratio": (
+                round(self.cache_read_tokens / self.input_tokens, 4)
+                if self.input_tokens
+                else 0
+            ),
+        }
+
+
+class LLMScheduler:
+    """Admits LLM calls under RPM/TPM limits, round-robin across users,
+    with in-progress workflows ahead of new ones"""
+
+    def __init__(
+        self,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        state_dir: str = LLM_SCHEDULER_STATE_DIR,
+        enabled: bool = LLM_SCHEDULER_ENABLED,
+    ):
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.shared = bool(state_dir)
+        if state_dir:
+            self.request_bucket = SharedTokenBucket(
+                "requests", requests_per_minute, state_dir
+            )
+            self.token_bucket = SharedTokenBucket(
+                "tokens", tokens_per_minute, state_dir
+            )
+        else:
+            self.request_bucket = TokenBucket("requests", requests_per_minute)
+            self.token_bucket = TokenBucket("tokens", tokens_per_minute)
+
+        self.wait_stats = {
+            Priority.IN_PROGRESS: WaitStats(),
+            Priority.NEW: WaitStats(),
+        }
+        self._reset_loop_state(None)
+
+    def _reset_loop_state(self, loop):
+        # Futures and events belong to one event loop; rebuild them if it changes
+        self._loop = loop
+        self._waiters: Dict[int, "OrderedDict[str, Deque]"] = {
+            Priority.IN_PROGRESS: OrderedDict(),
+            Priority.NEW: OrderedDict(),
+        }
+        self._active = 0
+        self._wakeup = asyncio.Event() if loop else None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset_loop_state(loop)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _next_waiter(self):
+        """Pop the next waiter: best priority first, round-robin within a class"""
+        for priority in (Priority.IN_PROGRESS, Priority.NEW):
+            users = self._waiters[priority]
+            while users:
+                user_id, queue = next(iter(users.items()))
+                users.move_to_end(user_id)
+                future, tokens, enqueued = queue.popleft()
+                if not queue:
+                    del users[user_id]
+                if future.cancelled():
+                    continue
+                return priority, future, tokens, enqueued
+        return None
+
+    def _has_waiters(self) -> bool:
+        return any(self._waiters[p] for p in self._waiters)
+
+    async def _dispatch(self):
+        while True:
+            if not self._has_waiters() or self._active >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            waiter = self._next_waiter()
+            if waiter is None:
+                continue
+            priority, future, tokens, enqueued = waiter
+
+            # Hold the head of the line until both buckets admit the call
+            while True:
+                wait = await self._off_loop(self._reserve, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait, 1.0))
+
+            if future.cancelled():
+                await self._off_loop(self._give_back, tokens)
+                continue
+
+            self._active += 1
+            waited = time.monotonic() - enqueued
+            self.wait_stats[priority].record(waited)
+            future.set_result(waited)
+
+    async def _off_loop(self, func, *args):
+        """Call a bucket operation, in a thread when it takes the file lock"""
+        if self.shared:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and tokens, or return seconds to wait (taking neither)"""
+        wait = self.request_bucket.reserve(1)
+        if wait == 0:
+            wait = self.token_bucket.reserve(tokens)
+            if wait > 0:
+                self.request_bucket.adjust(1)
+        return wait
+
+    def _give_back(self, tokens: int):
+        self.request_bucket.adjust(1)
+        self.token_bucket.adjust(tokens)
+
+    async def acquire(self, user_id: str, tokens: int, priority: int) -> float:
+        """Wait for an admission slot and return the seconds spent waiting"""
+        if not self.enabled:
+            return 0.0
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        users = self._waiters[priority]
+        users.setdefault(user_id, deque()).append((future, tokens, time.monotonic()))
+        self._wakeup.set()
+        try:
+            waited = await future
+        except asyncio.CancelledError:
+            # Granted just before the caller went away: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release(tokens, 0)
+            raise
+        if waited > 1:
+            logger.info(
+                f"LLM call for user {user_id} waited {waited:.2f}s "
+                f"(priority={priority})"
+            )
+        return waited
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int] = None):
+        """Free the concurrency slot and reconcile the token estimate"""
+        if not self.enabled:
+            return
+        if actual_tokens is not None:
+            self._adjust_tokens(estimated_tokens - actual_tokens)
+        self._active = max(0, self._active - 1)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _adjust_tokens(self, delta: float):
+        """Reconcile the token bucket, without blocking a running event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.shared and loop is not None:
+            loop.run_in_executor(None, self.token_bucket.adjust, delta)
+        else:
+            self.token_bucket.adjust(delta)
+
+    def acquire_blocking(self, tokens: int) -> float:
+        """Synchronous admission for non-async callers (no fair queuing)"""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0:
+                break
+            time.sleep(min(wait, 1.0))
+        waited = time.monotonic() - started
+        self.wait_stats[Priority.NEW].record(waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and wait-time metrics for health checks"""
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "queued": sum(
+                len(queue)
+                for users in self._waiters.values()
+                for queue in users.values()
+            ),
+            "wait_in_progress": self.wait_stats[Priority.IN_PROGRESS].summary(),
+            "wait_new": self.wait_stats[Priority.NEW].summary(),
+        }
+
+
+# Global LLM scheduler and usage instances
+llm_scheduler = LLMScheduler()
+usage_stats = UsageStats()
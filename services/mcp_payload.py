@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+"""
+Request/response encoding shared by the Gmail and Calendar Lambda MCP services
+"""
+
+# Ask the Lambda MCP servers to attach their stderr log to tool responses
+MCP_DEBUG_PAYLOAD = os.getenv("MCP_DEBUG_PAYLOAD", "false").lower() == "true"
+
+
+def build_tool_call(
+    request_id: str,
+    tool_name: str,
+    arguments: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """JSON-RPC tools/call request asking for the compact structured encoding"""
+    params: Dict[str, Any] = {
+        "name": tool_name,
+        "arguments": arguments,
+        "encoding": "structured",
+    }
+    if fields:
+        params["fields"] = list(fields)
+    if MCP_DEBUG_PAYLOAD:
+        params["_meta"] = {"debug": True}
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": params,
+    }
+
+
+def decode_tool_result(result: Dict[str, Any]) -> Any:
+    """Tool data from a tools/call result.
+
+    Structured results are already decoded with the Lambda payload; the text
+    content of older deployments is parsed as a fallback.
+    """
+    if "structuredContent" in result:
+        return result["structuredContent"]
+    content = result.get("content", [])
+    if content and isinstance(content, list):
+        text_content = content[0].get("text", "")
+        try:
+            return json.loads(text_content)
+        except json.JSONDecodeError:
+            return text_content
+    return result
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from mongodb_config import get_checkpoint_writes_collection, get_checkpoints_collection
+
+"""
+MongoDB checkpointer for the supervisor graph - every completed node is saved
+under thread_id = chat session id, so an interrupted turn resumes where it
+stopped and later turns reuse the full message state (tool results included)
+"""
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint settings
+GRAPH_CHECKPOINTS_ENABLED = (
+    os.getenv("GRAPH_CHECKPOINTS_ENABLED", "true").lower() == "true"
+)
+# Root checkpoints kept per thread; older ones, with their writes and subgraph
+# checkpoints, are deleted on put. Only the latest is read (to continue or
+# resume a session)
+GRAPH_CHECKPOINTS_KEEP = max(1, int(os.getenv("GRAPH_CHECKPOINTS_KEEP", "2")))
+
+
+class MongoCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpoint saver backed by the graph_checkpoints collections"""
+
+    def __init__(
+        self, checkpoints=None, writes=None, keep=GRAPH_CHECKPOINTS_KEEP, **kwargs
+    ):
+        super().__init__(**kwargs)
+        self._checkpoints = checkpoints
+        self._writes = writes
+        self.keep = keep
+        self._indexes_ready = False
+
+    @property
+    def checkpoints(self):
+        """Get checkpoints collection (lazy initialization)"""
+        if self._checkpoints is None:
+            self._checkpoints = get_checkpoints_collection()
+        self._ensure_indexes()
+        return self._checkpoints
+
+    @property
+    def writes(self):
+        """Get pending writes collection (lazy initialization)"""
+        if self._writes is None:
+            self._writes = get_checkpoint_writes_collection()
+        self._ensure_indexes()
+        return self._writes
+
+    def _ensure_indexes(self):
+        if self._indexes_ready or self._checkpoints is None or self._writes is None:
+            return
+        try:
+            self._checkpoints.create_index(
+                [
+                    ("thread_id", ASCENDING),
+                    ("checkpoint_ns", ASCENDING),
+                    ("checkpoint_id", DESCENDING),
+                ],
+                unique=True,
+            )
+            self._writes.create_index(
+                [
+                    ("thread_id", ASCENDING),
+                    ("checkpoint_ns", ASCENDING),
+                    ("checkpoint_id", ASCENDING),
+                    ("task_id", ASCENDING),
+                    ("idx", ASCENDING),
+                ],
+                unique=True,
+            )
+        except Exception as e:
+            logger.warning(f"Could not create checkpoint indexes: {e}")
+        self._indexes_ready = True
+
+    def _load(self, type_: str, value: bytes) -> Any:
+        return self.serde.loads_typed((type_, bytes(value)))
+
+    def _to_tuple(self, doc: Dict[str, Any]) -> CheckpointTuple:
+        thread_id = doc["thread_id"]
+        checkpoint_ns = doc["checkpoint_ns"]
+        checkpoint_id = doc["checkpoint_id"]
+        pending_writes = [
+            (
+                write["task_id"],
+                write["channel"],
+                self._load(write["type"], write["value"]),
+            )
+            for write in self.writes.find(
+                {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            ).sort([("task_id", ASCENDING), ("idx", ASCENDING)])
+        ]
+        parent_id = doc.get("parent_checkpoint_id")
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._load(doc["type"], doc["checkpoint"]),
+            metadata=self._load(doc["metadata_type"], doc["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the requested checkpoint, or the latest one for the thread"""
+        query = {
+            "thread_id": config["configurable"]["thread_id"],
+            "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+        }
+        if checkpoint_id := get_checkpoint_id(config):
+            query["checkpoint_id"] = checkpoint_id
+        doc = self.checkpoints.find_one(query, sort=[("checkpoint_id", DESCENDING)])
+        return self._to_tuple(doc) if doc else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first"""
+        query: Dict[str, Any] = {}
+        if config:
+            query["thread_id"] = config["configurable"]["thread_id"]
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = config["configurable"]["checkpoint_ns"]
+            if checkpoint_id := get_checkpoint_id(config):
+                query["checkpoint_id"] = checkpoint_id
+        if before and (before_id := get_checkpoint_id(before)):
+            query.setdefault("checkpoint_id", {})
+            if isinstance(query["checkpoint_id"], dict):
+                query["checkpoint_id"]["$lt"] = before_id
+
+        returned = 0
+        for doc in self.checkpoints.find(query).sort("checkpoint_id", DESCENDING):
+            checkpoint_tuple = self._to_tuple(doc)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value
+                for key, value in filter.items()
+            ):
+                continue
+            yield checkpoint_tuple
+            returned += 1
+            if limit is not None and returned >= limit:
+                break
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint (channel values included) for the thread"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        self.checkpoints.update_one(
+            {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            },
+            {
+                "$set": {
+                    "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+                    "type": type_,
+                    "checkpoint": serialized,
+                    "metadata_type": metadata_type,
+                    "metadata": serialized_metadata,
+                    "created_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
+        if not checkpoint_ns:
+            self._prune(thread_id)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _prune(self, thread_id: str):
+        """Delete all but the newest keep checkpoints of the thread, and their writes
+
+        Subgraph checkpoints (one namespace per agent call) older than the
+        oldest kept root checkpoint go too.
+        """
+        # Checkpoint ids are time-ordered (uuid6) across namespaces
+        oldest_kept = list(
+            self.checkpoints.find(
+                {"thread_id": thread_id, "checkpoint_ns": ""},
+                {"checkpoint_id": 1, "_id": 0},
+            )
+            .sort("checkpoint_id", DESCENDING)
+            .skip(self.keep - 1)
+            .limit(1)
+        )
+        if not oldest_kept:
+            return
+        stale = {
+            "thread_id": thread_id,
+            "checkpoint_id": {"$lt": oldest_kept[0]["checkpoint_id"]},
+        }
+        try:
+            self.checkpoints.delete_many(stale)
+            self.writes.delete_many(stale)
+        except Exception as e:
+            logger.warning(f"Could not prune checkpoints for {thread_id}: {e}")
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Save the writes of a node that finished before the next checkpoint"""
+        key = {
+            "thread_id": config["configurable"]["thread_id"],
+            "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+            "checkpoint_id": config["configurable"]["checkpoint_id"],
+            "task_id": task_id,
+        }
+        operations = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, serialized = self.serde.dumps_typed(value)
+            document = {
+                "channel": channel,
+                "type": type_,
+                "value": serialized,
+                "task_path": task_path,
+            }
+            # Regular writes are kept once; special writes (errors etc.) replace
+            update = {"$set": document} if write_idx < 0 else {"$setOnInsert": document}
+            operations.append(UpdateOne({**key, "idx": write_idx}, update, upsert=True))
+        if operations:
+            self.writes.bulk_write(operations, ordered=False)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint and pending write for a chat session"""
+        self.checkpoints.delete_many({"thread_id": thread_id})
+        self.writes.delete_many({"thread_id": thread_id})
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+# Global checkpointer instance
+mongo_checkpointer = MongoCheckpointSaver()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+"""
+Session change notifications - in-process pub/sub that ChatService publishes to
+whenever a session's state or message count changes, so long-poll requests can
+wake up instead of re-reading MongoDB on an interval
+"""
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for GET /tasks/{task_id}/wait
+SESSION_WAIT_MAX_SECONDS = float(os.getenv("SESSION_WAIT_MAX_SECONDS", "30"))
+# Waiters also re-read the session this often, which picks up writes made by
+# other worker processes that this process is never notified about
+SESSION_WAIT_RECHECK_SECONDS = float(os.getenv("SESSION_WAIT_RECHECK_SECONDS", "5"))
+
+
+class SessionEvents:
+    """One shared future per watched session, resolved on its next change"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Only touched on the event loop thread
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.published = 0
+        self.delivered = 0
+
+    @asynccontextmanager
+    async def listen(self, session_id: str) -> AsyncIterator[asyncio.Future]:
+        """
+        Future resolved with the next change to the session
+        Enter before reading the session so a change in between is not missed
+        """
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        future = self._futures.get(session_id)
+        if future is None or future.done():
+            future = loop.create_future()
+            self._futures[session_id] = future
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+        try:
+            yield future
+        finally:
+            remaining = self._waiters.pop(session_id) - 1
+            if remaining:
+                self._waiters[session_id] = remaining
+            elif self._futures.get(session_id) is future:
+                del self._futures[session_id]
+
+    @staticmethod
+    async def wait(future: asyncio.Future, timeout: float) -> Optional[Dict]:
+        """The change, or None if nothing happened within timeout seconds"""
+        try:
+            # Shielded so one waiter timing out does not cancel the others
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def publish(self, session_id: str, change: Dict[str, Any]):
+        """Wake everyone waiting on the session; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._resolve(session_id, change)
+        else:
+            # Sync routes and to_thread calls write from the threadpool
+            loop.call_soon_threadsafe(self._resolve, session_id, change)
+
+    def _resolve(self, session_id: str, change: Dict[str, Any]):
+        self.published += 1
+        future = self._futures.pop(session_id, None)
+        if future is not None and not future.done():
+            future.set_result(change)
+            self.delivered += self._waiters.get(session_id, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Watched sessions and waiter counts for health checks"""
+        return {
+            "sessions": len(self._futures),
+            "waiters": sum(self._waiters.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+
+# Global session events instance
+session_events = SessionEvents()
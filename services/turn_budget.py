@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage
+
+"""
+Per-turn budget for the multi-agent workflow - caps graph steps, LLM tokens
+and wall-clock time, and stops supervisor <-> agent handoff loops early
+"""
+
+logger = logging.getLogger(__name__)
+
+# Budget settings (TURN_DEADLINE_SECONDS stays below TURN_TIMEOUT_SECONDS so a
+# background turn ends with a partial answer rather than a worker timeout)
+TURN_MAX_STEPS = int(os.getenv("TURN_MAX_STEPS", "16"))
+TURN_MAX_TOKENS = int(os.getenv("TURN_MAX_TOKENS", "100000"))
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "120"))
+TURN_LOOP_REPEAT_LIMIT = int(os.getenv("TURN_LOOP_REPEAT_LIMIT", "3"))
+
+# Tool calls that move control between agents
+HANDOFF_TOOLS = ("transfer_to_", "report_to_supervisor", "dispatch_parallel")
+
+
+class BudgetReason:
+    """Why a turn stopped early"""
+
+    STEPS = "step limit"
+    TOKENS = "token limit"
+    DEADLINE = "time limit"
+    LOOP = "repeated handoff loop"
+
+
+class TurnBudgetExceeded(Exception):
+    """Raised when a turn runs out of steps, tokens or time, or starts looping"""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+class TurnBudget:
+    """Step, token and deadline limits for one agent turn, plus loop detection"""
+
+    def __init__(
+        self,
+        max_steps: int = TURN_MAX_STEPS,
+        max_tokens: int = TURN_MAX_TOKENS,
+        deadline_seconds: float = TURN_DEADLINE_SECONDS,
+        loop_repeat_limit: int = TURN_LOOP_REPEAT_LIMIT,
+    ):
+        self.max_steps = max_steps
+        self.max_tokens = max_tokens
+        self.deadline_seconds = deadline_seconds
+        self.loop_repeat_limit = loop_repeat_limit
+
+        self.started_at = time.monotonic()
+        self.steps = 0
+        self.tokens = 0
+        self.handoffs: Counter = Counter()
+        self.exhausted: Optional[str] = None
+
+    @property
+    def recursion_limit(self) -> int:
+        """LangGraph recursion limit, kept above max_steps so the budget stops first"""
+        return max(25, self.max_steps * 4)
+
+    def remaining_seconds(self) -> float:
+        return max(0.0, self.deadline_seconds - (time.monotonic() - self.started_at))
+
+    def add_tokens(self, tokens: int):
+        self.tokens += tokens
+
+    def check(self):
+        """Raise TurnBudgetExceeded if the token or time budget is spent"""
+        if self.tokens >= self.max_tokens:
+            raise TurnBudgetExceeded(
+                BudgetReason.TOKENS, f"{self.tokens}/{self.max_tokens} tokens"
+            )
+        if self.remaining_seconds() <= 0:
+            raise TurnBudgetExceeded(
+                BudgetReason.DEADLINE, f"{self.deadline_seconds:.0f}s"
+            )
+
+    def record_step(self, new_messages: List[BaseMessage]):
+        """Count one graph step and look for repeated identical handoffs"""
+        self.steps += 1
+        for message in new_messages:
+            for signature in self._handoff_signatures(message):
+                self.handoffs[signature] += 1
+                if self.handoffs[signature] >= self.loop_repeat_limit:
+                    raise TurnBudgetExceeded(
+                        BudgetReason.LOOP, f"{signature[1]} x{self.handoffs[signature]}"
+                    )
+        if self.steps >= self.max_steps:
+            raise TurnBudgetExceeded(BudgetReason.STEPS, f"{self.steps} steps")
+        self.check()
+
+    @staticmethod
+    def _handoff_signatures(message: BaseMessage):
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            return []
+        text = message.content if isinstance(message.content, str) else ""
+        return [
+            (
+                message.name,
+                call["name"],
+                json.dumps(call.get("args", {}), sort_keys=True, default=str),
+                text.strip().lower(),
+            )
+            for call in message.tool_calls
+            if call["name"].startswith(HANDOFF_TOOLS)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "tokens": self.tokens,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+            "exhausted": self.exhausted,
+        }
+
+
+class TurnBudgetCallback(BaseCallbackHandler):
+    """Checks the budget before every LLM call and counts tokens after it"""
+
+    raise_error = True
+    run_inline = True
+
+    def __init__(self, budget: TurnBudget):
+        self.budget = budget
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.budget.check()
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                self.budget.add_tokens(
+                    usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+                )
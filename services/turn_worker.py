@@ -0,0 +1,462 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from agents import EasydoAgent, build_conversation_history
+from chat_service import ChatService
+from mongodb_config import TurnJob, TurnJobStatus, get_turn_jobs_collection
+
+"""
+Background turn worker - runs agent turns off the request path so POST /tasks
+can answer 202 immediately while the session sits in TaskState.PROCESSING
+"""
+
+logger = logging.getLogger(__name__)
+
+# Worker settings
+TURN_WORKER_CONCURRENCY = int(os.getenv("TURN_WORKER_CONCURRENCY", "4"))
+TURN_QUEUE_MAX_SIZE = int(os.getenv("TURN_QUEUE_MAX_SIZE", "100"))
+TURN_MAX_PER_USER = int(os.getenv("TURN_MAX_PER_USER", "2"))
+TURN_TIMEOUT_SECONDS = float(os.getenv("TURN_TIMEOUT_SECONDS", "300"))
+# Finished jobs are dropped from memory, and from turn_jobs, after this
+TURN_RESULT_TTL_SECONDS = float(os.getenv("TURN_RESULT_TTL_SECONDS", "600"))
+TURN_QUEUE_DURABLE = os.getenv("TURN_QUEUE_DURABLE", "false").lower() == "true"
+# Job status and per-user limits live in the turn_jobs collection whenever
+# MongoDB is available, so any worker process can answer /turns/{job_id}.
+# TURN_QUEUE_DURABLE additionally re-queues unfinished jobs after a restart
+TURN_JOBS_SHARED = os.getenv("TURN_JOBS_SHARED", "true").lower() == "true"
+# How often wait() re-reads a job queued by another worker process
+TURN_POLL_INTERVAL_SECONDS = float(os.getenv("TURN_POLL_INTERVAL_SECONDS", "0.5"))
+
+FINISHED = (TurnJobStatus.COMPLETE, TurnJobStatus.FAILED)
+
+TurnHandler = Callable[[Dict[str, Any]], Awaitable[str]]
+FailureHandler = Callable[[Dict[str, Any], str], None]
+
+
+class TurnRejectedError(Exception):
+    """Raised when a turn cannot be accepted by the worker"""
+
+    status_code = 503
+
+
+class TurnQueueFullError(TurnRejectedError):
+    """Raised when the global queue is at capacity (backpressure)"""
+
+    status_code = 503
+
+
+class UserTurnLimitError(TurnRejectedError):
+    """Raised when a user already has the maximum number of turns in flight"""
+
+    status_code = 429
+
+
+async def run_chat_turn(job: Dict[str, Any]) -> str:
+    """Run one agent turn for a queued job and store the assistant reply"""
+    chat_service = ChatService()
+    session_id = job["session_id"]
+
+    # History excludes the user message that queued this turn
+    session_messages = chat_service.get_recent_messages(session_id)
+    conversation_history = build_conversation_history(
+        [msg for msg in session_messages if msg["_id"] != job.get("message_id")]
+    )
+
+    agent = EasydoAgent(selected_tools=job.get("selected_tools"))
+    reply = await agent.process_message(
+        job["message"],
+        conversation_history=conversation_history,
+        user_id=job["user_id"],
+        session_id=session_id,
+    )
+
+    chat_service.add_message(session_id, job["user_id"], "assistant", reply)
+    chat_service.set_session_require_permission(session_id)
+    return reply
+
+
+def fail_chat_turn(job: Dict[str, Any], error: str) -> None:
+    """Store an error reply so pollers see the session leave PROCESSING"""
+    chat_service = ChatService()
+    chat_service.add_message(
+        job["session_id"],
+        job["user_id"],
+        "assistant",
+        f"I'm sorry, I encountered an error while processing your request: {error}",
+        metadata={"turn_job_id": str(job["_id"]), "error": True},
+    )
+    chat_service.set_session_require_permission(job["session_id"])
+
+
+class TurnWorker:
+    """asyncio worker pool for agent turns with per-user and global limits"""
+
+    def __init__(
+        self,
+        handler: TurnHandler = run_chat_turn,
+        failure_handler: FailureHandler = fail_chat_turn,
+        concurrency: int = TURN_WORKER_CONCURRENCY,
+        max_queue_size: int = TURN_QUEUE_MAX_SIZE,
+        max_per_user: int = TURN_MAX_PER_USER,
+        timeout: float = TURN_TIMEOUT_SECONDS,
+        durable: bool = TURN_QUEUE_DURABLE,
+        shared: bool = TURN_JOBS_SHARED,
+        jobs_collection=None,
+    ):
+        self.handler = handler
+        self.failure_handler = failure_handler
+        self.concurrency = concurrency
+        self.max_queue_size = max_queue_size
+        self.max_per_user = max_per_user
+        self.timeout = timeout
+        self.durable = durable
+        self.shared = shared or durable
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._user_inflight: Dict[str, int] = {}
+        self._jobs_collection = jobs_collection
+        self._jobs_collection_checked = jobs_collection is not None
+        self._indexes_ready = False
+
+    @property
+    def jobs_collection(self):
+        """Get turn jobs collection (lazy, None when jobs are not shared)"""
+        if not self.shared:
+            return None
+        if not self._jobs_collection_checked:
+            self._jobs_collection = get_turn_jobs_collection()
+            self._jobs_collection_checked = True
+        self._ensure_indexes()
+        return self._jobs_collection
+
+    def _ensure_indexes(self):
+        if self._indexes_ready or self._jobs_collection is None:
+            return
+        try:
+            # The per-user in-flight count on every turn request
+            self._jobs_collection.create_index(
+                [
+                    ("user_id", ASCENDING),
+                    ("status", ASCENDING),
+                    ("updated_at", ASCENDING),
+                ]
+            )
+            # Finished jobs are removed by MongoDB once expire_at passes
+            self._jobs_collection.create_index("expire_at", expireAfterSeconds=0)
+        except Exception as e:
+            logger.warning(f"Could not create turn jobs indexes: {e}")
+        self._indexes_ready = True
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i)) for i in range(self.concurrency)
+        ]
+        logger.info(
+            f"Turn worker started with {self.concurrency} workers "
+            f"(queue={self.max_queue_size}, per_user={self.max_per_user}, "
+            f"durable={self.durable})"
+        )
+        if self.durable:
+            self._recover_jobs()
+
+    async def stop(self):
+        """Cancel worker tasks; durable jobs stay queued for the next start"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Turn worker stopped")
+
+    def check_capacity(self, user_id: str):
+        """Raise TurnRejectedError if a new turn for this user would be refused"""
+        if self._queue is None or not self.running:
+            raise TurnQueueFullError("Turn worker is not running")
+        if self._queue.full():
+            raise TurnQueueFullError("Turn queue is full, please retry shortly")
+        self.check_user_limit(user_id)
+
+    def check_user_limit(self, user_id: str):
+        """Raise UserTurnLimitError if the user has max_per_user turns in flight"""
+        if self._user_turns_in_flight(user_id) >= self.max_per_user:
+            raise UserTurnLimitError(
+                f"User already has {self.max_per_user} turns in progress"
+            )
+
+    def _user_turns_in_flight(self, user_id: str) -> int:
+        """The user's unfinished turns across all worker processes"""
+        local = self._user_inflight.get(user_id, 0)
+        if self.jobs_collection is None:
+            return local
+        try:
+            # Jobs older than the timeout were orphaned by a crashed process
+            shared = self.jobs_collection.count_documents(
+                {
+                    "user_id": user_id,
+                    "status": {"$in": [TurnJobStatus.QUEUED, TurnJobStatus.RUNNING]},
+                    "updated_at": {
+                        "$gt": datetime.utcnow() - timedelta(seconds=self.timeout)
+                    },
+                }
+            )
+        except Exception as e:
+            logger.warning(f"Could not count turn jobs for {user_id}: {e}")
+            return local
+        return max(local, shared)
+
+    def submit(
+        self,
+        session_id: str,
+        user_id: str,
+        message: str,
+        message_id: Optional[str] = None,
+        selected_tools: Optional[list] = None,
+    ) -> str:
+        """Queue a turn and return its job id"""
+        self.check_capacity(user_id)
+        self._prune_finished()
+
+        job = TurnJob.create_job(
+            session_id, user_id, message, message_id, selected_tools
+        )
+        job_id = str(job["_id"])
+
+        if self.jobs_collection is not None:
+            self.jobs_collection.insert_one(dict(job))
+
+        self._track(job)
+        self._queue.put_nowait(job_id)
+        logger.info(f"Queued turn {job_id} for session {session_id}")
+        return job_id
+
+    @asynccontextmanager
+    async def inline_turn(
+        self, session_id: str, user_id: str, message: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Admit a turn the caller runs itself (chat sockets) under the per-user
+        limit. It is recorded as a running job, so socket and background turns
+        count against the same limit in every worker process.
+        """
+        self.check_user_limit(user_id)
+        self._prune_finished()
+
+        job = TurnJob.create_job(session_id, user_id, message)
+        job["status"] = TurnJobStatus.RUNNING
+        self._track(job)
+        try:
+            if self.jobs_collection is not None:
+                await asyncio.to_thread(self.jobs_collection.insert_one, dict(job))
+            yield job
+            job["status"] = TurnJobStatus.COMPLETE
+        except BaseException:
+            job["status"] = TurnJobStatus.FAILED
+            raise
+        finally:
+            await asyncio.to_thread(self._persist, job)
+            self._release(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's current status from memory or the shared turn_jobs store"""
+        job = self._jobs.get(job_id)
+        if job is None and self.jobs_collection is not None:
+            try:
+                job = self.jobs_collection.find_one({"_id": ObjectId(job_id)})
+            except Exception:
+                return None
+        if job is None:
+            return None
+        return {**job, "_id": str(job["_id"])}
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to timeout seconds for a job to finish, then return it"""
+        event = self._events.get(job_id)
+        if event is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.get_job(job_id)
+
+        # Queued by another worker process: re-read the shared store
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = self.get_job(job_id)
+            remaining = deadline - loop.time()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            await asyncio.sleep(min(TURN_POLL_INTERVAL_SECONDS, remaining))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and in-flight counts for health checks"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "concurrency": self.concurrency,
+            "users_in_flight": len(self._user_inflight),
+            "durable": self.durable,
+            "shared": self.jobs_collection is not None,
+        }
+
+    def _track(self, job: Dict[str, Any]):
+        job_id = str(job["_id"])
+        self._jobs[job_id] = job
+        self._events[job_id] = asyncio.Event()
+        user_id = job["user_id"]
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+
+    def _release(self, job: Dict[str, Any]):
+        job_id = str(job["_id"])
+        user_id = job["user_id"]
+        remaining = self._user_inflight.get(user_id, 1) - 1
+        if remaining > 0:
+            self._user_inflight[user_id] = remaining
+        else:
+            self._user_inflight.pop(user_id, None)
+        job["finished_at"] = time.monotonic()
+        event = self._events.get(job_id)
+        if event is not None:
+            event.set()
+
+    def _prune_finished(self):
+        """Drop finished jobs whose results have outlived TURN_RESULT_TTL_SECONDS"""
+        cutoff = time.monotonic() - TURN_RESULT_TTL_SECONDS
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.get("finished_at") and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._events.pop(job_id, None)
+
+    def _claim(self, job: Dict[str, Any]) -> bool:
+        """Atomically move a stored job from QUEUED to RUNNING"""
+        if self.jobs_collection is None:
+            return True
+        claimed = self.jobs_collection.find_one_and_update(
+            {"_id": job["_id"], "status": TurnJobStatus.QUEUED},
+            {
+                "$set": {
+                    "status": TurnJobStatus.RUNNING,
+                    "worker_pid": os.getpid(),
+                    "lease_expires_at": datetime.utcnow()
+                    + timedelta(seconds=self.timeout),
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        return claimed is not None
+
+    def _persist(self, job: Dict[str, Any]):
+        if self.jobs_collection is None:
+            return
+        now = datetime.utcnow()
+        update = {
+            "status": job["status"],
+            "reply": job.get("reply"),
+            "error": job.get("error"),
+            "updated_at": now,
+        }
+        if job["status"] in FINISHED:
+            update["expire_at"] = now + timedelta(seconds=TURN_RESULT_TTL_SECONDS)
+        try:
+            self.jobs_collection.update_one({"_id": job["_id"]}, {"$set": update})
+        except Exception as e:
+            logger.error(f"Error persisting turn job {job['_id']}: {e}")
+
+    def _recover_jobs(self):
+        """Re-queue durable jobs left behind by a crashed or restarted worker"""
+        if self.jobs_collection is None:
+            return
+        try:
+            self.jobs_collection.update_many(
+                {
+                    "status": TurnJobStatus.RUNNING,
+                    "lease_expires_at": {"$lt": datetime.utcnow()},
+                },
+                {"$set": {"status": TurnJobStatus.QUEUED}},
+            )
+            recovered = 0
+            for job in self.jobs_collection.find({"status": TurnJobStatus.QUEUED}).sort(
+                "created_at", 1
+            ):
+                if self._queue.full():
+                    break
+                self._track(job)
+                self._queue.put_nowait(str(job["_id"]))
+                recovered += 1
+            if recovered:
+                logger.info(f"Recovered {recovered} queued turn jobs")
+        except Exception as e:
+            logger.error(f"Error recovering turn jobs: {e}")
+
+    async def _worker_loop(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Turn worker {index} crashed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+
+        if not self._claim(job):
+            # Another process already picked up this durable job
+            logger.info(f"Turn {job_id} already claimed elsewhere, skipping")
+            self._release(job)
+            return
+
+        job["status"] = TurnJobStatus.RUNNING
+        started = time.monotonic()
+        try:
+            reply = await asyncio.wait_for(self.handler(job), self.timeout)
+            job["status"] = TurnJobStatus.COMPLETE
+            job["reply"] = reply
+            logger.info(f"Turn {job_id} complete in {time.monotonic() - started:.2f}s")
+        except asyncio.TimeoutError:
+            self._fail(job, f"turn timed out after {self.timeout:.0f}s")
+        except Exception as e:
+            self._fail(job, str(e))
+        finally:
+            self._persist(job)
+            self._release(job)
+
+    def _fail(self, job: Dict[str, Any], error: str):
+        logger.error(f"Turn {job['_id']} failed: {error}")
+        job["status"] = TurnJobStatus.FAILED
+        job["error"] = error
+        try:
+            self.failure_handler(job, error)
+        except Exception as e:
+            logger.error(f"Error recording failed turn {job['_id']}: {e}")
+
+
+# Global turn worker instance
+turn_worker = TurnWorker()
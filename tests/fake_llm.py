@@ -0,0 +1,42 @@
+from typing import Any, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model for graph tests; responder(messages) returns an AIMessage"""
+
+    responder: Callable[[List[BaseMessage]], AIMessage]
+    calls: List[List[BaseMessage]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.calls.append(messages)
+        return ChatResult(
+            generations=[ChatGeneration(message=self.responder(messages))]
+        )
+
+
+def agent_name(messages: List[BaseMessage]) -> str:
+    """Which agent is calling, read from the opening line of its system prompt"""
+    system = messages[0].content
+    text = system if isinstance(system, str) else system[0]["text"]
+    if text.startswith("You are an executor agent"):
+        return "executor_agent"
+    if text.startswith("You are a retriever agent"):
+        return "retriever_agent"
+    return "supervisor"
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+from services.auth_status import AuthStatusService  # noqa: E402
+
+GMAIL_SCOPE = "https://www.googleapis.com/auth/gmail.modify"
+
+
+class FakeStorage:
+    """TokenStorage stand-in holding metadata rows; counts reads"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = 0
+        self.stored = []
+
+    def get_token_metadata(self, user_id, service):
+        self.reads += 1
+        return self.rows.get((user_id, service))
+
+    def get_refresh_token(self, user_id, service):
+        return "refresh" if (user_id, service) in self.rows else None
+
+    def store_tokens(self, user_id, service, tokens):
+        self.stored.append((user_id, service, tokens))
+        return True
+
+
+class FakeOAuth:
+    service_scopes = {"gmail": [GMAIL_SCOPE], "google_calendar": []}
+
+    def __init__(self, grant_valid=True):
+        self.grant_valid = grant_valid
+
+    def get_authorization_url(self, service, user_id):
+        return {"authorization_url": f"https://accounts.example/{service}"}
+
+    def check_refresh_token(self, refresh_token):
+        if not self.grant_valid:
+            raise ValueError("invalid_grant")
+        return {"access_token": "fresh", "expires_in": 3600}
+
+
+def row(expires_in, refresh=True, scope=GMAIL_SCOPE):
+    return {
+        "expires_at": (datetime.utcnow() + expires_in).isoformat(),
+        "scope": scope,
+        "has_refresh_token": refresh,
+    }
+
+
+def test_status_comes_from_token_metadata():
+    storage = FakeStorage(
+        {
+            ("fresh", "gmail"): row(timedelta(hours=1), refresh=False),
+            ("refreshable", "gmail"): row(timedelta(hours=-2)),
+            ("stale", "gmail"): row(timedelta(hours=-2), refresh=False),
+            ("narrow", "gmail"): row(timedelta(hours=1), scope="openid"),
+        }
+    )
+    service = AuthStatusService(storage, FakeOAuth())
+
+    def status(user_id):
+        return service.get_status(user_id, "gmail", include_authorization_url=True)
+
+    assert status("fresh")["authorized"] is True
+    # The Lambdas refresh expired access tokens, so this grant is still usable
+    refreshable = status("refreshable")
+    assert refreshable["authorized"] is True
+    assert refreshable["access_token_expired"] is True
+    assert status("stale")["reason"] == "expired"
+    assert status("narrow")["reason"] == "insufficient_scope"
+    missing = status("nobody")
+    assert missing["reason"] == "not_connected"
+    assert missing["authorization_url"] == "https://accounts.example/gmail"
+    assert storage.reads == 5
+
+
+def test_every_required_scope_must_be_granted():
+    class TwoScopeOAuth(FakeOAuth):
+        service_scopes = {"gmail": [GMAIL_SCOPE, "openid"]}
+
+    storage = FakeStorage(
+        {
+            ("partial", "gmail"): row(timedelta(hours=1)),
+            ("full", "gmail"): row(timedelta(hours=1), scope=f"openid {GMAIL_SCOPE}"),
+            ("unknown", "gmail"): row(timedelta(hours=1), scope=""),
+        }
+    )
+    service = AuthStatusService(storage, TwoScopeOAuth())
+
+    assert service.get_status("partial", "gmail")["reason"] == "insufficient_scope"
+    assert service.get_status("unknown", "gmail")["reason"] == "insufficient_scope"
+    assert service.get_status("full", "gmail")["authorized"] is True
+
+
+def test_validator_reports_revoked_grants_until_reauthorized():
+    storage = FakeStorage({("u1", "gmail"): row(timedelta(hours=1))})
+    oauth = FakeOAuth(grant_valid=False)
+    service = AuthStatusService(storage, oauth)
+
+    assert service.validate("u1", "gmail") is False
+    status = service.get_status("u1", "gmail")
+    assert status["reason"] == "revoked" and "validated_at" in status
+
+    # A successful check stores the fresh access token with the refresh token
+    oauth.grant_valid = True
+    assert service.validate("u1", "gmail") is True
+    assert storage.stored[-1][2]["refresh_token"] == "refresh"
+    assert service.get_status("u1", "gmail")["authorized"] is True
+
+    oauth.grant_valid = False
+    service.validate("u1", "gmail")
+    service.forget("u1", "gmail")
+    assert service.get_status("u1", "gmail")["authorized"] is True
@@ -0,0 +1,179 @@
+from datetime import timedelta
+
+import httplib2
+from googleapiclient.errors import HttpError
+from test_lambda_credentials import FakeTable, load_server, token_item
+
+CALENDARS = [
+    {"id": "primary", "summary": "Me", "timeZone": "UTC"},
+    {"id": "team@example.com", "summary": "Team", "timeZone": "America/New_York"},
+    {"id": "holidays", "summary": "Holidays", "timeZone": "UTC", "hidden": True},
+]
+EVENTS = {
+    "primary": [
+        {
+            "id": "p1",
+            "summary": "Standup",
+            "start": {"dateTime": "2025-03-03T14:00:00Z"},
+        },
+        {"id": "p2", "summary": "1:1", "start": {"dateTime": "2025-03-04T16:00:00Z"}},
+    ],
+    "team@example.com": [
+        # Midnight New York = 05:00 UTC, so this sorts before the standup
+        {"id": "t1", "summary": "Offsite", "start": {"date": "2025-03-03"}},
+        {
+            "id": "t2",
+            "summary": "Planning",
+            "start": {"dateTime": "2025-03-03T10:30:00-05:00"},
+        },
+    ],
+}
+
+
+class FakeRequest:
+    def __init__(self, params):
+        self.params = params
+
+    def execute(self):
+        if "calendarId" not in self.params:
+            return {"items": CALENDARS}
+        return {"items": EVENTS.get(self.params["calendarId"], [])}
+
+
+class FakeBatch:
+    def __init__(self, api, callback):
+        self.api = api
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.api.batches.append([request.params for _, request in self.requests])
+        for request_id, request in self.requests:
+            self.callback(request_id, request.execute(), None)
+
+
+class FakeCalendarApi:
+    """Calendar service stand-in that records batched events.list calls"""
+
+    def __init__(self):
+        self.batches = []
+
+    def calendarList(self):
+        return self
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        return FakeRequest(params)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def agenda_server():
+    server = load_server("google_calendar")
+    server.table = FakeTable(
+        {("u1", "google_calendar"): token_item("t1", timedelta(hours=1))}
+    )
+    api = FakeCalendarApi()
+    server.get_service = lambda user_id, credentials: api
+    return server, api
+
+
+def call_agenda(server, **arguments):
+    response = server.handle_request(
+        {
+            "id": "a",
+            "method": "tools/call",
+            "params": {
+                "name": "get_agenda",
+                "arguments": {"user_id": "u1", **arguments},
+                "encoding": "structured",
+            },
+        }
+    )
+    return response["result"]["structuredContent"]
+
+
+def test_agenda_merges_visible_calendars_in_one_batch():
+    server, api = agenda_server()
+    data = call_agenda(server, time_min="2025-03-03T00:00:00")
+
+    assert [event["id"] for event in data["events"]] == ["t1", "p1", "t2", "p2"]
+    assert data["calendar_ids"] == ["primary", "team@example.com"]
+    assert len(api.batches) == 1 and len(api.batches[0]) == 2
+    # Naive window start is taken as UTC and the default window is a week
+    assert api.batches[0][0]["timeMin"] == "2025-03-03T00:00:00+00:00"
+    assert api.batches[0][0]["timeMax"] == "2025-03-10T00:00:00+00:00"
+
+
+def test_agenda_respects_calendar_filter_and_limit():
+    server, api = agenda_server()
+    data = call_agenda(
+        server,
+        time_min="2025-03-03T00:00:00Z",
+        time_max="2025-03-05T00:00:00Z",
+        calendar_ids=["primary"],
+        max_results=1,
+    )
+
+    assert [event["id"] for event in data["events"]] == ["p1"]
+    assert api.batches[0][0]["timeMax"] == "2025-03-05T00:00:00+00:00"
+
+
+class SyncingCalendarApi(FakeCalendarApi):
+    """Answers events.list with a delta, or 410 for an expired sync token"""
+
+    def list(self, **params):
+        self.batches.append([params])
+        if params.get("syncToken") == "expired":
+            raise HttpError(httplib2.Response({"status": 410}), b"Gone")
+        return FakeSyncRequest(params)
+
+
+class FakeSyncRequest(FakeRequest):
+    def execute(self):
+        if "calendarId" not in self.params:
+            return {"items": CALENDARS[:1]}
+        if "syncToken" in self.params:
+            items = [{"id": "p1", "status": "cancelled"}, EVENTS["primary"][1]]
+        else:
+            items = EVENTS["primary"]
+        return {"items": items, "nextSyncToken": "next"}
+
+
+def call_sync(server, sync_tokens):
+    response = server.handle_request(
+        {
+            "id": "s",
+            "method": "tools/call",
+            "params": {
+                "name": "sync_events",
+                "arguments": {"user_id": "u1", "sync_tokens": sync_tokens},
+                "encoding": "structured",
+            },
+        }
+    )
+    return response["result"]["structuredContent"]["changes"]["primary"]
+
+
+def test_sync_returns_deltas_and_resyncs_expired_tokens():
+    server, _ = agenda_server()
+    api = SyncingCalendarApi()
+    server.get_service = lambda user_id, credentials: api
+
+    delta = call_sync(server, {"primary": "token"})
+    assert delta["full_sync"] is False
+    assert delta["deleted"] == ["p1"]
+    assert [event["id"] for event in delta["events"]] == ["p2"]
+    assert delta["events"][0]["start_utc"] == "2025-03-04T16:00:00+00:00"
+    assert api.batches[-1][0]["showDeleted"] is True
+
+    resync = call_sync(server, {"primary": "expired"})
+    assert resync["full_sync"] is True
+    assert resync["next_sync_token"] == "next"
+    assert "window_start" in resync and "timeMin" in api.batches[-1][0]
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+from services.calendar_sync import CalendarSyncService  # noqa: E402
+
+load_dotenv()
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def event(event_id, hours_from_now, summary="Meeting"):
+    start = NOW + timedelta(hours=hours_from_now)
+    end = start + timedelta(hours=1)
+    return {
+        "id": event_id,
+        "calendar_id": "primary",
+        "summary": summary,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "all_day": False,
+        "start_utc": start.isoformat(),
+        "end_utc": end.isoformat(),
+    }
+
+
+class FakeCalendarLambda:
+    """Calendar Lambda service stand-in that replays scripted sync_events results"""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.sync_tokens = []
+        self.agenda_calls = 0
+        self.write_listeners = []
+
+    async def sync_events(self, user_id, sync_tokens=None, calendar_ids=None):
+        self.sync_tokens.append(sync_tokens)
+        return {
+            "status": "success",
+            "data": {
+                "success": True,
+                "changes": {"primary": self.changes.pop(0)},
+                "calendar_ids": ["primary"],
+            },
+        }
+
+    async def get_agenda(self, **kwargs):
+        self.agenda_calls += 1
+        return {"status": "success", "data": {"events": [], "source": "live"}}
+
+
+def full_sync(events):
+    return {
+        "events": events,
+        "deleted": [],
+        "next_sync_token": "token-1",
+        "full_sync": True,
+        "time_zone": "UTC",
+        "window_start": (NOW - timedelta(days=30)).isoformat(),
+        "window_end": (NOW + timedelta(days=365)).isoformat(),
+    }
+
+
+@pytest.fixture
+def collections():
+    """Throwaway event and sync state collections in the test database"""
+    mongodb_url = os.getenv("MONGODB_URL")
+    if not mongodb_url:
+        pytest.skip("MONGODB_URL not configured")
+
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    db = client[os.getenv("MONGODB_DATABASE", "easydo_test")]
+    suffix = uuid.uuid4().hex[:8]
+    events = db[f"test_calendar_events_{suffix}"]
+    sync_state = db[f"test_calendar_sync_state_{suffix}"]
+    yield events, sync_state
+    events.drop()
+    sync_state.drop()
+    client.close()
+
+
+def test_agenda_is_served_from_cache_and_writes_pull_deltas(collections):
+    events, sync_state = collections
+    lambda_service = FakeCalendarLambda(
+        [
+            full_sync([event("e1", 2), event("e2", 30), event("e3", 24 * 20)]),
+            {
+                "events": [event("e4", 5, summary="New")],
+                "deleted": ["e2"],
+                "next_sync_token": "token-2",
+                "full_sync": False,
+                "time_zone": "UTC",
+            },
+        ]
+    )
+    sync = CalendarSyncService(events, sync_state, lambda_service)
+    assert sync.mark_dirty in lambda_service.write_listeners
+
+    agenda = asyncio.run(sync.get_agenda("u1"))["data"]
+    assert agenda["source"] == "cache"
+    assert [e["id"] for e in agenda["events"]] == ["e1", "e2"]
+    assert "start_utc" not in agenda["events"][0]
+
+    # Fresh cache: no sync, no Lambda call
+    asyncio.run(sync.get_agenda("u1"))
+    assert lambda_service.sync_tokens == [{}]
+
+    # A write marks the user dirty; the next read pulls only the delta
+    sync.mark_dirty("u1")
+    agenda = asyncio.run(sync.get_agenda("u1"))["data"]
+    assert lambda_service.sync_tokens[-1] == {"primary": "token-1"}
+    assert [e["id"] for e in agenda["events"]] == ["e1", "e4"]
+    assert sync_state.find_one({"user_id": "u1"})["sync_token"] == "token-2"
+    assert lambda_service.agenda_calls == 0
+
+
+def test_a_write_in_another_process_makes_the_next_read_sync(collections):
+    events, sync_state = collections
+    lambda_service = FakeCalendarLambda(
+        [
+            full_sync([event("e1", 2)]),
+            {
+                "events": [event("e2", 3)],
+                "deleted": [],
+                "next_sync_token": "token-2",
+                "full_sync": False,
+                "time_zone": "UTC",
+            },
+        ]
+    )
+    reader = CalendarSyncService(events, sync_state, lambda_service)
+    writer = CalendarSyncService(events, sync_state, FakeCalendarLambda([]))
+    asyncio.run(reader.get_agenda("u1"))
+
+    writer.mark_dirty("u1")  # e.g. POST /calendar/events on another worker
+    agenda = asyncio.run(reader.get_agenda("u1"))["data"]
+    assert [e["id"] for e in agenda["events"]] == ["e1", "e2"]
+
+    # Synced: the next read is served from the cache again
+    asyncio.run(reader.get_agenda("u1"))
+    assert len(lambda_service.sync_tokens) == 2
+
+
+def test_windows_outside_the_synced_range_go_live(collections):
+    events, sync_state = collections
+    lambda_service = FakeCalendarLambda([full_sync([event("e1", 2)])])
+    sync = CalendarSyncService(events, sync_state, lambda_service)
+
+    long_ago = (NOW - timedelta(days=90)).isoformat()
+    result = asyncio.run(sync.get_agenda("u1", time_min=long_ago))
+    assert result["data"]["source"] == "live"
+    assert lambda_service.agenda_calls == 1
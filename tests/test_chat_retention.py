@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.chat_retention import ChatRetentionService
+
+
+class FakeChatService:
+    """Eligible sessions in order; compaction fails for the ones in broken"""
+
+    def __init__(self, eligible, broken=()):
+        self.eligible = list(eligible)
+        self.broken = set(broken)
+        self.batches = []
+
+    @property
+    def sessions_collection(self):
+        raise RuntimeError("no index in this fake")
+
+    def get_retention_candidates(self, cutoff, limit, exclude=None):
+        assert cutoff < datetime.utcnow()
+        excluded = {str(oid) for oid in exclude or []}
+        batch = [sid for sid in self.eligible if sid not in excluded][:limit]
+        self.batches.append(batch)
+        return batch
+
+    def compact_session(self, session_id):
+        if session_id in self.broken:
+            return None
+        self.eligible.remove(session_id)
+        return {"messages": 4, "raw_bytes": 1000, "compressed_bytes": 200}
+
+
+def session_ids(n):
+    return [f"{i:024x}" for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def no_lease_store(monkeypatch):
+    """Single process: no background_leases collection to coordinate through"""
+    monkeypatch.setattr(
+        "services.chat_retention.get_background_leases_collection", lambda: None
+    )
+
+
+def test_run_compacts_in_throttled_batches(monkeypatch):
+    monkeypatch.setattr("services.chat_retention.CHAT_RETENTION_BATCH_SIZE", 3)
+    monkeypatch.setattr("services.chat_retention.CHAT_RETENTION_PAUSE_SECONDS", 0)
+    ids = session_ids(8)
+    chat_service = FakeChatService(ids, broken={ids[1]})
+    retention = ChatRetentionService(chat_service)
+
+    run = asyncio.run(retention.run_once())
+    assert run["sessions"] == 7 and run["skipped"] == 1
+    assert run["messages"] == 28 and run["compressed_bytes"] == 1400
+    # Skipped sessions are not picked again, so the run ends
+    assert [len(batch) for batch in chat_service.batches] == [3, 3, 2, 0]
+    assert chat_service.eligible == [ids[1]]
+    assert retention.stats()["sessions"] == 7
+
+
+def test_run_stops_at_max_sessions(monkeypatch):
+    monkeypatch.setattr("services.chat_retention.CHAT_RETENTION_BATCH_SIZE", 3)
+    monkeypatch.setattr("services.chat_retention.CHAT_RETENTION_PAUSE_SECONDS", 0)
+    chat_service = FakeChatService(session_ids(10))
+    retention = ChatRetentionService(chat_service)
+
+    assert asyncio.run(retention.run_once(max_sessions=4))["sessions"] == 4
+    assert [len(batch) for batch in chat_service.batches] == [3, 1]
+    assert asyncio.run(retention.run_once())["sessions"] == 6
+    assert retention.stats()["runs"] == 2
+
+
+def test_only_the_lease_holder_runs_retention(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr("services.chat_retention.CHAT_RETENTION_PAUSE_SECONDS", 0)
+    leases = mongomock.MongoClient().db.background_leases
+    chat_service = FakeChatService(session_ids(4))
+    first = ChatRetentionService(chat_service, leases=leases)
+    second = ChatRetentionService(chat_service, leases=leases)
+    second.holder = "other-host:2"  # another worker process
+
+    assert asyncio.run(first.run_once())["sessions"] == 4
+    assert asyncio.run(second.run_once()) is None
+    assert len(chat_service.batches) == 2  # the second never looked
+
+    # An expired lease is taken over
+    leases.update_one({}, {"$set": {"expires_at": datetime(2000, 1, 1)}})
+    assert asyncio.run(second.run_once())["sessions"] == 0
+    assert leases.find_one()["holder"] == "other-host:2"
+    assert asyncio.run(first.run_once()) is None
@@ -0,0 +1,383 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from chat_service import ChatService
+from mongodb_config import RAW_BSON_OPTIONS, ChatSession, Projections, TaskState
+
+load_dotenv()
+
+
+@pytest.fixture
+def chat_service(monkeypatch):
+    """ChatService on throwaway message and session collections"""
+    mongodb_url = os.getenv("MONGODB_URL")
+    if not mongodb_url:
+        pytest.skip("MONGODB_URL not configured")
+    monkeypatch.setattr("chat_service.is_mongodb_available", lambda: True)
+
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    db = client[os.getenv("MONGODB_DATABASE", "easydo_test")]
+    suffix = uuid.uuid4().hex[:8]
+    service = ChatService()
+    service._chat_collection = db[f"test_chat_messages_{suffix}"]
+    service._sessions_collection = db[f"test_chat_sessions_{suffix}"]
+    service._archive_collection = db[f"test_chat_messages_archive_{suffix}"]
+    service._bundles_collection = db[f"test_chat_archive_bundles_{suffix}"]
+    service._raw_chat_collection = service._chat_collection.with_options(
+        codec_options=RAW_BSON_OPTIONS
+    )
+    service._raw_archive_collection = service._archive_collection.with_options(
+        codec_options=RAW_BSON_OPTIONS
+    )
+    yield service
+    service._chat_collection.drop()
+    service._archive_collection.drop()
+    service._bundles_collection.drop()
+    service._sessions_collection.drop()
+    client.close()
+
+
+def test_projections_fetch_only_serialized_fields(chat_service):
+    session_doc = ChatSession.create_session("u1", "Plan the offsite")
+    session_id = str(
+        chat_service.sessions_collection.insert_one(session_doc).inserted_id
+    )
+    for i in range(3):
+        chat_service.add_message(
+            session_id, "u1", ("user", "assistant")[i % 2], f"m{i}", {"n": i}
+        )
+
+    messages = chat_service.get_session_messages(
+        session_id, projection=Projections.MESSAGE_TEXT
+    )
+    assert messages == [
+        {"role": "user", "message": "m0"},
+        {"role": "assistant", "message": "m1"},
+        {"role": "user", "message": "m2"},
+    ]
+
+    history = chat_service.get_session_messages(
+        session_id, projection=Projections.MESSAGE_HISTORY
+    )
+    assert set(history[0]) == {"_id", "role", "message"}
+    assert isinstance(history[0]["_id"], str)
+
+    session = chat_service.get_session_by_id(
+        session_id, projection=Projections.SESSION_STATE
+    )
+    assert set(session) == {"_id", "user_id", "state", "message_count", "updated_at"}
+    assert session["message_count"] == 3
+
+    [summary] = chat_service.get_user_sessions(
+        "u1", projection=Projections.SESSION_SUMMARY
+    )
+    assert set(summary) == {
+        "_id",
+        "title",
+        "state",
+        "user_id",
+        "created_at",
+        "recent_messages",
+    }
+    assert [m["message"] for m in summary["recent_messages"]] == ["m2"]
+
+    # Full documents are still the default
+    assert "metadata" in chat_service.get_session_messages(session_id)[0]
+
+
+def test_raw_documents_are_left_undecoded(chat_service):
+    chat_service.add_message("s1", "u1", "user", "hello")
+
+    [raw] = chat_service.get_session_messages("s1", raw=True)
+    assert isinstance(raw, RawBSONDocument)
+    assert raw["message"] == "hello"
+
+
+def test_recent_messages_come_from_the_session_tail(chat_service, monkeypatch):
+    monkeypatch.setattr("chat_service.CHAT_SESSION_TAIL_SIZE", 3)
+    session_doc = ChatSession.create_session("u1", "Tail")
+    session_id = str(
+        chat_service.sessions_collection.insert_one(session_doc).inserted_id
+    )
+    ids = [
+        chat_service.add_message(session_id, "u1", "user", f"m{i}") for i in range(5)
+    ]
+
+    session = chat_service.get_session_by_id(
+        session_id, projection=Projections.SESSION_WITH_TAIL
+    )
+    assert [m["_id"] for m in session["recent_messages"]] == ids[-3:]
+
+    # Served without touching chat_messages while the tail is long enough
+    chat_service.chat_collection.delete_many({"session_id": session_id})
+    recent = chat_service.get_recent_messages(session_id, limit=2, session=session)
+    assert [m["message"] for m in recent] == ["m3", "m4"]
+    assert len(chat_service.get_recent_messages(session_id, limit=3)) == 3
+
+    # Deeper history falls back to chat_messages
+    assert chat_service.get_recent_messages(session_id, limit=4) == []
+
+
+def test_sessions_without_a_tail_fall_back_to_chat_messages(chat_service):
+    legacy = ChatSession.create_session("u1", "Legacy")
+    del legacy["recent_messages"]
+    session_id = str(chat_service.sessions_collection.insert_one(legacy).inserted_id)
+    chat_service.chat_collection.insert_one(
+        {"session_id": session_id, "role": "user", "message": "old"}
+    )
+    chat_service.sessions_collection.update_one(
+        {"_id": legacy["_id"]}, {"$set": {"message_count": 1}}
+    )
+
+    assert [m["message"] for m in chat_service.get_recent_messages(session_id)] == [
+        "old"
+    ]
+    assert chat_service.get_session_page(session_id) == [
+        {"role": "user", "message": "old"}
+    ]
+
+    # The first new message starts a tail that does not cover the session yet
+    chat_service.add_message(session_id, "u1", "assistant", "new")
+    page = chat_service.get_session_page(session_id)
+    assert [m["message"] for m in page] == ["old", "new"]
+
+
+def test_bulk_operations_check_ownership_and_archive_messages(
+    chat_service, monkeypatch
+):
+    monkeypatch.setattr("chat_service.CHAT_SESSION_TAIL_SIZE", 2)
+    monkeypatch.setattr("chat_service.get_checkpoints_collection", lambda: None)
+    monkeypatch.setattr("chat_service.get_checkpoint_writes_collection", lambda: None)
+    owned = []
+    for title in ("a", "b", "c"):
+        session_id = chat_service.create_chat_session("u1", title)
+        for i in range(3):
+            chat_service.add_message(session_id, "u1", "user", f"{title}{i}")
+        owned.append(session_id)
+    other = chat_service.create_chat_session("u2", "not mine")
+    chat_service.add_message(other, "u2", "user", "private")
+
+    result = chat_service.complete_sessions([owned[0], other, "bogus"], "u1")
+    assert result["sessions"] == [owned[0]]
+    assert result["not_found"] == [other, "bogus"]
+    assert chat_service.get_session_by_id(other)["state"] == TaskState.PROCESSING
+
+    result = chat_service.archive_sessions([owned[1], owned[2], other], "u1")
+    assert result["sessions"] == owned[1:] and result["messages"] == 6
+    assert chat_service.chat_collection.count_documents({}) == 4
+    assert chat_service.archive_collection.count_documents({}) == 6
+    assert [s["title"] for s in chat_service.get_user_sessions("u1")] == ["a"]
+    assert {
+        s["title"] for s in chat_service.get_user_sessions("u1", archived=True)
+    } == {
+        "b",
+        "c",
+    }
+
+    # Archived history is still read, from the archive collection
+    page = chat_service.get_session_page(owned[1])
+    assert [m["message"] for m in page] == ["b0", "b1", "b2"]
+    assert [m["message"] for m in chat_service.get_recent_messages(owned[1], 3)] == [
+        "b0",
+        "b1",
+        "b2",
+    ]
+
+    # New activity restores the messages to chat_messages
+    chat_service.set_session_processing(owned[1])
+    assert chat_service.archive_collection.count_documents({}) == 3
+    assert chat_service.chat_collection.count_documents({"session_id": owned[1]}) == 3
+
+    result = chat_service.delete_sessions(owned[1:] + [other], "u1")
+    assert result["sessions"] == owned[1:] and result["messages"] == 6
+    assert chat_service.archive_collection.count_documents({}) == 0
+    assert chat_service.get_session_by_id(other) is not None
+    assert [m["message"] for m in chat_service.get_session_messages(other)] == [
+        "private"
+    ]
+
+
+def test_compacted_sessions_are_read_from_their_bundle(chat_service, monkeypatch):
+    monkeypatch.setattr("chat_service.CHAT_SESSION_TAIL_SIZE", 2)
+    session_id = chat_service.create_chat_session("u1", "Old task")
+    for i in range(5):
+        chat_service.add_message(
+            session_id, "u1", ("user", "assistant")[i % 2], f"m{i} " * 50
+        )
+
+    # Only complete (or archived) sessions are compacted
+    assert chat_service.compact_session(session_id) is None
+    chat_service.set_session_complete(session_id)
+
+    result = chat_service.compact_session(session_id)
+    assert result["messages"] == 5, (
+        result,
+        chat_service.chat_collection.count_documents({}),
+    )
+    assert result["compressed_bytes"] < result["raw_bytes"]
+    assert chat_service.chat_collection.count_documents({}) == 0
+    assert chat_service.bundles_collection.count_documents({}) == 1
+    session = chat_service.get_session_by_id(session_id)
+    assert session["state"] == TaskState.ARCHIVED and session["compressed_at"]
+    assert chat_service.compact_session(session_id) is None
+
+    page = chat_service.get_session_page(session_id)
+    assert [m["message"] for m in page] == [f"m{i} " * 50 for i in range(5)]
+    assert set(page[0]) == {"role", "message"}
+    recent = chat_service.get_recent_messages(session_id, limit=3)
+    assert [m["message"] for m in recent] == [f"m{i} " * 50 for i in range(2, 5)]
+    assert isinstance(recent[0]["_id"], str)
+
+    # A new turn unpacks the bundle into chat_messages
+    chat_service.set_session_processing(session_id)
+    assert chat_service.bundles_collection.count_documents({}) == 0
+    assert len(chat_service.get_session_messages(session_id)) == 5
+    assert "compressed_at" not in chat_service.get_session_by_id(session_id)
+
+
+def test_interleaved_compactors_never_lose_messages(chat_service, monkeypatch):
+    """Two retention workers compacting the same session at once"""
+    other = ChatService()
+    for name in (
+        "_chat_collection",
+        "_sessions_collection",
+        "_archive_collection",
+        "_bundles_collection",
+        "_raw_chat_collection",
+        "_raw_archive_collection",
+    ):
+        setattr(other, name, getattr(chat_service, name))
+
+    def compact_while_packing(first, second, expire=False):
+        """Run second.compact_session while first is packing its messages"""
+        pack, results = first._pack, []
+
+        def interleaved(source, query):
+            if expire:
+                first.sessions_collection.update_one(
+                    {"_id": ObjectId(session_id)},
+                    {"$set": {"compaction_lease.expires_at": datetime(2000, 1, 1)}},
+                )
+            results.append(second.compact_session(session_id))
+            return pack(source, query)
+
+        monkeypatch.setattr(first, "_pack", interleaved)
+        results.insert(0, first.compact_session(session_id))
+        monkeypatch.undo()
+        return results
+
+    session_id = chat_service.create_chat_session("u1", "Old task")
+    for i in range(5):
+        chat_service.add_message(session_id, "u1", "user", f"m{i}")
+    chat_service.set_session_complete(session_id)
+
+    # The second worker finds the session claimed and leaves it alone
+    first, second = compact_while_packing(chat_service, other)
+    assert first["messages"] == 5 and second is None
+
+    # With the claim expired the second takes over and finishes; the first
+    # then finds a bundle it did not create and keeps its hands off it
+    chat_service.set_session_complete(session_id)
+    first, second = compact_while_packing(chat_service, other, expire=True)
+    assert first is None and second["messages"] == 5
+
+    assert chat_service.bundles_collection.count_documents({}) == 1
+    assert chat_service.chat_collection.count_documents({}) == 0
+    page = chat_service.get_session_page(session_id)
+    assert [m["message"] for m in page] == [f"m{i}" for i in range(5)]
+    session = chat_service.get_session_by_id(session_id)
+    assert session["compressed_at"] and "compaction_lease" not in session
+
+
+def test_state_change_during_compaction_keeps_messages(chat_service, monkeypatch):
+    """A new turn lands after compaction deleted the messages, before it archived"""
+    session_id = chat_service.create_chat_session("u1", "Old task")
+    for i in range(3):
+        chat_service.add_message(session_id, "u1", "user", f"m{i}")
+    chat_service.set_session_complete(session_id)
+
+    source = chat_service.raw_chat_collection
+    delete_many = source.delete_many
+
+    def delete_then_resume(*args, **kwargs):
+        result = delete_many(*args, **kwargs)
+        chat_service.set_session_processing(session_id)
+        return result
+
+    monkeypatch.setattr(source, "delete_many", delete_then_resume)
+    assert chat_service.compact_session(session_id) is None
+    monkeypatch.undo()
+
+    session = chat_service.get_session_by_id(session_id)
+    assert session["state"] == TaskState.PROCESSING
+    assert "compressed_at" not in session and "compaction_lease" not in session
+    assert chat_service.bundles_collection.count_documents({}) == 0
+    assert [m["message"] for m in chat_service.get_session_messages(session_id)] == [
+        "m0",
+        "m1",
+        "m2",
+    ]
+
+
+def test_orphan_bundles_are_recovered(chat_service):
+    """Bundles left by a compaction that died before archiving its session"""
+    session_id = chat_service.create_chat_session("u1", "Old task")
+    for i in range(3):
+        chat_service.add_message(session_id, "u1", "user", f"m{i}")
+    query = {"session_id": session_id}
+    _, count, compressed = chat_service._pack(chat_service.raw_chat_collection, query)
+    for i in range(3, 5):
+        chat_service.add_message(session_id, "u1", "user", f"m{i}")
+    # Older than anything the moves below stamp as their cutoff
+    chat_service.chat_collection.update_many(
+        {}, {"$set": {"timestamp": datetime.utcnow() - timedelta(hours=1)}}
+    )
+
+    def leave_orphan():
+        """What a run that died right after its insert_one leaves behind"""
+        token, long_ago = ObjectId(), datetime.utcnow() - timedelta(days=1)
+        chat_service.bundles_collection.insert_one(
+            {
+                "_id": session_id,
+                "message_count": count,
+                "data": compressed,
+                "compaction_token": token,
+                "created_at": long_ago,
+            }
+        )
+        chat_service.sessions_collection.update_one(
+            {"_id": ObjectId(session_id)},
+            {"$set": {"compaction_lease": {"token": token, "expires_at": long_ago}}},
+        )
+
+    # An archived session is still read from its messages, not the stale bundle
+    leave_orphan()
+    chat_service.archive_sessions([session_id], "u1")
+    page = chat_service.get_session_page(session_id)
+    assert sorted(m["message"] for m in page) == [f"m{i}" for i in range(5)]
+
+    # and compaction clears the orphan instead of tripping over it
+    result = chat_service.compact_session(session_id)
+    assert result["messages"] == 5, (
+        result,
+        chat_service.chat_collection.count_documents({}),
+    )
+    assert chat_service.archive_collection.count_documents({}) == 0
+    chat_service.set_session_processing(session_id)
+
+    # A run that died after deleting the messages: the next turn restores them
+    chat_service.set_session_complete(session_id)
+    leave_orphan()
+    chat_service.chat_collection.delete_many({"message": {"$in": ["m0", "m1", "m2"]}})
+    chat_service.set_session_processing(session_id)
+    assert chat_service.bundles_collection.count_documents({}) == 0
+    assert "compaction_lease" not in chat_service.get_session_by_id(session_id)
+    messages = chat_service.get_session_messages(session_id)
+    assert sorted(m["message"] for m in messages) == [f"m{i}" for i in range(5)]
@@ -0,0 +1,199 @@
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, ToolMessage
+from starlette.websockets import WebSocketDisconnect
+
+from services.chat_socket import ChatSocketManager
+from services.turn_worker import TurnWorker
+
+
+class FakeChatService:
+    """In-memory sessions and messages; counts reads"""
+
+    def __init__(self, history):
+        self.session = {
+            "_id": "s1",
+            "user_id": "u1",
+            "state": 0,
+            "message_count": len(history),
+        }
+        self.messages = list(history)
+        self.states = []
+        self.reads = 0
+
+    def get_session_by_id(self, session_id, projection=None):
+        self.reads += 1
+        return dict(self.session) if session_id == "s1" else None
+
+    def get_recent_messages(self, session_id, limit=50, session=None):
+        # Served from the session document's tail when session is passed
+        if session is None:
+            self.reads += 1
+        return self.messages[-limit:]
+
+    def add_message(self, session_id, user_id, role, message, metadata=None):
+        self.messages.append({"role": role, "message": message})
+        self.session["message_count"] += 1
+        return f"m{len(self.messages)}"
+
+    def set_session_processing(self, session_id):
+        self.states.append(-1)
+
+    def set_session_require_permission(self, session_id):
+        self.states.append(0)
+
+
+class FakeUsers:
+    def __init__(self):
+        self.lookups = 0
+
+    def get_user_by_email(self, email):
+        self.lookups += 1
+        return {"id": "u1"} if email == "a@example.com" else None
+
+
+class FakeAgent:
+    built = 0
+    checkpointed = False
+    instances = []
+
+    def __init__(self, selected_tools=None):
+        FakeAgent.built += 1
+        FakeAgent.instances.append(self)
+        self.histories = []
+
+    async def has_checkpoint(self, session_id):
+        return self.checkpointed
+
+    async def process_message(
+        self,
+        text,
+        conversation_history=None,
+        user_id=None,
+        session_id=None,
+        on_step=None,
+    ):
+        self.histories.append(len(conversation_history))
+        await on_step(
+            [
+                AIMessage(
+                    content="",
+                    name="executor_agent",
+                    tool_calls=[{"name": "gmail_mcp", "args": {}, "id": "c1"}],
+                )
+            ]
+        )
+        await on_step([ToolMessage(content="{}", name="gmail_mcp", tool_call_id="c1")])
+        return f"done: {text}"
+
+
+@pytest.fixture
+def socket_app():
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "message": f"old {i}"}
+        for i in range(60)
+    ]
+    chat_service, users = FakeChatService(history), FakeUsers()
+    manager = ChatSocketManager(max_connections=1)
+    turns = TurnWorker(shared=False, max_per_user=1)
+    FakeAgent.built, FakeAgent.checkpointed, FakeAgent.instances = 0, False, []
+
+    app = FastAPI()
+
+    @app.websocket("/tasks/{task_id}/ws")
+    async def chat_socket(websocket: WebSocket, task_id: str, email: str):
+        await manager.serve(
+            websocket,
+            task_id,
+            email,
+            chat_service=chat_service,
+            users=users,
+            agent_factory=FakeAgent,
+            turns=turns,
+        )
+
+    with mock.patch("services.chat_socket.is_mongodb_available", lambda: True):
+        yield TestClient(app), chat_service, users, manager, turns
+
+
+def test_socket_authenticates_once_and_streams_turns(socket_app):
+    client, chat_service, users, manager, turns = socket_app
+
+    with client.websocket_connect("/tasks/s1/ws?email=a@example.com") as ws:
+        ready = ws.receive_json()
+        assert ready["type"] == "ready" and ready["message_count"] == 60
+
+        for turn in range(3):
+            ws.send_json({"message": f"hello {turn}", "selected_tools": ["gmail_mcp"]})
+            events = [ws.receive_json() for _ in range(4)]
+            assert [e["type"] for e in events] == [
+                "accepted",
+                "tool_call",
+                "tool_result",
+                "reply",
+            ]
+            assert events[-1]["message"] == f"done: hello {turn}"
+        assert manager.stats()["active"] == 1
+
+    # One user lookup and one session read (history from its tail) for three turns
+    assert users.lookups == 1 and chat_service.reads == 1
+    assert FakeAgent.built == 1
+    assert len(chat_service.messages) == 66
+    assert chat_service.states == [-1, 0] * 3
+    assert manager.stats()["turns"] == 3 and manager.stats()["active"] == 0
+
+
+def test_socket_refuses_other_users_and_extra_connections(socket_app):
+    client, _, _, manager, _ = socket_app
+
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/tasks/s1/ws?email=b@example.com") as ws:
+            ws.receive_json()
+    assert refused.value.code == 1008
+
+    with client.websocket_connect("/tasks/s1/ws?email=a@example.com") as ws:
+        ws.receive_json()
+        with pytest.raises(WebSocketDisconnect) as busy:
+            with client.websocket_connect("/tasks/s1/ws?email=a@example.com") as extra:
+                extra.receive_json()
+        assert busy.value.code == 1013
+        ws.send_json({"selected_tools": []})
+        assert ws.receive_json()["type"] == "error"
+    assert manager.stats()["refused"] == 2
+
+
+def test_socket_turns_share_the_per_user_turn_limit(socket_app):
+    client, chat_service, users, manager, turns = socket_app
+    turns._user_inflight["u1"] = 1  # e.g. a background turn from POST /tasks
+
+    with client.websocket_connect("/tasks/s1/ws?email=a@example.com") as ws:
+        ws.receive_json()
+        ws.send_json({"message": "hello"})
+        error = ws.receive_json()
+        assert error["type"] == "error" and "turns in progress" in error["detail"]
+
+        # Nothing was stored, and the turn runs once the other one finishes
+        assert len(chat_service.messages) == 60 and chat_service.states == []
+        turns._user_inflight.clear()
+        ws.send_json({"message": "hello"})
+        assert [ws.receive_json()["type"] for _ in range(4)][-1] == "reply"
+
+    assert turns._user_inflight == {}
+    assert manager.stats()["rejected_turns"] == 1
+
+
+def test_socket_drops_warm_history_once_checkpointed(socket_app):
+    client, chat_service, users, manager, turns = socket_app
+    FakeAgent.checkpointed = True
+
+    with client.websocket_connect("/tasks/s1/ws?email=a@example.com") as ws:
+        ws.receive_json()
+        for turn in range(2):
+            ws.send_json({"message": f"hello {turn}"})
+            [ws.receive_json() for _ in range(4)]
+
+    # The checkpoint holds the history, so only the first turn was sent any
+    assert FakeAgent.instances[0].histories == [50, 0]
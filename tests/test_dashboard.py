@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+import httpx  # noqa: E402
+
+from services.dashboard import gather_branches  # noqa: E402
+
+
+async def value_after(delay, value):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def failing():
+    raise RuntimeError("calendar unavailable")
+
+
+def test_branches_run_concurrently_and_fail_independently():
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results, errors = await gather_branches(
+            {
+                "tasks": (value_after(0.05, ["t1"]), 1.0),
+                "authorization": (value_after(0.05, {"gmail": True}), 1.0),
+                "slow": (value_after(5, "never"), 0.1),
+                "broken": (failing(), 1.0),
+            }
+        )
+        return results, errors, loop.time() - started
+
+    results, errors, elapsed = asyncio.run(run())
+
+    assert results["tasks"] == ["t1"]
+    assert results["authorization"] == {"gmail": True}
+    assert results["slow"] is None and results["broken"] is None
+    assert errors == {
+        "slow": "timed out after 0.1s",
+        "broken": "calendar unavailable",
+    }
+    # Bounded by the slowest timeout, not the sum of the branches
+    assert elapsed < 0.5
+
+
+class BlockingLambdaClient:
+    """boto3 Lambda client stand-in: invoke blocks like a slow cold start"""
+
+    def invoke(self, FunctionName, Payload):
+        time.sleep(1)
+        raise RuntimeError("not reached in time")
+
+
+def test_slow_calendar_lambda_does_not_block_the_dashboard(monkeypatch):
+    import main
+    from services.calendar_lambda_service import calendar_lambda_service
+
+    monkeypatch.setattr(main, "is_mongodb_available", lambda: True)
+    monkeypatch.setattr(
+        main.user_service, "get_user_by_id", lambda user_id: {"id": user_id}
+    )
+    monkeypatch.setattr(
+        main.ChatService, "get_user_sessions", lambda self, *a, **kw: []
+    )
+    monkeypatch.setattr(
+        main.auth_status, "get_status", lambda *a, **kw: {"authorized": True}
+    )
+    # No event cache, so the agenda is a live Lambda call
+    monkeypatch.setattr(main.calendar_sync, "_sync_state", None)
+    monkeypatch.setattr(
+        "services.calendar_sync.get_calendar_sync_state_collection", lambda: None
+    )
+    monkeypatch.setattr(
+        calendar_lambda_service, "lambda_client", BlockingLambdaClient()
+    )
+    monkeypatch.setattr(main, "DASHBOARD_EVENTS_TIMEOUT_SECONDS", 0.1)
+
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            started = time.monotonic()
+            response = await client.get("/dashboard", params={"user_id": "u1"})
+            return response.json(), time.monotonic() - started
+
+    body, elapsed = asyncio.run(request())
+
+    assert body["tasks"] == []
+    assert body["upcoming_events"] is None
+    assert body["errors"] == {"upcoming_events": "timed out after 0.1s"}
+    # The event timeout fired while invoke was still blocked in its thread
+    assert elapsed < 0.8
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httplib2
+import pytest
+from dotenv import load_dotenv
+from googleapiclient.errors import HttpError
+from pymongo import MongoClient
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+from test_lambda_credentials import FakeTable, load_server, token_item  # noqa: E402
+
+from services.gmail_sync import GmailSyncService, parse_query  # noqa: E402
+
+load_dotenv()
+
+
+def raw_message(message_id, subject, labels=("INBOX", "UNREAD"), minutes_ago=0):
+    sent = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "labelIds": list(labels),
+        "snippet": f"{subject} ...",
+        "internalDate": str(int(sent.timestamp() * 1000)),
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": "Ana <ana@example.com>"},
+            ]
+        },
+    }
+
+
+def not_found():
+    return HttpError(httplib2.Response({"status": 404}), b"Not Found")
+
+
+class FakeCall:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def execute(self):
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class FakeBatch:
+    def __init__(self, api, callback):
+        self.api = api
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.api.batches += 1
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeGmailApi:
+    """Gmail service stand-in: a mailbox (newest first) and a history log"""
+
+    def __init__(self, mailbox, history=None):
+        self.mailbox = {message["id"]: message for message in mailbox}
+        self.order = [message["id"] for message in mailbox]
+        self.history_records = history
+        self.batches = 0
+
+    def users(self):
+        return self
+
+    def getProfile(self, userId):
+        return FakeCall({"historyId": "100"})
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return FakeHistory(self)
+
+    def list(self, userId, maxResults, pageToken=None, q=None):
+        start = int(pageToken or 0)
+        page = {"messages": [{"id": i} for i in self.order[start : start + maxResults]]}
+        if start + maxResults < len(self.order):
+            page["nextPageToken"] = str(start + maxResults)
+        return FakeCall(page)
+
+    def get(self, userId, id, **params):
+        if id not in self.mailbox:
+            return FakeCall(error=not_found())
+        return FakeCall(self.mailbox[id])
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class FakeHistory:
+    def __init__(self, api):
+        self.api = api
+
+    def list(self, userId, startHistoryId, **params):
+        if self.api.history_records is None:
+            return FakeCall(error=not_found())
+        return FakeCall({"history": self.api.history_records, "historyId": "120"})
+
+
+def gmail_server(api):
+    server = load_server("gmail")
+    server.table = FakeTable({("u1", "gmail"): token_item("t1", timedelta(hours=1))})
+    server.get_service = lambda user_id, credentials: api
+    return server
+
+
+def call_sync(server, **arguments):
+    response = server.handle_request(
+        {
+            "id": "s",
+            "method": "tools/call",
+            "params": {
+                "name": "sync_messages",
+                "arguments": {"user_id": "u1", **arguments},
+                "encoding": "structured",
+            },
+        }
+    )
+    return response["result"]["structuredContent"]
+
+
+def test_full_sync_indexes_the_newest_messages_in_one_batch():
+    api = FakeGmailApi([raw_message(f"m{i}", f"Hello {i}") for i in range(3)])
+    changes = call_sync(gmail_server(api), max_messages=2)
+
+    assert changes["full_sync"] is True
+    assert changes["complete"] is False
+    assert changes["history_id"] == "100"
+    assert [m["id"] for m in changes["messages"]] == ["m0", "m1"]
+    assert changes["messages"][0]["sender"] == "Ana <ana@example.com>"
+    assert api.batches == 1
+
+
+def test_history_sync_returns_only_changes():
+    history = [
+        {"messagesAdded": [{"message": {"id": "m4"}}]},
+        {"labelsRemoved": [{"message": {"id": "m1", "labelIds": ["INBOX"]}}]},
+        {"messagesDeleted": [{"message": {"id": "m2"}}]},
+        # Arrived and deleted between syncs: never fetched
+        {"messagesAdded": [{"message": {"id": "m5"}}]},
+        {"messagesDeleted": [{"message": {"id": "m5"}}]},
+    ]
+    api = FakeGmailApi([raw_message("m4", "New"), raw_message("m1", "Old")], history)
+    changes = call_sync(gmail_server(api), history_id="90")
+
+    assert changes["full_sync"] is False
+    assert [m["id"] for m in changes["messages"]] == ["m4"]
+    assert changes["labels"] == {"m1": ["INBOX"]}
+    assert changes["deleted"] == ["m2", "m5"]
+    assert changes["history_id"] == "120"
+
+    # More new messages than one sync indexes: start over with a full sync
+    api.history_records = [
+        {"messagesAdded": [{"message": {"id": "m4"}}]},
+        {"messagesAdded": [{"message": {"id": "m1"}}]},
+    ]
+    changes = call_sync(gmail_server(api), history_id="90", max_messages=1)
+    assert changes["full_sync"] is True
+    assert changes["complete"] is False
+
+    # Gmail no longer has the history: start over with a full sync
+    api.history_records = None
+    assert call_sync(gmail_server(api), history_id="1")["full_sync"] is True
+
+
+def test_query_parser_covers_common_searches_only():
+    conditions = parse_query("in:inbox is:unread from:ana")
+    assert conditions["labels"] == {
+        "$nin": ["SPAM", "TRASH"],
+        "$all": ["INBOX", "UNREAD"],
+    }
+    assert conditions["sender"]["$regex"] == "ana"
+    assert parse_query("") == {"labels": {"$nin": ["SPAM", "TRASH"]}}
+    assert "$gte" in parse_query("newer_than:2d")["internal_date"]
+
+    # Full syncs do not list spam and trash, so those searches go to Gmail
+    for query in (
+        "invoice",
+        '"exact phrase"',
+        "-in:inbox",
+        "has:attachment",
+        "in:spam",
+        "in:trash",
+    ):
+        assert parse_query(query) is None
+
+
+class FakeGmailLambda:
+    """Gmail Lambda service stand-in that replays scripted sync_messages results"""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.history_ids = []
+        self.live_searches = 0
+        self.write_listeners = []
+
+    async def sync_messages(self, user_id, history_id=None):
+        self.history_ids.append(history_id)
+        return {"status": "success", "data": self.changes.pop(0)}
+
+    async def get_gmail_messages(self, **kwargs):
+        self.live_searches += 1
+        return {"status": "success", "data": {"messages": [], "source": "live"}}
+
+
+def indexed(message_id, subject, labels=("INBOX", "UNREAD"), minutes_ago=0):
+    raw = raw_message(message_id, subject, labels, minutes_ago)
+    return {
+        "id": message_id,
+        "thread_id": raw["threadId"],
+        "subject": subject,
+        "sender": "Ana <ana@example.com>",
+        "date": "Mon, 3 Mar 2025 10:00:00 +0000",
+        "snippet": raw["snippet"],
+        "labels": raw["labelIds"],
+        "internal_date": int(raw["internalDate"]),
+    }
+
+
+@pytest.fixture
+def collections():
+    """Throwaway message index and sync state collections in the test database"""
+    mongodb_url = os.getenv("MONGODB_URL")
+    if not mongodb_url:
+        pytest.skip("MONGODB_URL not configured")
+
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    db = client[os.getenv("MONGODB_DATABASE", "easydo_test")]
+    suffix = uuid.uuid4().hex[:8]
+    messages = db[f"test_gmail_messages_{suffix}"]
+    sync_state = db[f"test_gmail_sync_state_{suffix}"]
+    yield messages, sync_state
+    messages.drop()
+    sync_state.drop()
+    client.close()
+
+
+def test_searches_are_answered_from_the_index(collections):
+    messages, sync_state = collections
+    lambda_service = FakeGmailLambda(
+        [
+            {
+                "messages": [
+                    indexed("m1", "Lunch?", minutes_ago=5),
+                    indexed("m2", "Invoice", labels=["INBOX"], minutes_ago=10),
+                    indexed("m3", "Spam", labels=["SPAM"], minutes_ago=1),
+                ],
+                "labels": {},
+                "deleted": [],
+                "history_id": "100",
+                "full_sync": True,
+                "complete": True,
+            },
+            {
+                "messages": [indexed("m4", "Re: Lunch?")],
+                "labels": {"m1": ["INBOX"]},
+                "deleted": ["m2"],
+                "history_id": "120",
+                "full_sync": False,
+            },
+        ]
+    )
+    sync = GmailSyncService(messages, sync_state, lambda_service)
+
+    data = asyncio.run(sync.get_messages("u1", "in:inbox"))["data"]
+    assert data["source"] == "cache"
+    assert [m["id"] for m in data["messages"]] == ["m1", "m2"]
+    unread = asyncio.run(sync.get_messages("u1", "is:unread"))["data"]
+    assert [m["id"] for m in unread["messages"]] == ["m1"]
+
+    # Sending mail marks the user dirty; the next read applies the history
+    sync.mark_dirty("u1")
+    unread = asyncio.run(sync.get_messages("u1", "is:unread"))["data"]
+    assert lambda_service.history_ids == [None, "100"]
+    assert [m["id"] for m in unread["messages"]] == ["m4"]
+    assert messages.count_documents({"message_id": "m2"}) == 0
+
+    # Full-text search still goes to Gmail
+    asyncio.run(sync.get_messages("u1", "lunch"))
+    assert lambda_service.live_searches == 1
+
+
+def test_mail_sent_from_another_process_makes_the_next_read_sync(collections):
+    messages, sync_state = collections
+    full = {
+        "messages": [indexed("m1", "Lunch?")],
+        "labels": {},
+        "deleted": [],
+        "history_id": "100",
+        "full_sync": True,
+        "complete": True,
+    }
+    delta = {
+        "messages": [indexed("m2", "Re: Lunch?", labels=["SENT"])],
+        "labels": {},
+        "deleted": [],
+        "history_id": "110",
+        "full_sync": False,
+    }
+    lambda_service = FakeGmailLambda([full, delta])
+    reader = GmailSyncService(messages, sync_state, lambda_service)
+    writer = GmailSyncService(messages, sync_state, FakeGmailLambda([]))
+    asyncio.run(reader.get_messages("u1", "in:inbox", max_results=1))
+
+    writer.mark_dirty("u1")  # e.g. POST /gmail/send on another worker
+    sent = asyncio.run(reader.get_messages("u1", "in:sent", max_results=1))["data"]
+    assert [m["id"] for m in sent["messages"]] == ["m2"]
+    assert lambda_service.history_ids == [None, "100"]
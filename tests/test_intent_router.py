@@ -0,0 +1,95 @@
+import asyncio
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+import pytest  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from agents import MultiAgentSupervisor  # noqa: E402
+from fake_llm import FakeChatModel, agent_name  # noqa: E402
+from utils.intent_router import (  # noqa: E402
+    IntentRouter,
+    format_tool_reply,
+    time_window,
+)
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("List my calendars", ("tool", "list-calendars")),
+        ("What meetings do I have tomorrow?", ("tool", "list-events")),
+        ("Show my unread emails", ("tool", "get_messages")),
+        ("Send an email to bob@example.com saying hi", ("agent", "executor_agent")),
+        ("Schedule a meeting with Sam on Friday at 3pm", ("agent", "executor_agent")),
+        ("Search the latest news about SpaceX", ("agent", "retriever_agent")),
+        ("Find flights to Paris and add them to my calendar", None),
+        ("Hello there", None),
+        # Constraints the tool call cannot carry go to an agent
+        ("Do I have any meetings with John tomorrow?", None),
+        ("show my emails about the invoice", None),
+        ("email from my landlord about rent", None),
+        ("what events do I have in march", None),
+        ("When is my dentist appointment?", None),
+        ("list events in my work calendar", None),
+    ],
+)
+def test_classify(router, message, expected):
+    route = router.classify(message)
+    if expected is None:
+        assert route is None
+    else:
+        assert (route["kind"], route.get("action", route["target"])) == expected
+
+
+def test_gmail_query_consumes_filters(router):
+    route = router.classify("show unread emails from john")
+    assert route["args"]["query"] == "is:unread from:john"
+
+
+def test_time_window_uses_user_time_zone():
+    """ "today" ends at the user's midnight, not the server's"""
+    tz = ZoneInfo("America/Los_Angeles")
+    now = datetime(2025, 3, 1, 22, 0, tzinfo=tz)
+    window = time_window({"today"}, now=now, tz=tz)
+    assert window["timeMax"] == "2025-03-02T00:00:00-08:00"
+
+
+def test_follow_ups_go_to_supervisor(router):
+    """Anaphora needs conversation context, so it is never fast-pathed"""
+    history = [HumanMessage(content="Draft an email to Sam")]
+    assert router.classify("Yes, send it", history) is None
+
+
+def test_tool_reply_falls_back_on_errors():
+    route = {"action": "list-calendars"}
+    ok = {"status": "success", "data": {"calendars": [{"name": "Work"}]}}
+    assert "Work" in format_tool_reply(route, ok)
+    assert format_tool_reply(route, {"status": "error", "message": "boom"}) is None
+    assert format_tool_reply(route, "not a dict") is None
+
+
+def test_agent_fast_path_skips_supervisor():
+    """A routed action starts at the executor and ends there if it answers"""
+
+    def responder(messages):
+        return AIMessage(content=f"{agent_name(messages)} handled it")
+
+    llm = FakeChatModel(responder=responder, calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm)
+    reply = asyncio.run(
+        supervisor.process_message("Send an email to bob@example.com saying hi")
+    )
+
+    assert reply == "executor_agent handled it"
+    assert [agent_name(call) for call in llm.calls] == ["executor_agent"]
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from utils.json_response import OrjsonResponse
+
+
+class CalendarResponse(BaseModel):
+    status: str
+    data: Optional[dict] = None
+    message: Optional[str] = None
+
+
+def session_payload(count):
+    return {
+        "id": "665f1c2e9b1e8a3d4c5b6a79",
+        "created_at": datetime(2025, 6, 1, 9, 30, 0, 123000),
+        "messages": [
+            {"role": ("user", "assistant")[i % 2], "message": f"message {i} – ✓"}
+            for i in range(count)
+        ],
+    }
+
+
+def test_matches_jsonable_encoder_output():
+    payload = session_payload(5)
+    legacy = JSONResponse(jsonable_encoder(payload)).body
+    assert OrjsonResponse(payload).body == legacy
+
+    event = {"start": datetime(2025, 6, 1, 9, 0, tzinfo=timezone.utc), "n": None}
+    model = CalendarResponse(status="success", data={"events": [event]})
+    assert OrjsonResponse(model).body == JSONResponse(jsonable_encoder(model)).body
+
+
+def test_object_ids_and_sets_are_rendered():
+    object_id = ObjectId("665f1c2e9b1e8a3d4c5b6a79")
+    body = OrjsonResponse({"_id": object_id, "labels": {"INBOX"}, 3: "x"}).body
+    assert body == b'{"_id":"665f1c2e9b1e8a3d4c5b6a79","labels":["INBOX"],"3":"x"}'
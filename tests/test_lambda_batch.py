@@ -0,0 +1,102 @@
+import asyncio
+import io
+import json
+import os
+from datetime import timedelta
+
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("EASYDOAI_GOOGLE_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("EASYDOAI_GOOGLE_REDIRECT_URI", "http://localhost/callback")
+
+from test_lambda_credentials import FakeTable, load_handler, token_item  # noqa: E402
+
+from services.calendar_lambda_service import CalendarLambdaService  # noqa: E402
+
+
+class FakeCalendarApi:
+    """Stands in for the built Calendar service; counts API executions"""
+
+    def __init__(self):
+        self.executions = 0
+
+    def calendarList(self):
+        return self
+
+    def list(self):
+        return self
+
+    def execute(self):
+        self.executions += 1
+        return {"items": [{"id": "primary", "summary": "Me", "primary": True}]}
+
+
+class FakeLambdaClient:
+    """Routes invoke() straight into the Lambda handler"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.invocations = 0
+
+    def invoke(self, FunctionName, Payload):
+        self.invocations += 1
+        response = self.handler.lambda_handler(json.loads(Payload), None)
+        return {"Payload": io.BytesIO(json.dumps(response).encode())}
+
+
+def calendar_service_with_fakes():
+    handler = load_handler("google_calendar")
+    server = handler.mcp_server
+    server.table = FakeTable(
+        {("u1", "google_calendar"): token_item("t1", timedelta(hours=1))}
+    )
+    api = FakeCalendarApi()
+    built = []
+
+    def get_service(user_id, credentials):
+        built.append(credentials)
+        return api
+
+    server.get_service = get_service
+
+    service = CalendarLambdaService()
+    service.lambda_client = FakeLambdaClient(handler)
+    return service, server, api, built
+
+
+def test_batch_runs_in_one_invocation_with_shared_credentials():
+    service, server, api, built = calendar_service_with_fakes()
+    calls = [
+        {"name": "list_calendars", "arguments": {}, "fields": ["id"]},
+        {"name": "list_calendars", "arguments": {}},
+        {"name": "delete_everything", "arguments": {}},
+    ]
+
+    results = asyncio.run(service.call_tools_batch("u1", calls))
+
+    assert service.lambda_client.invocations == 1
+    assert server.table.reads == 1
+    assert api.executions == 2
+    assert built[0] is built[1]
+    assert results[0] == {
+        "status": "success",
+        "data": {"success": True, "calendars": [{"id": "primary"}], "total": 1},
+    }
+    assert results[1]["data"]["calendars"][0]["name"] == "Me"
+    assert results[2]["status"] == "error"
+
+
+def test_batch_shares_one_authorization_url():
+    service, server, api, built = calendar_service_with_fakes()
+    server.table = FakeTable({})
+    calls = [{"name": "list_calendars", "arguments": {}}] * 2
+
+    results = asyncio.run(service.call_tools_batch("u1", calls))
+
+    assert [result["status"] for result in results] == ["authentication_required"] * 2
+    assert results[0]["state"] == results[1]["state"]
+
+
+def test_handler_rejects_empty_and_malformed_batches():
+    handler = load_handler("gmail")
+    assert handler.lambda_handler([], None)["error"]["code"] == -32600
+    assert handler.lambda_handler(["nope"], None)[0]["error"]["code"] == -32600
@@ -0,0 +1,109 @@
+import importlib.util
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from botocore.exceptions import ClientError
+from google.oauth2.credentials import Credentials
+
+SERVERS = {
+    "gmail": "lambda_mcp_servers/gmail_lambda/gmail_server.py",
+    "google_calendar": "lambda_mcp_servers/calendar_lambda/calendar_server.py",
+}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeTable:
+    """DynamoDB token table: counts reads, honours access_token conditions"""
+
+    def __init__(self, items):
+        self.items = items
+        self.reads = 0
+
+    def get_item(self, Key):
+        self.reads += 1
+        item = self.items.get((Key["user_id"], Key["service"]))
+        return {"Item": dict(item)} if item else {}
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        item = self.items[(Key["user_id"], Key["service"])]
+        if item["access_token"] != ExpressionAttributeValues[":previous"]:
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+            )
+        item["access_token"] = ExpressionAttributeValues[":token"]
+        item["expires_at"] = ExpressionAttributeValues[":expires"]
+
+
+def load_handler(service):
+    """Fresh Lambda handler module with its MCP server already loaded"""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location(
+        f"test_{service}_handler", os.path.join(ROOT, SERVERS[service])
+    )
+    handler = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(handler)
+    handler.lambda_handler({"id": "t", "method": "tools/list"}, None)
+    return handler
+
+
+def load_server(service):
+    return load_handler(service).mcp_server
+
+
+def token_item(token, expires_in):
+    return {
+        "access_token": token,
+        "refresh_token": "refresh",
+        "scope": "https://www.googleapis.com/auth/calendar",
+        "expires_at": (datetime.utcnow() + expires_in).isoformat(),
+    }
+
+
+@pytest.mark.parametrize("service", SERVERS)
+def test_one_dynamodb_read_per_token_lifetime(service):
+    server = load_server(service)
+    server.table = FakeTable({("u1", service): token_item("t1", timedelta(hours=1))})
+
+    first = server.get_user_credentials("u1")
+    second = server.get_user_credentials("u1")
+    assert first is second
+    assert first.token == "t1"
+    assert server.table.reads == 1
+
+    # Once the cached token expires the record is read again
+    first.expiry = datetime.utcnow() - timedelta(seconds=1)
+    server.get_user_credentials("u1")
+    assert server.table.reads == 2
+
+
+def refresh_to(token, before=None):
+    """Credentials.refresh stand-in that hands out the given access token"""
+
+    def refresh(credentials, request):
+        if before:
+            before()
+        credentials.token = token
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    return refresh
+
+
+def test_refresh_does_not_clobber_a_concurrent_refresh(monkeypatch):
+    server = load_server("gmail")
+    item = token_item("old", timedelta(minutes=-5))
+    server.table = FakeTable({("u1", "gmail"): item})
+
+    # Another container stores its own refresh while this one is in flight
+    concurrent = refresh_to("mine", before=lambda: item.update(access_token="theirs"))
+    monkeypatch.setattr(Credentials, "refresh", concurrent)
+    credentials = server.get_user_credentials("u1")
+    assert credentials.token == "mine"
+    assert item["access_token"] == "theirs"
+
+    # Without a concurrent writer the refreshed token is stored
+    item.update(token_item("old", timedelta(minutes=-5)))
+    server.credentials_cache.clear()
+    monkeypatch.setattr(Credentials, "refresh", refresh_to("new"))
+    server.get_user_credentials("u1")
+    assert item["access_token"] == "new"
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+from services.llm_scheduler import (
+    LLMScheduler,
+    Priority,
+    SharedTokenBucket,
+    TokenBucket,
+    current_turn,
+    llm_turn,
+)
+
+
+def test_token_bucket_reports_wait_when_empty():
+    bucket = TokenBucket("requests", rate_per_minute=60)
+    assert bucket.reserve(60) == 0
+    wait = bucket.reserve(1)
+    assert 0.9 < wait <= 1.0
+    bucket.adjust(5)
+    assert bucket.reserve(5) == 0
+
+
+def test_shared_bucket_is_shared_between_instances(tmp_path):
+    """Two workers pointing at the same state dir draw from one bucket"""
+    first = SharedTokenBucket("tokens", 100, str(tmp_path))
+    second = SharedTokenBucket("tokens", 100, str(tmp_path))
+    assert first.reserve(80) == 0
+    assert second.reserve(80) > 0
+    assert second.reserve(20) == 0
+
+
+def test_shared_buckets_are_locked_off_the_event_loop(tmp_path):
+    """The file lock is taken in a worker thread, never on the loop"""
+    scheduler = LLMScheduler(
+        requests_per_minute=1000, tokens_per_minute=100000, state_dir=str(tmp_path)
+    )
+    threads = []
+    reserve = scheduler.token_bucket.reserve
+
+    def recording_reserve(amount):
+        threads.append(threading.get_ident())
+        return reserve(amount)
+
+    scheduler.token_bucket.reserve = recording_reserve
+
+    async def scenario():
+        for _ in range(3):
+            await scheduler.acquire("u", 10, Priority.NEW)
+            scheduler.release(10, 5)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 3 and loop_thread not in threads
+    assert scheduler.stats()["active"] == 0
+
+
+def test_turn_context_marks_follow_up_calls_in_progress():
+    with llm_turn("user-1"):
+        assert current_turn() == {"user_id": "user-1", "priority": Priority.NEW}
+        assert current_turn()["priority"] == Priority.IN_PROGRESS
+    assert current_turn() == {"user_id": "anonymous", "priority": Priority.NEW}
+
+
+def test_in_progress_first_then_round_robin_across_users():
+    """With one slot, waiters are admitted by priority, then fairly per user"""
+
+    async def scenario():
+        scheduler = LLMScheduler(
+            requests_per_minute=1000, tokens_per_minute=100000, max_concurrency=1
+        )
+        order = []
+
+        async def call(user_id, priority, label):
+            await scheduler.acquire(user_id, 10, priority)
+            order.append(label)
+            await asyncio.sleep(0.01)
+            scheduler.release(10, 10)
+
+        # Occupy the only slot so the rest queue up
+        await scheduler.acquire("holder", 10, Priority.NEW)
+        tasks = [
+            asyncio.create_task(call("heavy", Priority.NEW, "heavy-1")),
+            asyncio.create_task(call("heavy", Priority.NEW, "heavy-2")),
+            asyncio.create_task(call("heavy", Priority.NEW, "heavy-3")),
+            asyncio.create_task(call("light", Priority.NEW, "light-1")),
+            asyncio.create_task(call("busy", Priority.IN_PROGRESS, "busy-1")),
+        ]
+        await asyncio.sleep(0.01)
+        scheduler.release(10, 10)
+        await asyncio.gather(*tasks)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order[0] == "busy-1"
+    assert order.index("light-1") < order.index("heavy-2")
+    assert stats["wait_new"]["count"] == 5
+    assert stats["wait_in_progress"]["count"] == 1
+    assert stats["active"] == 0
+
+
+def test_disabled_scheduler_never_waits():
+    async def scenario():
+        scheduler = LLMScheduler(requests_per_minute=1, enabled=False)
+        return [await scheduler.acquire("u", 10, Priority.NEW) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [0.0, 0.0, 0.0]
@@ -0,0 +1,33 @@
+import json
+
+from services.mcp_payload import build_tool_call, decode_tool_result
+
+
+def test_tool_call_asks_for_structured_projected_result():
+    payload = build_tool_call(
+        "gmail_tool_call",
+        "get_gmail_messages",
+        {"user_id": "u1", "max_results": 5},
+        fields=["id", "subject"],
+    )
+    assert payload["method"] == "tools/call"
+    assert payload["params"]["encoding"] == "structured"
+    assert payload["params"]["fields"] == ["id", "subject"]
+    assert "_meta" not in payload["params"]
+
+    plain = build_tool_call("calendar_tool_call", "list_calendars", {"user_id": "u1"})
+    assert "fields" not in plain["params"]
+
+
+def test_structured_result_is_used_as_is():
+    data = {"success": True, "messages": [{"id": "m1"}], "total": 1}
+    assert decode_tool_result({"structuredContent": data}) == data
+
+
+def test_legacy_text_content_is_still_parsed():
+    data = {"success": True, "calendars": [], "total": 0}
+    legacy = {"content": [{"type": "text", "text": json.dumps(data)}]}
+    assert decode_tool_result(legacy) == data
+
+    plain = {"content": [{"type": "text", "text": "not json"}]}
+    assert decode_tool_result(plain) == "not json"
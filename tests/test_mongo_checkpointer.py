@@ -0,0 +1,156 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from pymongo import MongoClient
+
+from agents import MultiAgentSupervisor
+from fake_llm import FakeChatModel, agent_name
+from mongodb_config import CHAT_SESSION_TAIL_SIZE
+from services.mongo_checkpointer import MongoCheckpointSaver
+
+load_dotenv()
+
+
+@pytest.fixture
+def checkpointer():
+    """Checkpointer on throwaway collections in the test database"""
+    mongodb_url = os.getenv("MONGODB_URL")
+    if not mongodb_url:
+        pytest.skip("MONGODB_URL not configured")
+
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    db = client[os.getenv("MONGODB_DATABASE", "easydo_test")]
+    suffix = uuid.uuid4().hex[:8]
+    checkpoints = db[f"test_checkpoints_{suffix}"]
+    writes = db[f"test_checkpoint_writes_{suffix}"]
+    yield MongoCheckpointSaver(checkpoints=checkpoints, writes=writes)
+    checkpoints.drop()
+    writes.drop()
+    client.close()
+
+
+def delegating_responder(crash_retriever):
+    """Supervisor delegates research once, then answers from the result"""
+
+    def responder(messages):
+        name = agent_name(messages)
+        if name == "retriever_agent":
+            if crash_retriever:
+                crash_retriever.pop()
+                raise RuntimeError("worker restarted")
+            return AIMessage(content="Search result: Luigi's has the best pizza.")
+        if "Search result" in str(messages[-1].content):
+            return AIMessage(content=f"Summary: {messages[-1].content}")
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "transfer_to_retriever_agent", "args": {}, "id": "call_1"}
+            ],
+        )
+
+    return responder
+
+
+def test_interrupted_turn_resumes_from_last_completed_node(checkpointer):
+    crash_retriever = [True]
+    llm = FakeChatModel(responder=delegating_responder(crash_retriever), calls=[])
+    supervisor = MultiAgentSupervisor(
+        llm=llm, parallel=False, checkpointer=checkpointer
+    )
+
+    first = asyncio.run(
+        supervisor.process_message(
+            "I need pizza ideas for tonight", session_id="session-1"
+        )
+    )
+    assert "error" in first
+    supervisor_calls = [c for c in llm.calls if agent_name(c) == "supervisor"]
+    assert len(supervisor_calls) == 1
+
+    # Retrying the same turn skips the supervisor step that already completed
+    llm.calls.clear()
+    second = asyncio.run(
+        supervisor.process_message(
+            "I need pizza ideas for tonight", session_id="session-1"
+        )
+    )
+    assert [agent_name(c) for c in llm.calls] == ["retriever_agent", "supervisor"]
+    assert "Luigi's" in second
+
+
+def test_next_turn_reuses_checkpointed_messages(checkpointer):
+    llm = FakeChatModel(responder=delegating_responder([]), calls=[])
+    supervisor = MultiAgentSupervisor(
+        llm=llm, parallel=False, checkpointer=checkpointer
+    )
+    asyncio.run(
+        supervisor.process_message("I need pizza ideas for tonight", session_id="s-2")
+    )
+
+    llm.calls.clear()
+    asyncio.run(
+        supervisor.process_message(
+            "Thanks, anything else?", conversation_history=[], session_id="s-2"
+        )
+    )
+
+    # The earlier tool call and search result are in the next turn's context
+    first_call = llm.calls[0]
+    assert any(isinstance(m, ToolMessage) for m in first_call)
+    assert any("Search result" in str(m.content) for m in first_call)
+
+    checkpointer.delete_thread("s-2")
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "s-2"}}) is None
+
+
+def test_old_checkpoints_are_pruned(checkpointer):
+    llm = FakeChatModel(responder=delegating_responder([]), calls=[])
+    supervisor = MultiAgentSupervisor(
+        llm=llm, parallel=False, checkpointer=checkpointer
+    )
+    for turn in range(3):
+        asyncio.run(
+            supervisor.process_message(f"Pizza ideas, take {turn}", session_id="s-3")
+        )
+
+    query = {"thread_id": "s-3"}
+    roots = list(checkpointer.checkpoints.find({**query, "checkpoint_ns": ""}))
+    assert len(roots) == checkpointer.keep
+    oldest = min(doc["checkpoint_id"] for doc in roots)
+    assert (
+        checkpointer.checkpoints.count_documents(
+            {**query, "checkpoint_id": {"$lt": oldest}}
+        )
+        == 0
+    )
+    assert (
+        checkpointer.writes.count_documents({**query, "checkpoint_id": {"$lt": oldest}})
+        == 0
+    )
+
+
+def test_checkpointed_history_is_trimmed_to_the_session_window():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    llm = FakeChatModel(responder=lambda messages: AIMessage(content="ok"), calls=[])
+    supervisor = MultiAgentSupervisor(
+        llm=llm, parallel=False, checkpointer=InMemorySaver()
+    )
+    for turn in range(40):
+        asyncio.run(supervisor.process_message(f"Note {turn}", session_id="s-4"))
+
+    state = asyncio.run(
+        supervisor.resumable_graph.aget_state({"configurable": {"thread_id": "s-4"}})
+    )
+    messages = state.values["messages"]
+    assert asyncio.run(supervisor.has_checkpoint("s-4"))
+    assert not asyncio.run(supervisor.has_checkpoint("other"))
+    assert len(messages) <= CHAT_SESSION_TAIL_SIZE
+    assert isinstance(messages[0], HumanMessage)
+    assert messages[-2].content.endswith("Note 39")
+    # The model only saw the trimmed window too
+    assert len(llm.calls[-1]) <= CHAT_SESSION_TAIL_SIZE + 1
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agents import MultiAgentSupervisor
+from fake_llm import FakeChatModel, agent_name
+
+
+def dispatch_call(tasks):
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "dispatch_parallel", "args": {"tasks": tasks}, "id": "call_1"}
+        ],
+    )
+
+
+def test_parallel_branches_run_concurrently_and_merge():
+    """Branches meet at a barrier (so they must overlap) and all reach the supervisor"""
+    barrier = threading.Barrier(2, timeout=5)
+    seen_by_supervisor = []
+
+    def responder(messages):
+        name = agent_name(messages)
+        if name == "supervisor":
+            if not any(isinstance(m, ToolMessage) for m in messages):
+                return dispatch_call(
+                    [
+                        {"agent": "retriever_agent", "task": "Search pizza places"},
+                        {"agent": "executor_agent", "task": "List my events today"},
+                        {"agent": "retriever_agent", "task": "Search the weather"},
+                    ]
+                )
+            seen_by_supervisor.extend(messages)
+            return AIMessage(content="Final summary of both branches")
+
+        barrier.wait()  # raises BrokenBarrierError if branches run one by one
+        task = messages[-1].content
+        return AIMessage(content=f"{name} result for: {task}")
+
+    llm = FakeChatModel(responder=responder, calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm, max_parallel_branches=2)
+    final_state = asyncio.run(
+        supervisor.graph.ainvoke(
+            {"messages": [HumanMessage(content="Pizza and my events")]}
+        )
+    )
+
+    branch_results = [
+        m.content
+        for m in seen_by_supervisor
+        if isinstance(m, AIMessage) and m.content.endswith(("places", "today"))
+    ]
+    assert len(branch_results) == 2
+    assert any("Search pizza places" in r for r in branch_results)
+    assert any("List my events today" in r for r in branch_results)
+
+    # The dispatch result appears once and reports the task over the cap
+    dispatch_results = [
+        m for m in final_state["messages"] if isinstance(m, ToolMessage)
+    ]
+    assert len(dispatch_results) == 1
+    assert "Search the weather" in dispatch_results[0].content
+    assert final_state["messages"][-1].content == "Final summary of both branches"
+
+
+def test_parallel_mode_can_be_disabled():
+    llm = FakeChatModel(responder=lambda messages: AIMessage(content="ok"), calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm, parallel=False)
+    tools = supervisor.supervisor_agent.get_graph().nodes["tools"].data.tools_by_name
+    assert "dispatch_parallel" not in tools
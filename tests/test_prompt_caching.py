@@ -0,0 +1,91 @@
+from langchain_core.messages import HumanMessage
+
+from agents import (
+    EXECUTOR_STATIC_PROMPT,
+    PARALLEL_DISPATCH_PROMPT,
+    RETRIEVER_STATIC_PROMPT,
+    SUPERVISOR_STATIC_PROMPT,
+    MultiAgentSupervisor,
+    ScheduledChatAnthropic,
+    build_cached_system_prompt,
+    create_json_calendar_tool,
+    create_json_gmail_tool,
+    estimate_prefix_tokens,
+    prompt_cache_min_tokens,
+)
+from fake_llm import FakeChatModel
+from services.llm_scheduler import llm_turn, record_usage, turn_usage
+
+
+def test_static_prefix_carries_cache_breakpoint():
+    """Only the static instructions are marked for caching; the date follows"""
+    llm = ScheduledChatAnthropic(
+        model="claude-3-5-haiku-20241022", anthropic_api_key="test-key"
+    )
+    system = build_cached_system_prompt(
+        SUPERVISOR_STATIC_PROMPT, "CURRENT DATE CONTEXT:\n- Today's date: 2025-01-01"
+    )
+    payload = llm._get_request_payload([system, HumanMessage(content="hi")])
+
+    static_block, dynamic_block = payload["system"]
+    assert static_block["text"] == SUPERVISOR_STATIC_PROMPT
+    assert static_block["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in dynamic_block
+    assert "2025-01-01" in dynamic_block["text"]
+    assert "2025" not in SUPERVISOR_STATIC_PROMPT
+
+
+def test_breakpoint_is_dropped_below_the_minimum_cacheable_prefix():
+    """claude-3-5-haiku only caches prefixes of 2048+ tokens"""
+    haiku = "claude-3-5-haiku-20241022"
+    assert prompt_cache_min_tokens(haiku) == 2048
+    assert prompt_cache_min_tokens("claude-sonnet-4-20250514") == 1024
+
+    executor_tools = [create_json_gmail_tool(), create_json_calendar_tool()]
+    prefixes = {
+        "retriever": estimate_prefix_tokens(RETRIEVER_STATIC_PROMPT),
+        "executor": estimate_prefix_tokens(EXECUTOR_STATIC_PROMPT, executor_tools),
+        "supervisor": estimate_prefix_tokens(
+            SUPERVISOR_STATIC_PROMPT + PARALLEL_DISPATCH_PROMPT
+        ),
+    }
+    # Today's prefixes are far too short to be cached by haiku
+    assert all(tokens < 2048 for tokens in prefixes.values()), prefixes
+
+    supervisor = MultiAgentSupervisor(
+        llm=FakeChatModel(responder=lambda messages: None)
+    )
+    supervisor.llm = ScheduledChatAnthropic(model=haiku, anthropic_api_key="test-key")
+    system = supervisor._build_system_prompt(EXECUTOR_STATIC_PROMPT, executor_tools)
+    assert "cache_control" not in system.content[0]
+
+    # A prefix that reaches the minimum keeps its breakpoint
+    long_prompt = EXECUTOR_STATIC_PROMPT * 12
+    assert estimate_prefix_tokens(long_prompt, executor_tools) >= 2048
+    system = supervisor._build_system_prompt(long_prompt, executor_tools)
+    assert system.content[0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_cache_tokens_are_recorded_per_turn():
+    with llm_turn("user-1"):
+        record_usage(
+            {
+                "input_tokens": 1200,
+                "output_tokens": 50,
+                "input_token_details": {"cache_creation": 1000},
+            }
+        )
+        record_usage(
+            {
+                "input_tokens": 1300,
+                "output_tokens": 40,
+                "input_token_details": {"cache_read": 1000},
+            }
+        )
+        usage = turn_usage()
+
+    assert usage["calls"] == 2
+    assert usage["cache_creation_tokens"] == 1000
+    assert usage["cache_read_tokens"] == 1000
+    assert usage["input_tokens"] == 2500
+    assert usage["cache_hit_ratio"] == 0.4
@@ -0,0 +1,79 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.response_cache import ResponseCache
+
+
+def make_client(cache, state):
+    """Tiny app whose route versions itself the way GET /tasks does"""
+    app = FastAPI()
+
+    @app.get("/tasks")
+    def tasks(request: Request):
+        cached = cache.lookup(request, "tasks:u1", state["version"])
+        if cached is not None:
+            return cached
+        state["builds"] += 1
+        return cache.store("tasks:u1", state["tasks"], state["version"])
+
+    @app.get("/calendars")
+    def calendars(request: Request):
+        cached = cache.lookup(request, "calendars:u1")
+        if cached is not None:
+            return cached
+        state["builds"] += 1
+        return cache.store("calendars:u1", {"items": state["tasks"]}, ttl=60)
+
+    return TestClient(app)
+
+
+def test_unchanged_version_answers_304_then_cached_body():
+    cache = ResponseCache()
+    state = {"version": "v1", "tasks": [{"id": "s1"}], "builds": 0}
+    client = make_client(cache, state)
+
+    first = client.get("/tasks")
+    etag = first.headers["etag"]
+    assert first.json() == [{"id": "s1"}] and state["builds"] == 1
+
+    revalidated = client.get("/tasks", headers={"If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+
+    # A second tab without the ETag gets the stored bytes, not a rebuild
+    again = client.get("/tasks")
+    assert again.json() == [{"id": "s1"}] and state["builds"] == 1
+
+    state.update(version="v2", tasks=[{"id": "s1"}, {"id": "s2"}])
+    changed = client.get("/tasks", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and len(changed.json()) == 2
+    assert changed.headers["etag"] != etag and state["builds"] == 2
+    assert cache.stats()["not_modified"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_unversioned_bodies_expire_after_their_ttl():
+    cache = ResponseCache()
+    state = {"version": None, "tasks": ["primary"], "builds": 0}
+    client = make_client(cache, state)
+
+    etag = client.get("/calendars").headers["etag"]
+    assert client.get("/calendars", headers={"If-None-Match": etag}).status_code == 304
+
+    cache._entries["calendars:u1"] = cache._entries["calendars:u1"]._replace(
+        expires_at=time.monotonic() - 1
+    )
+    # Same body after expiry, so the body-hash ETag still matches
+    refreshed = client.get("/calendars", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.headers["etag"] == etag
+    assert state["builds"] == 2
+
+
+def test_disabled_cache_always_builds():
+    cache = ResponseCache(enabled=False)
+    state = {"version": "v1", "tasks": [], "builds": 0}
+    client = make_client(cache, state)
+
+    etag = client.get("/tasks").headers["etag"]
+    assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 200
+    assert state["builds"] == 2
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from services.session_events import SessionEvents
+
+
+def test_one_publish_wakes_every_waiter_on_the_session():
+    events = SessionEvents()
+
+    async def waiter(session_id):
+        async with events.listen(session_id) as change:
+            return await events.wait(change, 1.0)
+
+    async def run():
+        waiters = [asyncio.create_task(waiter("s1")) for _ in range(50)]
+        other = asyncio.create_task(waiter("s2"))
+        await asyncio.sleep(0)
+        # All fifty share one future
+        assert events.stats() == {
+            "sessions": 2,
+            "waiters": 51,
+            "published": 0,
+            "delivered": 0,
+        }
+
+        events.publish("s1", {"event": "state", "state": 0})
+        results = await asyncio.gather(*waiters)
+        other.cancel()
+        await asyncio.gather(other, return_exceptions=True)
+        return results
+
+    results = asyncio.run(run())
+    assert results == [{"event": "state", "state": 0}] * 50
+    assert events.stats() == {
+        "sessions": 0,
+        "waiters": 0,
+        "published": 1,
+        "delivered": 50,
+    }
+
+
+def test_publish_from_a_worker_thread_and_timeouts():
+    events = SessionEvents()
+
+    async def run():
+        async with events.listen("s1") as change:
+            assert await events.wait(change, 0.05) is None
+
+            # ChatService writes from sync routes run in the threadpool
+            thread = threading.Thread(
+                target=events.publish, args=("s1", {"event": "message"})
+            )
+            thread.start()
+            result = await events.wait(change, 1.0)
+            thread.join()
+        return result
+
+    assert asyncio.run(run()) == {"event": "message"}
+    assert events.stats()["sessions"] == 0
+
+
+def test_publish_without_listeners_is_a_no_op():
+    events = SessionEvents()
+    events.publish("s1", {"event": "message"})
+    assert events.stats()["published"] == 0
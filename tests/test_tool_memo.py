@@ -0,0 +1,92 @@
+from utils.tool_memo import ToolMemo, normalize_args
+from utils.tool_permissions import is_read_only
+
+
+class FakeLambda:
+    """Counts calls the way a Lambda round trip would be counted"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"status": "success", "data": {"call": self.calls}}
+
+
+def test_reads_are_classified_from_tool_permissions():
+    assert is_read_only("google_calendar_mcp", "list-events")
+    assert is_read_only("gmail_mcp", "get_messages")
+    assert not is_read_only("google_calendar_mcp", "create-event")
+    assert not is_read_only("gmail_mcp", "send_message")
+    assert not is_read_only("gmail_mcp", "draft_email")
+    assert not is_read_only("unknown_tool", "anything")
+
+
+def test_read_results_are_memoized_per_user_and_args():
+    memo = ToolMemo(ttl_seconds=60)
+    fake = FakeLambda()
+    args = {"calendarId": "primary", "timeMin": "2025-01-01T09:00:12.5+00:00"}
+
+    memo.call("google_calendar_mcp", "list-events", "u1", args, fake)
+    # Same window a few seconds later, key order changed: still a hit
+    later = {"timeMin": "2025-01-01T09:00:48+00:00", "calendarId": "primary"}
+    memo.call("google_calendar_mcp", "list-events", "u1", later, fake)
+    assert fake.calls == 1
+
+    memo.call("google_calendar_mcp", "list-events", "u2", args, fake)
+    memo.call("google_calendar_mcp", "list-calendars", "u1", {}, fake)
+    assert fake.calls == 3
+    assert memo.stats()["hits"] == 1
+
+
+def test_writes_invalidate_the_users_cached_reads():
+    memo = ToolMemo(ttl_seconds=60)
+    fake = FakeLambda()
+    memo.call("google_calendar_mcp", "list-events", "u1", {}, fake)
+    memo.call("google_calendar_mcp", "list-events", "u2", {}, fake)
+    memo.call("gmail_mcp", "get_messages", "u1", {"query": ""}, fake)
+
+    memo.call("google_calendar_mcp", "create-event", "u1", {"summary": "x"}, fake)
+    assert fake.calls == 4
+
+    memo.call("google_calendar_mcp", "list-events", "u1", {}, fake)  # refetched
+    memo.call("google_calendar_mcp", "list-events", "u2", {}, fake)  # other user
+    memo.call("gmail_mcp", "get_messages", "u1", {"query": ""}, fake)  # other tool
+    assert fake.calls == 5
+
+
+def test_writes_outside_the_tool_invalidate_watched_reads():
+    """A REST write goes through the Lambda service, not the agent tool"""
+
+    class FakeLambdaService:
+        write_listeners = []
+
+    service = FakeLambdaService()
+    memo = ToolMemo(ttl_seconds=60)
+    memo.watch(service, "google_calendar_mcp")
+    fake = FakeLambda()
+    memo.call("google_calendar_mcp", "list-events", "u1", {}, fake)
+
+    for listener in service.write_listeners:
+        listener("u1")  # e.g. POST /calendar/events
+    memo.call("google_calendar_mcp", "list-events", "u1", {}, fake)
+    assert fake.calls == 2
+
+
+def test_errors_and_expired_entries_are_not_served():
+    memo = ToolMemo(ttl_seconds=0)
+    fake = FakeLambda()
+    memo.call("gmail_mcp", "get_messages", "u1", {}, fake)
+    memo.call("gmail_mcp", "get_messages", "u1", {}, fake)
+    assert fake.calls == 2
+
+    memo = ToolMemo(ttl_seconds=60)
+    failing = lambda: {"status": "error", "message": "Lambda timeout"}  # noqa: E731
+    memo.call("gmail_mcp", "get_messages", "u1", {}, failing)
+    assert memo.stats()["entries"] == 0
+
+
+def test_normalize_args_ignores_user_id_and_empty_values():
+    assert normalize_args({"user_id": "u1", "query": " is:unread ", "x": None}) == (
+        normalize_args({"query": "is:unread"})
+    )
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents import MultiAgentSupervisor
+from fake_llm import FakeChatModel, agent_name
+from services.turn_budget import BudgetReason, TurnBudget, TurnBudgetExceeded
+
+
+def handoff(tool_name, args=None, content=""):
+    return AIMessage(
+        content=content,
+        tool_calls=[{"name": tool_name, "args": args or {}, "id": f"call_{id(args)}"}],
+    )
+
+
+def looping_responder(messages):
+    """Supervisor keeps delegating; the retriever keeps bouncing the task back"""
+    if agent_name(messages) == "supervisor":
+        return handoff("transfer_to_retriever_agent", content="Please research this")
+    return handoff(
+        "report_to_supervisor",
+        {"message": "I can't do actions, please reassign"},
+        content="Found: Luigi's is the best pizza place.",
+    )
+
+
+def test_repeated_handoffs_stop_with_partial_answer():
+    llm = FakeChatModel(responder=looping_responder, calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm, parallel=False)
+    budget = TurnBudget(loop_repeat_limit=3, max_steps=50)
+
+    reply = asyncio.run(
+        supervisor.process_message("Find pizza and invite Sam", budget=budget)
+    )
+
+    assert budget.exhausted == BudgetReason.LOOP
+    assert "stop before" in reply
+    assert "Luigi's is the best pizza place" in reply
+    assert len(llm.calls) < 10  # well before LangGraph's recursion limit
+
+
+def test_step_limit_stops_the_turn():
+    llm = FakeChatModel(responder=looping_responder, calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm, parallel=False)
+    budget = TurnBudget(max_steps=2, loop_repeat_limit=100)
+
+    reply = asyncio.run(supervisor.process_message("Find pizza", budget=budget))
+
+    assert budget.exhausted == BudgetReason.STEPS
+    assert budget.steps == 2
+    assert "stop before" in reply
+
+
+def test_token_and_deadline_limits():
+    budget = TurnBudget(max_tokens=100, deadline_seconds=60)
+    budget.add_tokens(99)
+    budget.check()
+    budget.add_tokens(1)
+    with pytest.raises(TurnBudgetExceeded) as exc:
+        budget.check()
+    assert exc.value.reason == BudgetReason.TOKENS
+
+    expired = TurnBudget(deadline_seconds=0)
+    with pytest.raises(TurnBudgetExceeded) as exc:
+        expired.check()
+    assert exc.value.reason == BudgetReason.DEADLINE
+
+
+def test_token_limit_is_enforced_before_the_next_llm_call():
+    """Usage reported by one call blocks the following call inside the graph"""
+
+    def responder(messages):
+        message = looping_responder(messages)
+        message.usage_metadata = {
+            "input_tokens": 400,
+            "output_tokens": 100,
+            "total_tokens": 500,
+        }
+        return message
+
+    llm = FakeChatModel(responder=responder, calls=[])
+    supervisor = MultiAgentSupervisor(llm=llm, parallel=False)
+    budget = TurnBudget(max_tokens=1000, loop_repeat_limit=100, max_steps=50)
+
+    asyncio.run(supervisor.process_message("Find pizza", budget=budget))
+
+    assert budget.exhausted == BudgetReason.TOKENS
+    assert len(llm.calls) == 2
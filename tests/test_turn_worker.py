@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from mongodb_config import TurnJobStatus
+from services.turn_worker import (
+    TurnWorker,
+    TurnQueueFullError,
+    UserTurnLimitError,
+)
+
+
+def make_worker(handler, failures=None, **kwargs):
+    """Create a worker with fake handlers (no MongoDB or LLM)"""
+    failures = failures if failures is not None else []
+    kwargs.setdefault("shared", False)
+    return TurnWorker(
+        handler=handler,
+        failure_handler=lambda job, error: failures.append((job["_id"], error)),
+        durable=False,
+        **kwargs,
+    )
+
+
+def test_turn_runs_in_background_and_reports_reply():
+    """Submitting returns immediately; the reply is available once the job ends"""
+
+    async def handler(job):
+        await asyncio.sleep(0.01)
+        return f"echo: {job['message']}"
+
+    async def scenario():
+        worker = make_worker(handler, concurrency=2)
+        await worker.start()
+        job_id = worker.submit("session-1", "user-1", "hello", message_id="m1")
+        assert worker.get_job(job_id)["status"] == TurnJobStatus.QUEUED
+
+        job = await worker.wait(job_id, timeout=1)
+        await worker.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == TurnJobStatus.COMPLETE
+    assert job["reply"] == "echo: hello"
+    assert job["session_id"] == "session-1"
+
+
+def test_per_user_limit_and_global_backpressure():
+    """Per-user limit gives 429-style errors, a full queue gives 503-style errors"""
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            return "done"
+
+        worker = make_worker(handler, concurrency=1, max_queue_size=2, max_per_user=1)
+        await worker.start()
+
+        worker.submit("s1", "user-a", "first")
+        with pytest.raises(UserTurnLimitError):
+            worker.submit("s2", "user-a", "second")
+
+        # Let the single worker pick up user-a's job, then fill the queue
+        await asyncio.sleep(0)
+        worker.submit("s3", "user-b", "b")
+        worker.submit("s4", "user-c", "c")
+        with pytest.raises(TurnQueueFullError):
+            worker.submit("s5", "user-d", "d")
+
+        release.set()
+        await asyncio.sleep(0.05)
+        # Capacity frees up once the jobs finish
+        worker.check_capacity("user-a")
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_and_timed_out_turns_call_failure_handler():
+    """Errors and timeouts mark the job failed and notify the failure handler"""
+
+    async def scenario():
+        failures = []
+
+        async def handler(job):
+            if job["message"] == "boom":
+                raise RuntimeError("agent exploded")
+            await asyncio.sleep(1)
+            return "too slow"
+
+        worker = make_worker(handler, failures, concurrency=2, timeout=0.05)
+        await worker.start()
+        boom_id = worker.submit("s1", "user-1", "boom")
+        slow_id = worker.submit("s2", "user-2", "slow")
+        boom = await worker.wait(boom_id, timeout=1)
+        slow = await worker.wait(slow_id, timeout=1)
+        await worker.stop()
+        return boom, slow, failures
+
+    boom, slow, failures = asyncio.run(scenario())
+    assert boom["status"] == TurnJobStatus.FAILED
+    assert "agent exploded" in boom["error"]
+    assert slow["status"] == TurnJobStatus.FAILED
+    assert "timed out" in slow["error"]
+    assert len(failures) == 2
+
+
+def test_submit_rejected_when_worker_not_started():
+    worker = make_worker(lambda job: None)
+    with pytest.raises(TurnQueueFullError):
+        worker.submit("s1", "user-1", "hello")
+
+
+def test_jobs_are_visible_to_every_worker_process():
+    """A job queued by one process can be polled and limited from another"""
+    mongomock = pytest.importorskip("mongomock")
+    jobs = mongomock.MongoClient().db.turn_jobs
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            return "done"
+
+        first = make_worker(handler, max_per_user=1, shared=True, jobs_collection=jobs)
+        # The other process never runs the job, it only serves polls
+        other = make_worker(handler, max_per_user=1, shared=True, jobs_collection=jobs)
+        await first.start()
+        await other.start()
+
+        job_id = first.submit("s1", "user-a", "hello")
+        assert other.get_job(job_id)["status"] == TurnJobStatus.QUEUED
+        with pytest.raises(UserTurnLimitError):
+            other.submit("s2", "user-a", "second")
+
+        waiting = asyncio.create_task(other.wait(job_id, timeout=2))
+        await asyncio.sleep(0.05)
+        release.set()
+        job = await waiting
+        other.check_capacity("user-a")
+        await first.stop()
+        await other.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == TurnJobStatus.COMPLETE
+
+    # Finished jobs carry the expiry their TTL index removes them by
+    stored = jobs.find_one({"_id": ObjectId(job["_id"])})
+    assert stored["expire_at"] > stored["updated_at"]
+    keys = [index["key"] for index in jobs.index_information().values()]
+    assert [("expire_at", 1)] in keys
+    assert [("user_id", 1), ("status", 1), ("updated_at", 1)] in keys
@@ -63,3 +63,13 @@ def get_available_tool_names() -> List[str]:
             except Exception as e:
                 print(f"Error loading tool {module_name}: {e}")
     return tool_names
+
+
+def get_tools_version() -> str:
+    """Changes whenever a tool module is added, removed or modified"""
+    entries = []
+    for filename in sorted(os.listdir(AVAILABLE_TOOLS_DIR)):
+        if filename.endswith(".py") and not filename.startswith("__"):
+            path = os.path.join(AVAILABLE_TOOLS_DIR, filename)
+            entries.append(f"{filename}:{os.stat(path).st_mtime_ns}")
+    return ",".join(entries)
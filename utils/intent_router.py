@@ -0,0 +1,399 @@
+"""
+Deterministic fast-path router for obvious single-tool requests.
+
+Clear read-only lookups ("list my calendars", "show my unread emails") are sent
+straight to the tool with no LLM call, but only when the router can turn every
+content word into a tool argument; a person, topic, date or calendar name it
+cannot express would be dropped from the query, so such messages go to an
+agent. Clear single-domain actions or pure research go straight to the
+executor or retriever agent, skipping the supervisor's first delegation step.
+Anything else returns None and takes the normal supervisor path.
+"""
+
+import logging
+import re
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Gmail actions exposed by the gmail_mcp tool (see available_tools/gmail_mcp.py)
+GMAIL_ACTIONS = [
+    {
+        "name": "get_messages",
+        "description": "Get recent or matching Gmail inbox messages.",
+        "read_only": True,
+    },
+    {
+        "name": "send_message",
+        "description": "Send an email message.",
+        "read_only": False,
+    },
+]
+
+# Calendar tools that only read data; everything else in GOOGLE_CALENDAR_TOOLS writes
+CALENDAR_READ_ONLY_TOOLS = {"list-calendars", "list-events"}
+
+# Map everyday words onto the vocabulary used in tool names and descriptions
+SYNONYMS = {
+    "meeting": "events",
+    "meetings": "events",
+    "appointment": "events",
+    "appointments": "events",
+    "agenda": "events",
+    "event": "events",
+    "emails": "messages",
+    "email": "messages",
+    "mail": "messages",
+    "mails": "messages",
+    "inbox": "messages",
+    "message": "messages",
+}
+
+CALENDAR_WORDS = {"calendar", "calendars", "events", "schedule", "scheduled"}
+EMAIL_WORDS = {"messages", "gmail"}
+READ_WORDS = {
+    "list",
+    "show",
+    "get",
+    "check",
+    "what",
+    "whats",
+    "what's",
+    "which",
+    "any",
+    "see",
+    "view",
+    "display",
+    "read",
+    "have",
+}
+WRITE_WORDS = {
+    "send",
+    "create",
+    "add",
+    "book",
+    "update",
+    "move",
+    "reschedule",
+    "delete",
+    "cancel",
+    "remove",
+    "invite",
+    "reply",
+    "forward",
+    "draft",
+    "write",
+    "compose",
+}
+RESEARCH_WORDS = {
+    "search",
+    "research",
+    "google",
+    "news",
+    "look",
+    "lookup",
+    "find",
+    "who",
+    "weather",
+}
+# Words that point back at earlier turns; those need the supervisor's context
+ANAPHORA_WORDS = {"it", "that", "this", "them", "those", "these", "yes", "ok", "okay"}
+COMPOUND_PATTERN = re.compile(r"\b(and|then|after that|also)\b|;")
+STOPWORDS = {"a", "an", "the", "for", "from", "of", "to", "all", "my", "user"}
+EMAIL_ADDRESS_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Words a tool fast path accounts for without a tool argument. Any other
+# content word (a name, topic, month, calendar name) sends the message to an
+# agent that can filter on it
+FILLER_WORDS = (
+    READ_WORDS
+    | STOPWORDS
+    | {
+        "i",
+        "me",
+        "do",
+        "does",
+        "is",
+        "are",
+        "am",
+        "there",
+        "please",
+        "can",
+        "could",
+        "you",
+        "tell",
+        "on",
+        "in",
+        "got",
+        "coming",
+        "up",
+        # get_messages already returns the newest messages first
+        "latest",
+        "recent",
+        "newest",
+    }
+)
+# Windows time_window understands
+TIME_WORDS = {"today", "tonight", "tomorrow", "week", "this", "next", "upcoming"}
+# Windows bounded by the user's midnight, which need their time zone
+DAY_WINDOW_WORDS = {"today", "tonight", "tomorrow", "week"}
+# "schedule" is a calendar noun unless it is used as a verb
+SCHEDULE_VERB_PATTERN = re.compile(r"^(please )?schedule\b|\bschedule (a|an|the)\b")
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9@.'+-]+", text.lower())
+
+
+def _normalize(tokens: List[str]) -> Set[str]:
+    return {SYNONYMS.get(token.strip(".'"), token.strip(".'")) for token in tokens}
+
+
+def _keywords(name: str, description: str) -> Set[str]:
+    words = _tokens(name.replace("-", " ").replace("_", " ") + " " + description)
+    return {word.strip(".") for word in words} - STOPWORDS
+
+
+def time_window(
+    words: Set[str], now: Optional[datetime] = None, tz: Optional[tzinfo] = None
+) -> Dict[str, str]:
+    """Translate today/tomorrow/this week/next week into timeMin/timeMax
+
+    Day boundaries are midnights in tz, the user's calendar time zone.
+    """
+    now = now or datetime.now(tz)
+    start_of_day = datetime.combine(now.date(), time.min, tzinfo=now.tzinfo)
+
+    if "tomorrow" in words:
+        start = start_of_day + timedelta(days=1)
+        end = start + timedelta(days=1)
+    elif "today" in words or "tonight" in words:
+        start, end = now, start_of_day + timedelta(days=1)
+    elif "week" in words and "next" in words:
+        start = start_of_day + timedelta(days=7 - now.weekday())
+        end = start + timedelta(days=7)
+    elif "week" in words:
+        start = now
+        end = start_of_day + timedelta(days=7 - now.weekday())
+    else:
+        # "upcoming", "next meeting", or no window at all
+        start, end = now, None
+
+    window = {"timeMin": start.isoformat()}
+    if end is not None:
+        window["timeMax"] = end.isoformat()
+    return window
+
+
+class IntentRouter:
+    """Rule + keyword-index classifier over the calendar tools and gmail actions"""
+
+    def __init__(self, calendar_tools: Optional[List[Dict[str, Any]]] = None):
+        if calendar_tools is None:
+            calendar_tools = self._load_calendar_tools()
+
+        # keyword -> set of (tool, action) entries it appears in
+        self.index: Dict[str, Set[tuple]] = {}
+        self.read_only: Set[tuple] = set()
+        for entry in calendar_tools:
+            key = ("google_calendar_mcp", entry["name"])
+            self._add_to_index(key, _keywords(entry["name"], entry["description"]))
+            if entry["name"] in CALENDAR_READ_ONLY_TOOLS:
+                self.read_only.add(key)
+        for entry in GMAIL_ACTIONS:
+            key = ("gmail_mcp", entry["name"])
+            self._add_to_index(key, _keywords(entry["name"], entry["description"]))
+            if entry["read_only"]:
+                self.read_only.add(key)
+
+    @staticmethod
+    def _load_calendar_tools() -> List[Dict[str, Any]]:
+        try:
+            from available_tools.google_calendar import GOOGLE_CALENDAR_TOOLS
+
+            return GOOGLE_CALENDAR_TOOLS
+        except Exception as e:
+            logger.warning(f"Calendar tools unavailable for fast path: {e}")
+            return []
+
+    def _add_to_index(self, key: tuple, keywords: Set[str]):
+        for keyword in keywords:
+            self.index.setdefault(keyword, set()).add(key)
+
+    def _best_read_only_match(self, words: Set[str], tool: str) -> Optional[str]:
+        scores: Dict[str, int] = {}
+        for word in words:
+            for key in self.index.get(word, ()):
+                if key[0] == tool and key in self.read_only:
+                    scores[key[1]] = scores.get(key[1], 0) + 1
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None  # ambiguous
+        return ranked[0][0]
+
+    def classify(
+        self, message: str, conversation_history: Optional[list] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a fast-path route for the message, or None for the supervisor"""
+        text = message.lower().strip()
+        raw_tokens = _tokens(text)
+        words = _normalize(raw_tokens)
+
+        if not raw_tokens or len(raw_tokens) > 30 or COMPOUND_PATTERN.search(text):
+            return None
+        if conversation_history and words & ANAPHORA_WORDS:
+            return None
+
+        is_calendar = bool(words & CALENDAR_WORDS)
+        is_email = bool(words & EMAIL_WORDS)
+        is_write = bool(words & WRITE_WORDS) or bool(SCHEDULE_VERB_PATTERN.search(text))
+        is_read = (
+            bool(words & READ_WORDS)
+            or text.endswith("?")
+            or (is_email and "from" in words)
+        )
+        is_research = bool(words & RESEARCH_WORDS)
+
+        if is_calendar and is_email:
+            return None
+
+        if (is_calendar or is_email) and is_write:
+            if is_research:
+                return None
+            return {
+                "kind": "agent",
+                "target": "executor_agent",
+                "reason": "single-domain action",
+            }
+
+        if is_calendar and is_read and not is_research:
+            action = self._best_read_only_match(words, "google_calendar_mcp")
+            if words - FILLER_WORDS - TIME_WORDS - CALENDAR_WORDS:
+                return None  # constraints list-events has no argument for
+            if action == "list-events" or (action is None and "events" in words):
+                # The window is computed at call time, in the user's time zone
+                return {
+                    "kind": "tool",
+                    "target": "google_calendar_mcp",
+                    "action": "list-events",
+                    "args": {"calendarId": "primary"},
+                    "time_words": sorted(words & TIME_WORDS),
+                    "reason": "calendar lookup",
+                }
+            if action == "list-calendars":
+                return {
+                    "kind": "tool",
+                    "target": "google_calendar_mcp",
+                    "action": "list-calendars",
+                    "args": {},
+                    "reason": "calendar list",
+                }
+            return None
+
+        if is_email and is_read and not is_research:
+            action = self._best_read_only_match(words, "gmail_mcp")
+            if action != "get_messages":
+                return None
+            query, consumed = self._gmail_query(text, words)
+            if words - FILLER_WORDS - EMAIL_WORDS - consumed:
+                return None  # e.g. a topic the query would not search for
+            return {
+                "kind": "tool",
+                "target": "gmail_mcp",
+                "action": "get_messages",
+                "args": {"query": query, "max_results": 10},
+                "reason": "inbox lookup",
+            }
+
+        if is_research and not (is_calendar or is_email or is_write):
+            return {
+                "kind": "agent",
+                "target": "retriever_agent",
+                "reason": "pure research",
+            }
+
+        return None
+
+    @staticmethod
+    def _gmail_query(text: str, words: Set[str]) -> Tuple[str, Set[str]]:
+        """Gmail search for the message, and the words the search accounts for"""
+        terms, consumed = [], set()
+        if "unread" in words:
+            terms.append("is:unread")
+            consumed.add("unread")
+        if "starred" in words:
+            terms.append("is:starred")
+            consumed.add("starred")
+        address = EMAIL_ADDRESS_PATTERN.search(text)
+        if address and " from " in f" {text} ":
+            terms.append(f"from:{address.group(0)}")
+            consumed |= {"from", address.group(0).strip(".'")}
+        else:
+            sender = re.search(r"\bfrom ([a-z][a-z.'-]+)", text)
+            if sender and sender.group(1) not in {"today", "yesterday", "my", "the"}:
+                terms.append(f"from:{sender.group(1)}")
+                consumed |= {"from", sender.group(1).strip(".'")}
+        if "today" in words:
+            terms.append("newer_than:1d")
+            consumed.add("today")
+        return " ".join(terms), consumed
+
+
+def format_tool_reply(route: Dict[str, Any], result: Any) -> Optional[str]:
+    """Render a fast-path tool result as the assistant reply.
+
+    Returns None when the result is not usable, so the caller can fall back
+    to the supervisor.
+    """
+    if not isinstance(result, dict):
+        return None
+    if result.get("status") == "authentication_required":
+        return (
+            f"{result.get('message', 'Authentication required.')}\n\n"
+            f"Authorize here: {result.get('authorization_url', '')}"
+        )
+    if result.get("status") != "success":
+        return None
+
+    data = result.get("data") or {}
+    if not isinstance(data, dict):
+        return None
+    action = route["action"]
+
+    if action == "list-calendars":
+        calendars = data.get("calendars", [])
+        if not calendars:
+            return "You don't have any calendars yet."
+        lines = [
+            f"- {cal.get('name', cal.get('id'))}{' (primary)' if cal.get('primary') else ''}"
+            for cal in calendars
+        ]
+        return f"You have {len(calendars)} calendars:\n" + "\n".join(lines)
+
+    if action == "list-events":
+        events = data.get("events")
+        if events is None:
+            return None
+        if not events:
+            return "You have no events in that time range."
+        lines = []
+        for event in events:
+            start = event.get("start")
+            if isinstance(start, dict):
+                start = start.get("dateTime") or start.get("date")
+            lines.append(f"- {start or 'TBD'}: {event.get('summary', '(no title)')}")
+        return f"You have {len(events)} events:\n" + "\n".join(lines)
+
+    if action == "get_messages":
+        messages = data.get("messages", [])
+        if not messages:
+            return "No emails matched."
+        lines = [
+            f"- {msg.get('subject', 'No Subject')} — {msg.get('sender', 'Unknown')} ({msg.get('date', '')})"
+            for msg in messages
+        ]
+        return f"Here are your {len(messages)} most recent emails:\n" + "\n".join(lines)
+
+    return None
@@ -0,0 +1,40 @@
+"""
+orjson serialization for API responses.
+
+OrjsonResponse is the app's default response class. It renders datetimes
+natively and ObjectIds, sets and Pydantic models through default(). Routes on
+hot paths (session messages, Gmail data) return it directly, which also skips
+FastAPI's jsonable_encoder pass over the content. Output matches what
+jsonable_encoder + json.dumps produced for the same data.
+"""
+
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def default(obj: Any) -> Any:
+    """Types orjson does not serialize itself"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=default, option=OPTIONS)
+
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
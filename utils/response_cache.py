@@ -0,0 +1,149 @@
+"""
+ETag revalidation and a serialized-body cache for polled read endpoints.
+
+The frontend polls GET /tasks and GET /tasks/{task_id}/messages while a turn
+is processing. Each route derives a cheap version string for what it would
+return (e.g. the session's updated_at and message_count), and the ETag is a
+hash of route key and version. A matching If-None-Match gets a 304 without
+building anything. A changed client with an unchanged version gets the
+cached JSON bytes. Routes without a local version (Google calendar lists)
+cache their body for a TTL and use a hash of it as the ETag.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from utils.json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+
+class CachedBody(NamedTuple):
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+def make_etag(key: str, version: str) -> str:
+    digest = hashlib.sha1(f"{key}|{version}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, or *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+class ResponseCache:
+    """LRU cache of serialized JSON bodies keyed by route, with ETags"""
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # Sync routes run in the threadpool, so the cache is lock-protected
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self.not_modified = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _response(body: Optional[bytes], etag: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if body is None:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def lookup(
+        self, request: Request, key: str, version: Optional[str] = None
+    ) -> Optional[Response]:
+        """
+        304 or cached body for the route, or None if it has to be built
+        Without a version only an unexpired TTL entry can answer
+        """
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+
+            if version is not None:
+                etag = make_etag(key, version)
+            elif entry is not None:
+                etag = entry.etag
+            else:
+                self.misses += 1
+                return None
+
+            if etag_matches(request, etag):
+                self.not_modified += 1
+                return self._response(None, etag)
+            if entry is not None and entry.etag == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._response(entry.body, etag)
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        key: str,
+        content: Any,
+        version: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> Response:
+        """Serialize content once, cache it and return it with its ETag"""
+        body = dumps(content)
+        if version is None:
+            version = hashlib.sha1(body).hexdigest()
+        etag = make_etag(key, version)
+
+        if self.enabled:
+            expires_at = time.monotonic() + ttl if ttl else float("inf")
+            with self._lock:
+                self._entries[key] = CachedBody(etag, body, expires_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return self._response(body, etag)
+
+    def invalidate(self, key: str):
+        """Drop one route's cached body"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "not_modified": self.not_modified,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,161 @@
+"""
+Short-lived memo for read-only tool calls.
+
+Calendar and Gmail reads (list-events, list-calendars, get_messages) are often
+repeated within one workflow and again on the next turn, and each one is a full
+Lambda round trip. Results are kept per user for TOOL_MEMO_TTL_SECONDS, keyed
+by tool, action and normalized arguments. Any write for the same user and tool
+drops that user's cached reads, whether it runs through an agent tool
+(create-event, send_message, ...) or a REST endpoint: the Lambda services call
+their write_listeners, which watch() subscribes to. Read vs. write comes from
+utils.tool_permissions.TOOL_PERMISSIONS.
+
+The memo is per worker process, so a write handled by another gunicorn worker
+is only seen here once the entry expires; TOOL_MEMO_TTL_SECONDS bounds that
+staleness and is kept short for it.
+"""
+
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.tool_permissions import is_read_only
+
+logger = logging.getLogger(__name__)
+
+TOOL_MEMO_ENABLED = os.getenv("TOOL_MEMO_ENABLED", "true").lower() == "true"
+# Also the longest a write made in another worker process can go unseen
+TOOL_MEMO_TTL_SECONDS = float(os.getenv("TOOL_MEMO_TTL_SECONDS", "15"))
+TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "1000"))
+
+# Seconds and fractions in ISO timestamps; "now"-based windows differ only there
+ISO_SECONDS_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}):\d{2}(\.\d+)?")
+
+
+def normalize_args(args: Dict[str, Any]) -> str:
+    """Stable key for tool arguments: no user_id or empty values, minute precision"""
+
+    def normalize(value):
+        if isinstance(value, dict):
+            return {
+                key: normalize(item)
+                for key, item in value.items()
+                if key != "user_id" and item not in (None, "", [], {})
+            }
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        if isinstance(value, str):
+            return ISO_SECONDS_PATTERN.sub(r"\1", value.strip())
+        return value
+
+    return json.dumps(normalize(args), sort_keys=True, default=str)
+
+
+class ToolMemo:
+    """Per-user TTL cache of read-only tool results, invalidated by writes"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = TOOL_MEMO_TTL_SECONDS,
+        max_entries: int = TOOL_MEMO_MAX_ENTRIES,
+        enabled: bool = TOOL_MEMO_ENABLED,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # Tool functions run in worker threads, so the cache is lock-protected
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # Bumped on every write so a read that overlapped it is not cached
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def call(
+        self,
+        tool_name: str,
+        action: str,
+        user_id: Optional[str],
+        args: Dict[str, Any],
+        func: Callable[[], Any],
+    ) -> Any:
+        """Return a memoized result for reads; run writes and invalidate reads"""
+        if not self.enabled or not user_id:
+            return func()
+
+        scope = (str(user_id), tool_name)
+        if not is_read_only(tool_name, action):
+            try:
+                return func()
+            finally:
+                self.invalidate(user_id, tool_name)
+
+        key = (*scope, action, normalize_args(args))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            generation = self._generations.get(scope[0], 0)
+
+        result = func()
+        if isinstance(result, dict) and result.get("status") == "success":
+            with self._lock:
+                if self._generations.get(scope[0], 0) == generation:
+                    self._entries[key] = (
+                        time.monotonic() + self.ttl_seconds,
+                        copy.deepcopy(result),
+                    )
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, user_id: str, tool_name: Optional[str] = None):
+        """Drop cached reads for a user (optionally only for one tool)"""
+        user_id = str(user_id)
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == user_id and (tool_name is None or key[1] == tool_name)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.invalidations += 1
+        if stale:
+            logger.info(
+                f"Invalidated {len(stale)} memoized {tool_name or 'tool'} reads "
+                f"for user {user_id}"
+            )
+
+    def watch(self, lambda_service, tool_name: str):
+        """Invalidate tool_name reads whenever lambda_service reports a write"""
+        lambda_service.write_listeners.append(
+            lambda user_id: self.invalidate(user_id, tool_name)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global tool memo instance
+tool_memo = ToolMemo()
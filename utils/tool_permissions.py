@@ -24,10 +24,26 @@ TOOL_PERMISSIONS: Dict[str, ToolPermission] = {
         "delete_label": ToolPermission.REQUIRE_APPROVAL,
         "batch_modify_emails": ToolPermission.REQUIRE_APPROVAL,
         "batch_delete_emails": ToolPermission.REQUIRE_APPROVAL,
+        # Actions implemented by the Gmail Lambda
+        "get_messages": ToolPermission.ALWAYS_ALLOW,
+        "send_message": ToolPermission.REQUIRE_APPROVAL,
+        "list_tools": ToolPermission.ALWAYS_ALLOW,
+    },
+    # Google Calendar MCP tools
+    "google_calendar_mcp": {
+        "list-calendars": ToolPermission.ALWAYS_ALLOW,
+        "list-events": ToolPermission.ALWAYS_ALLOW,
+        "get-agenda": ToolPermission.ALWAYS_ALLOW,
+        "create-event": ToolPermission.REQUIRE_APPROVAL,
+        "update-event": ToolPermission.REQUIRE_APPROVAL,
+        "delete-event": ToolPermission.REQUIRE_APPROVAL,
     },
     # Add other tools here with their permissions
 }
 
+# Always-allowed actions that still change data, so they are never memoized
+UNAPPROVED_WRITES = {("gmail_mcp", "draft_email")}
+
 
 def requires_approval(tool_name: str, subtool: Optional[str] = None) -> bool:
     """Check if a tool requires user approval."""
@@ -47,6 +63,13 @@ def requires_approval(tool_name: str, subtool: Optional[str] = None) -> bool:
     return TOOL_PERMISSIONS[tool_name] == ToolPermission.REQUIRE_APPROVAL
 
 
+def is_read_only(tool_name: str, subtool: Optional[str] = None) -> bool:
+    """Check if a tool action only reads data (always allowed and not a write)."""
+    if (tool_name, subtool) in UNAPPROVED_WRITES:
+        return False
+    return not requires_approval(tool_name, subtool)
+
+
 def format_approval_request(tool_name: str, tool_args: Dict[str, Any]) -> str:
     """Format a user-friendly approval request message."""
     if tool_name == "gmail_mcp":